@@ -0,0 +1,4 @@
+"""
+Benchmarks module for Voyaltis Agent
+Run from the agent/ directory, e.g. `python -m benchmarks.bench_catalog_memory`
+"""
@@ -0,0 +1,90 @@
+"""
+Ingestion benchmark: streaming products.json parsing vs json.load
+
+Compares peak traced memory and wall time of:
+- load:   json.load of the whole document, then ProductCatalog.from_records
+- stream: ProductCatalog.from_file (incremental parser, one product at a time)
+
+"overhead" is the peak minus the memory retained by the final catalog, i.e.
+what ingestion costs on top of the catalog itself. With streaming it stays
+bounded by the chunk size whatever the file size.
+
+Usage (from agent/):
+    python -m benchmarks.bench_catalog_ingestion --products 10000 100000
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.synthetic import write_products_file
+from utils.catalog import ProductCatalog
+
+
+def load_whole_document(path: str) -> ProductCatalog:
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return ProductCatalog.from_records(data)
+
+
+def stream_document(path: str) -> ProductCatalog:
+    return ProductCatalog.from_file(path)
+
+
+def measure(build, path: str) -> dict:
+    # Time without tracemalloc, which slows allocations down several times
+    gc.collect()
+    started = time.perf_counter()
+    build(path)
+    elapsed = time.perf_counter() - started
+
+    gc.collect()
+    tracemalloc.start()
+    catalog = build(path)
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "products": len(catalog),
+        "seconds": round(elapsed, 3),
+        "peak_bytes": peak,
+        "retained_bytes": retained,
+        "overhead_bytes": peak - retained,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in args.products:
+            path = os.path.join(tmp, f"products_{count}.json")
+            write_products_file(path, count)
+            file_size = os.path.getsize(path)
+            for mode, build in (("load", load_whole_document), ("stream", stream_document)):
+                result = measure(build, path)
+                result.update({"mode": mode, "file_bytes": file_size})
+                results.append(result)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'products':>9} {'file MiB':>9} {'mode':>7} {'time s':>7} {'peak MiB':>9} {'catalog MiB':>12} {'overhead MiB':>13}")
+    for r in results:
+        print(f"{r['products']:>9} {r['file_bytes'] / 2**20:>9.1f} {r['mode']:>7} {r['seconds']:>7.2f} "
+              f"{r['peak_bytes'] / 2**20:>9.1f} {r['retained_bytes'] / 2**20:>12.1f} {r['overhead_bytes'] / 2**20:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Memory benchmark: compact ProductCatalog vs the former list-of-dicts layout
+
+The former layout kept, per session, the raw products list from json.load,
+the SalesAnalyzer copy from get_products_for_analyzer(), a names list, a
+keyword map and the rendered catalog text. The compact layout compiles the file once into a ProductCatalog
+shared by every ConfigLoader/SalesAnalyzer of the worker.
+
+Usage (from agent/):
+    python -m benchmarks.bench_catalog_memory --products 10000 --sessions 20
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import logging
+import os
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.synthetic import write_products_file
+from sales_analyzer import SalesAnalyzer
+from utils.catalog import normalize_product_field
+from utils.config_loader import ConfigLoader
+
+
+def legacy_session(products_file: str) -> tuple:
+    """Rebuild the per-session structures of the former implementation"""
+    with open(products_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    products = data if isinstance(data, list) else data.get("products", [])
+
+    analyzer_products = [
+        {
+            "nom": normalize_product_field(p, "display_name") or normalize_product_field(p, "name"),
+            "catégorie": normalize_product_field(p, "category"),
+            "objectifs": normalize_product_field(p, "target_quantity"),
+            "keywords": normalize_product_field(p, "keywords"),
+        }
+        for p in products
+    ]
+    product_names = [p["nom"] for p in analyzer_products]
+    product_keywords = {p["nom"]: p["keywords"] for p in analyzer_products if p["keywords"]}
+    products_info = legacy_products_list_for_prompt(products)
+    return products, analyzer_products, product_names, product_keywords, products_info
+
+
+def legacy_products_list_for_prompt(products: list) -> str:
+    """Per-session catalog rendering of the former implementation (same output)"""
+    standard_fields = {
+        "name", "Nom", "nom", "display_name", "Nom d'affichage", "id", "ID",
+        "category", "Catégorie", "catégorie", "keywords", "Mots-clés", "mots-clés"
+    }
+    lines = []
+    for i, product in enumerate(products, 1):
+        name = normalize_product_field(product, "display_name") or normalize_product_field(product, "name")
+        category = normalize_product_field(product, "category")
+        keywords = normalize_product_field(product, "keywords")
+        lines.append(f"{i}. {name}" + (f" ({category})" if category else ""))
+        if keywords:
+            lines.append(f"   - Mots-clés : {', '.join(keywords[:8])}...")
+        for field_name, field_value in product.items():
+            if field_name in standard_fields or field_value is None or field_value == "" or field_value == []:
+                continue
+            if isinstance(field_value, list):
+                field_value = ', '.join(str(v) for v in field_value)
+            lines.append(f"   - {field_name.replace('_', ' ').title()} : {field_value}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def compact_session(products_file: str) -> tuple:
+    """Build the per-session structures of the current implementation"""
+    loader = ConfigLoader(products_file, "non_existent_config.json")
+    analyzer = SalesAnalyzer(config_loader=loader)
+    loader.get_products_list_for_prompt()
+    analyzer.catalog.match_index()
+    return loader, analyzer
+
+
+def measure(build, products_file: str, sessions: int) -> int:
+    """Return bytes still allocated after building `sessions` sessions"""
+    gc.collect()
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        kept = [build(products_file) for _ in range(sessions)]
+    gc.collect()
+    current, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--sessions", type=int, default=10, help="concurrent sessions on the same project")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in args.products:
+            path = os.path.join(tmp, f"products_{count}.json")
+            write_products_file(path, count)
+            legacy = measure(legacy_session, path, args.sessions)
+            compact = measure(compact_session, path, args.sessions)
+            results.append({
+                "products": count,
+                "sessions": args.sessions,
+                "legacy_bytes": legacy,
+                "compact_bytes": compact,
+                "ratio": round(legacy / compact, 1) if compact else None,
+            })
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'products':>9} {'sessions':>8} {'legacy MiB':>11} {'compact MiB':>12} {'ratio':>6}")
+    for r in results:
+        print(f"{r['products']:>9} {r['sessions']:>8} {r['legacy_bytes'] / 2**20:>11.2f} "
+              f"{r['compact_bytes'] / 2**20:>12.2f} {r['ratio']:>5}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""
+Load generator: concurrent simulated reps against the agent
+
+Runs sessions at increasing concurrency levels and reports, per level, throughput
+(completed sessions and turns per second) and turn / report latency percentiles,
+i.e. the curves that show where one worker (or one machine) starts to degrade.
+
+Targets:
+- livekit   a LiveKit server (docker-compose.yml / livekit.yaml) with the agent
+            worker running (python mainV2.py dev). Each rep joins its own room
+            with {"userName", "projectId"} participant metadata, sends text-mode
+            "user_text_message" packets (handled by data_received), times each
+            "agent_response", and waits for "conversation-complete". Point the
+            worker at benchmarks/mock_llm_server.py for runs without network costs
+            (the opening message still goes through the worker TTS).
+- fake      in-process: the session code of benchmarks/replay.py on one event loop,
+            with simulated LLM/TTS latency. Measures what N sessions cost one worker
+            process (event loop contention), without LiveKit.
+
+User messages are the user side of benchmarks.replay.synthetic_transcript.
+
+Usage (from agent/):
+    python -m benchmarks.load_generator --target fake --concurrency 1 8 32 128 --llm-latency 0.4
+    python -m benchmarks.load_generator --target livekit --project perrot --concurrency 1 2 4 8 --json results.json
+
+LiveKit connection (environment): LIVEKIT_URL (ws://localhost:7880),
+LIVEKIT_API_KEY (devkey), LIVEKIT_API_SECRET (secret).
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.replay import ProjectSession, replay_session, synthetic_transcript
+from utils.conversation_state import TEXT
+from utils.loop_monitor import LoopMonitor
+from utils.tracing import LatencyHistogram
+
+CLOSING_MESSAGE = "Non, c'est tout pour aujourd'hui."
+
+
+@dataclass
+class RepResult:
+    """One simulated rep session"""
+    completed: bool = False
+    error: Optional[str] = None
+    turn_seconds: List[float] = field(default_factory=list)
+    report_seconds: Optional[float] = None
+    session_seconds: float = 0.0
+
+
+def user_messages(project: ProjectSession, seed: int) -> List[str]:
+    return [m["content"] for m in synthetic_transcript(project, seed=seed) if m["role"] == "user"]
+
+
+# -- In-process target ------------------------------------------------------------
+
+async def run_fake_rep(project: ProjectSession, seed: int, llm_latency: float, report_latency: float) -> RepResult:
+    started = time.perf_counter()
+    result = RepResult()
+    try:
+        session = await replay_session(project, synthetic_transcript(project, seed=seed), TEXT,
+                                       llm_latency=llm_latency, report_latency=report_latency)
+        result.turn_seconds = session.turn_seconds
+        result.report_seconds = session.report_seconds
+        result.completed = session.report_ok
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"
+    result.session_seconds = time.perf_counter() - started
+    return result
+
+
+# -- LiveKit target ---------------------------------------------------------------
+
+class LiveKitRep:
+    """A rep in its own room: text messages out, agent packets in"""
+
+    def __init__(self, url: str, api_key: str, api_secret: str, project_id: str, messages: List[str],
+                 reply_timeout: float = 60.0, report_timeout: float = 120.0):
+        self.url = url
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.project_id = project_id
+        self.messages = messages
+        self.reply_timeout = reply_timeout
+        self.report_timeout = report_timeout
+        self.room_name = f"load-{project_id}-{uuid.uuid4().hex[:8]}"
+        self._replies: asyncio.Queue = asyncio.Queue()
+        self._complete = asyncio.Event()
+        self._ending = asyncio.Event()
+
+    def _token(self) -> str:
+        from livekit import api
+
+        identity = f"rep-{uuid.uuid4().hex[:6]}"
+        metadata = {"userName": "Thomas", "eventName": "", "projectId": self.project_id}
+        return (
+            api.AccessToken(self.api_key, self.api_secret)
+            .with_identity(identity)
+            .with_name(identity)
+            .with_metadata(json.dumps(metadata))
+            .with_grants(api.VideoGrants(room_join=True, room=self.room_name, can_publish=True, can_subscribe=True, can_publish_data=True))
+            .to_jwt()
+        )
+
+    def _on_data(self, packet):
+        try:
+            message = json.loads(packet.data.decode('utf-8'))
+        except (ValueError, UnicodeDecodeError):
+            return
+        kind = message.get("type")
+        if kind == "agent_response":
+            self._replies.put_nowait(time.perf_counter())
+        elif kind == "conversation_ending":
+            self._ending.set()
+        elif kind == "conversation_complete":
+            self._complete.set()
+
+    async def _send(self, room, text: str):
+        payload = json.dumps({"type": "user_text_message", "text": text, "mode": "text"}).encode('utf-8')
+        await room.local_participant.publish_data(payload, reliable=True)
+
+    async def run(self) -> RepResult:
+        from livekit import rtc
+
+        started = time.perf_counter()
+        result = RepResult()
+        room = rtc.Room()
+        room.on("data_received", self._on_data)
+        try:
+            await room.connect(self.url, self._token())
+            # The agent joins and speaks its opening first
+            await asyncio.wait_for(self._replies.get(), self.reply_timeout)
+
+            pending = list(self.messages)
+            while not (self._ending.is_set() or self._complete.is_set()):
+                text = pending.pop(0) if pending else CLOSING_MESSAGE
+                sent = time.perf_counter()
+                await self._send(room, text)
+                replied = await asyncio.wait_for(self._replies.get(), self.reply_timeout)
+                result.turn_seconds.append(replied - sent)
+                # Give the end detection a moment to signal before the next message
+                await asyncio.sleep(0.05)
+                if not pending and len(result.turn_seconds) > len(self.messages) + 6:
+                    raise RuntimeError("conversation did not end")
+
+            ending = time.perf_counter()
+            await asyncio.wait_for(self._complete.wait(), self.report_timeout)
+            result.report_seconds = time.perf_counter() - ending
+            result.completed = True
+        except asyncio.TimeoutError:
+            result.error = "timeout"
+        except Exception as e:
+            result.error = f"{type(e).__name__}: {e}"
+        finally:
+            await room.disconnect()
+        result.session_seconds = time.perf_counter() - started
+        return result
+
+
+# -- Load levels ------------------------------------------------------------------
+
+def summarize(concurrency: int, results: List[RepResult], wall: float, max_loop_lag: Optional[float] = None) -> Dict:
+    turns = LatencyHistogram(max_samples=1_000_000)
+    reports = LatencyHistogram(max_samples=1_000_000)
+    for result in results:
+        for seconds in result.turn_seconds:
+            turns.observe(seconds)
+        if result.report_seconds is not None:
+            reports.observe(result.report_seconds)
+    completed = sum(1 for r in results if r.completed)
+    errors: Dict[str, int] = {}
+    for result in results:
+        if result.error:
+            errors[result.error] = errors.get(result.error, 0) + 1
+    summary = {
+        "concurrency": concurrency,
+        "sessions": len(results),
+        "completed": completed,
+        "wall_seconds": round(wall, 2),
+        "sessions_per_second": round(completed / wall, 3) if wall else None,
+        "turns_per_second": round(turns.count / wall, 2) if wall else None,
+        "turn_latency": turns.summary(),
+        "report_latency": reports.summary(),
+        "errors": errors,
+    }
+    if max_loop_lag is not None:
+        summary["max_loop_lag_ms"] = round(max_loop_lag * 1000, 1)
+    return summary
+
+
+async def run_level(args, project: Optional[ProjectSession], concurrency: int) -> Dict:
+    sessions = max(concurrency, args.sessions_per_level or concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+    monitor = None
+    if args.target == "fake":
+        monitor = LoopMonitor(asyncio.get_running_loop(), threshold=0.05)
+        monitor.start()
+
+    async def one(i: int) -> RepResult:
+        async with semaphore:
+            # Ramp: spread the first session starts over ramp seconds
+            if i < concurrency:
+                await asyncio.sleep(args.ramp * i / concurrency)
+            if args.target == "fake":
+                return await run_fake_rep(project, i, args.llm_latency, args.report_latency)
+            messages = user_messages(project, i)
+            return await LiveKitRep(args.url, args.api_key, args.api_secret, args.project, messages).run()
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one(i) for i in range(sessions)))
+    wall = time.perf_counter() - started
+    if monitor:
+        monitor.stop()
+    return summarize(concurrency, results, wall, monitor.max_lag if monitor else None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=("fake", "livekit"), default="fake")
+    parser.add_argument("--project", default="perrot")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--sessions-per-level", type=int, default=0, help="sessions per level (default: the concurrency)")
+    parser.add_argument("--ramp", type=float, default=1.0, help="seconds over which session starts are spread")
+    parser.add_argument("--llm-latency", type=float, default=0.4, help="fake target: seconds per LLM reply")
+    parser.add_argument("--report-latency", type=float, default=3.0, help="fake target: seconds of the report LLM call")
+    parser.add_argument("--url", default=os.getenv("LIVEKIT_URL", "ws://localhost:7880"))
+    parser.add_argument("--api-key", default=os.getenv("LIVEKIT_API_KEY", "devkey"))
+    parser.add_argument("--api-secret", default=os.getenv("LIVEKIT_API_SECRET", "secret"))
+    parser.add_argument("--json", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    project = ProjectSession.load(args.project)
+    results = []
+    print(f"{'conc.':>5} {'sessions':>8} {'done':>5} {'sess/s':>7} {'turns/s':>8} {'turn p50':>9} {'turn p95':>9} {'turn p99':>9} {'report p95':>10} {'loop lag':>9}  errors")
+    for concurrency in args.concurrency:
+        level = asyncio.run(run_level(args, project, concurrency))
+        results.append(level)
+        turn, report = level["turn_latency"], level["report_latency"]
+        print(f"{concurrency:>5} {level['sessions']:>8} {level['completed']:>5} {level['sessions_per_second']!s:>7} {level['turns_per_second']!s:>8} "
+              f"{turn['p50_ms']!s:>9} {turn['p95_ms']!s:>9} {turn['p99_ms']!s:>9} {report['p95_ms']!s:>10} {level.get('max_loop_lag_ms', '-')!s:>9}  {level['errors'] or ''}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({"target": args.target, "project": args.project, "levels": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
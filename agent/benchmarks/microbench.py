@@ -0,0 +1,274 @@
+"""
+Microbenchmarks: catalog loading, sales matching and prompt building
+
+Times the hot functions of a session on synthetic catalogs (10 to 100k products)
+and stores the results as JSON, one file per commit, so runs can be compared.
+
+Cases:
+    config_loader.load              ConfigLoader on a products.json (catalog cache cleared)
+    config_loader.normalize_fields  normalize_product_field over every product and field
+    config_loader.products_prompt   get_products_list_for_prompt (rendering cache cleared)
+    sales_analyzer.map_sales        map_sales_data of 20 lines (direct, fuzzy and unknown names)
+    sales_analyzer.find_best_match  _find_best_match of one approximate name
+    sales_analyzer.insights         generate_insights of 20 sales lines and a feedback text
+    instructions.build              build_simple_instructions with the catalog prompt
+    prompt_builder.extraction       build_claude_extraction_prompt of a 30-message conversation
+
+Usage (from agent/):
+    python -m benchmarks.microbench                                  # writes benchmarks/results/<commit>.json
+    python -m benchmarks.microbench --sizes 10 1000 --only sales_analyzer
+    python -m benchmarks.microbench compare benchmarks/results/abc1234.json benchmarks/results/def5678.json
+"""
+import argparse
+import contextlib
+import fnmatch
+import io
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.synthetic import make_products, write_products_file
+from sales_analyzer import SalesAnalyzer
+from utils import config_loader as config_loader_module
+from utils.catalog import FIELD_ALIASES, normalize_product_field
+from utils.config_loader import ConfigLoader
+from utils.instructions import build_simple_instructions
+from utils.prompt_builder import PromptBuilder
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+DEFAULT_SIZES = [10, 100, 1000, 10000, 100000]
+ATTENTION_POINTS = [
+    {"id": "sales", "description": "Produits vendus", "naturalPrompts": ["Qu'as-tu vendu ?"]},
+    {"id": "feedback", "description": "Retours clients", "naturalPrompts": ["Des retours clients ?"]},
+    {"id": "stock", "description": "Ruptures de stock", "naturalPrompts": ["Des ruptures ?"]},
+]
+FEEDBACK = "Les clients trouvent les prix trop élevés mais adorent la qualité. Problème de stock sur le blanc, forte demande sur le satin."
+
+# name -> setup(size, products_file) returning the timed callable
+BENCHMARKS: Dict[str, Callable[[int, str], Callable[[], object]]] = {}
+
+
+def benchmark(name: str):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def _loader(products_file: str) -> ConfigLoader:
+    with contextlib.redirect_stdout(io.StringIO()):
+        return ConfigLoader(products_file, "non_existent_config.json")
+
+
+def _raw_sales(loader: ConfigLoader) -> Dict[str, int]:
+    """20 report lines: exact labels, approximate names (lowercase, one word dropped) and unknown ones"""
+    labels = loader.catalog.labels
+    step = max(1, len(labels) // 8)
+    sales = {}
+    for i in range(0, min(len(labels), 8 * step), step):
+        sales[labels[i]] = 2
+        sales[" ".join(labels[i].split()[:-1]).lower() or labels[i].lower()] = 1
+    for i in range(20 - len(sales)):
+        sales[f"produit inconnu {i}"] = 1
+    return dict(list(sales.items())[:20])
+
+
+@benchmark("config_loader.load")
+def setup_load(size: int, products_file: str):
+    def run():
+        config_loader_module._catalog_cache.clear()
+        return _loader(products_file)
+    return run
+
+
+@benchmark("config_loader.normalize_fields")
+def setup_normalize(size: int, products_file: str):
+    products = make_products(size)
+    fields = list(FIELD_ALIASES)
+
+    def run():
+        for product in products:
+            for field in fields:
+                normalize_product_field(product, field)
+    return run
+
+
+@benchmark("config_loader.products_prompt")
+def setup_products_prompt(size: int, products_file: str):
+    loader = _loader(products_file)
+
+    def run():
+        loader.catalog.prompt_text = None
+        return loader.get_products_list_for_prompt()
+    return run
+
+
+@benchmark("sales_analyzer.map_sales")
+def setup_map_sales(size: int, products_file: str):
+    loader = _loader(products_file)
+    analyzer = SalesAnalyzer(config_loader=loader)
+    raw_sales = _raw_sales(loader)
+    analyzer.map_sales_data(raw_sales)  # Match index built once per catalog
+    return lambda: analyzer.map_sales_data(raw_sales)
+
+
+@benchmark("sales_analyzer.find_best_match")
+def setup_find_best_match(size: int, products_file: str):
+    loader = _loader(products_file)
+    analyzer = SalesAnalyzer(config_loader=loader)
+    name = " ".join(loader.catalog.labels[len(loader.catalog) // 2].split()[:2]).lower()
+    analyzer._find_best_match(name)
+    return lambda: analyzer._find_best_match(name)
+
+
+@benchmark("sales_analyzer.insights")
+def setup_insights(size: int, products_file: str):
+    loader = _loader(products_file)
+    analyzer = SalesAnalyzer(config_loader=loader)
+    sales = {label: 3 for label in loader.catalog.labels[:20]}
+    return lambda: analyzer.generate_insights(sales, FEEDBACK)
+
+
+@benchmark("instructions.build")
+def setup_instructions(size: int, products_file: str):
+    products_info = _loader(products_file).get_products_list_for_prompt()
+    return lambda: build_simple_instructions(
+        user_name="Thomas",
+        attention_points=ATTENTION_POINTS,
+        questions_asked=2,
+        max_questions=5,
+        first_question_in_opening=True,
+        products_info=products_info,
+    )
+
+
+@benchmark("prompt_builder.extraction")
+def setup_extraction_prompt(size: int, products_file: str):
+    builder = PromptBuilder(_loader(products_file))
+    conversation_text = "\n".join(
+        f"{'ASSISTANT' if i % 2 else 'USER'}: message {i}, j'ai vendu 3 pots de peinture satin et 2 rouleaux."
+        for i in range(30)
+    )
+    attention_structure = "\n".join(f"{i}. {p['description'].upper()}" for i, p in enumerate(ATTENTION_POINTS, 1))
+    return lambda: builder.build_claude_extraction_prompt(conversation_text=conversation_text, attention_structure=attention_structure)
+
+
+def measure(func: Callable[[], object], min_time: float = 0.2, repeats: int = 5) -> Dict:
+    """Per-call seconds: calls batched to last min_time, repeated; median and min of the batches"""
+    started = time.perf_counter()
+    func()
+    single = time.perf_counter() - started
+    number = max(1, int(min_time / single)) if single > 0 else 1000
+    # Slow cases (whole seconds per call): fewer repeats
+    repeats = max(1, min(repeats, int(repeats * min_time / single))) if single > min_time else repeats
+
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - started) / number)
+    return {
+        "median_s": statistics.median(timings),
+        "min_s": min(timings),
+        "calls": number * repeats,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(sizes: List[int], patterns: Optional[List[str]] = None, min_time: float = 0.2, repeats: int = 5) -> Dict:
+    names = [name for name in BENCHMARKS if not patterns or any(fnmatch.fnmatch(name, f"{p}*") for p in patterns)]
+    results = []
+    # Library logs (fuzzy match lines, missing keywords) are not part of the measure
+    logging.disable(logging.WARNING)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for size in sizes:
+                products_file = os.path.join(tmp, f"products_{size}.json")
+                write_products_file(products_file, size)
+                for name in names:
+                    result = measure(BENCHMARKS[name](size, products_file), min_time, repeats)
+                    result.update({"name": name, "size": size})
+                    results.append(result)
+                    print(f"{name:>32} {size:>7} {result['median_s'] * 1000:>12.3f} ms", file=sys.stderr)
+    finally:
+        logging.disable(logging.NOTSET)
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()}",
+        "results": results,
+    }
+
+
+def compare(base: Dict, head: Dict, threshold: float = 0.10) -> Tuple[List[Dict], int]:
+    """Rows of (name, size, base, head, ratio); regressions are slower than 1 + threshold"""
+    base_results = {(r["name"], r["size"]): r for r in base["results"]}
+    rows = []
+    regressions = 0
+    for result in head["results"]:
+        previous = base_results.get((result["name"], result["size"]))
+        if not previous:
+            continue
+        ratio = result["median_s"] / previous["median_s"] if previous["median_s"] else float("inf")
+        status = "regression" if ratio > 1 + threshold else "faster" if ratio < 1 - threshold else ""
+        regressions += status == "regression"
+        rows.append({"name": result["name"], "size": result["size"], "base_s": previous["median_s"],
+                     "head_s": result["median_s"], "ratio": ratio, "status": status})
+    return rows, regressions
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "compare":
+        parser = argparse.ArgumentParser(prog="benchmarks.microbench compare", description="Compare two result files")
+        parser.add_argument("base")
+        parser.add_argument("head")
+        parser.add_argument("--threshold", type=float, default=0.10, help="relative slowdown reported as a regression")
+        args = parser.parse_args(sys.argv[2:])
+        with open(args.base, encoding='utf-8') as f:
+            base = json.load(f)
+        with open(args.head, encoding='utf-8') as f:
+            head = json.load(f)
+        rows, regressions = compare(base, head, args.threshold)
+        print(f"base {base.get('commit')} → head {head.get('commit')}")
+        print(f"{'benchmark':>32} {'size':>7} {'base ms':>12} {'head ms':>12} {'ratio':>7}")
+        for row in rows:
+            print(f"{row['name']:>32} {row['size']:>7} {row['base_s'] * 1000:>12.3f} {row['head_s'] * 1000:>12.3f} {row['ratio']:>7.2f}  {row['status']}")
+        sys.exit(1 if regressions else 0)
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--only", nargs="+", help="benchmark name prefixes (e.g. sales_analyzer)")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per timing batch")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", help=f"result file (default: {os.path.relpath(RESULTS_DIR)}/<commit>.json)")
+    args = parser.parse_args()
+
+    suite = run_suite(args.sizes, args.only, args.min_time, args.repeats)
+    output = args.output or os.path.join(RESULTS_DIR, f"{suite['commit'] or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(suite, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
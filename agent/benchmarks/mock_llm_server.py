@@ -0,0 +1,341 @@
+"""
+Local stand-in for the OpenAI and Anthropic APIs used by the agent
+
+Implements the subset the agent calls, with and without streaming:
+- POST /v1/chat/completions   OpenAI chat completions (LiveKit openai.LLM, text mode)
+- POST /v1/messages           Anthropic messages (report generation)
+- GET  /stats                 requests, errors and tokens served so far
+
+Responses are scripted (a JSON file, played in turn) or templated, and streamed one
+word per token after a configurable time to first token, at a configurable token
+rate. Errors (429 / 500 / 529, in each API's error format) are injected at a given
+rate, before the response or in the middle of a stream.
+
+Point the agent at it (agent/.env):
+    VOYALTIS_LLM_BASE_URL=http://127.0.0.1:8089/v1
+    VOYALTIS_REPORT_BASE_URL=http://127.0.0.1:8089
+
+Script file: {"chat": ["réponse 1", "réponse 2 {turn}"], "report": {...}}
+or a plain list of chat responses. The n-th agent reply of a conversation is the
+n-th response (the last one repeats), whatever the number of concurrent sessions.
+Templates may use {turn}, {model} and {last_user}.
+
+Usage (from agent/):
+    python -m benchmarks.mock_llm_server --port 8089 --ttft 0.35 --tokens-per-second 60
+    python -m benchmarks.mock_llm_server --error-rate 0.02 --error-status 429 --script script.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+DEFAULT_CHAT_RESPONSES = [
+    "Super, merci ! Et côté retours clients, qu'est-ce qu'ils t'ont dit ?",
+    "D'accord, je note. Tu as eu des demandes particulières aujourd'hui ?",
+    "Top ! Combien en as-tu vendu exactement ?",
+    "Merci pour ces détails. Dernière chose : as-tu autre chose à ajouter ?",
+    "Parfait, merci ! Je vais préparer ton rapport.",
+]
+
+DEFAULT_REPORT = {
+    "sales": {},
+    "customer_feedback": "**RETOURS CLIENTS**\nBons retours sur la gamme.",
+    "emotional_context": "positif",
+    "key_insights": ["Demande soutenue", "Prix bien acceptés"],
+    "event_name": "",
+    "time_spent": "",
+}
+
+ERROR_TYPES = {
+    429: ("rate_limit_error", "rate_limit_exceeded", "Rate limit reached (mock)"),
+    500: ("api_error", "server_error", "Internal server error (mock)"),
+    529: ("overloaded_error", "server_error", "Overloaded (mock)"),
+}
+
+_TOKEN = re.compile(r"\s*\S+")
+
+
+def split_tokens(text: str) -> List[str]:
+    """Stream units: one word with its leading whitespace, concatenating back to text"""
+    tokens = _TOKEN.findall(text)
+    trailing = text[len("".join(tokens)):]
+    if trailing:
+        tokens.append(trailing)
+    return tokens
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (4 characters per token) for the usage fields"""
+    return max(1, len(text) // 4)
+
+
+class _SafeFormat(dict):
+    def __missing__(self, key):
+        return "{" + key + "}"
+
+
+@dataclass
+class MockConfig:
+    ttft: float = 0.3                  # seconds before the first token
+    tokens_per_second: float = 50.0    # 0: everything at once
+    error_rate: float = 0.0            # fraction of requests answered with error_status
+    error_status: int = 429
+    stream_error_rate: float = 0.0     # fraction of streams cut after a few tokens
+    seed: Optional[int] = None
+
+
+@dataclass
+class ResponseScript:
+    """Chat responses played in turn (the last one repeats), and the report returned to Anthropic calls"""
+    chat: List[str] = field(default_factory=lambda: list(DEFAULT_CHAT_RESPONSES))
+    report: str = field(default_factory=lambda: json.dumps(DEFAULT_REPORT, ensure_ascii=False))
+
+    @classmethod
+    def from_file(cls, path: str) -> "ResponseScript":
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if isinstance(data, list):
+            return cls(chat=data)
+        report = data.get("report", DEFAULT_REPORT)
+        return cls(
+            chat=data.get("chat") or list(DEFAULT_CHAT_RESPONSES),
+            report=report if isinstance(report, str) else json.dumps(report, ensure_ascii=False),
+        )
+
+    def chat_response(self, model: str, messages: List[Dict]) -> str:
+        """
+        Response for the turn of this conversation: the number of agent messages so far
+        (opening included) picks it, so concurrent sessions each follow the script
+        """
+        turn = max(1, sum(1 for m in messages if m.get("role") == "assistant"))
+        last_user = next((m.get("content") for m in reversed(messages) if m.get("role") == "user"), "") or ""
+        if not isinstance(last_user, str):
+            # Content parts (OpenAI/Anthropic list format)
+            last_user = " ".join(part.get("text", "") for part in last_user if isinstance(part, dict))
+        template = self.chat[min(turn, len(self.chat)) - 1]
+        return template.format_map(_SafeFormat(turn=turn, model=model, last_user=last_user))
+
+    def report_response(self) -> str:
+        return f"```json\n{self.report}\n```"
+
+
+class MockLLMServer:
+    """Scripted OpenAI / Anthropic responses with latency and error injection"""
+
+    def __init__(self, config: Optional[MockConfig] = None, script: Optional[ResponseScript] = None):
+        self.config = config or MockConfig()
+        self.script = script or ResponseScript()
+        self.random = random.Random(self.config.seed)
+        self.stats = {"requests": 0, "streams": 0, "errors": 0, "stream_errors": 0, "output_tokens": 0}
+
+    # -- Timing and errors ---------------------------------------------------------
+
+    def _token_delay(self) -> float:
+        rate = self.config.tokens_per_second
+        return 1.0 / rate if rate > 0 else 0.0
+
+    def injected_error(self) -> Optional[int]:
+        """HTTP status to answer this request with, or None"""
+        if self.config.error_rate > 0 and self.random.random() < self.config.error_rate:
+            self.stats["errors"] += 1
+            return self.config.error_status
+        return None
+
+    def _cut_stream_at(self, tokens: int) -> Optional[int]:
+        if tokens > 1 and self.config.stream_error_rate > 0 and self.random.random() < self.config.stream_error_rate:
+            self.stats["stream_errors"] += 1
+            return self.random.randint(1, tokens - 1)
+        return None
+
+    @staticmethod
+    def openai_error(status: int) -> Dict:
+        error_type, code, message = ERROR_TYPES.get(status, ERROR_TYPES[500])
+        return {"error": {"message": message, "type": error_type, "param": None, "code": code}}
+
+    @staticmethod
+    def anthropic_error(status: int) -> Dict:
+        error_type, _, message = ERROR_TYPES.get(status, ERROR_TYPES[500])
+        return {"type": "error", "error": {"type": error_type, "message": message}}
+
+    async def _paced(self, tokens: List[str]) -> AsyncIterator[Tuple[int, str]]:
+        await asyncio.sleep(self.config.ttft)
+        delay = self._token_delay()
+        for i, token in enumerate(tokens):
+            if i and delay:
+                await asyncio.sleep(delay)
+            yield i, token
+
+    async def _wait_full(self, tokens: List[str]):
+        await asyncio.sleep(self.config.ttft + self._token_delay() * max(0, len(tokens) - 1))
+
+    # -- OpenAI chat completions ---------------------------------------------------
+
+    def _openai_text(self, body: Dict) -> Tuple[str, int]:
+        messages = body.get("messages") or []
+        prompt_tokens = sum(estimate_tokens(str(m.get("content", ""))) for m in messages)
+        return self.script.chat_response(body.get("model", "mock"), messages), prompt_tokens
+
+    async def openai_completion(self, body: Dict) -> Dict:
+        self.stats["requests"] += 1
+        text, prompt_tokens = self._openai_text(body)
+        tokens = split_tokens(text)
+        await self._wait_full(tokens)
+        self.stats["output_tokens"] += len(tokens)
+        return {
+            "id": f"chatcmpl-mock-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "logprobs": None, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens), "total_tokens": prompt_tokens + len(tokens)},
+        }
+
+    async def openai_stream(self, body: Dict) -> AsyncIterator[str]:
+        """Server-sent events of a streamed chat completion, [DONE] included"""
+        self.stats["requests"] += 1
+        self.stats["streams"] += 1
+        text, prompt_tokens = self._openai_text(body)
+        tokens = split_tokens(text)
+        cut_at = self._cut_stream_at(len(tokens))
+        model = body.get("model", "mock")
+        base = {"id": f"chatcmpl-mock-{uuid.uuid4().hex[:12]}", "object": "chat.completion.chunk", "created": int(time.time()), "model": model}
+
+        def chunk(delta: Dict, finish_reason=None, **extra) -> str:
+            payload = {**base, "choices": [{"index": 0, "delta": delta, "logprobs": None, "finish_reason": finish_reason}], **extra}
+            return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+        async for i, token in self._paced(tokens):
+            if i == cut_at:
+                yield f"data: {json.dumps(self.openai_error(500))}\n\n"
+                return
+            delta = {"role": "assistant", "content": token} if i == 0 else {"content": token}
+            self.stats["output_tokens"] += 1
+            yield chunk(delta)
+        yield chunk({}, "stop")
+        if (body.get("stream_options") or {}).get("include_usage"):
+            usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens), "total_tokens": prompt_tokens + len(tokens)}
+            yield f"data: {json.dumps({**base, 'choices': [], 'usage': usage})}\n\n"
+        yield "data: [DONE]\n\n"
+
+    # -- Anthropic messages --------------------------------------------------------
+
+    def _anthropic_message(self, body: Dict, text: str = "", output_tokens: int = 0) -> Dict:
+        input_tokens = estimate_tokens(str(body.get("system", ""))) + sum(estimate_tokens(str(m.get("content", ""))) for m in body.get("messages") or [])
+        return {
+            "id": f"msg_mock_{uuid.uuid4().hex[:16]}",
+            "type": "message",
+            "role": "assistant",
+            "model": body.get("model", "mock"),
+            "content": [{"type": "text", "text": text}] if text else [],
+            "stop_reason": "end_turn" if text else None,
+            "stop_sequence": None,
+            "usage": {"input_tokens": input_tokens, "output_tokens": output_tokens},
+        }
+
+    async def anthropic_message(self, body: Dict) -> Dict:
+        self.stats["requests"] += 1
+        text = self.script.report_response()
+        tokens = split_tokens(text)
+        await self._wait_full(tokens)
+        self.stats["output_tokens"] += len(tokens)
+        return self._anthropic_message(body, text, len(tokens))
+
+    async def anthropic_stream(self, body: Dict) -> AsyncIterator[str]:
+        """Server-sent events of a streamed message"""
+        self.stats["requests"] += 1
+        self.stats["streams"] += 1
+        tokens = split_tokens(self.script.report_response())
+        cut_at = self._cut_stream_at(len(tokens))
+
+        def event(name: str, payload: Dict) -> str:
+            return f"event: {name}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+        yield event("message_start", {"type": "message_start", "message": self._anthropic_message(body)})
+        yield event("content_block_start", {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}})
+        yield event("ping", {"type": "ping"})
+        async for i, token in self._paced(tokens):
+            if i == cut_at:
+                yield event("error", self.anthropic_error(529))
+                return
+            self.stats["output_tokens"] += 1
+            yield event("content_block_delta", {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": token}})
+        yield event("content_block_stop", {"type": "content_block_stop", "index": 0})
+        yield event("message_delta", {"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None}, "usage": {"output_tokens": len(tokens)}})
+        yield event("message_stop", {"type": "message_stop"})
+
+    # -- HTTP ----------------------------------------------------------------------
+
+    def build_app(self):
+        from aiohttp import web
+
+        async def stream_response(request, events: AsyncIterator[str]):
+            response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+            await response.prepare(request)
+            async for data in events:
+                await response.write(data.encode('utf-8'))
+            await response.write_eof()
+            return response
+
+        async def chat_completions(request):
+            body = await request.json()
+            status = self.injected_error()
+            if status:
+                return web.json_response(self.openai_error(status), status=status, headers={"Retry-After": "1"} if status == 429 else None)
+            if body.get("stream"):
+                return await stream_response(request, self.openai_stream(body))
+            return web.json_response(await self.openai_completion(body))
+
+        async def messages(request):
+            body = await request.json()
+            status = self.injected_error()
+            if status:
+                return web.json_response(self.anthropic_error(status), status=status, headers={"Retry-After": "1"} if status == 429 else None)
+            if body.get("stream"):
+                return await stream_response(request, self.anthropic_stream(body))
+            return web.json_response(await self.anthropic_message(body))
+
+        async def stats(request):
+            return web.json_response(self.stats)
+
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", chat_completions)
+        app.router.add_post("/chat/completions", chat_completions)
+        app.router.add_post("/v1/messages", messages)
+        app.router.add_get("/stats", stats)
+        return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--ttft", type=float, default=0.3, help="seconds to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=429, choices=sorted(ERROR_TYPES))
+    parser.add_argument("--stream-error-rate", type=float, default=0.0, help="fraction of streams cut mid-response")
+    parser.add_argument("--script", help="JSON script of responses (see module docstring)")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    from aiohttp import web
+
+    server = MockLLMServer(
+        MockConfig(args.ttft, args.tokens_per_second, args.error_rate, args.error_status, args.stream_error_rate, args.seed),
+        ResponseScript.from_file(args.script) if args.script else ResponseScript(),
+    )
+    print(f"Mock LLM server on http://{args.host}:{args.port} (OpenAI: /v1/chat/completions, Anthropic: /v1/messages)")
+    web.run_app(server.build_app(), host=args.host, port=args.port, access_log=None, print=None)
+
+
+if __name__ == "__main__":
+    main()
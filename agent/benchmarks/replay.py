@@ -0,0 +1,413 @@
+"""
+Replay benchmark: conversation pipeline without LiveKit nor paid APIs
+
+Feeds recorded or synthetic transcripts through the same session code as the
+entrypoint (ConversationState question counting and end detection, catalog fast
+path and document snippets, build_simple_instructions, generate_report), with a
+fake room, LLM and TTS whose latency is configurable.
+
+Reported per project:
+- turn overhead:  wall time of a turn minus the simulated LLM/TTS latency, i.e.
+                  what the agent code itself adds to every reply
+- report:         generate_report wall time, and its overhead without the fake LLM
+- memory:         peak traced memory of one session (second pass, under tracemalloc)
+
+A recorded transcript is a JSON list of {"role": "user"|"assistant", "content": ...}
+starting with the agent opening; the agent replies are played back by the fake LLM.
+
+Usage (from agent/):
+    python -m benchmarks.replay                          # every project of data/projects
+    python -m benchmarks.replay perrot --sessions 20 --llm-latency 0.4 --tts-latency 0.2
+    python -m benchmarks.replay perrot --transcript session.json --mode text --json
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sales_analyzer import SalesAnalyzer
+from utils.catalog_answers import CatalogAnswerIndex, FastPathStats
+from utils.conversation_state import DEFAULT_ATTENTION_POINTS, TEXT, VOICE, ConversationState, question_budget, report_period
+from utils.instructions import build_simple_instructions
+from utils.project_loader import list_projects, load_project_config, load_project_documents, load_project_products, products_info_for_prompt
+from utils.prompt_builder import PromptBuilder
+from utils.question_generator import generate_opening_question
+from utils.report import generate_report, send_ending_signal
+from utils.tracing import LatencyHistogram
+
+RECAP_QUESTION = "Super, merci ! Dernière chose : as-tu autre chose à ajouter ?"
+FINAL_REPLY = "Parfait, merci pour ces infos ! Je vais préparer ton rapport."
+
+
+class FakeParticipant:
+    """local_participant of a FakeRoom: records published packets"""
+
+    def __init__(self):
+        self.packets: List[Dict] = []
+
+    async def publish_data(self, payload: bytes, topic: str = ""):
+        self.packets.append({"topic": topic, "bytes": len(payload)})
+
+
+class FakeRoom:
+    """The part of rtc.Room the session code publishes to"""
+
+    def __init__(self, name: str = "replay"):
+        self.name = name
+        self.local_participant = FakeParticipant()
+
+    def topics(self) -> List[str]:
+        return [packet["topic"] for packet in self.local_participant.packets]
+
+
+class FakeLLM:
+    """
+    Plays back the agent replies of a transcript after `latency` seconds, and answers
+    the report prompt with a report of the products the user mentioned.
+    """
+
+    def __init__(self, replies: List[str], sales: Dict[str, int], latency: float = 0.0, report_latency: float = 0.0):
+        self.replies = list(replies)
+        self.sales = sales
+        self.latency = latency
+        self.report_latency = report_latency
+        self.calls = 0
+        self.simulated = 0.0
+
+    async def chat(self, instructions: str, messages: List[Dict[str, str]]) -> str:
+        started = time.perf_counter()
+        await asyncio.sleep(self.latency)
+        self.simulated += time.perf_counter() - started
+        self.calls += 1
+        return self.replies.pop(0) if self.replies else FINAL_REPLY
+
+    async def complete(self, prompt: str) -> str:
+        started = time.perf_counter()
+        await asyncio.sleep(self.report_latency)
+        self.simulated += time.perf_counter() - started
+        report = {
+            "sales": self.sales,
+            "customer_feedback": "**RETOURS CLIENTS**\nBons retours sur la gamme.",
+            "emotional_context": "positif",
+            "key_insights": ["Demande soutenue", "Prix bien acceptés"],
+            "event_name": "",
+            "time_spent": "",
+        }
+        return f"```json\n{json.dumps(report, ensure_ascii=False)}\n```"
+
+
+class FakeTTS:
+    """Synthesis that takes `latency` seconds plus `per_char` seconds per character"""
+
+    def __init__(self, latency: float = 0.0, per_char: float = 0.0):
+        self.latency = latency
+        self.per_char = per_char
+        self.characters = 0
+        self.simulated = 0.0
+
+    async def synthesize(self, text: str) -> int:
+        started = time.perf_counter()
+        await asyncio.sleep(self.latency + self.per_char * len(text))
+        self.simulated += time.perf_counter() - started
+        self.characters += len(text)
+        return len(text)
+
+
+@dataclass
+class ProjectSession:
+    """Everything the entrypoint loads for a project before the first turn"""
+    project_id: str
+    config_loader: object
+    prompt_builder: PromptBuilder
+    sales_analyzer: SalesAnalyzer
+    catalog_answers: CatalogAnswerIndex
+    document_index: object
+    attention_points: List[Dict]
+    report_config: Optional[Dict]
+    table_structure: Optional[Dict]
+    products_info: Optional[str]
+    time_period: str
+    report_frequency: str
+    report_goal: Optional[str]
+
+    @classmethod
+    def load(cls, project_id: str) -> "ProjectSession":
+        project_config = load_project_config(project_id)
+        report_template = project_config.get("reportTemplate", {})
+        config_loader = load_project_products(project_id)
+        document_index = load_project_documents(project_id, build=True)
+        time_period, report_frequency = report_period(project_config)
+        return cls(
+            project_id=project_id,
+            config_loader=config_loader,
+            prompt_builder=PromptBuilder(config_loader),
+            sales_analyzer=SalesAnalyzer(config_loader=config_loader),
+            catalog_answers=CatalogAnswerIndex.for_config(config_loader),
+            document_index=document_index,
+            attention_points=project_config.get("attentionPoints") or list(DEFAULT_ATTENTION_POINTS),
+            report_config=report_template.get("configuration"),
+            table_structure=report_template.get("tableStructure"),
+            products_info=products_info_for_prompt(config_loader, document_index),
+            time_period=time_period,
+            report_frequency=report_frequency,
+            report_goal=project_config.get("reportGoal"),
+        )
+
+    def instructions(self, questions_asked: int, max_questions: int, products_info: Optional[str]) -> str:
+        base_questions, follow_up_buffer, _ = question_budget(self.attention_points)
+        return build_simple_instructions(
+            user_name="Thomas",
+            attention_points=self.attention_points,
+            questions_asked=questions_asked,
+            max_questions=max_questions,
+            first_question_in_opening=True,
+            report_config=self.report_config,
+            table_structure=self.table_structure,
+            base_questions=base_questions,
+            follow_up_buffer=follow_up_buffer,
+            products_info=products_info,
+            time_period=self.time_period,
+        )
+
+
+def synthetic_transcript(project: ProjectSession, seed: int = 0) -> List[Dict[str, str]]:
+    """
+    A plausible session for the project: opening, one question per attention point
+    (plus follow-ups up to the question budget), user answers naming catalog products
+    with quantities, one product question from the user, recap, final phrase.
+    """
+    rng = random.Random(seed)
+    labels = list(project.config_loader.catalog.labels) or ["produit"]
+    _, _, max_questions = question_budget(project.attention_points)
+
+    messages = [{"role": "assistant", "content": generate_opening_question(
+        user_name="Thomas",
+        first_attention_point=project.attention_points[0],
+        frequency=project.report_frequency,
+        report_goal=project.report_goal,
+        time_period=project.time_period,
+    )}]
+    questions = []
+    for point in project.attention_points[1:]:
+        questions.append(rng.choice(point.get("naturalPrompts") or [f"Et côté {point.get('description', '').lower()} ?"]))
+    while len(questions) < max_questions - 1:
+        questions.append(rng.choice(["Tu peux m'en dire plus ?", "Et sinon, des retours des clients ?", "Combien exactement ?"]))
+
+    for i, question in enumerate(questions):
+        sold = rng.sample(labels, k=min(2, len(labels)))
+        messages.append({"role": "user", "content": f"J'ai vendu {rng.randint(1, 12)} {sold[0]} et {rng.randint(1, 6)} {sold[-1]}, plutôt une bonne journée."})
+        if i == len(questions) // 2:
+            # A user question: answered, not counted
+            messages.append({"role": "assistant", "content": question})
+            messages.append({"role": "user", "content": f"C'est quoi le prix du {rng.choice(labels)} ?"})
+            messages.append({"role": "assistant", "content": "Je te donne ça tout de suite, c'est dans le catalogue."})
+            continue
+        messages.append({"role": "assistant", "content": question})
+
+    messages.append({"role": "user", "content": "Des clients contents, rien de spécial."})
+    messages.append({"role": "assistant", "content": RECAP_QUESTION})
+    messages.append({"role": "user", "content": "Non, c'est tout pour aujourd'hui."})
+    messages.append({"role": "assistant", "content": FINAL_REPLY})
+    return messages
+
+
+def mentioned_sales(transcript: List[Dict[str, str]], labels: List[str]) -> Dict[str, int]:
+    """{product: quantity} the fake report LLM extracts: catalog labels named by the user"""
+    sales: Dict[str, int] = {}
+    for message in transcript:
+        if message["role"] != "user":
+            continue
+        for label in labels:
+            if label and label in message["content"]:
+                sales[label] = sales.get(label, 0) + 1
+    return sales
+
+
+@dataclass
+class SessionResult:
+    turns: int = 0
+    questions_asked: int = 0
+    end_path: Optional[str] = None
+    turn_overheads: List[float] = field(default_factory=list)
+    turn_seconds: List[float] = field(default_factory=list)
+    report_seconds: Optional[float] = None
+    report_overhead: Optional[float] = None
+    report_ok: bool = False
+    packets: int = 0
+
+
+async def replay_session(project: ProjectSession, transcript: List[Dict[str, str]], mode: str = VOICE,
+                         llm_latency: float = 0.0, tts_latency: float = 0.0, report_latency: float = 0.0) -> SessionResult:
+    """Play one transcript through the session code; user turns drive the agent replies"""
+    _, _, max_questions = question_budget(project.attention_points)
+    labels = list(project.config_loader.catalog.labels)
+    room = FakeRoom(f"replay-{project.project_id}")
+    llm = FakeLLM([m["content"] for m in transcript[1:] if m["role"] == "assistant"],
+                  mentioned_sales(transcript, labels), latency=llm_latency, report_latency=report_latency)
+    tts = FakeTTS(latency=tts_latency)
+    conversation = ConversationState(max_questions)
+    fast_path_stats = FastPathStats()
+    result = SessionResult()
+
+    instructions = project.instructions(0, max_questions, project.products_info)
+    opening = transcript[0]["content"]
+    conversation.on_voice_item("assistant", opening)
+    await tts.synthesize(opening)
+
+    outcome = None
+    for message in transcript[1:]:
+        if message["role"] != "user":
+            continue
+        user_text = message["content"]
+        turn_started = time.perf_counter()
+        simulated_before = llm.simulated + tts.simulated
+
+        await room.local_participant.publish_data(json.dumps({"type": "user_transcription", "text": user_text, "role": "user"}).encode('utf-8'), "conversation-message")
+        if mode == VOICE:
+            outcome = conversation.on_voice_item("user", user_text)
+        else:
+            conversation.add_message("user", user_text)
+
+        # Per-turn context: catalog fast path, else the relevant document passages
+        turn_products_info = project.products_info
+        catalog_answer = project.catalog_answers.timed_answer(user_text, fast_path_stats)
+        if catalog_answer:
+            turn_products_info = catalog_answer.context_snippet()
+        elif project.document_index:
+            documents_context = project.document_index.context_snippet(user_text)
+            if documents_context:
+                turn_products_info = f"{project.products_info}\n\n{documents_context}" if project.products_info else documents_context
+        if mode == TEXT:
+            instructions = project.instructions(conversation.questions_asked, max_questions, turn_products_info)
+
+        reply = await llm.chat(instructions, conversation.messages)
+        if mode == VOICE:
+            outcome = conversation.on_voice_item("assistant", reply)
+            if outcome.counted and conversation.questions_remaining <= 1:
+                instructions = project.instructions(conversation.questions_asked, max_questions, project.products_info)
+            await tts.synthesize(reply)
+        else:
+            outcome = conversation.on_text_reply(user_text, reply)
+        await room.local_participant.publish_data(json.dumps({"type": "agent_response", "text": reply, "role": "assistant"}).encode('utf-8'), "conversation-message")
+
+        simulated = llm.simulated + tts.simulated - simulated_before
+        turn_seconds = time.perf_counter() - turn_started
+        result.turn_seconds.append(turn_seconds)
+        result.turn_overheads.append(max(0.0, turn_seconds - simulated))
+        result.turns += 1
+        if outcome.should_end:
+            break
+
+    result.questions_asked = conversation.questions_asked
+    if outcome and outcome.should_end:
+        result.end_path = outcome.end_path
+        await send_ending_signal(room)
+        simulated_before = llm.simulated
+        report_started = time.perf_counter()
+        report = await generate_report(
+            room, conversation.messages, project.attention_points,
+            project.config_loader, project.prompt_builder, project.sales_analyzer,
+            complete=llm.complete, project_id=project.project_id,
+        )
+        result.report_seconds = time.perf_counter() - report_started
+        result.report_overhead = max(0.0, result.report_seconds - (llm.simulated - simulated_before))
+        result.report_ok = report is not None
+    result.packets = len(room.local_participant.packets)
+    return result
+
+
+def session_memory(project: ProjectSession, transcript: List[Dict[str, str]], mode: str) -> int:
+    """Peak traced memory (bytes) of one session, without simulated latency"""
+    gc.collect()
+    tracemalloc.start()
+    asyncio.run(replay_session(project, transcript, mode))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def run_project(project_id: str, sessions: int = 10, mode: str = VOICE, transcript: Optional[List[Dict[str, str]]] = None,
+                llm_latency: float = 0.0, tts_latency: float = 0.0, report_latency: float = 0.0) -> Dict:
+    setup_started = time.perf_counter()
+    project = ProjectSession.load(project_id)
+    setup_seconds = time.perf_counter() - setup_started
+
+    turn_overhead = LatencyHistogram()
+    report_seconds = LatencyHistogram()
+    report_overhead = LatencyHistogram()
+    end_paths: Dict[str, int] = {}
+    failures = 0
+    turns = 0
+    for i in range(sessions):
+        session_transcript = transcript or synthetic_transcript(project, seed=i)
+        result = asyncio.run(replay_session(project, session_transcript, mode, llm_latency, tts_latency, report_latency))
+        turns += result.turns
+        for overhead in result.turn_overheads:
+            turn_overhead.observe(overhead)
+        end_paths[result.end_path or "none"] = end_paths.get(result.end_path or "none", 0) + 1
+        if result.report_seconds is not None:
+            report_seconds.observe(result.report_seconds)
+            report_overhead.observe(result.report_overhead)
+            failures += not result.report_ok
+
+    memory = session_memory(project, transcript or synthetic_transcript(project, seed=0), mode)
+    return {
+        "project": project_id,
+        "mode": mode,
+        "products": len(project.config_loader.catalog),
+        "sessions": sessions,
+        "turns": turns,
+        "setup_ms": round(setup_seconds * 1000, 1),
+        "turn_overhead": turn_overhead.summary(),
+        "report": report_seconds.summary(),
+        "report_overhead": report_overhead.summary(),
+        "report_failures": failures,
+        "end_paths": end_paths,
+        "session_peak_bytes": memory,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("projects", nargs="*", help="project ids (default: every project of data/projects)")
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--mode", choices=(VOICE, TEXT), default=VOICE)
+    parser.add_argument("--transcript", help="recorded transcript (JSON list of messages) replayed instead of synthetic ones")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds per fake LLM reply")
+    parser.add_argument("--tts-latency", type=float, default=0.0, help="seconds per fake TTS synthesis")
+    parser.add_argument("--report-latency", type=float, default=0.0, help="seconds of the fake report LLM call")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    transcript = None
+    if args.transcript:
+        with open(args.transcript, 'r', encoding='utf-8') as f:
+            transcript = json.load(f)
+
+    results = [
+        run_project(project_id, args.sessions, args.mode, transcript, args.llm_latency, args.tts_latency, args.report_latency)
+        for project_id in (args.projects or list_projects())
+    ]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'project':>30} {'products':>8} {'turns':>6} {'turn p50 ms':>11} {'turn p95 ms':>11} "
+          f"{'report p50 ms':>13} {'report ovh p50':>14} {'peak KiB':>9}  end paths")
+    for r in results:
+        print(f"{r['project']:>30} {r['products']:>8} {r['turns']:>6} {r['turn_overhead']['p50_ms']!s:>11} {r['turn_overhead']['p95_ms']!s:>11} "
+              f"{r['report']['p50_ms']!s:>13} {r['report_overhead']['p50_ms']!s:>14} {r['session_peak_bytes'] / 1024:>9.0f}  {r['end_paths']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+STT latency benchmark: end of speech → final transcript, per STT mode
+
+Runs the providers of utils/stt_providers.build_stt on recorded rep utterances (WAV
+files, 16-bit PCM) and measures when the final transcript arrives after the end of
+speech (found from the audio energy), and for streaming providers when the first
+interim transcript arrives after the start of the audio.
+
+Modes:
+    whisper            batch: the configured 2 s VAD silence + the measured whisper-1 request
+    whisper-adaptive   batch: the 0.4 s VAD segment of adaptive endpointing + the measured request
+    deepgram           streaming: audio pushed in real time, final transcript measured
+    fake               streaming: the scripted fake STT (no API), a pipeline check
+
+The VAD silence of the batch modes is the session setting, added as is: the session
+only sends the segment to whisper once it has elapsed. Everything else is measured.
+
+Without --audio, utterances are tone bursts timed like the rep messages of synthetic
+sessions: only the fake mode can "transcribe" them.
+
+Usage (from agent/):
+    python -m benchmarks.stt_latency --audio ../data/stt-samples
+    python -m benchmarks.stt_latency --audio ../data/stt-samples --modes whisper-adaptive deepgram --json
+    python -m benchmarks.stt_latency perrot --sessions 3          # fake mode on tone bursts
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import sys
+import time
+from array import array
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.endpointing import ADAPTIVE_VAD_SILENCE
+from utils.scripted_transcriber import DEFAULT_ENERGY_THRESHOLD, pcm_energy
+from utils.stt_providers import DEEPGRAM, FAKE, WHISPER, build_stt
+from utils.tracing import LatencyHistogram
+from utils.tts_cache import AudioClip, livekit_frame, read_clip
+
+FIXED_VAD_SILENCE = 2.0
+FRAME_SECONDS = 0.01
+TAIL_SECONDS = 3.0         # Silence pushed after the utterance, for the provider endpointing
+SAMPLE_RATE = 16000
+
+# mode: (provider, VAD silence of a batch mode, None for streaming)
+MODES: Dict[str, Tuple[str, Optional[float]]] = {
+    "whisper": (WHISPER, FIXED_VAD_SILENCE),
+    "whisper-adaptive": (WHISPER, ADAPTIVE_VAD_SILENCE),
+    "deepgram": (DEEPGRAM, None),
+    "fake": (FAKE, None),
+}
+API_KEYS = {WHISPER: "OPENAI_API_KEY", DEEPGRAM: "DEEPGRAM_API_KEY"}
+
+
+def speech_bounds(clip: AudioClip, threshold: float = DEFAULT_ENERGY_THRESHOLD) -> Optional[Tuple[float, float]]:
+    """(start, end) of speech in the clip, in seconds, None if it is all silence"""
+    voiced = [i for i, chunk in enumerate(clip.chunks(FRAME_SECONDS)) if pcm_energy(chunk) >= threshold]
+    if not voiced:
+        return None
+    return voiced[0] * FRAME_SECONDS, (voiced[-1] + 1) * FRAME_SECONDS
+
+
+def with_silence(clip: AudioClip, seconds: float) -> AudioClip:
+    silence = bytes(int(clip.sample_rate * seconds) * 2 * clip.num_channels)
+    return AudioClip(clip.pcm + silence, clip.sample_rate, clip.num_channels)
+
+
+def tone_clip(text: str, words_per_second: float, sample_rate: int = SAMPLE_RATE, lead: float = 0.3) -> AudioClip:
+    """Silence, then a 220 Hz tone lasting as long as the text takes to say"""
+    samples = int(sample_rate * len(text.split()) / words_per_second)
+    tone = array("h", (int(8000 * math.sin(2 * math.pi * 220 * i / sample_rate)) for i in range(samples)))
+    return AudioClip(bytes(int(sample_rate * lead) * 2) + tone.tobytes(), sample_rate, 1)
+
+
+@dataclass
+class UtteranceResult:
+    final_seconds: Optional[float]          # End of speech → final transcript (None: no final)
+    first_interim_seconds: Optional[float]  # Start of the audio → first interim transcript
+    interims: int = 0
+    text: str = ""
+
+
+@dataclass
+class ModeResult:
+    mode: str
+    utterances: List[UtteranceResult] = field(default_factory=list)
+
+    def summary(self) -> Dict:
+        final = LatencyHistogram(max_samples=1_000_000)
+        first_interim = LatencyHistogram(max_samples=1_000_000)
+        for utterance in self.utterances:
+            if utterance.final_seconds is not None:
+                final.observe(utterance.final_seconds)
+            if utterance.first_interim_seconds is not None:
+                first_interim.observe(utterance.first_interim_seconds)
+        return {
+            "mode": self.mode,
+            "utterances": len(self.utterances),
+            "missing_finals": sum(1 for u in self.utterances if u.final_seconds is None),
+            "final_transcript": final.summary(),
+            "first_interim": first_interim.summary() if first_interim.count else None,
+        }
+
+
+async def measure_streaming(stt, clip: AudioClip, make_frame: Callable = livekit_frame,
+                            clock: Callable[[], float] = time.perf_counter) -> UtteranceResult:
+    """Push the clip in real time (then TAIL_SECONDS of silence) and time the transcripts"""
+    from livekit.agents.stt import SpeechEventType
+
+    bounds = speech_bounds(clip)
+    clip = with_silence(clip, TAIL_SECONDS)
+    stream = stt.stream()
+    started = clock()
+    result = UtteranceResult(None, None)
+
+    async def read():
+        async for event in stream:
+            text = event.alternatives[0].text if event.alternatives else ""
+            if event.type == SpeechEventType.INTERIM_TRANSCRIPT and text:
+                result.interims += 1
+                if result.first_interim_seconds is None:
+                    result.first_interim_seconds = clock() - started
+            elif event.type == SpeechEventType.FINAL_TRANSCRIPT and text:
+                result.text = text
+                if bounds:
+                    result.final_seconds = clock() - (started + bounds[1])
+                return
+
+    reader = asyncio.ensure_future(read())
+    try:
+        for i, chunk in enumerate(clip.chunks(FRAME_SECONDS)):
+            if reader.done():
+                break
+            await asyncio.sleep(max(0.0, started + i * FRAME_SECONDS - clock()))
+            stream.push_frame(make_frame(chunk, clip.sample_rate, clip.num_channels))
+        stream.end_input()
+        await asyncio.wait_for(reader, TAIL_SECONDS)
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        reader.cancel()
+        await stream.aclose()
+    return result
+
+
+async def measure_batch(stt, clip: AudioClip, vad_silence: float, make_frame: Callable = livekit_frame,
+                        clock: Callable[[], float] = time.perf_counter) -> UtteranceResult:
+    """The speech segment in one recognize() request, after the VAD silence"""
+    bounds = speech_bounds(clip)
+    if not bounds:
+        return UtteranceResult(None, None)
+    size = int(clip.sample_rate * bounds[1]) * 2 * clip.num_channels
+    frames = [make_frame(chunk, clip.sample_rate, clip.num_channels) for chunk in AudioClip(clip.pcm[:size], clip.sample_rate, clip.num_channels).chunks()]
+    started = clock()
+    event = await stt.recognize(frames)
+    elapsed = clock() - started
+    text = event.alternatives[0].text if event.alternatives else ""
+    return UtteranceResult(vad_silence + elapsed if text else None, None, 0, text)
+
+
+async def run_mode(mode: str, clips: List[AudioClip], concurrency: int, http_session=None) -> ModeResult:
+    provider, vad_silence = MODES[mode]
+    stt = build_stt(provider, language="fr", http_session=http_session)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def measure(clip: AudioClip) -> UtteranceResult:
+        async with semaphore:
+            if vad_silence is None:
+                return await measure_streaming(stt, clip)
+            return await measure_batch(stt, clip, vad_silence)
+
+    results = await asyncio.gather(*(measure(clip) for clip in clips))
+    return ModeResult(mode, list(results))
+
+
+async def run(modes: List[str], clips: List[AudioClip], concurrency: int) -> List[Dict]:
+    import aiohttp
+
+    async with aiohttp.ClientSession() as http_session:
+        return [(await run_mode(mode, clips, concurrency, http_session)).summary() for mode in modes]
+
+
+def load_clips(args) -> List[AudioClip]:
+    if args.audio:
+        paths = sorted(os.path.join(args.audio, name) for name in os.listdir(args.audio) if name.endswith(".wav"))
+        return [clip for clip in map(read_clip, paths) if clip]
+
+    from benchmarks.load_generator import user_messages
+    from benchmarks.replay import ProjectSession
+    project = ProjectSession.load(args.project)
+    texts = [text for seed in range(args.sessions) for text in user_messages(project, seed)]
+    return [tone_clip(text, args.words_per_second) for text in texts]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("project", nargs="?", default="perrot", help="project of the synthetic sessions (without --audio)")
+    parser.add_argument("--audio", help="directory of recorded utterances (.wav)")
+    parser.add_argument("--sessions", type=int, default=3, help="synthetic sessions whose rep messages become tone bursts")
+    parser.add_argument("--words-per-second", type=float, default=2.5, help="speaking rate of the tone bursts")
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), help="modes to run (default: all with --audio, else fake)")
+    parser.add_argument("--concurrency", type=int, default=4, help="utterances measured at once")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    modes = args.modes or ([mode for mode in MODES if mode != "fake"] if args.audio else ["fake"])
+    missing = [mode for mode in modes if API_KEYS.get(MODES[mode][0]) and not os.getenv(API_KEYS[MODES[mode][0]])]
+    if missing:
+        parser.error(f"missing API key for {', '.join(missing)} ({', '.join(API_KEYS[MODES[m][0]] for m in missing)})")
+    clips = load_clips(args)
+    if not clips:
+        parser.error("no utterances to transcribe")
+
+    results = asyncio.run(run(modes, clips, args.concurrency))
+
+    if args.json:
+        print(json.dumps({"audio": "recorded" if args.audio else "tone", "modes": results}, indent=2))
+        return
+    print(f"{'mode':>18} {'utterances':>10} {'no final':>8} {'final p50':>10} {'final p95':>10} {'final p99':>10} {'1st interim p50':>16}")
+    for summary in results:
+        final, first = summary["final_transcript"], summary["first_interim"]
+        print(f"{summary['mode']:>18} {summary['utterances']:>10} {summary['missing_finals']:>8} {final['p50_ms']!s:>10} "
+              f"{final['p95_ms']!s:>10} {final['p99_ms']!s:>10} {(first or {}).get('p50_ms', '-')!s:>16}")
+
+
+if __name__ == "__main__":
+    main()
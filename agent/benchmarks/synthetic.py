@@ -0,0 +1,53 @@
+"""
+Synthetic product catalogs for benchmarks
+Mimics the Excel export format of data/projects/*/products.json
+"""
+import json
+import random
+from typing import Dict, Iterator, List
+
+CATEGORIES = [
+    "Peinture murale", "Peinture boiseries", "Sous-couche", "Enduit",
+    "Vernis", "Lasure", "Outillage", "Accessoires", "Décoration", "Façade",
+]
+
+FINISHES = ["Mat", "Satin", "Velours", "Brillant", "Laqué", "Poudré"]
+COLORS = ["Blanc", "Noir", "Gris", "Beige", "Bleu", "Vert", "Rouge", "Sable"]
+SIZES = ["1L", "2.5L", "5L", "10L", "15L"]
+
+
+def iter_products(count: int, seed: int = 42) -> Iterator[Dict]:
+    """Yield `count` products with French Excel headers, deterministically"""
+    rng = random.Random(seed)
+    for i in range(1, count + 1):
+        category = CATEGORIES[i % len(CATEGORIES)]
+        finish = rng.choice(FINISHES)
+        color = rng.choice(COLORS)
+        size = rng.choice(SIZES)
+        yield {
+            "Nom": f"{category.split()[0]}-{finish}-{size}-{i}",
+            "Nom d'affichage": f"{category.split()[0]} {finish} {color} {i}",
+            "Catégorie": category,
+            "Prix (€/unité)": round(rng.uniform(5, 400), 2),
+            "Marge (%)": round(rng.uniform(0.2, 0.6), 2),
+            "Objectif": rng.randint(0, 20),
+            "Mots-clés": [finish.lower(), color.lower(), category.split()[0].lower(), f"ref{i}"],
+            "Caractéristiques": f"Finition {finish.lower()}, {size}, rendement {rng.randint(10, 120)}m²/{size}",
+            "id": f"prod-{i}",
+        }
+
+
+def make_products(count: int, seed: int = 42) -> List[Dict]:
+    """Return a list of `count` synthetic products"""
+    return list(iter_products(count, seed))
+
+
+def write_products_file(path: str, count: int, seed: int = 42):
+    """Write a synthetic products.json (array format) without building the list in memory"""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[\n")
+        for i, product in enumerate(iter_products(count, seed)):
+            if i:
+                f.write(",\n")
+            f.write(json.dumps(product, ensure_ascii=False, indent=2))
+        f.write("\n]\n")
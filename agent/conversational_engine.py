@@ -7,6 +7,7 @@ import json
 import logging
 from typing import Dict, List, Optional, Any
 from anthropic import AsyncAnthropic
+from utils.speech_text import speakable
 
 logger = logging.getLogger(__name__)
 
@@ -548,9 +549,9 @@ Réponds UNIQUEMENT en JSON selon le format spécifié.
     async def before_tts_cb(self, text: str) -> str:
         """
         Callback before text-to-speech
-        Can be used to modify the text before it's spoken
+        Numbers, prices, units and product codes written out in French words
         """
-        return text
+        return speakable(text)
 
     def get_collected_data(self) -> Dict[str, Any]:
         """Get all collected data"""
@@ -21,11 +21,13 @@ from livekit.plugins import openai, silero, elevenlabs
 from conversational_engine import ConversationalEngine
 from sales_analyzer import SalesAnalyzer
 from utils.config_loader import ConfigLoader
+from utils.logging_setup import LazyJson, TRANSCRIPT_LOGGER
 from utils.prompt_builder import PromptBuilder
 
 load_dotenv()
 logger = logging.getLogger("voyaltis-agent")
 logger.setLevel(logging.INFO)
+transcript_logger = logging.getLogger(TRANSCRIPT_LOGGER)
 
 
 async def entrypoint(ctx: JobContext):
@@ -265,7 +267,7 @@ async def entrypoint(ctx: JobContext):
                 response_text = response_text.split("```")[1].split("```")[0].strip()
 
             extracted_data = json.loads(response_text)
-            logger.info(f"📊 Extracted data (before validation): {json.dumps(extracted_data, indent=2, ensure_ascii=False)}")
+            transcript_logger.debug("📊 Extracted data (before validation): %s", LazyJson(extracted_data, indent=2))
 
             # Validate that all products are present
             expected_products = config_loader.get_product_names_list()
@@ -285,7 +287,7 @@ async def entrypoint(ctx: JobContext):
                 raw_sales = extracted_data["sales"]
                 mapped_sales = sales_analyzer.map_sales_data(raw_sales)
                 extracted_data["sales"] = mapped_sales
-                logger.info(f"📊 Sales after fuzzy matching: {json.dumps(mapped_sales, indent=2, ensure_ascii=False)}")
+                transcript_logger.debug("📊 Sales after fuzzy matching: %s", LazyJson(mapped_sales, indent=2))
 
             # Send data to client via DataReceived event
             data_message = {
@@ -6,6 +6,7 @@ import asyncio
 import logging
 import os
 import json
+import time
 from dotenv import load_dotenv
 
 from livekit import agents
@@ -15,318 +16,222 @@ from livekit.agents import (
     cli,
     AgentSession,
 )
-from livekit.agents.voice import Agent, ConversationItemAddedEvent
+from livekit.agents.voice import Agent, ConversationItemAddedEvent, ModelSettings
 from livekit.plugins import openai, silero, elevenlabs
 
 # Import minimal modules
 from sales_analyzer import SalesAnalyzer
+from utils.catalog_answers import CatalogAnswerIndex, FastPathStats, fast_path_instructions
 from utils.config_loader import ConfigLoader
+from utils.conversation_memory import HISTORY_SUMMARIZER, ConversationMemory, history_budget, openai_summarizer, summary_messages
+from utils.conversation_state import DEFAULT_ATTENTION_POINTS, ConversationState, question_budget, report_period
+from utils.document_index import DocumentIndex
+from utils.endpointing import ADAPTIVE, ADAPTIVE_VAD_SILENCE, ENDPOINTING_MODE, AdaptiveEndpointer
+from utils.inbox import InboxEntry, SessionInbox
+from utils.instructions import build_simple_instructions
+from utils import metrics
+from utils.logging_setup import TRANSCRIPT_LOGGER, configure_logging, set_log_context
+from utils.loop_monitor import start_loop_monitor
+from utils.offload import offload
+from utils.opening_audio import OPENING_AUDIO_ENABLED, OpeningAudio
+from utils.profiling import profiling_project_selected, start_session_profiler
+from utils.project_loader import load_project_config, load_project_documents, load_project_products, products_info_for_prompt
 from utils.prompt_builder import PromptBuilder
-from utils.question_generator import generate_natural_question, generate_opening_question
+from utils.question_generator import generate_opening_question
+from utils.report import generate_report as generate_session_report, send_ending_signal
+from utils.response_stream import DeltaPublisher
+from utils.shared_catalog import publish_projects
+from utils.speech_text import speakable, speech_segments
+from utils.speculation import Speculator, speculation_settings
+from utils.stt_providers import build_stt, select_stt_provider
+from utils.tts_cache import TTS_CACHE_ENABLED, TTSCache, cached_tts, get_tts_cache, session_phrases
+from utils.turn_cancellation import TurnCanceller, TurnWork, chunk_text, estimate_tokens
+from utils.tracing import (
+    LLM_FIRST_TOKEN, LLM_LAST_TOKEN, LLM_REQUEST, PLAYOUT_START, STT_FINAL,
+    TTS_FIRST_AUDIO, TTS_REQUEST, TurnTracer, worker_latency_summary,
+)
 
 load_dotenv()
 logger = logging.getLogger("voyaltis-agent-v2")
 logger.setLevel(logging.INFO)
+# Conversation content (user/agent text), with its own verbosity (VOYALTIS_TRANSCRIPT_LOG_LEVEL)
+transcript_logger = logging.getLogger(TRANSCRIPT_LOGGER)
 
+# OpenAI chat completions base URL override (local mock server for load tests), default API otherwise
+LLM_BASE_URL = os.getenv("VOYALTIS_LLM_BASE_URL") or None
 
-def build_simple_instructions(user_name: str, attention_points: list, questions_asked: int, max_questions: int, first_question_in_opening: bool = False, report_config: dict = None, table_structure: dict = None, base_questions: int = None, follow_up_buffer: int = None, products_info: str = None, time_period: str = "aujourd'hui") -> str:
-    """
-    Build ultra-simple instructions for the agent
-    Adapts based on report configuration and dynamic table structure
-    Includes product catalog if available
-    """
-
-    # Calculate base and buffer if not provided
-    if base_questions is None:
-        base_questions = len(attention_points)
-    if follow_up_buffer is None:
-        follow_up_buffer = max(2, int(base_questions * 0.5))
-
-    # Build attention points questions (only if tracking enabled)
-    questions_list = []
-    start_index = 2 if first_question_in_opening else 1
-
-    # Check report configuration (default to attention points tracking)
-    if report_config is None:
-        report_config = {
-            "attentionPointsTracking": True,
-            "productTableTracking": False,
-            "productSalesTracking": False,
-            "stockAlertsTracking": False,
-            "additionalRemarksTracking": False
-        }
-
-    attention_tracking = report_config.get("attentionPointsTracking", True)
-    product_table_tracking = report_config.get("productTableTracking", False)
-    product_sales_tracking = report_config.get("productSalesTracking", False)
-    stock_alerts_tracking = report_config.get("stockAlertsTracking", False)
-    remarks_tracking = report_config.get("additionalRemarksTracking", False)
-
-    # Build role description based on active options
-    role_parts = []
-    if attention_tracking:
-        role_parts.append(f"Poser exactement {len(attention_points)} questions sur les points d'attention")
-    if product_sales_tracking:
-        # Dynamic description based on table structure
-        if table_structure:
-            role_parts.append(f"Tracker les données de ventes: {table_structure.get('description', 'ventes de produits')}")
-        else:
-            role_parts.append("Capturer les quantités de produits vendus")
-    if stock_alerts_tracking:
-        role_parts.append("Identifier les produits en rupture ou risque de rupture de stock")
-    if remarks_tracking:
-        role_parts.append("Noter toute information pertinente supplémentaire")
-
-    role_description = "\n- ".join(role_parts)
-
-    # Build questions section only if attention tracking enabled
-    questions_section = ""
-    if attention_tracking and attention_points:
-        for i, point in enumerate(attention_points, 1):
-            desc = point.get("description", "")
-            natural_prompts = point.get("naturalPrompts", [])
-
-            if natural_prompts:
-                questions_list.append(f"Question {i}: {natural_prompts[0]}")
-            else:
-                # Use intelligent question generator instead of simple "Parle-moi de..."
-                natural_question = generate_natural_question(desc, index=i)
-                questions_list.append(f"Question {i}: {natural_question}")
-
-        # Calculate which mandatory questions have been covered
-        mandatory_questions_covered = min(questions_asked, base_questions)
-        mandatory_remaining = base_questions - mandatory_questions_covered
-
-        priority_warning = ""
-        if mandatory_remaining > 0:
-            priority_warning = f"\n🎯 PRIORITÉ : Il reste {mandatory_remaining} question(s) OBLIGATOIRE(S) sur les points d'attention à poser avant d'utiliser les questions bonus."
-
-        # Build warning messages outside f-string to avoid backslash issues
-        warning_one_left = "ATTENTION : Plus qu'UNE question restante. Assure-toi d'avoir couvert l'essentiel avant de clôturer." if max_questions - questions_asked == 1 else ""
-
-        limit_warning = ""
-        if questions_asked >= max_questions:
-            limit_warning = f"🛑 LIMITE ATTEINTE ! TU AS POSÉ {questions_asked} QUESTIONS SUR {max_questions} AUTORISÉES.\n   ➡️ NE POSE PLUS AUCUNE QUESTION !\n   ➡️ COMMENCE IMMÉDIATEMENT L'ÉTAPE 1 (RÉCAPITULATIF) !\n   ➡️ Dis: \"Merci {user_name} ! Pour résumer...\" puis termine par \"As-tu une dernière information à me partager ?\""
-
-        questions_section = f"""
-QUESTIONS À POSER (dans l'ordre) :
-{chr(10).join(questions_list)}
-
-PROGRESSION : Question {questions_asked}/{max_questions} ({base_questions} obligatoires + {follow_up_buffer} bonus)
-Questions obligatoires couvertes : {mandatory_questions_covered}/{base_questions}
-{priority_warning}
-
-⚠️ {warning_one_left}
-🚨 {limit_warning}
-"""
-
-    # Build tracking instructions
-    tracking_notes = []
-    if product_sales_tracking:
-        if table_structure and table_structure.get("columns"):
-            # Dynamic tracking based on table structure
-            sales_columns = [col for col in table_structure.get("columns", []) if col.get("source") == "sales"]
-            if sales_columns:
-                tracking_notes.append("DONNÉES DE VENTES À CAPTURER PAR PRODUIT:")
-                for col in sales_columns:
-                    tracking_notes.append(f"  - {col.get('label')}: {col.get('type')} (ex: {col.get('id')})")
-            else:
-                tracking_notes.append("- Capte les quantités de produits mentionnées")
-        else:
-            tracking_notes.append("- Capte les quantités de produits mentionnées")
-    if stock_alerts_tracking:
-        tracking_notes.append("\nALERTES RUPTURE DE STOCK:")
-        tracking_notes.append("  - Pour chaque produit, demande: \"Y a-t-il un risque de rupture de stock ?\"")
-        tracking_notes.append("  - Réponse attendue: Oui/Non")
-        tracking_notes.append("  - Note uniquement les produits avec réponse 'Oui'")
-    if remarks_tracking:
-        tracking_notes.append("\n- Note toute information importante même si elle ne correspond pas aux questions")
-
-    tracking_section = "\n".join(tracking_notes) if tracking_notes else ""
-
-    # Add products catalog if available
-    products_section = ""
-    if products_info:
-        products_section = f"""
-═══════════════════════════════════════════════════════════════
-📦 CATALOGUE PRODUITS DISPONIBLES
-═══════════════════════════════════════════════════════════════
-
-{products_info}
-
-⚠️ Tu as accès à TOUTES ces informations (prix, caractéristiques, catégories, etc.)
-Tu peux t'en servir pour répondre aux questions de {user_name} ou pour calculer des totaux.
-"""
-
-    # CRITICAL: Override instructions if limit reached
-    if questions_asked >= max_questions:
-        status_message = f"""
-🚨🚨🚨 ALERTE CRITIQUE 🚨🚨🚨
-TU AS ATTEINT LA LIMITE DE {max_questions} QUESTIONS !
-NE POSE PLUS AUCUNE QUESTION !
+TTS_MODEL = "eleven_turbo_v2_5"
+TTS_VOICE_ID = "5jCmrHdxbpU36l1wb3Ke"
 
-➡️ ACTION IMMÉDIATE REQUISE :
-Fais un RÉCAPITULATIF de ce que {user_name} t'a dit, puis demande :
-"As-tu une dernière information à me partager ?"
-"""
-        next_action = f"FAIRE LE RÉCAPITULATIF MAINTENANT (ne pose plus de questions !)"
-    elif first_question_in_opening:
-        status_message = f"La question 1 a déjà été posée dans le message d'ouverture. Tu dois maintenant attendre la réponse de {user_name}."
-        next_action = f"Après avoir reçu la réponse à la question 1, pose la question 2."
-    else:
-        status_message = ""
-        next_action = "Commence par poser la question 1." if attention_tracking else "Engage la conversation naturellement."
-
-    # Adapt report context based on time period
-    report_context = f"à créer un rapport pour {time_period}"
-
-    instructions = f"""Tu es un assistant vocal sympathique qui aide {user_name} {report_context}.
-
-📋 CONTEXTE : L'HISTORIQUE COMPLET de ta conversation avec {user_name} est fourni ci-dessus.
-⚠️ LIS-LE ATTENTIVEMENT avant chaque réponse pour savoir ce qui a DÉJÀ été dit et demandé.
-
-TON RÔLE :
-- {role_description}
-- Une question à la fois
-- Courtes et naturelles (max 15 mots)
-- Écouter attentivement les réponses
-{questions_section}
-{status_message}
-
-RÈGLES SIMPLES :
-1. {next_action}
-2. ⚠️ AVANT de poser une question : VÉRIFIE l'historique de conversation ci-dessus pour voir si elle a DÉJÀ été posée et répondue
-3. 🚫 NE REPOSE JAMAIS une question qui a déjà été posée - passe à la suivante
-4. Attends la réponse complète
-5. {"Passe à la suivante qui n'a PAS encore été posée" if attention_tracking else "Continue la conversation naturellement"}
-6. 🎯 PRIORITÉ ABSOLUE : Couvre TOUS les {base_questions} points d'attention AVANT de poser des questions bonus
-7. Une fois les {base_questions} points couverts, tu peux poser jusqu'à {follow_up_buffer} questions de clarification si nécessaire
-8. Après {"avoir couvert tous les points" if attention_tracking else "avoir collecté les informations"}, PROCESSUS DE FIN EN 3 ÉTAPES :
-
-   ÉTAPE 1 - RÉCAPITULATIF :
-   Fais un résumé naturel et chaleureux de ce que tu as compris
-   Exemple : "Merci {user_name} ! Pour résumer, tu as vendu [produits], tu as eu des difficultés sur [points],
-   et les clients t'ont fait des retours sur [feedback]. As-tu une dernière information à me partager ?"
-
-   ÉTAPE 2 - DERNIÈRE PAROLE :
-   Attends la réponse de {user_name} (peut être un ajout, une modification, ou "non c'est bon")
-
-   ÉTAPE 3 - CONCLUSION :
-   Dis : "Parfait, merci ! Je vais préparer ton rapport."
-   🚫 NE RÉCITE JAMAIS le rapport oralement - dis seulement que tu le prépares, puis ARRÊTE de parler
-
-LIMITE : Maximum {max_questions} questions au total ({base_questions} obligatoires + {follow_up_buffer} bonus)
-
-{tracking_section}
-
-{products_section}
-
-GESTION DES QUESTIONS DE {user_name.upper()} :
-Si {user_name} pose une question (phrase finissant par "?") :
-1. 🔍 Fouille dans le catalogue produits ci-dessus pour trouver la réponse
-2. 💬 Réponds de manière concise et précise
-3. 📝 Extrais quand même les infos pertinentes de sa phrase pour le rapport
-4. ⏭️ Reprends directement avec ta prochaine question (transition naturelle)
-5. ⚠️ Cette réponse ne compte PAS dans tes {max_questions} questions
-
-Exemple :
-- {user_name} : "Aujourd'hui j'ai vendu 2 cuiseurs Linux. C'est quoi le prix déjà ?"
-- Toi : "Le cuiseur Linux est à 299€. D'accord ! Et c'est pour quand la livraison ?"
-  → Tu as capté "2 cuiseurs Linux vendus" pour le rapport
-  → Tu as répondu à sa question
-  → Tu reprends avec ta question suivante
-  → Tu es toujours à la même position dans tes questions (pas +1)
-
-Si tu ne sais pas :
-- Toi : "Je n'ai pas cette info dans mon catalogue. Mais bon, et du coup c'est pour quand la livraison ?"
-
-🚫 INTERDICTIONS STRICTES :
-- NE FAIS JAMAIS de récapitulatif pendant la conversation
-- NE RÉPÈTE JAMAIS les produits vendus que {user_name} vient de mentionner
-- Le SEUL récapitulatif autorisé est celui de l'ÉTAPE 1 (processus de fin)
-- Exemple de ce qu'il NE FAUT PAS faire :
-  ❌ {user_name} : "J'ai vendu 2 cuiseurs Linux"
-  ❌ Toi : "D'accord, donc 2 cuiseurs Linux. Et pour la livraison ?"
-  ✅ Toi : "Super ! Et c'est pour quand la livraison ?"
-
-IMPORTANT :
-- Réponds en texte naturel conversationnel
-- PAS de JSON
-- Questions courtes et directes
-- Reste sympathique et détendu
-- Capte TOUTES les informations pertinentes mentionnées (même quand {user_name} pose une question)
-"""
 
-    return instructions
-
-
-def load_project_config(project_id: str) -> dict:
+class VoyaltisAgent(Agent):
     """
-    Load project configuration from data/projects/{project_id}/config.json
+    Voice agent with the catalog fast path: product questions answered from the
+    catalog index are injected as a short verified snippet before the LLM runs, and
+    that turn's instructions carry the one-line-per-product summary instead of the
+    full catalog. Their time to first token feeds the fast path stats.
+    With a speculator, the reply may already be generating from the interim transcript
+    when the turn is committed. A reply interrupted by the rep is recorded as waste.
+    With a memory, older turns are replaced in the prompt by their rolling summary.
     """
-    try:
-        config_path = os.path.join("..", "data", "projects", project_id, "config.json")
-        with open(config_path, 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        logger.error(f"Error loading project config for {project_id}: {e}")
-        return {}
 
-
-def load_project_products(project_id: str) -> ConfigLoader:
-    """
-    Load project-specific products from data/projects/{project_id}/products.json
-    Returns a new ConfigLoader with the project's products, or the default one if not found
-    """
-    try:
-        products_path = os.path.join("..", "data", "projects", project_id, "products.json")
-        client_config_path = os.path.join("..", "data", "projects", project_id, "client_config.json")
-
-        # Check if project-specific products file exists
-        if os.path.exists(products_path):
-            logger.info(f"📦 Loading products from project: {project_id}")
-
-            # Load with project-specific client config if it exists, otherwise use non-existent path
-            # This will force ConfigLoader to use generic defaults instead of Samsung config
-            if os.path.exists(client_config_path):
-                config_loader = ConfigLoader(products_path, client_config_path)
-            else:
-                # Pass a non-existent path to force default config (not Samsung)
-                config_loader = ConfigLoader(products_path, "non_existent_config.json")
-
-            logger.info(f"✅ Loaded {len(config_loader.products)} products from project {project_id}")
-            return config_loader
-        else:
-            logger.warning(f"⚠️ No products.json found for project {project_id}, using defaults")
-            return ConfigLoader("config/products.json")
-    except Exception as e:
-        logger.error(f"Error loading project products for {project_id}: {e}")
-        return ConfigLoader("config/products.json")
+    def __init__(self, instructions: str, catalog_answers: CatalogAnswerIndex = None, fast_path_stats: FastPathStats = None, document_index: DocumentIndex = None, tracer: TurnTracer = None, speculator: Speculator = None, tts_cache: TTSCache = None, canceller: TurnCanceller = None, project_id: str = "default", memory: ConversationMemory = None, products_info: str = None, products_summary: str = None):
+        super().__init__(instructions=instructions)
+        self.catalog_answers = catalog_answers
+        self.fast_path_stats = fast_path_stats
+        self.document_index = document_index
+        self.tracer = tracer
+        self.speculator = speculator
+        self.tts_cache = tts_cache
+        self.canceller = canceller
+        self.project_id = project_id
+        self.memory = memory
+        self.fast_path_instructions = fast_path_instructions(instructions, products_info, products_summary)
+        self.turn_fast_path = None  # Whether the turn awaiting its LLM metrics hit the fast path
+
+    async def llm_node(self, chat_ctx, tools, model_settings):
+        # Default LLM node (or the matching speculative reply), with first/last token marks for the turn trace
+        tracer = self.tracer
+        if tracer:
+            tracer.mark(LLM_REQUEST)
+        chunks = None
+        if self.speculator:
+            last_user = next((item for item in reversed(chat_ctx.items) if getattr(item, "role", None) == "user"), None)
+            chunks = self.speculator.take(last_user.text_content or "") if last_user else None
+        if chunks is None:
+            chat_ctx = self.with_turn_instructions(self.bounded_chat_ctx(chat_ctx), self.turn_fast_path)
+            chunks = Agent.default.llm_node(self, chat_ctx, tools, model_settings)
+        work = TurnWork(prompt_tokens=self.estimated_prompt_tokens(""))
+        try:
+            async for chunk in chunks:
+                if tracer:
+                    tracer.mark(LLM_FIRST_TOKEN)
+                work.generated_chars += len(chunk_text(chunk))
+                yield chunk
+        except (asyncio.CancelledError, GeneratorExit):
+            # Barge-in: the speech handle cancels this node (and the TTS node)
+            if self.canceller:
+                self.canceller.record(work, self.project_id, "voice", "interrupted")
+            raise
+        if tracer:
+            tracer.mark(LLM_LAST_TOKEN)
+
+    async def tts_node(self, text, model_settings):
+        # Default TTS node (or the cached audio of a fixed phrase) on speakable segments, with first text in / first audio out marks for the turn trace
+        tracer = self.tracer
+
+        async def traced_text():
+            async for chunk in text:
+                if tracer:
+                    tracer.mark(TTS_REQUEST)
+                yield chunk
+
+        def synthesize(chunks):
+            return Agent.default.tts_node(self, chunks, model_settings)
+
+        # Sentence / clause segments with numbers, prices and units written out
+        segments = speech_segments(traced_text())
+        frames = cached_tts(segments, self.tts_cache, synthesize) if self.tts_cache else synthesize(segments)
+        async for frame in frames:
+            if tracer:
+                tracer.mark(TTS_FIRST_AUDIO)
+            yield frame
+
+    def bounded_chat_ctx(self, chat_ctx):
+        """Chat context with the older turns replaced by the rolling summary"""
+        if not self.memory:
+            return chat_ctx
+        items = chat_ctx.items
+        turns = [item for item in items if getattr(item, "role", None) in ("user", "assistant")]
+        messages = [{"role": item.role, "content": item.text_content or ""} for item in turns]
+        self.memory.update(messages)
+        summary, start = self.memory.window(messages)
+        if not start:
+            return chat_ctx
+        bounded = chat_ctx.copy()
+        summary_item = bounded.add_message(role="system", content=summary_messages(summary)[0]["content"]) if summary else None
+        # Instructions (before the first turn), summary, then the recent turns
+        head = items[:items.index(turns[0])]
+        bounded.items[:] = head + ([summary_item] if summary_item else []) + items[items.index(turns[start]):]
+        return bounded
+
+    def with_turn_instructions(self, chat_ctx, fast_path: bool):
+        """Chat context of a fast path turn: the instructions with the catalog summary"""
+        if not fast_path or not self.fast_path_instructions:
+            return chat_ctx
+        swapped = chat_ctx.copy()
+        for i, item in enumerate(swapped.items):
+            if getattr(item, "role", None) == "system" and item.text_content == self.instructions:
+                swapped.items[i] = item.model_copy(update={"content": [self.fast_path_instructions]})
+                break
+        return swapped
+
+    def turn_context(self, user_text: str, record: bool = True):
+        """(system snippet, fast path hit) for a user message: catalog answer, else document passages"""
+        if self.catalog_answers:
+            answer = self.catalog_answers.timed_answer(user_text, self.fast_path_stats) if record else self.catalog_answers.answer(user_text)
+            if answer:
+                if record:
+                    logger.info("⚡ Catalog fast path (%s): %s", answer.intent, answer.text, extra={"category": "fast_path"})
+                return answer.context_snippet(), True
+        if self.document_index:
+            return self.document_index.context_snippet(user_text), False
+        return None, False
+
+    async def on_user_turn_completed(self, turn_ctx, new_message):
+        user_text = new_message.text_content
+        if not user_text:
+            return
+
+        snippet, self.turn_fast_path = self.turn_context(user_text)
+        if snippet:
+            turn_ctx.add_message(role="system", content=snippet)
+
+    def record_llm_metrics(self, llm_metrics):
+        """Time to first token of the reply to the last committed turn, for the fast path stats"""
+        fast_path, self.turn_fast_path = self.turn_fast_path, None
+        ttft = getattr(llm_metrics, "ttft", -1)
+        if fast_path is None or not self.fast_path_stats or ttft is None or ttft < 0:
+            return
+        saved = len(self.instructions) - len(self.fast_path_instructions) if fast_path and self.fast_path_instructions else 0
+        self.fast_path_stats.record_llm_call(ttft, fast_path=fast_path, prompt_chars_saved=saved)
+
+    async def speculative_reply(self, user_text: str):
+        """LLM stream of the reply to a not yet committed user message"""
+        snippet, fast_path = self.turn_context(user_text, record=False)
+        chat_ctx = self.with_turn_instructions(self.bounded_chat_ctx(self.chat_ctx), fast_path).copy()
+        if snippet:
+            chat_ctx.add_message(role="system", content=snippet)
+        chat_ctx.add_message(role="user", content=user_text)
+        async for chunk in Agent.default.llm_node(self, chat_ctx, self.tools, ModelSettings()):
+            yield chunk
+
+    def estimated_prompt_tokens(self, user_text: str) -> int:
+        history = sum(len(item.text_content or "") for item in self.chat_ctx.items if getattr(item, "role", None))
+        return (len(self.instructions) + history + len(user_text)) // 4
 
 
 async def entrypoint(ctx: JobContext):
     """
     Ultra-simplified entry point
     """
+    configure_logging()
+    set_log_context(session=ctx.room.name)
     logger.info(f"🚀 [V2] Starting simple agent for room: {ctx.room.name}")
 
+    # Opt-in sampled profiling for the whole session (VOYALTIS_PROFILE*)
+    profiler = start_session_profiler()
+
     # Load configuration (will be updated from participant metadata)
     config_loader = None  # Will be loaded from project
     prompt_builder = None  # Will be loaded from project
     sales_analyzer = None  # Will be loaded from project
     project_config = None  # Will be loaded from project
 
-    # Simple state tracking
-    conversation_messages = []
-    questions_asked = 0
-    report_sent = False
+    # Messages, question count and end detection (max_questions set once the project is loaded)
+    conversation = ConversationState(max_questions=0)
     session_ref = None  # Will hold session reference
 
-    # End-of-conversation tracking (hybrid system with safety nets)
-    recap_done = False  # Track if recap has been done
-    user_responded_after_recap = False  # User gave final input after recap
-    exchanges_after_max = 0  # Safety counter to prevent infinite loops
-
     # Participant info
     user_name = "Thomas"
     event_name = ""
@@ -335,6 +240,12 @@ async def entrypoint(ctx: JobContext):
     report_config = None  # Will hold report configuration from project
     table_structure = None  # Will hold dynamic table structure from project
     products_info = None  # Will hold formatted products list for agent instructions
+    products_summary = None  # One line per product, for the instructions of voice fast path turns
+    catalog_answers = None  # Catalog fast path index for the project
+    document_index = None  # BM25 index over the project documents and catalog
+    fast_path_stats = FastPathStats()
+    canceller = TurnCanceller()  # Stale text turns (superseded messages) and barge-ins
+    tracer = TurnTracer(f"{ctx.room.name}-{int(time.time())}")
 
     # Connect to room
     await ctx.connect()
@@ -355,69 +266,79 @@ async def entrypoint(ctx: JobContext):
     conversation_mode = "voice"  # Default mode is voice
     last_message_type = "voice"  # Track if last user message was text or voice
 
-    @ctx.room.on("data_received")
-    def on_data_received(data_packet):
-        """Handle text messages from client"""
-        nonlocal conversation_mode, last_message_type, session_ref
+    async def process_message(entry: InboxEntry):
+        """Handle one client message (or a burst of typed messages) from the inbox"""
+        nonlocal conversation_mode, last_message_type
+        message = entry.message
+
+        if entry.is_text:
+            user_text = entry.text
+            transcript_logger.info("💬 TEXT MESSAGE from user: %s", user_text)
+
+            # Switch to text mode if requested
+            if message.get("mode") == "text":
+                conversation_mode = "text"
+                last_message_type = "text"
+                logger.info("🔄 Switched to TEXT mode (no TTS)")
+
+            # Send transcription to client for display
+            if user_text:
+                try:
+                    for part in entry.parts:
+                        await ctx.room.local_participant.publish_data(
+                            payload=json.dumps({
+                                "type": "user_transcription",
+                                "text": part,
+                                "role": "user"
+                            }).encode('utf-8'),
+                            topic="conversation-message"
+                        )
 
-        async def handle_message():
-            try:
-                # Decode the data packet
-                message_text = data_packet.data.decode('utf-8')
-                message = json.loads(message_text)
-
-                if message.get("type") == "user_text_message":
-                    user_text = message.get("text", "")
-                    logger.info(f"💬 TEXT MESSAGE from user: {user_text}")
-
-                    # Switch to text mode if requested
-                    if message.get("mode") == "text":
-                        conversation_mode = "text"
-                        last_message_type = "text"
-                        logger.info("🔄 Switched to TEXT mode (no TTS)")
-
-                    # Send transcription to client for display
-                    if user_text:
-                        try:
-                            await ctx.room.local_participant.publish_data(
-                                payload=json.dumps({
-                                    "type": "user_transcription",
-                                    "text": user_text,
-                                    "role": "user"
-                                }).encode('utf-8'),
-                                topic="conversation-message"
-                            )
-
-                            # Add to conversation history
-                            conversation_messages.append({
-                                "role": "user",
-                                "content": user_text
-                            })
-
-                            # Generate text-only response if in text mode
-                            if conversation_mode == "text":
-                                await handle_text_response(user_text)
-
-                        except Exception as e:
-                            logger.error(f"Failed to handle text message: {e}")
-
-                elif message.get("type") == "switch_to_voice":
-                    # User clicked mic button to switch back to voice
-                    logger.info("🎤 User requested switch to VOICE mode")
-                    conversation_mode = "voice"
-                    last_message_type = "voice"
+                    # A reply already streaming is finished first, so that it precedes
+                    # this message in the history (and the next turn is built on it)
+                    await canceller.wait_delivered()
 
-            except Exception as e:
-                logger.error(f"Error handling data message: {e}")
-                import traceback
-                logger.error(traceback.format_exc())
+                    # Add to conversation history (a burst of messages is one user turn)
+                    conversation.add_message("user", user_text)
+
+                    # Generate text-only response if in text mode (a newer message
+                    # cancels the reply still waiting on the LLM)
+                    if conversation_mode == "text":
+                        canceller.start_text_turn(lambda work: handle_text_response(user_text, work), project_id or "default")
 
-        # Create task to handle message asynchronously
-        asyncio.create_task(handle_message())
+                except Exception as e:
+                    logger.error(f"Failed to handle text message: {e}")
+
+        elif message.get("type") == "switch_to_voice":
+            # User clicked mic button to switch back to voice
+            logger.info("🎤 User requested switch to VOICE mode")
+            canceller.cancel_text_turn(project_id or "default", "mode_switch")
+            conversation_mode = "voice"
+            last_message_type = "voice"
+
+    # Client messages are processed in order by a single consumer, bursts coalesced
+    inbox = SessionInbox(process_message).start()
+
+    async def close_inbox():
+        logger.info(f"📥 Inbox stats: {inbox.stats}")
+        await inbox.close()
+
+    ctx.add_shutdown_callback(close_inbox)
+
+    @ctx.room.on("data_received")
+    def on_data_received(data_packet):
+        """Queue text messages from client"""
+        try:
+            message = json.loads(data_packet.data.decode('utf-8'))
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            logger.error(f"Error decoding data message: {e}")
+            return
+        if isinstance(message, dict):
+            inbox.offer(message)
 
     @ctx.room.on("participant_connected")
     def on_participant_connected(participant):
-        nonlocal user_name, event_name, attention_points, project_id, config_loader, prompt_builder, sales_analyzer, report_config, table_structure, products_info, project_config
+        nonlocal user_name, event_name, attention_points, project_id, config_loader, prompt_builder, sales_analyzer, report_config, table_structure, products_info, products_summary, project_config, catalog_answers, document_index
         logger.info(f"👋 Participant connected: {participant.identity}")
 
         if participant.metadata:
@@ -426,6 +347,7 @@ async def entrypoint(ctx: JobContext):
                 user_name = metadata.get("userName", user_name)
                 event_name = metadata.get("eventName", event_name)
                 project_id = metadata.get("projectId", None)
+                set_log_context(project=project_id)
 
                 # If projectId is provided, load from filesystem
                 if project_id:
@@ -456,11 +378,14 @@ async def entrypoint(ctx: JobContext):
                         config_loader = load_project_products(project_id)
                         prompt_builder = PromptBuilder(config_loader)
                         sales_analyzer = SalesAnalyzer(config_loader=config_loader)
+                        catalog_answers = CatalogAnswerIndex.for_config(config_loader)
+                        document_index = load_project_documents(project_id)
 
                         # Get formatted products list for agent instructions
-                        if config_loader.products:
-                            products_info = config_loader.get_products_list_for_prompt()
-                            logger.info(f"📦 Products info prepared for agent ({len(config_loader.products)} products)")
+                        products_info = products_info_for_prompt(config_loader, document_index)
+                        if products_info:
+                            products_summary = config_loader.get_products_summary_for_prompt()
+                            logger.info(f"📦 Products info prepared for agent ({len(config_loader.products)} products, {len(products_info)} chars)")
                     else:
                         logger.warning(f"⚠️ Failed to load project config for {project_id}, using defaults")
                 else:
@@ -488,18 +413,7 @@ async def entrypoint(ctx: JobContext):
 
     # Set defaults if no attention points
     if not attention_points:
-        attention_points = [
-            {
-                "id": "default_sales",
-                "description": "Produits vendus",
-                "naturalPrompts": ["Comment s'est passée ta journée ? Qu'as-tu vendu ?"]
-            },
-            {
-                "id": "default_feedback",
-                "description": "Retours clients",
-                "naturalPrompts": ["Et au niveau des retours clients ?"]
-            }
-        ]
+        attention_points = list(DEFAULT_ATTENTION_POINTS)
 
     # Create default loaders if not loaded from project
     if config_loader is None:
@@ -507,41 +421,76 @@ async def entrypoint(ctx: JobContext):
         config_loader = ConfigLoader("config/products.json")
         prompt_builder = PromptBuilder(config_loader)
         sales_analyzer = SalesAnalyzer(config_loader=config_loader)
+        catalog_answers = CatalogAnswerIndex.for_config(config_loader)
+
+    async def log_fast_path_stats():
+        logger.info(f"⚡ Catalog fast path stats: {fast_path_stats.summary()}")
+
+    ctx.add_shutdown_callback(log_fast_path_stats)
+
+    async def log_stale_turn_stats():
+        logger.info(f"✂️ Stale turn stats: {canceller.stats}")
+
+    ctx.add_shutdown_callback(log_stale_turn_stats)
+
+    async def log_turn_latency():
+        tracer.finish_turn()
+        logger.info(f"⏱️ Session turn latency: {tracer.session_summary()}")
+        logger.info(f"⏱️ Worker turn latency: {worker_latency_summary()}")
+        trace_dir = os.getenv("VOYALTIS_TRACE_DIR")
+        if trace_dir:
+            logger.info(f"⏱️ Chrome trace written to {tracer.dump_chrome_trace(trace_dir)}")
+
+    ctx.add_shutdown_callback(log_turn_latency)
+
+    # Metrics: session gauge, event loop monitor, snapshot for the worker /metrics endpoint
+    metrics.start_snapshot_writer()
+    metrics.ACTIVE_SESSIONS.inc()
+    metrics.SESSIONS.inc(project=project_id or "default")
+    loop_monitor = start_loop_monitor()
+
+    async def close_session_metrics():
+        loop_monitor.log_report()
+        metrics.ACTIVE_SESSIONS.dec()
+        metrics.write_snapshot()
+
+    ctx.add_shutdown_callback(close_session_metrics)
+
+    if profiler and not profiling_project_selected(project_id):
+        profiler.discard()
+        profiler = None
+    if profiler:
+        async def write_session_profile():
+            profiler.stop(project_id or "default", ctx.room.name)
+
+        ctx.add_shutdown_callback(write_session_profile)
 
     # Calculate max questions: base on attention points + buffer for follow-ups
-    # Formula: len(attention_points) + ceil(len(attention_points) * 0.5)
-    # Example: 3 attention points → 3 + 2 = 5 questions
-    #          4 attention points → 4 + 2 = 6 questions
-    #          5 attention points → 5 + 3 = 8 questions
-    base_questions = len(attention_points)
-    follow_up_buffer = max(2, int(base_questions * 0.5))  # At least 2 follow-ups
-    max_questions = base_questions + follow_up_buffer
+    base_questions, follow_up_buffer, max_questions = question_budget(attention_points)
+    conversation.max_questions = max_questions
 
     logger.info(f"📊 Will ask up to {max_questions} questions ({base_questions} base + {follow_up_buffer} follow-ups)")
 
+    # Rolling memory: older turns summarized in the background, recent ones verbatim, under a token budget
+    history_tokens = history_budget(project_config)
+    history_summarizer = openai_summarizer(base_url=LLM_BASE_URL, project_id=project_id or "default") if HISTORY_SUMMARIZER == "llm" else None
+    text_memory = ConversationMemory(history_tokens, summarizer=history_summarizer, project_id=project_id or "default")
+    voice_memory = ConversationMemory(history_tokens, summarizer=history_summarizer, project_id=project_id or "default")
+
+    async def close_memories():
+        logger.info(f"🗜️ History memory stats: voice {voice_memory.stats}, text {text_memory.stats}")
+        await voice_memory.close()
+        await text_memory.close()
+
+    ctx.add_shutdown_callback(close_memories)
+
     # Get time period context and frequency based on report schedule
-    time_period = "aujourd'hui"  # Default: daily
-    report_frequency = "daily"  # Default
+    time_period, report_frequency = report_period(project_config)
     report_goal = None
 
     if project_config:
-        report_schedule_type = project_config.get("settings", {}).get("reportScheduleType", "fixed")
-        report_frequency = project_config.get("settings", {}).get("reportFrequency", "daily")
         report_goal = project_config.get("reportGoal", None)
-
-        if report_schedule_type == "fixed":
-            if report_frequency == "weekly":
-                time_period = "cette semaine"
-            elif report_frequency == "biweekly":
-                time_period = "ces deux dernières semaines"
-            elif report_frequency == "monthly":
-                time_period = "ce mois-ci"
-            # daily stays as "aujourd'hui"
-        else:  # per-appointment
-            time_period = "lors de cette visite"
-            report_frequency = "per-appointment"
-
-        logger.info(f"⏰ Report time period: {time_period} (schedule: {report_schedule_type}, frequency: {report_frequency})")
+        logger.info(f"⏰ Report time period: {time_period} (schedule: {project_config.get('settings', {}).get('reportScheduleType', 'fixed')}, frequency: {report_frequency})")
 
     # Opening message - Use intelligent opening question generator with period context
     if attention_points:
@@ -556,366 +505,273 @@ async def entrypoint(ctx: JobContext):
         # Fallback if no attention points
         opening_message = f"Salut {user_name} ! Prêt pour ton rapport ?"
 
+    tts = elevenlabs.TTS(
+        model=TTS_MODEL,
+        voice_id=TTS_VOICE_ID,
+        streaming_latency=2,
+        language="fr",
+    )
+    audio_cache = get_tts_cache(TTS_VOICE_ID, TTS_MODEL)
+    # Opening audio rendered now (TTS cache, else TTS), while the session starts
+    opening_audio = OpeningAudio(tts, audio_cache, speakable(opening_message)).start() if OPENING_AUDIO_ENABLED else None
+    # Fixed phrases of the session played from the TTS cache
+    tts_cache = None
+    if TTS_CACHE_ENABLED:
+        tts_cache = audio_cache
+        tts_cache.register(speakable(phrase) for phrase in session_phrases(attention_points, time_period))
+
+        async def log_tts_cache_stats():
+            logger.info(f"🔊 TTS cache stats: {tts_cache.stats} (hit rate {tts_cache.hit_rate})")
+
+        ctx.add_shutdown_callback(log_tts_cache_stats)
+
     # Text response handler - generates response without TTS
-    async def handle_text_response(user_text: str):
+    async def handle_text_response(user_text: str, work: TurnWork):
         """Handle text message and generate text-only response"""
-        nonlocal questions_asked, report_sent, recap_done, user_responded_after_recap, exchanges_after_max
 
         try:
-            # Build conversation context for LLM
+            # Build conversation context for LLM: rolling summary + recent messages
             messages = []
-            for msg in conversation_messages:
+            for msg in conversation.messages:
                 messages.append({
                     "role": "user" if msg["role"] == "user" else "assistant",
                     "content": msg["content"]
                 })
-
-            # Get current instructions
-            current_instructions = build_simple_instructions(
+            text_memory.update(messages)
+            messages = text_memory.prompt_messages(messages)
+
+            # Catalog fast path: a product question answered from the catalog index
+            # replaces the full catalog in the prompt by a short verified snippet
+            catalog_answer = catalog_answers.timed_answer(user_text, fast_path_stats) if catalog_answers else None
+            turn_products_info = catalog_answer.context_snippet() if catalog_answer else products_info
+            if catalog_answer:
+                logger.info("⚡ Catalog fast path (%s): %s", catalog_answer.intent, catalog_answer.text, extra={"category": "fast_path"})
+            elif document_index:
+                # Only the project document passages relevant to this turn
+                documents_context = document_index.context_snippet(user_text)
+                if documents_context:
+                    turn_products_info = f"{products_info}\n\n{documents_context}" if products_info else documents_context
+
+            # Get current instructions (off the loop for very large catalogs)
+            current_instructions = await offload(
+                "instructions", build_simple_instructions,
+                size=len(turn_products_info or ""), cpu_bound=True,
                 user_name=user_name,
                 attention_points=attention_points,
-                questions_asked=questions_asked,
+                questions_asked=conversation.questions_asked,
                 max_questions=max_questions,
                 first_question_in_opening=True,
                 report_config=report_config,
                 table_structure=table_structure,
                 base_questions=base_questions,
                 follow_up_buffer=follow_up_buffer,
-                products_info=products_info,
+                products_info=turn_products_info,
                 time_period=time_period
             )
 
             # Call OpenAI LLM directly
             from openai import AsyncOpenAI
-            openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+            openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), base_url=LLM_BASE_URL)
 
-            response = await openai_client.chat.completions.create(
+            tracer.start_turn(source="text")
+            tracer.mark(LLM_REQUEST)
+            llm_started = asyncio.get_running_loop().time()
+            work.prompt_tokens = estimate_tokens(len(current_instructions) + sum(len(m["content"] or "") for m in messages))
+            stream = await openai_client.chat.completions.create(
                 model="gpt-4o-mini",
                 messages=[
                     {"role": "system", "content": current_instructions},
                     *messages
                 ],
                 temperature=0.7,
-                max_tokens=150
-            )
-
-            assistant_text = response.choices[0].message.content.strip()
-            logger.info(f"🤖 TEXT RESPONSE: {assistant_text}")
-
-            # Store assistant response
-            conversation_messages.append({
-                "role": "assistant",
-                "content": assistant_text
-            })
-
-            # Send text response to client
-            await ctx.room.local_participant.publish_data(
-                payload=json.dumps({
-                    "type": "agent_response",
-                    "text": assistant_text,
-                    "role": "assistant"
-                }).encode('utf-8'),
-                topic="conversation-message"
+                max_tokens=150,
+                stream=True,
+                stream_options={"include_usage": True}
             )
 
-            # Count questions - but not if answering user's question
-            if len(conversation_messages) > 2:
-                # Check if user asked a question
-                is_answering_user_question = user_text.strip().endswith("?")
-
-                if not is_answering_user_question:
-                    questions_asked += 1
-                    logger.info(f"📊 Questions: {questions_asked}/{max_questions}")
-
-                    # Garde-fou: Warn agent when approaching limit
-                    questions_remaining = max_questions - questions_asked
-                    if questions_remaining == 1:
-                        logger.warning(f"⚠️  Only 1 question remaining! Agent should wrap up.")
-                    elif questions_remaining == 0:
-                        logger.warning(f"🚨 Limit reached! Agent must conclude now.")
-                else:
-                    logger.info(f"💡 Agent answered user question - not counting (still at {questions_asked}/{max_questions})")
-
-            # Hybrid end detection - same as voice mode
-            should_end = False
-
-            # ==================================================================================
-            # CHEMIN 0 (PRIORITAIRE ABSOLU): Vérifier la phrase magique IMMÉDIATEMENT
-            # ==================================================================================
-            # CRITIQUE: Cette vérification doit se faire AVANT tout autre check !
-            # Elle doit fonctionner quel que soit le nombre de questions posées.
-            text_lower = assistant_text.lower()
-
-            # Définir les phrases magiques qui déclenchent la fin IMMÉDIATE
-            immediate_end_patterns = [
-                "je vais préparer ton rapport",
-                "je vais préparer le rapport",
-                "je vais rédiger ton rapport",
-                "je vais rédiger le rapport",
-                "je prépare ton rapport",
-                "je prépare le rapport",
-                "je rédige ton rapport",
-                "je rédige le rapport"
-            ]
-
-            # Si phrase magique détectée → FIN IMMÉDIATE, sans condition !
-            if any(pattern in text_lower for pattern in immediate_end_patterns):
-                report_sent = True  # Set immediately to prevent double processing
-                logger.info(f"🏁 IMMEDIATE END - agent said final phrase (text mode, at question {questions_asked}/{max_questions})")
-
-                # Send ending signal IMMEDIATELY to cut microphone
-                ending_signal = {"type": "conversation_ending"}
+            # Publish the reply as it is generated (coalesced agent_response_delta packets)
+            async def publish_packet(packet):
                 await ctx.room.local_participant.publish_data(
-                    payload=json.dumps(ending_signal).encode('utf-8'),
-                    topic="conversation-ending"
+                    payload=json.dumps(packet).encode('utf-8'),
+                    topic="conversation-message"
                 )
-                logger.info("📡 Sent IMMEDIATE conversation_ending signal (text mode)")
 
-                # Generate report IMMEDIATELY and stop processing
-                await asyncio.sleep(0.5)
-                await generate_report()
+            publisher = DeltaPublisher(publish_packet)
+            usage = None
+            first_token_seconds = None
+            async for chunk in stream:
+                if chunk.usage:
+                    usage = chunk.usage
+                token = chunk.choices[0].delta.content if chunk.choices else None
+                if not token:
+                    continue
+                if not publisher.text:
+                    tracer.mark(LLM_FIRST_TOKEN)
+                    first_token_seconds = asyncio.get_running_loop().time() - llm_started
+                    # From here the reply is delivered, even if a newer message arrives
+                    work.delivered = True
+                work.generated_chars += len(token)
+                await publisher.push(token)
+            await publisher.flush()
+            tracer.mark(LLM_LAST_TOKEN)
+            tracer.finish_turn()
+            if first_token_seconds is not None:
+                fast_path_stats.record_llm_call(
+                    first_token_seconds,
+                    fast_path=catalog_answer is not None,
+                    prompt_chars_saved=len(products_info or "") - len(turn_products_info or ""),
+                )
 
-                # Close session immediately
-                if session_ref:
-                    await session_ref.aclose()
-                    logger.info("🔚 Session closed immediately after final phrase (text mode)")
+            if usage:
+                metrics.record_llm_usage(project_id or "default", "gpt-4o-mini", usage.prompt_tokens, usage.completion_tokens)
 
-                # CRITICAL: Return immediately to stop processing any further messages
-                return
+            assistant_text = publisher.text.strip()
+            transcript_logger.info("🤖 TEXT RESPONSE: %s", assistant_text)
 
-            # ==================================================================================
-            # Autres chemins de fin (seulement si phrase magique pas détectée)
-            # ==================================================================================
-            if questions_asked >= max_questions:
-                # Track that user sent a message after max
-                exchanges_after_max += 1
-                if recap_done:
-                    user_responded_after_recap = True
-                    logger.info("📝 User responded after recap (text mode)")
-
-                # CHEMIN 1 (Idéal): Detect RECAP phase
-                if not should_end:
-                    recap_patterns = [
-                    "dernière information",
-                    "dernière chose",
-                    "dernière remarque",
-                    "as-tu autre chose",
-                    "autre chose",
-                    "quelque chose à ajouter",
-                    "un dernier mot",
-                    "une dernière précision"
-                ]
-                is_recap = any(pattern in text_lower for pattern in recap_patterns)
-
-                if is_recap and not recap_done:
-                    recap_done = True
-                    logger.info("📝 Recap detected - waiting for user's final input (text mode)")
-
-                # CHEMIN 2 (Patterns): After recap + user responded + conclusion patterns
-                elif user_responded_after_recap:
-                    end_patterns = [
-                        "préparer ton rapport",
-                        "préparer le rapport",
-                        "je vais générer",
-                        "génération du rapport",
-                        "rédiger ton rapport",
-                        "rédiger le rapport",
-                        "je m'y mets",
-                        "je rédige"
-                    ]
-                    if any(pattern in text_lower for pattern in end_patterns):
-                        should_end = True
-                        logger.info("🏁 End detected (Pattern match) - recap + user replied + conclusion")
-
-                    # CHEMIN 3 (Safety net): User responded after recap, agent replied
-                    else:
-                        should_end = True
-                        logger.info("🏁 End detected (Safety net) - user responded after recap + agent replied")
+            # Store assistant response, count the question, detect the end
+            outcome = conversation.on_text_reply(user_text, assistant_text)
 
-                # CHEMIN 4 (Ultimate safety): Too many exchanges
-                if exchanges_after_max >= 6:
-                    should_end = True
-                    logger.info("🏁 SAFETY END - too many exchanges after max questions")
+            # Send the whole text response to client (replaces the streamed deltas)
+            await publish_packet(publisher.final_packet(assistant_text))
 
-            # Generate report if done
-            if should_end and not report_sent:
-                report_sent = True
+            if outcome.counted:
+                metrics.QUESTIONS_ASKED.inc(project=project_id or "default", mode="text")
+                # Garde-fou: Warn agent when approaching limit
+                if conversation.questions_remaining == 1:
+                    logger.warning(f"⚠️  Only 1 question remaining! Agent should wrap up.")
+                elif conversation.questions_remaining == 0:
+                    logger.warning(f"🚨 Limit reached! Agent must conclude now.")
 
-                # Signal end
-                ending_signal = {"type": "conversation_ending"}
-                await ctx.room.local_participant.publish_data(
-                    payload=json.dumps(ending_signal).encode('utf-8'),
-                    topic="conversation-ending"
-                )
+            if not outcome.should_end:
+                return
+            metrics.END_DETECTIONS.inc(path=outcome.end_path, mode="text")
 
-                await asyncio.sleep(0.5)
+            # Send ending signal IMMEDIATELY to cut microphone
+            await send_ending_signal(ctx.room)
+            logger.info(f"📡 Sent conversation_ending signal (text mode, {outcome.end_path})")
 
-                # Generate report
-                await generate_report()
+            await asyncio.sleep(0.5)
+            await generate_report()
 
+            # Immediate end: close right away, other paths let the last message settle
+            if outcome.end_path != "immediate":
                 await asyncio.sleep(1)
-
-                # Close session
-                if session_ref:
-                    await session_ref.aclose()
-                    logger.info("✅ Session closed")
+            if session_ref:
+                await session_ref.aclose()
+                logger.info("✅ Session closed (text mode)")
 
         except Exception as e:
             logger.error(f"Error generating text response: {e}")
             import traceback
             logger.error(traceback.format_exc())
 
+    # Adaptive endpointing: short VAD segments, the end of turn is committed by the endpointer
+    adaptive_endpointing = ENDPOINTING_MODE == ADAPTIVE
+    endpointing_options = {"turn_detection": "manual"} if adaptive_endpointing else {}
+    stt_provider = select_stt_provider(project_config)
+
     # Create session - ULTRA PERMISSIVE for maximum voice capture
     session = AgentSession(
         vad=silero.VAD.load(
             min_speech_duration=0.2,      # ↓ Detect very short speech
-            min_silence_duration=2.0,     # ↑ Wait 2s of silence before ending turn
+            # ↑ Fixed mode: wait 2s of silence before ending turn
+            min_silence_duration=ADAPTIVE_VAD_SILENCE if adaptive_endpointing else 2.0,
             prefix_padding_duration=0.5,  # ↑ Capture more before speech starts
         ),
-        stt=openai.STT(
-            model="whisper-1",
-            language="fr",
-        ),
-        llm=openai.LLM(model="gpt-4o-mini"),
-        tts=elevenlabs.TTS(
-            model="eleven_turbo_v2_5",
-            voice_id="5jCmrHdxbpU36l1wb3Ke",
-            streaming_latency=2,
-            language="fr",
-        ),
+        stt=build_stt(stt_provider, language="fr"),
+        llm=openai.LLM(model="gpt-4o-mini", base_url=LLM_BASE_URL),
+        tts=tts,
         # ULTRA PERMISSIVE: Accept almost any voice input
         allow_interruptions=True,
         min_interruption_duration=0.3,        # ↓ Only 0.3s needed (was 1.0s)
         min_interruption_words=0,             # ↓ NO minimum words (was 2)
         false_interruption_timeout=1.0,       # ↓ Faster detection (was 2.0s)
         resume_false_interruption=False,      # Don't resume - let user speak
+        **endpointing_options,
     )
-    logger.info(f"🔍 AgentSession created with VAD/STT/LLM/TTS")
-
-    async def generate_report():
-        """Generate report from conversation"""
-        logger.info("📊 Generating report...")
-
-        # Build conversation text
-        conversation_text = "\n".join([
-            f"{msg['role'].upper()}: {msg['content']}"
-            for msg in conversation_messages
-        ])
-
-        # Build attention structure
-        attention_structure = "\n".join([
-            f"{i}. {point.get('description', '').upper()}"
-            for i, point in enumerate(attention_points, 1)
-        ])
-
-        # Generate prompt
-        prompt = prompt_builder.build_claude_extraction_prompt(
-            conversation_text=conversation_text,
-            attention_structure=attention_structure
-        )
-
-        # Call Claude (using Anthropic client from config_loader context)
-        from anthropic import AsyncAnthropic
-        anthropic = AsyncAnthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
-
-        try:
-            response = await anthropic.messages.create(
-                model="claude-sonnet-4-20250514",
-                max_tokens=2048,
-                messages=[{"role": "user", "content": prompt}]
-            )
+    logger.info(f"🔍 AgentSession created with VAD/STT/LLM/TTS ({stt_provider} STT, {ENDPOINTING_MODE} endpointing)")
+    endpointer = AdaptiveEndpointer(commit=session.commit_user_turn) if adaptive_endpointing else None
 
-            response_text = response.content[0].text.strip()
-
-            # Clean JSON
-            if "```json" in response_text:
-                response_text = response_text.split("```json")[1].split("```")[0].strip()
-            elif "```" in response_text:
-                response_text = response_text.split("```")[1].split("```")[0].strip()
-
-            extracted_data = json.loads(response_text)
-
-            # Apply fuzzy matching
-            if "sales" in extracted_data:
-                mapped_sales = sales_analyzer.map_sales_data(extracted_data["sales"])
-                extracted_data["sales"] = mapped_sales
-
-            # Calculate sales amounts - SIMPLIFIED VERSION (no discount)
-            total_amount = 0.0
-            sales_amounts = {}  # Dictionary: {product_name: amount}
-
-            if "sales" in extracted_data and extracted_data["sales"]:
-                logger.info(f"💰 Calculating sales amounts for {len(extracted_data['sales'])} products...")
-
-                # Calculate amount for each product
-                for product_name, quantity in extracted_data["sales"].items():
-                    if quantity > 0:
-                        # Find product and get price using normalized field
-                        price = 0.0
-                        for product in config_loader.products:
-                            # Get display name or name
-                            prod_name = config_loader._normalize_product_field(product, "display_name") or config_loader._normalize_product_field(product, "name")
-                            if prod_name == product_name:
-                                # Use the intelligent price detection
-                                price = config_loader._normalize_product_field(product, "price")
-                                break
-
-                        # Calculate amount for this product
-                        amount = quantity * price
-                        sales_amounts[product_name] = round(amount, 2)
-                        total_amount += amount
-
-                        if price > 0:
-                            logger.info(f"  ✓ {product_name}: {quantity} × {price}€ = {amount:.2f}€")
-                        else:
-                            logger.warning(f"  ⚠️  {product_name}: No price found (quantity: {quantity})")
-
-            # Add financial data to extracted data
-            extracted_data["sales_amounts"] = sales_amounts  # Individual amounts per product
-            extracted_data["total_amount"] = round(total_amount, 2)
-
-            # Log final calculation
-            logger.info(f"💰 Total sales amount: {extracted_data['total_amount']}€")
-
-            # Send to client
-            data_message = {
-                "type": "conversation_complete",
-                "data": extracted_data
-            }
+    # Speculative replies on the transcript so far, bounded by the project wasted-token budget
+    speculation_enabled, speculation_budget = speculation_settings(project_config)
+    speculator = Speculator(
+        generate=lambda text: session.current_agent.speculative_reply(text),
+        project_id=project_id or "default",
+        max_wasted_tokens=speculation_budget,
+        prompt_tokens=lambda text: session.current_agent.estimated_prompt_tokens(text),
+    ) if speculation_enabled else None
 
-            await ctx.room.local_participant.publish_data(
-                payload=json.dumps(data_message).encode('utf-8'),
-                topic="conversation-complete"
-            )
+    if speculator:
+        async def log_speculation_stats():
+            logger.info(f"🔮 Speculation stats: {speculator.stats.as_dict()}")
 
-            logger.info("✅ Report sent to client")
+        ctx.add_shutdown_callback(log_speculation_stats)
 
-        except Exception as e:
-            logger.error(f"❌ Report generation failed: {e}")
-            import traceback
-            logger.error(traceback.format_exc())
+    async def generate_report():
+        """Generate report from conversation and send it to the client"""
+        await generate_session_report(
+            ctx.room, conversation.messages, attention_points,
+            config_loader, prompt_builder, sales_analyzer,
+            project_id=project_id,
+        )
 
     # Debug handlers
     @session.on("user_started_speaking")
     def on_user_started_speaking():
-        logger.info("🎤 DEBUG: User started speaking (VAD detected voice)")
+        logger.debug("🎤 User started speaking (VAD detected voice)", extra={"category": "vad"})
 
     @session.on("user_stopped_speaking")
     def on_user_stopped_speaking():
-        logger.info("🎤 DEBUG: User stopped speaking (VAD detected silence)")
+        logger.debug("🎤 User stopped speaking (VAD detected silence)", extra={"category": "vad"})
+
+    # Turn tracing: end of speech -> STT -> LLM -> TTS -> playout
+    @session.on("user_state_changed")
+    def on_user_state_changed(event):
+        if event.old_state == "speaking" and event.new_state != "speaking":
+            tracer.start_turn()
+            if endpointer:
+                endpointer.on_speech_end()
+            if speculator:
+                speculator.on_speech_end()
+        elif event.new_state == "speaking":
+            if endpointer:
+                endpointer.on_speech_start()
+            if speculator:
+                speculator.on_speech_start()
+
+    @session.on("user_input_transcribed")
+    def on_user_input_transcribed(event):
+        if event.is_final:
+            tracer.mark(STT_FINAL, first_only=False)
+        if endpointer:
+            endpointer.on_transcript(event.transcript, event.is_final)
+        if speculator:
+            speculator.on_transcript(event.transcript, event.is_final)
+
+    @session.on("agent_state_changed")
+    def on_agent_state_changed(event):
+        if event.new_state == "speaking":
+            tracer.mark(PLAYOUT_START)
+
+    @session.on("metrics_collected")
+    def on_metrics_collected(event):
+        tracer.on_metrics(event.metrics)
+        if getattr(event.metrics, "type", "") == "llm_metrics":
+            metrics.record_llm_usage(project_id or "default", "gpt-4o-mini", event.metrics.prompt_tokens, event.metrics.completion_tokens)
+            if isinstance(session.current_agent, VoyaltisAgent):
+                session.current_agent.record_llm_metrics(event.metrics)
 
     # Event handlers
     @session.on("conversation_item_added")
     def on_conversation_item(event: ConversationItemAddedEvent):
-        nonlocal questions_asked, report_sent, recap_done, user_responded_after_recap, exchanges_after_max
-
-        logger.info(f"💬 {event.item.role}: {event.item.text_content}")
+        transcript_logger.info("💬 %s: %s", event.item.role, event.item.text_content)
+        if speculator and event.item.role == "assistant":
+            # A speculation started before this reply was generated without it
+            speculator.cancel()
 
-        # Store message
-        conversation_messages.append({
-            "role": event.item.role,
-            "content": event.item.text_content
-        })
+        # Store message, count questions (not the opening message, nor answers to a
+        # user question) and run the hybrid end detection
+        outcome = conversation.on_voice_item(event.item.role, event.item.text_content)
 
         # Send message to client for conversation history
         async def send_message_to_client():
@@ -931,32 +787,15 @@ async def entrypoint(ctx: JobContext):
 
         asyncio.create_task(send_message_to_client())
 
-        # Count questions - SKIP the opening message (first assistant message)
-        # ALSO SKIP if the agent is responding to a user question
-        should_count = False
-        if event.item.role == "assistant" and len(conversation_messages) > 2:
-            # Check if previous user message was a question (ends with "?")
-            previous_user_message = None
-            for i in range(len(conversation_messages) - 2, -1, -1):
-                if conversation_messages[i]["role"] == "user":
-                    previous_user_message = conversation_messages[i]["content"]
-                    break
-
-            # Don't count if user asked a question
-            is_answering_user_question = previous_user_message and previous_user_message.strip().endswith("?")
-
-            if not is_answering_user_question:
-                questions_asked += 1
-                should_count = True
-                logger.info(f"📊 Questions: {questions_asked}/{max_questions}")
-            else:
-                logger.info(f"💡 Agent answered user question - not counting (still at {questions_asked}/{max_questions})")
-
-            # Update instructions dynamically when approaching limit (only if we counted this question)
-            if should_count:
-                questions_remaining = max_questions - questions_asked
-                if questions_remaining <= 1:
-                    updated_instructions = build_simple_instructions(
+        if outcome.counted:
+            metrics.QUESTIONS_ASKED.inc(project=project_id or "default", mode="voice")
+
+            # Update instructions dynamically when approaching limit
+            if conversation.questions_remaining <= 1:
+                async def update_instructions(questions_asked: int):
+                    updated_instructions = await offload(
+                        "instructions", build_simple_instructions,
+                        size=len(products_info or ""), cpu_bound=True,
                         user_name=user_name,
                         attention_points=attention_points,
                         questions_asked=questions_asked,
@@ -970,156 +809,59 @@ async def entrypoint(ctx: JobContext):
                         time_period=time_period
                     )
                     # Update agent instructions in real-time
-                    session.update_agent(Agent(instructions=updated_instructions))
+                    session.update_agent(VoyaltisAgent(instructions=updated_instructions, catalog_answers=catalog_answers, fast_path_stats=fast_path_stats, document_index=document_index, tracer=tracer, speculator=speculator, tts_cache=tts_cache, canceller=canceller, project_id=project_id or "default", memory=voice_memory, products_info=products_info, products_summary=products_summary))
                     logger.info("🔄 Updated agent instructions - approaching limit")
 
-        # Hybrid end detection: Pattern-based (ideal) + Safety nets (robust)
-        should_end = False
-
-        # ==================================================================================
-        # CHEMIN 0 (PRIORITAIRE ABSOLU): Vérifier la phrase magique IMMÉDIATEMENT
-        # ==================================================================================
-        # CRITIQUE: Cette vérification doit se faire AVANT tout autre check !
-        # Elle doit fonctionner quel que soit le nombre de questions posées.
-        if event.item.role == "assistant":
-            text_lower = event.item.text_content.lower()
-
-            # Définir les phrases magiques qui déclenchent la fin IMMÉDIATE
-            immediate_end_patterns = [
-                "je vais préparer ton rapport",
-                "je vais préparer le rapport",
-                "je vais rédiger ton rapport",
-                "je vais rédiger le rapport",
-                "je prépare ton rapport",
-                "je prépare le rapport",
-                "je rédige ton rapport",
-                "je rédige le rapport"
-            ]
-
-            # Chercher si une phrase magique est présente
-            matched_pattern = None
-            for pattern in immediate_end_patterns:
-                if pattern in text_lower:
-                    matched_pattern = pattern
-                    break
-
-            # Si phrase magique détectée → FIN IMMÉDIATE, sans condition !
-            if matched_pattern:
-                report_sent = True  # Set immediately to prevent double processing
-                logger.info(f"🏁 IMMEDIATE END - agent said final phrase: '{matched_pattern}' (at question {questions_asked}/{max_questions})")
-
-                # Send ending signal + Generate report + Close session IMMEDIATELY
-                async def immediate_finalization():
-                    try:
-                        # 1. Send ending signal to cut microphone
-                        ending_signal = {"type": "conversation_ending"}
-                        await ctx.room.local_participant.publish_data(
-                            payload=json.dumps(ending_signal).encode('utf-8'),
-                            topic="conversation-ending"
-                        )
-                        logger.info("📡 Sent IMMEDIATE conversation_ending signal")
-
-                        # 2. Generate report immediately
-                        await asyncio.sleep(0.5)
-                        await generate_report()
-
-                        # 3. Close session to stop all processing
-                        await session.aclose()
-                        logger.info("🔚 Session closed immediately after final phrase")
-                    except Exception as e:
-                        logger.error(f"❌ Error in immediate finalization: {e}")
-
-                # Launch immediately and don't process any more messages
-                asyncio.create_task(immediate_finalization())
-                return  # CRITICAL: Stop processing this callback NOW
-
-        # ==================================================================================
-        # Autres chemins de fin (seulement si phrase magique pas détectée)
-        # ==================================================================================
-        if questions_asked >= max_questions:
-
-            # Track exchanges for safety net
-            if event.item.role == "user":
-                exchanges_after_max += 1
-                if recap_done:
-                    user_responded_after_recap = True
-                    logger.info("📝 User responded after recap")
-
-            if event.item.role == "assistant":
-                text_lower = event.item.text_content.lower()
-                logger.info(f"🔍 DEBUG: Checking if should end. Text: '{text_lower[:50]}...'")
-                logger.info(f"🔍 DEBUG: questions_asked={questions_asked}, max_questions={max_questions}")
-
-                # CHEMIN 1 (Idéal): Detect RECAP phase with flexible patterns
-                if not should_end:
-                    recap_patterns = [
-                        "dernière information",
-                        "dernière chose",
-                        "dernière remarque",
-                        "as-tu autre chose",
-                        "autre chose",
-                        "quelque chose à ajouter",
-                        "un dernier mot",
-                        "une dernière précision"
-                    ]
-                    is_recap = any(pattern in text_lower for pattern in recap_patterns)
-
-                    if is_recap and not recap_done:
-                        recap_done = True
-                        logger.info("📝 Recap detected - waiting for user's final input")
-
-                    # CHEMIN 2 (Patterns): After recap + user responded + conclusion patterns
-                    elif user_responded_after_recap:
-                        end_patterns = [
-                            "préparer ton rapport",
-                            "préparer le rapport",
-                            "je vais générer",
-                            "génération du rapport",
-                            "rédiger ton rapport",
-                            "rédiger le rapport",
-                            "je m'y mets",
-                            "je rédige"
-                        ]
-                        if any(pattern in text_lower for pattern in end_patterns):
-                            should_end = True
-                            logger.info("🏁 End detected (Pattern match) - recap + user replied + conclusion")
-
-                        # CHEMIN 3 (Safety net): User responded after recap, agent replied again
-                        # Even if patterns don't match, we should end after this exchange
-                        else:
-                            should_end = True
-                            logger.info("🏁 End detected (Safety net) - user responded after recap + agent replied")
-
-            # CHEMIN 4 (Ultimate safety): Too many exchanges after max
-            if exchanges_after_max >= 6:  # 3 full exchanges (agent+user pairs)
-                should_end = True
-                logger.info("🏁 SAFETY END - too many exchanges after max questions")
-
-        # Generate report
-        if should_end and not report_sent:
-            report_sent = True
-
-            async def finalize():
-                # Wait a bit to ensure immediate signal was sent first
-                await asyncio.sleep(0.5)
-                logger.info("📊 Starting report generation...")
-
-                # Generate report
-                await generate_report()
+                asyncio.create_task(update_instructions(conversation.questions_asked))
 
-                await asyncio.sleep(1)
+        if not outcome.should_end:
+            return
+        metrics.END_DETECTIONS.inc(path=outcome.end_path, mode="voice")
+
+        if outcome.end_path == "immediate":
+            # Send ending signal + Generate report + Close session IMMEDIATELY
+            async def immediate_finalization():
+                try:
+                    # 1. Send ending signal to cut microphone
+                    await send_ending_signal(ctx.room)
+                    logger.info("📡 Sent IMMEDIATE conversation_ending signal")
 
-                # Close session
-                await session.aclose()
-                logger.info("✅ Session closed")
+                    # 2. Generate report immediately
+                    await asyncio.sleep(0.5)
+                    await generate_report()
 
-            asyncio.create_task(finalize())
+                    # 3. Close session to stop all processing
+                    await session.aclose()
+                    logger.info("🔚 Session closed immediately after final phrase")
+                except Exception as e:
+                    logger.error(f"❌ Error in immediate finalization: {e}")
+
+            asyncio.create_task(immediate_finalization())
+            return
+
+        async def finalize():
+            # Wait a bit to ensure immediate signal was sent first
+            await asyncio.sleep(0.5)
+            logger.info("📊 Starting report generation...")
+
+            # Generate report
+            await generate_report()
+
+            await asyncio.sleep(1)
+
+            # Close session
+            await session.aclose()
+            logger.info("✅ Session closed")
+
+        asyncio.create_task(finalize())
 
     # Start session with dynamic instructions
-    initial_instructions = build_simple_instructions(
+    initial_instructions = await offload(
+        "instructions", build_simple_instructions,
+        size=len(products_info or ""), cpu_bound=True,
         user_name=user_name,
         attention_points=attention_points,
-        questions_asked=questions_asked,
+        questions_asked=conversation.questions_asked,
         max_questions=max_questions,
         first_question_in_opening=True,
         report_config=report_config,
@@ -1134,7 +876,7 @@ async def entrypoint(ctx: JobContext):
     # VAD/STT/LLM/TTS are already configured in AgentSession above
     await session.start(
         room=ctx.room,
-        agent=Agent(instructions=initial_instructions),
+        agent=VoyaltisAgent(instructions=initial_instructions, catalog_answers=catalog_answers, fast_path_stats=fast_path_stats, document_index=document_index, tracer=tracer, speculator=speculator, tts_cache=tts_cache, canceller=canceller, project_id=project_id or "default", memory=voice_memory, products_info=products_info, products_summary=products_summary),
     )
     logger.info("✅ Agent started")
 
@@ -1143,13 +885,43 @@ async def entrypoint(ctx: JobContext):
 
     logger.info("🎤 [V2] Simple agent started")
 
-    # Say opening message
-    await session.say(opening_message, allow_interruptions=True)
+    # Say opening message (pre-rendered audio when available, live TTS otherwise; a
+    # rendering failure after this point falls back to live synthesis inside frames())
+    opening_frames = opening_audio.frames() if opening_audio and not opening_audio.failed else None
+    await session.say(opening_message, audio=opening_frames, allow_interruptions=True)
 
     logger.info("✅ [V2] Session running")
 
 
+def publish_shared_catalogs():
+    """
+    Publish hot project catalogs in shared memory before job processes start.
+    VOYALTIS_SHARED_CATALOGS is a comma-separated list of project ids, or "all".
+    """
+    setting = os.getenv("VOYALTIS_SHARED_CATALOGS", "").strip()
+    if not setting:
+        return
+
+    projects_dir = os.path.join("..", "data", "projects")
+    if setting == "all":
+        project_ids = sorted(
+            name for name in os.listdir(projects_dir)
+            if os.path.isdir(os.path.join(projects_dir, name))
+        )
+    else:
+        project_ids = [project_id.strip() for project_id in setting.split(",") if project_id.strip()]
+
+    published = publish_projects(project_ids, projects_dir)
+    logger.info(f"📦 {len(published)} project catalogs shared with job processes")
+
+
 if __name__ == "__main__":
+    configure_logging()
+    publish_shared_catalogs()
+    metrics_port = int(os.getenv("VOYALTIS_METRICS_PORT", "9102"))
+    if metrics_port:
+        # Local by default: the labels carry project ids
+        metrics.start_metrics_server(metrics_port, os.getenv("VOYALTIS_METRICS_HOST", "127.0.0.1"))
     cli.run_app(
         WorkerOptions(
             entrypoint_fnc=entrypoint,
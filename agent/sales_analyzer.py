@@ -7,6 +7,9 @@ import json
 import logging
 from typing import Dict, List, Tuple, Optional
 
+from utils.catalog import ProductCatalog
+from utils.metrics import FUZZY_MATCHES
+
 logger = logging.getLogger(__name__)
 
 
@@ -21,44 +24,44 @@ class SalesAnalyzer:
         Initialize analyzer with products from config loader or direct list
 
         Args:
-            config_loader: ConfigLoader instance (preferred method)
-            products_list: Alternative - direct list of products (for backward compatibility)
+            config_loader: ConfigLoader instance (preferred method, shares its catalog)
+            products_list: Alternative - direct list of products or a ProductCatalog (for backward compatibility)
             brand_mentions: List of brand names to give bonus points (e.g. ["Samsung", "Galaxy"])
             brand_bonus: Bonus points to add when brand name is mentioned
         """
         if config_loader:
-            self.products = config_loader.get_products_for_analyzer()
+            self.catalog = config_loader.catalog
             self.brand_mentions = config_loader.get_brand_mentions()
             self.brand_bonus = config_loader.get_brand_mention_bonus()
-            logger.info(f"Loaded {len(self.products)} products from ConfigLoader")
+            logger.info(f"Loaded {len(self.catalog)} products from ConfigLoader")
         elif products_list:
-            self.products = products_list
+            if isinstance(products_list, ProductCatalog):
+                self.catalog = products_list
+            else:
+                self.catalog = ProductCatalog.from_records(products_list)
             self.brand_mentions = brand_mentions or []
             self.brand_bonus = brand_bonus or 0
-            logger.info(f"Loaded {len(self.products)} products from direct list")
+            logger.info(f"Loaded {len(self.catalog)} products from direct list")
         else:
             raise ValueError("Must provide either config_loader or products_list")
 
-        self.product_names = [p["nom"] for p in self.products]
-        self.product_keywords = self._build_product_keywords()
-
-    def _build_product_keywords(self) -> Dict[str, List[str]]:
-        """
-        Build keyword mapping for fuzzy matching dynamically from products config
-        """
-        keywords_map = {}
-
-        for product in self.products:
-            product_name = product["nom"]
-            keywords = product.get("keywords", [])
+        # Views over the shared catalog - no per-analyzer copies
+        self.products = self.catalog
+        self.product_names = self.catalog.labels
+        self._brand_mentions_lower = [brand.lower() for brand in self.brand_mentions]
 
-            if keywords:
-                keywords_map[product_name] = keywords
-                logger.info(f"Loaded {len(keywords)} keywords for {product_name}")
-            else:
-                logger.warning(f"No keywords defined for {product_name}")
+        without_keywords = sum(1 for keywords in self.catalog.keywords if not keywords)
+        if without_keywords:
+            logger.warning(f"No keywords defined for {without_keywords}/{len(self.catalog)} products")
 
-        return keywords_map
+    @property
+    def product_keywords(self) -> Dict[str, Tuple[str, ...]]:
+        """Keyword mapping {product_name: keywords} for products that define keywords"""
+        return {
+            label: keywords
+            for label, keywords in zip(self.catalog.labels, self.catalog.keywords)
+            if keywords
+        }
 
     def map_sales_data(self, raw_sales: Dict[str, int]) -> Dict[str, int]:
         """
@@ -69,9 +72,10 @@ class SalesAnalyzer:
 
         for raw_name, quantity in raw_sales.items():
             # Try exact match first
-            if raw_name in self.product_names:
+            if self.catalog.has_label(raw_name):
                 mapped_sales[raw_name] = mapped_sales.get(raw_name, 0) + quantity
-                logger.info(f"✓ Direct match: '{raw_name}' ({quantity})")
+                FUZZY_MATCHES.inc(result="direct")
+                logger.info("✓ Direct match: '%s' (%s)", raw_name, quantity, extra={"category": "fuzzy_match"})
                 continue
 
             # Fuzzy matching
@@ -80,11 +84,14 @@ class SalesAnalyzer:
                 product_name, score = best_match
                 if score >= 3:  # Minimum threshold
                     mapped_sales[product_name] = mapped_sales.get(product_name, 0) + quantity
-                    logger.info(f"✓ Fuzzy match: '{raw_name}' ({quantity}) → '{product_name}' (score: {score})")
+                    FUZZY_MATCHES.inc(result="fuzzy")
+                    logger.info("✓ Fuzzy match: '%s' (%s) → '%s' (score: %s)", raw_name, quantity, product_name, score, extra={"category": "fuzzy_match"})
                 else:
-                    logger.warning(f"✗ No good match for: '{raw_name}' (best score: {score})")
+                    FUZZY_MATCHES.inc(result="miss")
+                    logger.warning("✗ No good match for: '%s' (best score: %s)", raw_name, score)
             else:
-                logger.warning(f"✗ No match found for: '{raw_name}'")
+                FUZZY_MATCHES.inc(result="miss")
+                logger.warning("✗ No match found for: '%s'", raw_name)
 
         return mapped_sales
 
@@ -93,46 +100,50 @@ class SalesAnalyzer:
         Find the best matching product using keyword scoring
         Returns (product_name, score) or None
         """
-        best_product = None
+        best_index = None
         best_score = 0.0
 
         raw_lower = raw_name.lower()
+        raw_length = len(raw_lower)
+
+        # Generic brand mentions bonus (configurable) - same for every product
+        brand_score = 0
+        for brand in self._brand_mentions_lower:
+            if brand in raw_lower:
+                brand_score = self.brand_bonus
+                break
+
+        for index, (keywords, name_words) in enumerate(self.catalog.match_index()):
+            # Only products with keywords are candidates
+            if not keywords:
+                continue
 
-        for product_name, keywords in self.product_keywords.items():
             score = 0.0
 
-            for keyword in keywords:
-                keyword_lower = keyword.lower()
-
+            for keyword_lower in keywords:
                 # Exact match with keyword: +20 points
                 if raw_lower == keyword_lower:
                     score += 20
 
                 # Contains the keyword: +10 to +15 points (proportional)
                 elif keyword_lower in raw_lower:
-                    proportion = len(keyword_lower) / len(raw_lower)
+                    proportion = len(keyword_lower) / raw_length
                     score += 10 + (proportion * 5)
 
                 # Keyword contains the raw name (min 3 chars): +6 points
-                elif len(raw_lower) > 3 and raw_lower in keyword_lower:
+                elif raw_length > 3 and raw_lower in keyword_lower:
                     score += 6
 
-            # Generic brand mentions bonus (configurable)
-            for brand in self.brand_mentions:
-                if brand.lower() in raw_lower:
-                    score += self.brand_bonus
-                    break
+            score += brand_score
 
             # Bonus for product name word matches
-            product_name_words = product_name.lower().split()
-            for word in product_name_words:
-                if len(word) > 3 and word in raw_lower:
+            for word in name_words:
+                if word in raw_lower:
                     score += 5
 
             # HUGE bonus for unique category terms (short keywords like "frigo", "télé", etc.)
             # These are typically 3-6 letter words that uniquely identify a category
-            for keyword in keywords:
-                keyword_lower = keyword.lower()
+            for keyword_lower in keywords:
                 if 3 <= len(keyword_lower) <= 6 and keyword_lower in raw_lower:
                     score += 15
                     break
@@ -140,9 +151,9 @@ class SalesAnalyzer:
             # Track best match
             if score > best_score:
                 best_score = score
-                best_product = product_name
+                best_index = index
 
-        return (best_product, best_score) if best_product else None
+        return (self.catalog.labels[best_index], best_score) if best_index is not None else None
 
     def generate_insights(
         self,
@@ -154,14 +165,14 @@ class SalesAnalyzer:
         Generic implementation
         """
         # Calculate metrics
+        catalog = self.catalog
         total_sold = sum(sales.values())
-        total_target = sum(p["objectifs"] for p in self.products)
+        total_target = catalog.total_target()
 
         product_performance = []
-        for product in self.products:
-            name = product["nom"]
+        for i, name in enumerate(catalog.labels):
             sold = sales.get(name, 0)
-            target = product["objectifs"]
+            target = catalog.targets[i]
             performance = (sold / target * 100) if target > 0 else 0
 
             product_performance.append({
@@ -169,7 +180,7 @@ class SalesAnalyzer:
                 "sold": sold,
                 "target": target,
                 "performance": performance,
-                "category": product["catégorie"]
+                "category": catalog.category_of(i)
             })
 
         # Sort by performance
@@ -0,0 +1,30 @@
+"""
+Fakes shared by the test suite (clock, async streams, audio frames)
+"""
+from types import SimpleNamespace
+
+
+class FakeClock:
+    """Clock returning now, moved by the test"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+async def text_stream(*chunks):
+    """Async stream of text chunks, like the text input of a TTS node"""
+    for chunk in chunks:
+        yield chunk
+
+
+async def collect(items):
+    """Everything an async iterator yields"""
+    return [item async for item in items]
+
+
+def fake_frame(pcm, sample_rate, num_channels):
+    """Stand-in for rtc.AudioFrame (make_frame of the TTS cache and the opening audio)"""
+    return SimpleNamespace(data=pcm, sample_rate=sample_rate, num_channels=num_channels)
@@ -0,0 +1,95 @@
+"""
+Test suite for the compact ProductCatalog
+"""
+import sys
+import os
+import json
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sales_analyzer import SalesAnalyzer
+from utils.catalog import ProductCatalog
+from utils.config_loader import ConfigLoader
+
+AGENT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+PROJECT_PRODUCTS = os.path.join(AGENT_DIR, "..", "data", "projects", "perrot", "products.json")
+
+
+def test_catalog_columns_match_raw_products():
+    """Catalog columns and record views reproduce the raw Excel products"""
+    print("\n🧪 Testing ProductCatalog columns...")
+
+    with open(PROJECT_PRODUCTS, 'r', encoding='utf-8') as f:
+        raw_products = json.load(f)
+
+    catalog = ProductCatalog.from_records(raw_products)
+
+    assert len(catalog) == len(raw_products)
+    for i, raw in enumerate(raw_products):
+        assert dict(catalog[i]) == raw, f"Record {i} should match the raw product"
+        assert catalog.labels[i] == raw["Nom d'affichage"]
+        assert catalog.prices[i] == float(raw["Prix (€/unité)"])
+        assert catalog.category_of(i) == raw["Catégorie"]
+
+    # Categories are stored once and referenced by id
+    assert len(catalog.categories) == len({p["Catégorie"] for p in raw_products})
+    print(f"✅ {len(catalog)} products, {len(catalog.categories)} categories")
+
+
+def test_price_detection_skips_wholesale_prices():
+    """Price column uses the unit price, not 'prix de gros' or 'prix au kilo'"""
+    catalog = ProductCatalog.from_records([
+        {"Nom": "A", "Prix de gros": 5, "Prix au kilo": 2, "Prix (€)": "12.5"},
+        {"Nom": "B"},
+    ])
+
+    assert catalog.price_of("A") == 12.5
+    assert catalog.price_of("B") == 0.0
+    assert catalog.price_of("Unknown") == 0.0
+
+
+def test_loader_and_analyzer_share_catalog():
+    """ConfigLoader instances and SalesAnalyzer share one catalog object"""
+    print("\n🧪 Testing catalog sharing...")
+
+    loader_a = ConfigLoader(os.path.join(AGENT_DIR, "config", "products.json"))
+    loader_b = ConfigLoader(os.path.join(AGENT_DIR, "config", "products.json"))
+    analyzer = SalesAnalyzer(config_loader=loader_a)
+
+    assert loader_a.catalog is loader_b.catalog, "Same file should reuse the compiled catalog"
+    assert analyzer.catalog is loader_a.catalog, "SalesAnalyzer should not copy the catalog"
+
+    # Legacy list-of-dicts API still works on the views
+    first = loader_a.products[0]
+    assert loader_a._normalize_product_field(first, "price") == loader_a.catalog.prices[0]
+    assert loader_a.get_products_list_for_prompt() is loader_b.get_products_list_for_prompt()
+
+    mapped = analyzer.map_sales_data({"Samsung Galaxy Z Nova": 2, "frigo": 1})
+    assert mapped["Samsung Galaxy Z Nova"] == 2
+    assert sum(mapped.values()) == 3
+    print("✅ Catalog shared between loaders and analyzer")
+
+
+def test_streaming_ingestion_matches_json_load(tmp_path):
+    """Streamed products are identical to json.load, whatever the chunk boundaries"""
+    print("\n🧪 Testing streaming ingestion...")
+
+    from utils.catalog import iter_json_products
+
+    legacy_file = os.path.join(AGENT_DIR, "config", "products.json")
+    with open(legacy_file, 'r', encoding='utf-8') as f:
+        legacy_products = json.load(f)["products"]
+
+    for chunk_size in (1, 7, 4096):
+        assert list(iter_json_products(legacy_file, chunk_size)) == legacy_products
+        assert list(iter_json_products(PROJECT_PRODUCTS, chunk_size)) == json.load(open(PROJECT_PRODUCTS, encoding='utf-8'))
+
+    # Other keys around "products" are skipped, numbers split across chunks stay intact
+    document = tmp_path / "products.json"
+    document.write_text('{"version": 2, "products": [{"Nom": "A", "Prix": 123456.75}], "meta": {"rows": [1, 2]}}')
+    assert list(iter_json_products(str(document), 3)) == [{"Nom": "A", "Prix": 123456.75}]
+
+    catalog = ProductCatalog.from_file(str(document), chunk_size=3)
+    assert catalog.price_of("A") == 123456.75
+    print("✅ Streaming parser matches json.load")
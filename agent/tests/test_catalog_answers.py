@@ -0,0 +1,88 @@
+"""
+Test suite for the catalog fast path
+"""
+import sys
+import os
+import gc
+import weakref
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.catalog_answers import CatalogAnswerIndex, FastPathStats, fast_path_instructions
+from utils.config_loader import ConfigLoader
+from utils.conversation_state import DEFAULT_ATTENTION_POINTS
+from utils.instructions import build_simple_instructions
+
+AGENT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+PROJECT_PRODUCTS = os.path.join(AGENT_DIR, "..", "data", "projects", "perrot", "products.json")
+
+
+def test_fast_path_answers_catalog_questions():
+    """Price, margin, category and characteristics questions are answered locally"""
+    print("\n🧪 Testing catalog fast path...")
+
+    config = ConfigLoader(PROJECT_PRODUCTS, "non_existent_config.json")
+    index = CatalogAnswerIndex.for_config(config)
+    assert CatalogAnswerIndex.for_config(config) is index, "Index should be shared per catalog"
+
+    answer = index.answer("J'ai vendu 2 acryliques mat. C'est quoi le prix déjà ?")
+    assert answer.intent == "price"
+    assert answer.product == "Acrylique Mat Blanc"
+    assert "68€" in answer.text
+
+    answer = index.answer("Quelle est la marge sur le glycéro brillant ?")
+    assert answer.intent == "margin" and "39%" in answer.text
+
+    answer = index.answer("Le rendement de la Glycero Satin ?")
+    assert answer.intent == "characteristics" and "25m²" in answer.text
+
+    answer = index.answer("C'est dans quelle catégorie l'acrylique satin ?")
+    assert answer.intent == "category" and "Peinture murale" in answer.text
+    print("✅ Catalog questions answered without the LLM")
+
+
+def test_fast_path_leaves_other_turns_to_llm():
+    """Statements, ambiguous products and unknown products fall back to the LLM"""
+    config = ConfigLoader(PROJECT_PRODUCTS, "non_existent_config.json")
+    index = CatalogAnswerIndex.for_config(config)
+    stats = FastPathStats()
+
+    assert index.timed_answer("J'ai vendu 3 acryliques mat aujourd'hui", stats) is None
+    assert index.timed_answer("C'est quoi le prix de l'acrylique ?", stats) is None  # 3 acryliques
+    assert index.timed_answer("Combien coûte le Galaxy Z Nova ?", stats) is None
+    assert index.timed_answer("Combien coûte la glycéro satin ?", stats) is not None
+
+    assert stats.lookups == 4 and stats.hits == 1
+    stats.record_llm_call(1.5, fast_path=False)
+    stats.record_llm_call(0.5, fast_path=True, prompt_chars_saved=4000)
+    assert stats.summary()["latency_saved_s"] == 1.0
+    assert stats.summary()["prompt_chars_saved"] == 4000
+
+
+def test_voice_fast_path_instructions_use_the_catalog_summary():
+    """A voice fast path turn gets the one-line-per-product summary instead of the full catalog"""
+    config = ConfigLoader(PROJECT_PRODUCTS, "non_existent_config.json")
+    products_info = config.get_products_list_for_prompt()
+    products_summary = config.get_products_summary_for_prompt()
+    instructions = build_simple_instructions("Thomas", list(DEFAULT_ATTENTION_POINTS), 0, 3, products_info=products_info)
+
+    fast = fast_path_instructions(instructions, products_info, products_summary)
+    assert fast is not None and len(fast) < len(instructions)
+    assert products_summary in fast and products_info not in fast
+    assert fast.replace(products_summary, "") == instructions.replace(products_info, "")
+    # Already the summary (large catalogs with a document index), or no catalog: unchanged
+    assert fast_path_instructions(instructions, products_summary, products_summary) is None
+    assert fast_path_instructions(instructions, None, products_summary) is None
+
+
+def test_index_does_not_keep_its_catalog_alive():
+    """The shared index is released with its catalog (weak key, weak back reference)"""
+    config = ConfigLoader(PROJECT_PRODUCTS, "non_existent_config.json")
+    index = CatalogAnswerIndex.for_config(config)
+    assert index.catalog is config.catalog
+    catalog_ref, index_ref = weakref.ref(config.catalog), weakref.ref(index)
+
+    del config, index
+    gc.collect()
+    assert catalog_ref() is None and index_ref() is None
@@ -0,0 +1,102 @@
+"""
+Test suite for the rolling conversation memory (summary + recent turns under a token budget)
+"""
+import sys
+import os
+import asyncio
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.conversation_memory import ConversationMemory, extractive_summary, message_tokens
+
+BUDGET = 500
+PRODUCTS = ["cuiseurs", "robots", "blenders", "poêles", "casseroles", "couteaux"]
+
+
+def _turn(i):
+    product = PRODUCTS[i % len(PRODUCTS)]
+    return [
+        {"role": "assistant", "content": f"D'accord, et côté {product}, combien en as-tu vendu cette semaine et à quel prix moyen ?"},
+        {"role": "user", "content": f"J'ai vendu {i + 10} {product} à {i * 7 + 49} euros en moyenne, surtout le samedi, "
+                                    f"les clients demandaient beaucoup la garantie et les délais de livraison du magasin numéro {i}."},
+    ]
+
+
+def _session(turns, summarizer=None, settle=True):
+    """Prompt tokens sent to the LLM at each user turn, full history tokens, memory"""
+    async def scenario():
+        memory = ConversationMemory(BUDGET, keep_recent=4, summarizer=summarizer)
+        messages, prompt_tokens, full_tokens = [], [], []
+        for i in range(turns):
+            messages.extend(_turn(i))
+            memory.update(messages)
+            prompt_tokens.append(message_tokens(memory.prompt_messages(messages)))
+            full_tokens.append(message_tokens(messages))
+            if settle:
+                await memory.wait()
+        await memory.close()
+        return prompt_tokens, full_tokens, memory
+
+    return asyncio.run(scenario())
+
+
+def test_prompt_size_stays_flat_over_long_sessions():
+    prompt_tokens, full_tokens, memory = _session(35)
+    assert full_tokens[-1] > 4 * BUDGET
+    assert max(prompt_tokens) <= BUDGET + 30
+    # Flat once the budget is reached: no growth between turn 10 and turn 35
+    assert max(prompt_tokens[10:]) - min(prompt_tokens[10:]) < BUDGET * 0.3
+    assert memory.stats["compactions"] > 1 and memory.compacted > 0
+
+
+def test_recent_turns_verbatim_and_facts_summarized():
+    async def scenario():
+        memory = ConversationMemory(BUDGET, keep_recent=4)
+        messages = []
+        for i in range(12):
+            messages.extend(_turn(i))
+            memory.update(messages)
+            await memory.wait()
+        return memory.prompt_messages(messages), messages
+
+    prompt, messages = asyncio.run(scenario())
+    assert prompt[0]["role"] == "system" and "faits déjà recueillis" in prompt[0]["content"]
+    assert prompt[-4:] == messages[-4:]
+    assert "J'ai vendu 10 cuiseurs à 49 euros" in prompt[0]["content"]
+
+
+def test_budget_holds_while_compaction_is_pending():
+    """A slow summarizer never lets the prompt exceed the budget"""
+    async def slow_summarizer(previous, messages, max_tokens):
+        await asyncio.sleep(10)
+        return previous
+
+    prompt_tokens, _, memory = _session(30, summarizer=slow_summarizer, settle=False)
+    assert max(prompt_tokens) <= BUDGET + 30
+    assert memory.stats["compactions"] == 0
+
+
+def test_llm_summary_used_and_failures_fall_back():
+    calls = []
+
+    async def summarizer(previous, messages, max_tokens):
+        calls.append(len(messages))
+        return "- Faits résumés " * 1000  # Too long: cut to the summary share
+
+    _, _, memory = _session(20, summarizer=summarizer)
+    assert calls and memory.summary.startswith("- Faits résumés")
+    assert message_tokens([{"content": memory.summary}]) <= memory.summary_tokens + 4
+
+    async def failing(previous, messages, max_tokens):
+        raise RuntimeError("LLM unavailable")
+
+    _, _, memory = _session(20, summarizer=failing)
+    assert memory.stats["failures"] >= 1 and "J'ai vendu" in memory.summary
+
+
+def test_extractive_summary_is_bounded():
+    messages = [m for i in range(40) for m in _turn(i)]
+    summary = extractive_summary("", messages, 200)
+    assert len(summary) <= 800
+    assert "49 euros" not in summary and "J'ai vendu 49" in summary  # Oldest answers dropped first
@@ -0,0 +1,158 @@
+"""
+Test suite for the conversation state machine, report generation and replay harness
+"""
+import sys
+import os
+import asyncio
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.replay import FakeLLM, FakeRoom, ProjectSession, replay_session, synthetic_transcript
+from utils.conversation_state import ConversationState, question_budget, report_period
+from utils.report import calculate_sales_amounts, generate_report, parse_report_json
+
+
+def _voice(state, *messages):
+    outcomes = []
+    for role, content in messages:
+        outcomes.append(state.on_voice_item(role, content))
+    return outcomes
+
+
+def test_question_budget_and_period():
+    """Attention points + at least 2 follow-ups; report period from the schedule"""
+    assert question_budget([{}] * 3) == (3, 2, 5)
+    assert question_budget([{}] * 6) == (6, 3, 9)
+    assert report_period(None) == ("aujourd'hui", "daily")
+    assert report_period({"settings": {"reportFrequency": "weekly"}}) == ("cette semaine", "weekly")
+    assert report_period({"settings": {"reportScheduleType": "per-appointment"}}) == ("lors de cette visite", "per-appointment")
+
+
+def test_voice_counting_skips_opening_and_user_questions():
+    """Opening and answers to a user question are not counted"""
+    state = ConversationState(max_questions=5)
+    outcomes = _voice(
+        state,
+        ("assistant", "Salut Thomas ! Qu'as-tu vendu aujourd'hui ?"),
+        ("user", "Trois pots de blanc."),
+        ("assistant", "Super, et les retours ?"),
+        ("user", "C'est quoi le prix du blanc ?"),
+        ("assistant", "Il est à 42€."),
+    )
+    assert [o.counted for o in outcomes] == [False, False, True, False, False]
+    assert outcomes[-1].answered_user_question
+    assert state.questions_asked == 1
+    assert len(state.messages) == 5
+
+
+def test_voice_end_paths():
+    """Recap then user reply then conclusion: pattern; anything else: safety net"""
+    state = ConversationState(max_questions=1)
+    outcomes = _voice(
+        state,
+        ("assistant", "Salut ! Qu'as-tu vendu ?"),
+        ("user", "Deux pots."),
+        ("assistant", "Merci ! As-tu autre chose à ajouter ?"),
+        ("user", "Non."),
+        ("assistant", "Top, je m'y mets."),
+    )
+    assert state.recap_done and state.user_responded_after_recap
+    assert outcomes[-1].end_path == "pattern"
+    assert state.report_sent
+
+    state = ConversationState(max_questions=1)
+    outcomes = _voice(
+        state,
+        ("assistant", "Salut ! Qu'as-tu vendu ?"),
+        ("user", "Deux pots."),
+        ("assistant", "Dernière chose : un souci ?"),
+        ("user", "Non."),
+        ("assistant", "Merci et bonne soirée."),
+    )
+    assert outcomes[-1].end_path == "safety_net"
+    # Once the report is sent, no other end is reported
+    assert not state.on_voice_item("assistant", "Autre chose ?").should_end
+
+
+def test_immediate_and_ultimate_ends():
+    """The final phrase ends at any time; 6 user messages after max end the session"""
+    state = ConversationState(max_questions=10)
+    state.on_voice_item("assistant", "Salut !")
+    outcome = state.on_voice_item("assistant", "OK, je vais préparer ton rapport.")
+    assert outcome.end_path == "immediate"
+    assert outcome.matched_pattern == "je vais préparer ton rapport"
+
+    state = ConversationState(max_questions=1)
+    _voice(state, ("assistant", "Salut !"), ("user", "Salut."), ("assistant", "Tu as vendu quoi ?"))
+    outcomes = []
+    for _ in range(6):
+        outcomes += _voice(state, ("user", "Des pots."), ("assistant", "Ah bon."))
+    ends = [o.end_path for o in outcomes if o.should_end]
+    assert ends == ["ultimate"]
+
+
+def test_text_mode_counts_and_ends():
+    """Text replies count per exchange and track the user side of the exchange"""
+    state = ConversationState(max_questions=2)
+    state.add_message("assistant", "Salut ! Qu'as-tu vendu ?")
+    state.add_message("user", "Deux pots.")
+    assert state.on_text_reply("Deux pots.", "Et les retours clients ?").counted
+    state.add_message("user", "Bons.")
+    assert state.on_text_reply("Bons.", "As-tu autre chose à ajouter ?").counted
+    assert state.recap_done
+    state.add_message("user", "Non.")
+    outcome = state.on_text_reply("Non.", "Merci, je vais générer la synthèse.")
+    assert outcome.end_path == "pattern"
+    assert state.exchanges_after_max == 2
+
+
+def test_report_parsing_and_amounts():
+    """Code fences removed; amounts from the catalog price column"""
+    assert parse_report_json('```json\n{"sales": {}}\n```') == {"sales": {}}
+    assert parse_report_json('{"a": 1}') == {"a": 1}
+
+    class Catalog:
+        def price_of(self, name):
+            return {"Blanc": 10.0}.get(name, 0.0)
+
+    amounts, total = calculate_sales_amounts({"Blanc": 3, "Inconnu": 2, "Vide": 0}, Catalog())
+    assert amounts == {"Blanc": 30.0, "Inconnu": 0.0}
+    assert total == 30.0
+
+
+def test_generate_report_publishes_to_room():
+    """The report goes through the injected completion and is published to the room"""
+    project = ProjectSession.load("perrot")
+    label = project.config_loader.catalog.labels[0]
+    room = FakeRoom()
+    llm = FakeLLM([], {label: 2})
+    messages = [{"role": "assistant", "content": "Salut"}, {"role": "user", "content": f"2 {label}"}]
+
+    report = asyncio.run(generate_report(
+        room, messages, project.attention_points, project.config_loader,
+        project.prompt_builder, project.sales_analyzer, complete=llm.complete, project_id="perrot",
+    ))
+    assert report["sales"].get(label) == 2
+    assert report["total_amount"] == round(2 * project.config_loader.catalog.price_of(label), 2)
+    assert room.topics() == ["conversation-complete"]
+
+    failed = asyncio.run(generate_report(
+        room, messages, project.attention_points, project.config_loader,
+        project.prompt_builder, project.sales_analyzer, complete=lambda prompt: asyncio.sleep(0, "pas du json"),
+    ))
+    assert failed is None
+
+
+def test_replay_synthetic_session():
+    """A synthetic transcript ends the conversation and produces a report, in both modes"""
+    project = ProjectSession.load("perrot")
+    transcript = synthetic_transcript(project, seed=1)
+    _, _, max_questions = question_budget(project.attention_points)
+    for mode in ("voice", "text"):
+        result = asyncio.run(replay_session(project, transcript, mode))
+        assert result.end_path == "immediate"
+        # The recap is the last counted question, the final phrase counts too
+        assert result.questions_asked == max_questions + 1
+        assert result.report_ok
+        assert len(result.turn_overheads) == result.turns
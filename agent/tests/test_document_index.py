@@ -0,0 +1,79 @@
+"""
+Test suite for the project document index
+"""
+import sys
+import os
+import asyncio
+import shutil
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils import project_loader
+from utils.document_index import DocumentIndex, extract_passages
+
+AGENT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+PERROT_DIR = os.path.join(AGENT_DIR, "..", "data", "projects", "perrot")
+
+
+def _copy_project(tmp_path):
+    project_dir = tmp_path / "perrot"
+    shutil.copytree(PERROT_DIR, project_dir, ignore=shutil.ignore_patterns("index", "reports"))
+    return str(project_dir)
+
+
+def test_xlsx_rows_become_passages():
+    """Each spreadsheet row is a "Header: value" passage"""
+    documents_dir = os.path.join(PERROT_DIR, "documents")
+    xlsx = [name for name in os.listdir(documents_dir) if name.endswith(".xlsx")][0]
+    passages = extract_passages(os.path.join(documents_dir, xlsx))
+
+    assert len(passages) == 12
+    assert passages[0].source == "Peintur_Produit.xlsx › Sheet1"
+    assert "Nom d'affichage: Acrylique Mat Blanc" in passages[0].text
+    assert "Prix (€/unité): 68" in passages[0].text
+
+
+def test_index_is_persisted_and_queried(tmp_path):
+    """Top passage matches the turn; the index is saved, reused, and rebuilt when documents change"""
+    project_dir = _copy_project(tmp_path)
+    with open(os.path.join(project_dir, "documents", "conseils.txt"), "w", encoding="utf-8") as f:
+        f.write("Conseil pose : appliquer la façade siloxane sur support sec, deux couches croisées.\n")
+
+    index = DocumentIndex.for_project(project_dir)
+    assert os.path.exists(DocumentIndex.index_path(project_dir))
+    assert DocumentIndex.for_project(project_dir) is index
+
+    results = index.search("rendement de la glycéro satin", k=2)
+    assert results[0].source == "Catalogue › Glycéro Satin Blanc"
+    assert index.search("combien de couches pour la siloxane")[0].source == "conseils.txt"
+    assert index.context_snippet("zzz inconnu") is None
+
+    # Spreadsheet rows duplicating catalog products are not indexed twice
+    assert not any(p.source.startswith("Peintur_Produit") for p in index.passages)
+
+    with open(os.path.join(project_dir, "documents", "conseils.txt"), "a", encoding="utf-8") as f:
+        f.write("\nNettoyage des outils à l'eau pour les acryliques.\n")
+    rebuilt = DocumentIndex.for_project(project_dir)
+    assert rebuilt is not index
+    assert "Nettoyage" in rebuilt.search("nettoyage outils")[0].text
+
+
+def test_sessions_never_build_the_index_inline(tmp_path, monkeypatch):
+    """A missing index is not built by the session load: it is rebuilt in the background"""
+
+    project_dir = _copy_project(tmp_path)
+    monkeypatch.setattr(project_loader, "PROJECTS_DIR", str(tmp_path))
+    assert DocumentIndex.for_project(project_dir, build=False) is None
+    assert not os.path.exists(DocumentIndex.index_path(project_dir))
+
+    async def first_then_next_session():
+        assert project_loader.load_project_documents("perrot") is None
+        build = project_loader._index_builds["perrot"]
+        assert project_loader.schedule_index_build("perrot") is build  # One build per project
+        await build
+        return project_loader.load_project_documents("perrot")
+
+    index = asyncio.run(first_then_next_session())
+    assert index is not None and len(index)
+    assert "perrot" not in project_loader._index_builds
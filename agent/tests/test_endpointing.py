@@ -0,0 +1,115 @@
+"""
+Test suite for adaptive end-of-turn detection (completeness heuristic, learned pauses, commits)
+"""
+import sys
+import os
+import asyncio
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tests.helpers import FakeClock
+from utils.endpointing import AdaptiveEndpointer, PauseStats, completeness
+
+
+def test_completeness_finished_sentences():
+    """Punctuated sentences and closed answers end the turn quickly"""
+    assert completeness("Oui.") >= 0.9
+    assert completeness("Non merci") >= 0.9
+    assert completeness("Tu as des nouveautés ?") >= 0.9
+    assert completeness("Les clients aiment beaucoup la qualité.") >= 0.8
+    assert completeness("Il y en a.") >= 0.8
+
+
+def test_completeness_unfinished_sentences():
+    """Connectors, hesitations, commas and quantities mean the rep is still talking"""
+    assert completeness("") == 0.0
+    assert completeness("J'ai vendu trois pots de blanc et") < 0.2
+    assert completeness("Alors euh") < 0.2
+    assert completeness("Euh...") < 0.2
+    assert completeness("Trois pots de blanc,") < 0.2
+    assert completeness("Trois pots de blanc, deux") < 0.3
+    assert completeness("J'ai vendu 12") < 0.3
+    # A period right after a connector is the STT closing on a pause
+    assert completeness("J'ai vendu du satin et.") < 0.5
+
+
+def test_delay_follows_completeness_and_learned_pauses():
+    """Finished sentences wait min_delay; unfinished ones wait for the rep's long pauses"""
+    endpointer = AdaptiveEndpointer(commit=lambda: None, min_delay=0.2, unfinished_delay=1.5, max_delay=3.0)
+    finished = endpointer.delay_for("Les clients aiment beaucoup la qualité.")
+    unfinished = endpointer.delay_for("J'ai vendu trois pots de blanc et")
+    assert finished < 0.5 < 1.0 < unfinished <= 1.5
+
+    for pause in (0.8, 1.2, 2.0, 2.2, 2.4):
+        endpointer.pauses.observe(pause)
+    assert endpointer.delay_for("J'ai vendu trois pots de blanc et") > unfinished
+    assert endpointer.delay_for("Les clients aiment beaucoup la qualité.") < 1.0
+    assert endpointer.delay_for("Euh...") <= 3.0
+
+
+def test_pause_stats_window():
+    stats = PauseStats(window=3)
+    assert stats.quantile(0.9) is None
+    for pause in (5.0, 1.0, 2.0, 3.0):
+        stats.observe(pause)
+    assert stats.quantile(0.9) == 3.0
+    assert stats.quantile(0.0) == 1.0
+
+
+def test_commit_after_finished_turn():
+    """A finished sentence is committed right after the end of speech"""
+    async def scenario():
+        commits = []
+        endpointer = AdaptiveEndpointer(commit=lambda: commits.append(True), min_delay=0.01, unfinished_delay=1.0)
+        endpointer.on_speech_start()
+        endpointer.on_speech_end()
+        endpointer.on_transcript("Non, c'est tout pour aujourd'hui.")
+        await asyncio.sleep(0.3)
+        return commits, endpointer.turn_text
+
+    assert asyncio.run(scenario()) == ([True], "")
+
+
+def test_pause_mid_thought_is_not_a_turn():
+    """Speech resuming before the commit cancels it and is learned as a pause"""
+    async def scenario():
+        commits = []
+        endpointer = AdaptiveEndpointer(commit=lambda: commits.append(True), min_delay=0.01, unfinished_delay=0.2)
+        endpointer.on_speech_start()
+        endpointer.on_speech_end()
+        endpointer.on_transcript("J'ai vendu trois pots de blanc et")
+        await asyncio.sleep(0.05)
+        assert not commits
+        endpointer.on_speech_start()
+        assert len(endpointer.pauses.pauses) == 1
+        await asyncio.sleep(0.3)
+        assert not commits
+        endpointer.on_speech_end()
+        endpointer.on_transcript("deux rouleaux.")
+        await asyncio.sleep(0.15)
+        return commits, endpointer.early_commits
+
+    assert asyncio.run(scenario()) == ([True], 0)
+
+
+def test_early_commit_raises_delay():
+    """Speaking again right after a commit makes the next turns wait longer"""
+    async def scenario():
+        clock = FakeClock()
+        endpointer = AdaptiveEndpointer(commit=lambda: None, clock=clock)
+        before = endpointer.delay_for("Oui.")
+        endpointer._committed_at = clock.now
+        clock.now += 0.5
+        endpointer.on_speech_start()
+        assert endpointer.early_commits == 1
+        assert endpointer.delay_for("Oui.") > before
+        # Long after a commit, speech is a new turn
+        endpointer.on_speech_end()
+        endpointer.cancel()
+        endpointer._committed_at = clock.now
+        clock.now += 5
+        endpointer.on_speech_start()
+        return endpointer.early_commits
+
+    assert asyncio.run(scenario()) == 1
@@ -0,0 +1,119 @@
+"""
+Test suite for the data channel inbox (ordering, burst coalescing, bound)
+"""
+import sys
+import os
+import asyncio
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.inbox import SessionInbox
+
+
+def _text(text, mode="text"):
+    return {"type": "user_text_message", "text": text, "mode": mode}
+
+
+class Recorder:
+    """Handler that takes delay seconds per entry and checks it is never run concurrently"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.handled = []
+        self.running = 0
+        self.max_running = 0
+
+    async def handle(self, entry):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(self.delay)
+        self.handled.append(entry.text if entry.is_text else entry.message["type"])
+        self.running -= 1
+
+
+def test_messages_processed_in_order_one_at_a_time():
+    async def scenario():
+        recorder = Recorder(delay=0.01)
+        inbox = SessionInbox(recorder.handle, coalesce_window=0).start()
+        for message in (_text("un"), {"type": "switch_to_voice"}, _text("deux"), _text("trois")):
+            inbox.offer(message)
+        await asyncio.sleep(0.1)
+        await inbox.close()
+        return recorder, inbox
+
+    recorder, inbox = asyncio.run(scenario())
+    assert recorder.handled == ["un", "switch_to_voice", "deux", "trois"]
+    assert recorder.max_running == 1
+    assert inbox.stats["processed"] == 4 and inbox.stats["coalesced"] == 0
+
+
+def test_burst_is_one_turn():
+    """Messages typed within the window become one user turn, a later one is separate"""
+    async def scenario():
+        recorder = Recorder()
+        inbox = SessionInbox(recorder.handle, coalesce_window=0.05).start()
+        inbox.offer(_text("J'ai vendu 3 cuiseurs"))
+        await asyncio.sleep(0.02)
+        inbox.offer(_text("et 2 robots"))
+        await asyncio.sleep(0.15)
+        inbox.offer(_text("Voilà"))
+        await asyncio.sleep(0.1)
+        await inbox.close()
+        return recorder, inbox
+
+    recorder, inbox = asyncio.run(scenario())
+    assert recorder.handled == ["J'ai vendu 3 cuiseurs\net 2 robots", "Voilà"]
+    assert inbox.stats["coalesced"] == 1 and inbox.stats["processed"] == 2
+
+
+def test_burst_stops_at_other_message():
+    """A mode switch between typed messages is not reordered by coalescing"""
+    async def scenario():
+        recorder = Recorder()
+        inbox = SessionInbox(recorder.handle, coalesce_window=0.05).start()
+        for message in (_text("un"), {"type": "switch_to_voice"}, _text("deux")):
+            inbox.offer(message)
+        await asyncio.sleep(0.15)
+        await inbox.close()
+        return recorder
+
+    assert asyncio.run(scenario()).handled == ["un", "switch_to_voice", "deux"]
+
+
+def test_full_inbox_merges_text_and_drops_the_rest():
+    async def scenario():
+        recorder = Recorder(delay=0.05)
+        inbox = SessionInbox(recorder.handle, max_size=2, coalesce_window=0).start()
+        inbox.offer(_text("en cours"))
+        await asyncio.sleep(0.01)  # Being handled: the queue is empty again
+        assert inbox.offer(_text("un")) and inbox.offer(_text("deux"))
+        assert inbox.offer(_text("trois"))  # Merged into "deux"
+        assert not inbox.offer({"type": "switch_to_voice"})
+        assert len(inbox) == 2
+        await asyncio.sleep(0.3)
+        await inbox.close()
+        return recorder, inbox
+
+    recorder, inbox = asyncio.run(scenario())
+    assert recorder.handled == ["en cours", "un", "deux\ntrois"]
+    assert inbox.stats["dropped"] == 1 and inbox.stats["max_depth"] == 2
+
+
+def test_handler_error_does_not_stop_the_consumer():
+    async def scenario():
+        handled = []
+
+        async def handle(entry):
+            if entry.text == "boom":
+                raise ValueError("boom")
+            handled.append(entry.text)
+
+        inbox = SessionInbox(handle, coalesce_window=0).start()
+        inbox.offer(_text("boom"))
+        inbox.offer(_text("ok"))
+        await asyncio.sleep(0.05)
+        await inbox.close()
+        return handled
+
+    assert asyncio.run(scenario()) == ["ok"]
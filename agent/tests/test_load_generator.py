@@ -0,0 +1,42 @@
+"""
+Test suite for the load generator (in-process target and level summaries)
+"""
+import sys
+import os
+import asyncio
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.load_generator import RepResult, run_fake_rep, summarize, user_messages
+from benchmarks.replay import ProjectSession
+
+
+def test_fake_reps_run_concurrently():
+    """N in-process sessions overlap on one loop: the level takes about one session"""
+    project = ProjectSession.load("perrot")
+
+    async def level(concurrency):
+        return await asyncio.gather(*(run_fake_rep(project, i, 0.01, 0.01) for i in range(concurrency)))
+
+    results = asyncio.run(level(8))
+    assert all(r.completed and not r.error for r in results)
+    assert all(len(r.turn_seconds) == len(user_messages(project, i)) for i, r in enumerate(results))
+    assert max(r.session_seconds for r in results) < 8 * min(r.session_seconds for r in results)
+
+
+def test_summarize_level():
+    """Throughput and percentiles over all sessions of a level, errors grouped"""
+    results = [
+        RepResult(completed=True, turn_seconds=[0.1, 0.2], report_seconds=1.0),
+        RepResult(completed=True, turn_seconds=[0.3], report_seconds=2.0),
+        RepResult(error="timeout"),
+    ]
+    level = summarize(3, results, wall=2.0, max_loop_lag=0.012)
+    assert level["completed"] == 2
+    assert level["sessions_per_second"] == 1.0
+    assert level["turns_per_second"] == 1.5
+    assert level["turn_latency"]["p50_ms"] == 200.0
+    assert level["report_latency"]["count"] == 2
+    assert level["errors"] == {"timeout": 1}
+    assert level["max_loop_lag_ms"] == 12.0
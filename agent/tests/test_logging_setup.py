@@ -0,0 +1,102 @@
+"""
+Test suite for the logging pipeline
+"""
+import sys
+import os
+import io
+import json
+import logging
+import threading
+from queue import SimpleQueue
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from logging.handlers import QueueListener
+
+from utils.logging_setup import (
+    ContextFilter, DeferredQueueHandler, JsonFormatter, LazyJson, SamplingFilter, set_log_context,
+)
+
+
+class _RecordingJson:
+    """Records which thread renders it"""
+    def __init__(self):
+        self.rendered_on = None
+
+    def __str__(self):
+        self.rendered_on = threading.current_thread().name
+        return "{}"
+
+
+def _pipeline(rates=None):
+    stream = io.StringIO()
+    sink = logging.StreamHandler(stream)
+    sink.setFormatter(JsonFormatter())
+    queue = SimpleQueue()
+    handler = DeferredQueueHandler(queue)
+    handler.addFilter(SamplingFilter(rates or {}))
+    handler.addFilter(ContextFilter())
+    logger = logging.getLogger(f"voyaltis.test.{id(stream)}")
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    listener = QueueListener(queue, sink)
+    listener.start()
+    return logger, listener, stream
+
+
+def _lines(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_json_records_are_formatted_off_the_calling_thread():
+    """Messages are rendered by the listener thread, with session fields and extras"""
+    logger, listener, stream = _pipeline()
+    payload = _RecordingJson()
+    set_log_context(session="room-1", project="perrot")
+    logger.info("📊 Questions: %d/%d %s", 2, 5, payload, extra={"category": "questions"})
+    listener.stop()
+
+    assert payload.rendered_on != threading.current_thread().name
+    record = _lines(stream)[0]
+    assert record["message"] == "📊 Questions: 2/5 {}"
+    assert record["level"] == "INFO"
+    assert record["category"] == "questions"
+    assert record["session"] == "room-1" and record["project"] == "perrot"
+
+
+def test_sampling_and_lazy_json():
+    """Sampled categories keep 1/N records below WARNING; disabled levels never render"""
+    logger, listener, stream = _pipeline({"vad": 0.25, "noisy": 0})
+    for i in range(8):
+        logger.info("vad %d", i, extra={"category": "vad"})
+    logger.info("dropped", extra={"category": "noisy"})
+    logger.warning("kept", extra={"category": "noisy"})
+    logger.info("other")
+
+    never_rendered = _RecordingJson()
+    logger.debug("%s", never_rendered)
+    listener.stop()
+
+    messages = [record["message"] for record in _lines(stream)]
+    assert messages == ["vad 0", "vad 4", "kept", "other"]
+    assert never_rendered.rendered_on is None
+    assert str(LazyJson({"prix": 35}, indent=None)) == '{"prix": 35}'
+
+
+def test_mutable_arguments_are_snapshotted_when_queued():
+    """Session state changed after the log call does not leak into the queued message"""
+    handler = DeferredQueueHandler(SimpleQueue())
+    state = {"questions": 2}
+    sales = ["cuiseur"]
+    record = logging.LogRecord("voyaltis", logging.INFO, __file__, 1, "state %s sales %s json %s", (state, sales, LazyJson(state, indent=None)), None)
+    handler.prepare(record)
+    state["questions"] = 3
+    sales.append("robot")
+    assert record.getMessage() == "state {'questions': 2} sales ['cuiseur'] json {\"questions\": 2}"
+
+    payload = _RecordingJson()
+    record = logging.LogRecord("voyaltis", logging.INFO, __file__, 1, "%s", (payload,), None)
+    handler.prepare(record)
+    assert payload.rendered_on is None  # Other arguments are still rendered by the listener
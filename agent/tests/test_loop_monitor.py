@@ -0,0 +1,36 @@
+"""
+Test suite for the event loop lag monitor
+"""
+import sys
+import os
+import asyncio
+import time
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.loop_monitor import LoopMonitor
+
+
+def render_catalog_synchronously():
+    time.sleep(0.3)  # Stands for a slow synchronous callback
+
+
+def test_blocking_callback_is_reported_by_name():
+    """A callback blocking the loop over the threshold is captured and named"""
+    async def scenario():
+        monitor = LoopMonitor(asyncio.get_running_loop(), interval=0.02, threshold=0.05)
+        monitor.start()
+        await asyncio.sleep(0.1)
+        asyncio.get_running_loop().call_soon(render_catalog_synchronously)
+        await asyncio.sleep(0.2)
+        monitor.stop()
+        return monitor
+
+    monitor = asyncio.run(scenario())
+    report = monitor.report()
+    assert report, "Blocking episode should be recorded"
+    assert report[0]["function"].startswith("render_catalog_synchronously (tests/test_loop_monitor.py")
+    assert report[0]["max_ms"] >= 250
+    assert any("render_catalog_synchronously" in line for line in report[0]["stack"])
+    assert monitor.max_lag >= 0.25
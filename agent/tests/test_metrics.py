@@ -0,0 +1,97 @@
+"""
+Test suite for the metrics registry and multi-process aggregation
+"""
+import sys
+import os
+import json
+import subprocess
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils import metrics
+from utils.metrics import MetricsRegistry
+
+
+def test_prometheus_text_format():
+    """Counters, gauges and cumulative histogram buckets"""
+    registry = MetricsRegistry()
+    ends = registry.counter("test_end_total", "Ends", ("path",))
+    active = registry.gauge("test_active", "Active")
+    latency = registry.histogram("test_latency_seconds", "Latency", buckets=(0.1, 1.0))
+
+    ends.inc(path="immediate")
+    ends.inc(2, path="pattern")
+    active.inc()
+    active.inc()
+    active.dec()
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(3)
+
+    text = registry.render()
+    assert '# TYPE test_end_total counter' in text
+    assert 'test_end_total{path="pattern"} 2' in text
+    assert 'test_active 1' in text
+    assert 'test_latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{le="1"} 2' in text
+    assert 'test_latency_seconds_bucket{le="+Inf"} 3' in text
+    assert 'test_latency_seconds_count 3' in text
+    assert 'test_latency_seconds_sum 3.55' in text
+
+
+def test_snapshots_from_job_processes_are_merged(tmp_path, monkeypatch):
+    """Counters add up across processes; gauges of exited processes are dropped"""
+    monkeypatch.setattr(metrics, "METRICS_DIR", str(tmp_path))
+    script = (
+        "import sys; sys.path.insert(0, '.'); from utils import metrics; "
+        f"metrics.METRICS_DIR = {str(tmp_path)!r}; "
+        "metrics.ACTIVE_SESSIONS.inc(); metrics.FUZZY_MATCHES.inc(result='fuzzy'); "
+        "metrics.REPORT_LATENCY.observe(1.2, project='perrot'); metrics.write_snapshot()"
+    )
+    agent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", script], cwd=agent_dir, check=True)
+
+    snapshots = metrics.read_snapshots()
+    assert len(snapshots) == 1  # Both processes exited: folded into the aggregate
+    text = metrics.render_snapshots(snapshots)
+    assert 'voyaltis_fuzzy_match_total{result="fuzzy"} 2' in text
+    assert 'voyaltis_report_generation_seconds_count{project="perrot"} 2' in text
+    assert "voyaltis_active_sessions " not in text  # Both processes exited
+
+    with open(tmp_path / "metrics-1.json", "w") as f:  # pid 1 is always alive
+        json.dump({"pid": 1, "metrics": {"voyaltis_active_sessions": {
+            "type": "gauge", "help": "", "labelnames": [], "buckets": [], "samples": [[[], 3]],
+        }}}, f)
+    assert "voyaltis_active_sessions 3" in metrics.render_snapshots(metrics.read_snapshots())
+
+
+def test_exited_snapshots_are_folded_into_one_file(tmp_path, monkeypatch):
+    """Files of exited processes are removed once their totals are in the aggregate"""
+    monkeypatch.setattr(metrics, "METRICS_DIR", str(tmp_path))
+    script = (
+        "import sys; sys.path.insert(0, '.'); from utils import metrics; "
+        f"metrics.METRICS_DIR = {str(tmp_path)!r}; "
+        "metrics.FUZZY_MATCHES.inc(result='miss'); metrics.write_snapshot()"
+    )
+    agent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+    def run_sessions(count):
+        for _ in range(count):
+            subprocess.run([sys.executable, "-c", script], cwd=agent_dir, check=True)
+
+    run_sessions(3)
+    (tmp_path / "metrics-999999999.json.tmp").write_text("{")  # Killed mid-write
+    text = metrics.render_snapshots(metrics.read_snapshots())
+    assert 'voyaltis_fuzzy_match_total{result="miss"} 3' in text
+    assert os.listdir(tmp_path) == [metrics.EXITED_SNAPSHOT]
+
+    run_sessions(2)
+    text = metrics.render_snapshots(metrics.read_snapshots())
+    assert 'voyaltis_fuzzy_match_total{result="miss"} 5' in text
+    assert os.listdir(tmp_path) == [metrics.EXITED_SNAPSHOT]
+
+    # Scraping again does not count the exited processes twice
+    text = metrics.render_snapshots(metrics.read_snapshots())
+    assert 'voyaltis_fuzzy_match_total{result="miss"} 5' in text
@@ -0,0 +1,41 @@
+"""
+Test suite for the microbenchmark suite (cases, result format, comparison)
+"""
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.microbench import BENCHMARKS, compare, measure, run_suite
+
+
+def test_every_case_runs_on_a_small_catalog():
+    """One result per case and size, with per-call timings"""
+    suite = run_suite([10], min_time=0.001, repeats=1)
+    assert {r["name"] for r in suite["results"]} == set(BENCHMARKS)
+    assert all(r["size"] == 10 and r["median_s"] > 0 and r["calls"] >= 1 for r in suite["results"])
+    assert {"commit", "timestamp", "python", "results"} <= set(suite)
+
+
+def test_only_filters_by_prefix():
+    suite = run_suite([10], ["sales_analyzer"], min_time=0.001, repeats=1)
+    assert {r["name"] for r in suite["results"]} == {n for n in BENCHMARKS if n.startswith("sales_analyzer")}
+
+
+def test_measure_batches_fast_calls():
+    result = measure(lambda: None, min_time=0.01, repeats=2)
+    assert result["calls"] > 2
+
+
+def test_compare_flags_regressions():
+    """Ratios over the threshold are regressions, cases missing from the base are skipped"""
+    base = {"results": [{"name": "a", "size": 10, "median_s": 1.0}, {"name": "b", "size": 10, "median_s": 1.0}]}
+    head = {"results": [
+        {"name": "a", "size": 10, "median_s": 1.5},
+        {"name": "b", "size": 10, "median_s": 0.5},
+        {"name": "c", "size": 10, "median_s": 1.0},
+    ]}
+    rows, regressions = compare(base, head, threshold=0.1)
+    assert regressions == 1
+    assert [(r["name"], r["status"]) for r in rows] == [("a", "regression"), ("b", "faster")]
@@ -0,0 +1,108 @@
+"""
+Test suite for the local mock LLM server (response formats, pacing, error injection)
+"""
+import sys
+import os
+import asyncio
+import json
+import time
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tests.helpers import collect
+from benchmarks.mock_llm_server import MockConfig, MockLLMServer, ResponseScript, split_tokens
+from utils.report import parse_report_json
+
+CHAT_BODY = {
+    "model": "gpt-4o-mini",
+    "messages": [
+        {"role": "system", "content": "Tu es un assistant."},
+        {"role": "assistant", "content": "Salut ! Qu'as-tu vendu ?"},
+        {"role": "user", "content": "Trois pots de blanc."},
+    ],
+}
+
+
+def _sse_payloads(events):
+    payloads = []
+    for event in events:
+        for line in event.splitlines():
+            if line.startswith("data: ") and line != "data: [DONE]":
+                payloads.append(json.loads(line[len("data: "):]))
+    return payloads
+
+
+def test_split_tokens_round_trip():
+    """Tokens concatenate back to the text"""
+    text = "Super, merci !  Et les retours ?\n"
+    assert "".join(split_tokens(text)) == text
+    assert split_tokens("Bonjour à tous") == ["Bonjour", " à", " tous"]
+
+
+def test_script_follows_conversation_turn():
+    """The n-th agent reply of a conversation is the n-th scripted response"""
+    script = ResponseScript(chat=["Première {turn} ({last_user})", "Seconde"])
+    assert script.chat_response("m", CHAT_BODY["messages"]) == "Première 1 (Trois pots de blanc.)"
+    later = CHAT_BODY["messages"] + [{"role": "assistant", "content": "x"}, {"role": "user", "content": "y"}]
+    assert script.chat_response("m", later) == "Seconde"
+    assert script.chat_response("m", later + [{"role": "assistant", "content": "z"}]) == "Seconde"
+    # Unknown placeholders are left as is
+    assert ResponseScript(chat=["{inconnu}"]).chat_response("m", []) == "{inconnu}"
+
+
+def test_openai_completion_and_stream():
+    """Non-streaming response and SSE chunks in the chat completions format"""
+    server = MockLLMServer(MockConfig(ttft=0, tokens_per_second=0), ResponseScript(chat=["Et les retours clients ?"]))
+    completion = asyncio.run(server.openai_completion(CHAT_BODY))
+    assert completion["choices"][0]["message"]["content"] == "Et les retours clients ?"
+    assert completion["usage"]["completion_tokens"] == 5
+
+    events = asyncio.run(collect(server.openai_stream({**CHAT_BODY, "stream": True, "stream_options": {"include_usage": True}})))
+    assert events[-1] == "data: [DONE]\n\n"
+    payloads = _sse_payloads(events)
+    deltas = [p["choices"][0]["delta"].get("content", "") for p in payloads if p["choices"]]
+    assert "".join(deltas) == "Et les retours clients ?"
+    assert payloads[0]["choices"][0]["delta"]["role"] == "assistant"
+    assert payloads[-2]["choices"][0]["finish_reason"] == "stop"
+    assert payloads[-1]["usage"]["completion_tokens"] == 5
+    assert server.stats["requests"] == 2 and server.stats["streams"] == 1
+
+
+def test_anthropic_message_and_stream():
+    """The report comes back in a code fence, parsable by the report code"""
+    server = MockLLMServer(MockConfig(ttft=0, tokens_per_second=0))
+    body = {"model": "claude-sonnet-4-20250514", "max_tokens": 2048, "messages": [{"role": "user", "content": "Analyse"}]}
+    message = asyncio.run(server.anthropic_message(body))
+    assert message["type"] == "message" and message["stop_reason"] == "end_turn"
+    assert "key_insights" in parse_report_json(message["content"][0]["text"])
+
+    events = asyncio.run(collect(server.anthropic_stream({**body, "stream": True})))
+    names = [event.split("\n", 1)[0][len("event: "):] for event in events]
+    assert names[:3] == ["message_start", "content_block_start", "ping"]
+    assert names[-3:] == ["content_block_stop", "message_delta", "message_stop"]
+    text = "".join(p["delta"]["text"] for p in _sse_payloads(events) if p["type"] == "content_block_delta")
+    assert text == message["content"][0]["text"]
+
+
+def test_pacing():
+    """First token after ttft, then one token per 1/tokens_per_second"""
+    server = MockLLMServer(MockConfig(ttft=0.05, tokens_per_second=100), ResponseScript(chat=["un deux trois quatre cinq"]))
+    started = time.perf_counter()
+    asyncio.run(server.openai_completion(CHAT_BODY))
+    elapsed = time.perf_counter() - started
+    assert 0.08 <= elapsed < 0.5
+
+
+def test_error_injection():
+    """Request errors at the configured rate, streams cut with an error event"""
+    server = MockLLMServer(MockConfig(error_rate=1.0, error_status=500, seed=1))
+    assert server.injected_error() == 500
+    assert server.openai_error(429)["error"]["code"] == "rate_limit_exceeded"
+    assert server.anthropic_error(529)["error"]["type"] == "overloaded_error"
+    assert MockLLMServer(MockConfig(error_rate=0.0)).injected_error() is None
+
+    server = MockLLMServer(MockConfig(ttft=0, tokens_per_second=0, stream_error_rate=1.0, seed=1))
+    payloads = _sse_payloads(asyncio.run(collect(server.openai_stream({**CHAT_BODY, "stream": True}))))
+    assert "error" in payloads[-1]
+    assert server.stats["stream_errors"] == 1
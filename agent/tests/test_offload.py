@@ -0,0 +1,79 @@
+"""
+Test suite for executor offloading
+"""
+import sys
+import os
+import asyncio
+import threading
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.instructions import build_simple_instructions
+from utils.offload import INLINE, PROCESS, THREAD, OFFLOAD_SECONDS, Offloader, _parse_thresholds
+
+INSTRUCTIONS_KWARGS = dict(
+    user_name="Thomas",
+    attention_points=[{"id": "sales", "description": "Produits vendus", "naturalPrompts": ["Qu'as-tu vendu ?"]}],
+    questions_asked=1,
+    max_questions=3,
+    first_question_in_opening=True,
+    products_info="1. Glycéro Satin Blanc (Peinture boiseries)\n" * 200,
+)
+
+
+def _thread_name():
+    return threading.current_thread().name
+
+
+def test_dispatch_by_threshold():
+    """Small inputs stay inline, large ones go to the thread pool, CPU work to processes if configured"""
+    offloader = Offloader(threads=2, processes=0, thresholds={"op": 100})
+    assert offloader.executor_for("op", 10, cpu_bound=True) == INLINE
+    assert offloader.executor_for("op", 100, cpu_bound=True) == THREAD
+    assert Offloader(processes=1, thresholds={"op": 100}).executor_for("op", 100, cpu_bound=True) == PROCESS
+    assert Offloader(processes=1, thresholds={"op": 100}).executor_for("op", 100, cpu_bound=False) == THREAD
+    assert _parse_thresholds("instructions=50000, map_sales=20") == {"instructions": 50000, "map_sales": 20}
+
+    async def scenario():
+        inline = await offloader.run("op", _thread_name, size=1)
+        pooled = await offloader.run("op", _thread_name, size=1000)
+        return inline, pooled
+
+    inline, pooled = asyncio.run(scenario())
+    offloader.shutdown()
+    assert inline == "MainThread"
+    assert pooled.startswith("voyaltis-offload")
+    samples = dict(OFFLOAD_SECONDS.samples())
+    assert samples[("op", "inline")][-1] >= 1
+    assert samples[("op", "thread")][-1] >= 1
+
+
+def test_instructions_in_process_pool_match_inline():
+    """build_simple_instructions is importable without LiveKit and runs in a worker process"""
+    offloader = Offloader(threads=1, processes=1, thresholds={"instructions": 0})
+
+    async def scenario():
+        return await offloader.run("instructions", build_simple_instructions, size=10, cpu_bound=True, **INSTRUCTIONS_KWARGS)
+
+    try:
+        result = asyncio.run(scenario())
+    finally:
+        offloader.shutdown()
+    assert result == build_simple_instructions(**INSTRUCTIONS_KWARGS)
+
+
+def test_instructions_generate_question_without_natural_prompts():
+    """An attention point with only a description gets a generated question"""
+    kwargs = dict(INSTRUCTIONS_KWARGS, attention_points=[{"description": "ventes du jour"}])
+    offloader = Offloader(threads=1, processes=1, thresholds={"instructions": 0})
+
+    async def scenario():
+        return await offloader.run("instructions", build_simple_instructions, size=10, cpu_bound=True, **kwargs)
+
+    try:
+        result = asyncio.run(scenario())
+    finally:
+        offloader.shutdown()
+    assert result == build_simple_instructions(**kwargs)
+    assert "Question 1: " in result
@@ -0,0 +1,120 @@
+"""
+Test suite for the pre-synthesized opening audio (background rendering, cached clip)
+"""
+import sys
+import os
+import asyncio
+from types import SimpleNamespace
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tests.helpers import collect, fake_frame
+from utils.opening_audio import OpeningAudio
+from utils.tts_cache import TTSCache
+
+SAMPLE_RATE = 16000
+
+
+class FakeStream:
+    def __init__(self, frames, delay, fail_after=None):
+        self.frames = frames
+        self.delay = delay
+        self.fail_after = fail_after
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __aiter__(self):
+        return self._events()
+
+    async def _events(self):
+        for i, pcm in enumerate(self.frames):
+            await asyncio.sleep(self.delay)
+            if i == self.fail_after:
+                raise RuntimeError("TTS stream cut")
+            yield SimpleNamespace(frame=SimpleNamespace(data=memoryview(pcm), sample_rate=SAMPLE_RATE, num_channels=1))
+
+
+class FakeTTS:
+    """
+    synthesize() streams three 100 ms frames, one every delay seconds; the streams listed
+    in fail_streams (by call number) fail after fail_after frames
+    """
+
+    def __init__(self, delay: float = 0.0, fail: bool = False, fail_streams=(), fail_after: int = 0):
+        self.delay = delay
+        self.fail = fail
+        self.fail_streams = fail_streams
+        self.fail_after = fail_after
+        self.calls = []
+
+    def synthesize(self, text: str):
+        self.calls.append(text)
+        if self.fail:
+            raise RuntimeError("TTS unavailable")
+        fail_after = self.fail_after if len(self.calls) in self.fail_streams else None
+        return FakeStream([bytes([i]) * 3200 for i in range(1, 4)], self.delay, fail_after)
+
+
+def test_frames_play_while_synthesizing_then_from_cache(tmp_path):
+    """First session: frames as the TTS produces them, clip cached; second session: no TTS call"""
+    async def session(tts):
+        audio = OpeningAudio(tts, TTSCache("voice", "model", cache_dir=str(tmp_path)), "Salut Thomas !", make_frame=fake_frame).start()
+        frames = await collect(audio.frames())
+        return audio, frames
+
+    tts = FakeTTS(delay=0.01)
+    audio, frames = asyncio.run(session(tts))
+    assert audio.source == "synthesized" and tts.calls == ["Salut Thomas !"]
+    assert [frame.data[0] for frame in frames] == [1, 2, 3]
+    assert os.path.exists(audio.cache.path("Salut Thomas !"))
+
+    tts = FakeTTS()
+    audio, cached = asyncio.run(session(tts))
+    assert audio.source == "cache" and not tts.calls
+    assert b"".join(frame.data for frame in cached) == b"".join(frame.data for frame in frames)
+    assert all(frame.sample_rate == SAMPLE_RATE for frame in cached)
+
+
+def test_failure_is_reported_not_raised(tmp_path):
+    """A TTS error marks the audio failed; the live synthesis fails too and leaves no frames"""
+    async def session():
+        audio = OpeningAudio(FakeTTS(fail=True), TTSCache("voice", "model", cache_dir=str(tmp_path)), "Salut !", make_frame=fake_frame).start()
+        frames = await collect(audio.frames())
+        return audio, frames
+
+    audio, frames = asyncio.run(session())
+    assert audio.failed and frames == []
+    assert not os.listdir(tmp_path)
+
+
+def test_late_failure_falls_back_to_live_synthesis(tmp_path):
+    """Rendering fails after frames() started, before any frame: the opening is synthesized live"""
+    async def session():
+        tts = FakeTTS(delay=0.01, fail_streams=(1,), fail_after=0)
+        audio = OpeningAudio(tts, TTSCache("voice", "model", cache_dir=str(tmp_path)), "Salut !", make_frame=fake_frame).start()
+        assert not audio.failed  # Still rendering when session.say starts playing
+        frames = await collect(audio.frames())
+        return tts, audio, frames
+
+    tts, audio, frames = asyncio.run(session())
+    assert audio.failed and tts.calls == ["Salut !", "Salut !"]
+    assert [frame.data[0] for frame in frames] == [1, 2, 3]
+    assert not os.listdir(tmp_path)
+
+
+def test_failure_part_way_is_not_replayed(tmp_path):
+    """Frames already played are not repeated by a live synthesis"""
+    async def session():
+        tts = FakeTTS(delay=0.01, fail_streams=(1,), fail_after=2)
+        audio = OpeningAudio(tts, TTSCache("voice", "model", cache_dir=str(tmp_path)), "Salut !", make_frame=fake_frame).start()
+        frames = await collect(audio.frames())
+        return tts, audio, frames
+
+    tts, audio, frames = asyncio.run(session())
+    assert audio.failed and len(tts.calls) == 1
+    assert [frame.data[0] for frame in frames] == [1, 2]
@@ -0,0 +1,53 @@
+"""
+Test suite for sampled session profiling
+"""
+import sys
+import os
+import time
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils import profiling
+from utils.profiling import SessionProfiler
+
+
+def busy_fuzzy_matching(seconds):
+    deadline = time.perf_counter() + seconds
+    allocations = []
+    while time.perf_counter() < deadline:
+        allocations.append("x" * 1000)
+    return allocations
+
+
+def test_profile_files_are_written(tmp_path):
+    """Folded stacks name the busy function; tracemalloc snapshot lists top allocations"""
+    profiler = SessionProfiler(interval=0.002, output_dir=str(tmp_path))
+    profiler.start()
+    kept = busy_fuzzy_matching(0.2)
+    paths = profiler.stop("perrot", "room/42")
+
+    assert kept
+    assert os.path.basename(paths["folded"]).startswith("profile-perrot-room_42-")
+    with open(paths["folded"]) as f:
+        lines = f.read().splitlines()
+    assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert any(line.startswith("MainThread;") and "busy_fuzzy_matching (tests/test_profiling.py" in line for line in lines)
+
+    with open(paths["tracemalloc"]) as f:
+        report = f.read()
+    assert report.startswith("# project=perrot room=room/42")
+    assert "test_profiling.py" in report
+
+
+def test_session_selection(monkeypatch):
+    """Enabled by env var, by sample rate, and filtered by project"""
+    monkeypatch.delenv("VOYALTIS_PROFILE", raising=False)
+    monkeypatch.setenv("VOYALTIS_PROFILE_SAMPLE_RATE", "0")
+    assert profiling.start_session_profiler() is None
+
+    monkeypatch.setenv("VOYALTIS_PROFILE_SAMPLE_RATE", "1")
+    assert profiling.should_profile()
+    monkeypatch.setenv("VOYALTIS_PROFILE_PROJECTS", "perrot, smitharm-2")
+    assert profiling.profiling_project_selected("perrot")
+    assert not profiling.profiling_project_selected("fiestasatdsdfze")
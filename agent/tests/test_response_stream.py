@@ -0,0 +1,59 @@
+"""
+Test suite for streamed text-mode replies (delta packet coalescing)
+"""
+import sys
+import os
+import asyncio
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tests.helpers import FakeClock
+from utils.response_stream import DeltaPublisher
+
+
+def _stream(tokens, interval=0.08, min_chars=10, step=0.01):
+    """Packets published for tokens arriving every step seconds"""
+    async def scenario():
+        packets = []
+        clock = FakeClock()
+
+        async def publish(packet):
+            packets.append(packet)
+
+        publisher = DeltaPublisher(publish, interval=interval, min_chars=min_chars, clock=clock)
+        for token in tokens:
+            await publisher.push(token)
+            clock.now += step
+        await publisher.flush()
+        return publisher, packets
+
+    return asyncio.run(scenario())
+
+
+def test_first_token_sent_then_coalesced_by_size():
+    tokens = ["Super", " !", " Et", " combien", " de", " cuiseurs", " as", "-tu", " vendus", " ?"]
+    publisher, packets = _stream(tokens)
+    assert packets[0]["text"] == "Super"
+    assert "".join(p["text"] for p in packets) == "".join(tokens) == publisher.text
+    assert len(packets) < len(tokens)
+    assert [p["seq"] for p in packets] == list(range(len(packets)))
+    assert all(p["type"] == "agent_response_delta" and p["id"] == publisher.response_id for p in packets)
+
+
+def test_slow_tokens_flushed_by_time():
+    """Tokens further apart than the interval are each sent right away"""
+    tokens = ["Un", " deux", " trois"]
+    _, packets = _stream(tokens, min_chars=100, step=0.1)
+    assert [p["text"] for p in packets] == tokens
+
+
+def test_fast_tokens_wait_for_size_or_interval():
+    _, packets = _stream(["a"] * 30, interval=1.0, min_chars=10, step=0.001)
+    assert [len(p["text"]) for p in packets] == [1, 10, 10, 9]
+
+
+def test_final_packet_replaces_deltas():
+    publisher, _ = _stream(["Bonjour", " Thomas"])
+    final = publisher.final_packet(publisher.text.strip())
+    assert final == {"type": "agent_response", "id": publisher.response_id, "text": "Bonjour Thomas", "role": "assistant"}
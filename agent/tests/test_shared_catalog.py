@@ -0,0 +1,86 @@
+"""
+Test suite for shared-memory catalogs across job processes
+"""
+import sys
+import os
+import multiprocessing
+import tempfile
+
+import pytest
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.synthetic import write_products_file
+from utils.config_loader import ConfigLoader
+from utils.shared_catalog import SharedProductCatalog, publish_catalog, unpublish_all
+
+PRODUCTS_COUNT = 20000
+PROCESSES = 4
+
+
+def _rss_anon_kb() -> int:
+    """Private anonymous resident memory of this process (Linux), in KiB"""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("RssAnon:"):
+                return int(line.split()[1])
+    return 0
+
+
+def _read_catalog_in_job(products_file: str) -> dict:
+    """Job process: attach the catalog, read every column and report a checksum"""
+    import hashlib
+
+    before = _rss_anon_kb()
+    loader = ConfigLoader(products_file, "non_existent_config.json")
+    catalog = loader.catalog
+
+    digest = hashlib.sha1()
+    for i in range(len(catalog)):
+        digest.update(catalog.labels[i].encode("utf-8"))
+        digest.update(repr((catalog.prices[i], catalog.targets[i], catalog.category_of(i))).encode("utf-8"))
+        digest.update("|".join(catalog.keywords[i]).encode("utf-8"))
+    digest.update(loader.get_products_list_for_prompt().encode("utf-8"))
+    matched = catalog.index_of(catalog.labels[len(catalog) // 2])
+
+    return {
+        "shared": isinstance(catalog, SharedProductCatalog),
+        "checksum": digest.hexdigest(),
+        "middle_index": matched,
+        "rss_anon_growth_kb": _rss_anon_kb() - before,
+    }
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/status"), reason="RSS accounting requires Linux /proc")
+def test_job_processes_share_one_catalog():
+    """Several spawned processes attach the same catalog without private copies"""
+    print("\n🧪 Testing shared catalog across processes...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        products_file = os.path.join(tmp, "products.json")
+        write_products_file(products_file, PRODUCTS_COUNT)
+
+        try:
+            shm = publish_catalog(products_file)
+            expected = _read_catalog_in_job(products_file)
+
+            context = multiprocessing.get_context("spawn")
+            with context.Pool(PROCESSES) as pool:
+                results = pool.map(_read_catalog_in_job, [products_file] * PROCESSES)
+        finally:
+            unpublish_all()
+
+    # Every job read the very same catalog from shared memory
+    assert all(r["shared"] for r in results), "Job processes should attach the published catalog"
+    assert {r["checksum"] for r in results} == {expected["checksum"]}
+    assert {r["middle_index"] for r in results} == {PRODUCTS_COUNT // 2}
+    print(f"✅ {PROCESSES} processes read the same {PRODUCTS_COUNT}-product catalog")
+
+    # Private memory per job stays well below the size of the catalog itself
+    shared_kb = shm.size // 1024
+    for r in results:
+        assert r["rss_anon_growth_kb"] < shared_kb / 4, (
+            f"Job grew by {r['rss_anon_growth_kb']} KiB of private memory for a {shared_kb} KiB catalog"
+        )
+    print(f"✅ Private RSS growth per job: {[r['rss_anon_growth_kb'] for r in results]} KiB (catalog {shared_kb} KiB)")
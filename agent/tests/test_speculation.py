@@ -0,0 +1,150 @@
+"""
+Test suite for speculative LLM generation (transcript matching, hits, misses, cost guard)
+"""
+import sys
+import os
+import asyncio
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tests.helpers import FakeClock, collect
+from utils.speculation import CostGuard, Speculator, materially_same, speculation_settings
+
+
+class FakeLLM:
+    """Streams "reply to <text>" word by word, one chunk every delay seconds"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = []
+        self.closed = 0
+        self.yielded = 0
+
+    async def generate(self, text: str):
+        self.calls.append(text)
+        try:
+            for word in f"reply to {text}".split():
+                await asyncio.sleep(self.delay)
+                self.yielded += 1
+                yield word
+        finally:
+            self.closed += 1
+
+
+def test_materially_same():
+    """Case, punctuation and fillers don't matter; quantities and real rewording do"""
+    assert materially_same("j'ai vendu trois pots de blanc", "Euh, j'ai vendu trois pots de blanc.")
+    assert materially_same("j'ai vendu trois pots de peinture blanche satinée", "j'ai vendu trois pots de peinture blanche satinées")
+    assert not materially_same("j'ai vendu trois pots de blanc", "j'ai vendu quatre pots de blanc")
+    assert not materially_same("j'ai vendu trois pots", "j'ai vendu trois pots de blanc et deux rouleaux de satin")
+    assert not materially_same("les clients aiment le prix", "les clients n'aiment pas du tout le prix")
+
+
+def test_project_settings():
+    """Project settings override the environment defaults"""
+    assert speculation_settings({"settings": {"speculativeResponses": True, "speculationMaxWastedTokensPerHour": 500}}) == (True, 500)
+    assert speculation_settings({"settings": {"speculativeResponses": False}})[0] is False
+
+
+def test_hit_reuses_buffered_reply():
+    """The final transcript matches: the speculative stream is the reply, no second call"""
+    async def scenario():
+        llm = FakeLLM()
+        speculator = Speculator(llm.generate, guard=CostGuard())
+        speculator.on_speech_start()
+        speculator.on_transcript("j'ai vendu trois pots", is_final=False)
+        speculator.on_transcript("j'ai vendu trois pots de blanc", is_final=False)
+        assert not llm.calls  # Nothing while the rep is speaking
+        speculator.on_speech_end()
+        await asyncio.sleep(0.01)
+        chunks = speculator.take("J'ai vendu trois pots de blanc.")
+        return llm, speculator.stats, await collect(chunks)
+
+    llm, stats, chunks = asyncio.run(scenario())
+    assert llm.calls == ["j'ai vendu trois pots de blanc"]
+    assert chunks == "reply to j'ai vendu trois pots de blanc".split()
+    assert (stats.started, stats.hits, stats.misses, stats.wasted_tokens) == (1, 1, 0, 0)
+    assert stats.hit_rate == 1.0
+
+
+def test_closing_hit_stream_stops_generation():
+    """Barge-in during a speculative hit: closing the stream stops the background LLM call"""
+    async def scenario():
+        llm = FakeLLM(delay=0.02)
+        speculator = Speculator(llm.generate, guard=CostGuard())
+        speculator.on_transcript("j'ai vendu trois pots de blanc", is_final=True)
+        speculator.on_speech_end()
+        chunks = speculator.take("j'ai vendu trois pots de blanc")
+        first = await chunks.__anext__()
+        await chunks.aclose()
+        await asyncio.sleep(0.3)
+        return llm, first
+
+    llm, first = asyncio.run(scenario())
+    assert first == "reply" and len(llm.calls) == 1
+    # Stopped after the first chunk, not run to the end of the 9-word reply
+    assert llm.closed == 1 and llm.yielded <= 2
+
+
+def test_miss_cancels_and_counts_waste():
+    """A different final transcript cancels the stream and counts its tokens as wasted"""
+    async def scenario():
+        llm = FakeLLM(delay=0.01)
+        guard = CostGuard()
+        speculator = Speculator(llm.generate, project_id="perrot", prompt_tokens=lambda text: 100, guard=guard)
+        speculator.on_transcript("j'ai vendu trois pots de blanc")
+        await asyncio.sleep(0.035)
+        assert speculator.take("j'ai vendu quatre pots de blanc et du satin") is None
+        await asyncio.sleep(0.02)
+        return llm, speculator.stats, guard
+
+    llm, stats, guard = asyncio.run(scenario())
+    assert llm.closed == 1
+    assert (stats.hits, stats.misses) == (0, 1)
+    assert stats.hit_rate == 0.0
+    assert 100 < stats.wasted_tokens < 100 + len("reply to j'ai vendu trois pots de blanc".split())
+    assert guard.wasted("perrot") == stats.wasted_tokens
+
+
+def test_changed_transcript_restarts():
+    """A new final segment while the rep is silent restarts the speculation"""
+    async def scenario():
+        llm = FakeLLM()
+        speculator = Speculator(llm.generate, guard=CostGuard())
+        speculator.on_transcript("j'ai vendu trois pots")
+        await asyncio.sleep(0)
+        speculator.on_transcript("Euh.")  # Fillers only: same request
+        speculator.on_transcript("et deux rouleaux de satin")
+        await asyncio.sleep(0.01)
+        chunks = speculator.take("j'ai vendu trois pots euh et deux rouleaux de satin")
+        return llm, speculator.stats, await collect(chunks)
+
+    llm, stats, chunks = asyncio.run(scenario())
+    assert llm.calls == ["j'ai vendu trois pots", "j'ai vendu trois pots Euh. et deux rouleaux de satin"]
+    assert (stats.started, stats.restarted, stats.hits) == (2, 1, 1)
+    assert chunks[-1] == "satin"
+
+
+def test_cost_guard_pauses_speculation():
+    """Past the project budget, no speculation until the window slides"""
+    clock = FakeClock()
+    guard = CostGuard(window=3600, clock=clock)
+    guard.record("perrot", 900)
+    assert guard.allow("perrot", 1000) and guard.allow("smitharm-2", 1)
+    guard.record("perrot", 200)
+    assert not guard.allow("perrot", 1000)
+    clock.now += 3601
+    assert guard.allow("perrot", 1000) and guard.wasted("perrot") == 0
+
+    async def scenario():
+        llm = FakeLLM()
+        exhausted = CostGuard()
+        exhausted.record("perrot", 10)
+        speculator = Speculator(llm.generate, project_id="perrot", max_wasted_tokens=10, guard=exhausted)
+        speculator.on_transcript("j'ai vendu trois pots de blanc")
+        return llm, speculator.stats, speculator.take("j'ai vendu trois pots de blanc")
+
+    llm, stats, chunks = asyncio.run(scenario())
+    assert not llm.calls and chunks is None
+    assert (stats.started, stats.skipped) == (0, 1)
@@ -0,0 +1,78 @@
+"""
+Test suite for speakable TTS text (French number words, prices, units, stream segmentation)
+"""
+import sys
+import os
+import asyncio
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tests.helpers import text_stream
+from utils.speech_text import number_to_words, ordinal_to_words, speakable, speech_segments
+
+
+def _segments(*chunks, **kwargs):
+    async def collect():
+        return [segment async for segment in speech_segments(text_stream(*chunks), **kwargs)]
+    return asyncio.run(collect())
+
+
+def test_number_words():
+    assert number_to_words(0) == "zéro"
+    assert number_to_words(21) == "vingt et un"
+    assert number_to_words(71) == "soixante et onze"
+    assert number_to_words(80) == "quatre-vingts"
+    assert number_to_words(99) == "quatre-vingt-dix-neuf"
+    assert number_to_words(200) == "deux cents"
+    assert number_to_words(1299) == "mille deux cent quatre-vingt-dix-neuf"
+    assert number_to_words(200000) == "deux cent mille"
+    assert number_to_words(2000000) == "deux millions"
+    assert ordinal_to_words(1) == "premier"
+    assert ordinal_to_words(5) == "cinquième"
+    assert ordinal_to_words(9) == "neuvième"
+    assert ordinal_to_words(11) == "onzième"
+
+
+def test_prices_and_percentages():
+    assert speakable("Le cuiseur est à 299€.") == "Le cuiseur est à deux cent quatre-vingt-dix-neuf euros."
+    assert speakable("Prix : 1 299,90 € TTC") == "Prix : mille deux cent quatre-vingt-dix-neuf euros quatre-vingt-dix toutes taxes comprises"
+    assert speakable("1 euro HT") == "un euro hors taxes"
+    assert speakable("une remise de 15%") == "une remise de quinze pour cent"
+    assert speakable("2,5 %") == "deux virgule cinq pour cent"
+
+
+def test_units_times_ordinals_codes():
+    assert speakable("un bidon de 10L") == "un bidon de dix litres"
+    assert speakable("80m² de surface") == "quatre-vingts mètres carrés de surface"
+    assert speakable("1 kg") == "un kilo"
+    assert speakable("rendez-vous à 14h30") == "rendez-vous à quatorze heures trente"
+    assert speakable("le 1er magasin, la 1re visite, le 3e rayon") == "le premier magasin, la première visite, le troisième rayon"
+    assert speakable("le modèle RX-500") == "le modèle R X cinq cents"
+    assert speakable("12 000 clients") == "douze mille clients"
+    assert speakable("12.000 unités") == "douze mille unités"
+    assert speakable("10.000L et 12.000%") == "dix mille litres et douze mille pour cent"
+    assert speakable("1.250,50 de stock, 3.14 de ratio") == "mille deux cent cinquante virgule cinquante de stock, trois virgule quatorze de ratio"
+    assert speakable("Aucun chiffre ici.") == "Aucun chiffre ici."
+
+
+def test_segments_never_split_numbers():
+    """A number cut across LLM chunks is only spoken once complete"""
+    segments = _segments("Le prix est de 1 2", "99,", "90€. Et le stock ", "est de 2.", "5 tonnes.")
+    text = "".join(segments)
+    assert "mille deux cent quatre-vingt-dix-neuf euros quatre-vingt-dix." in text
+    assert "deux virgule cinq tonnes." in text
+    assert segments[0] == "Le prix est de mille deux cent quatre-vingt-dix-neuf euros quatre-vingt-dix. "
+
+
+def test_first_clause_sent_early():
+    """The first clause goes to the TTS before the end of a long sentence"""
+    segments = _segments("Très bien, ", "et combien de clients as-tu vus, ", "en tout, ", "sur la journée ?")
+    assert segments[0] == "Très bien, et combien de clients as-tu vus, "
+    assert len(segments) == 2
+    assert "".join(segments) == "Très bien, et combien de clients as-tu vus, en tout, sur la journée ?"
+
+
+def test_abbreviations_do_not_end_sentences():
+    segments = _segments("J'ai vu M. ", "Dupont ce matin. ", "Il était content.")
+    assert segments == ["J'ai vu M. Dupont ce matin. ", "Il était content."]
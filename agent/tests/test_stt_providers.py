@@ -0,0 +1,105 @@
+"""
+Test suite for STT provider selection, the scripted fake STT and the STT latency benchmark helpers
+"""
+import sys
+import os
+import asyncio
+
+import pytest
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.stt_latency import FRAME_SECONDS, speech_bounds, tone_clip, with_silence
+from utils.scripted_transcriber import END_OF_SPEECH, FINAL, INTERIM, START_OF_SPEECH, ScriptedTranscriber, UtteranceScript
+from utils.stt_providers import DEEPGRAM, FAKE, WHISPER, is_streaming, select_stt_provider
+
+TEXT = "J'ai vendu trois pots de blanc et deux rouleaux de satin"
+WORDS_PER_SECOND = 2.5
+
+
+def _transcribe(transcriber, clip):
+    """(audio position, kind, text) of every event of the clip, fed frame by frame"""
+    events = []
+    for chunk in clip.chunks(FRAME_SECONDS):
+        for kind, text in transcriber.feed(chunk, clip.sample_rate, clip.num_channels):
+            events.append((round(transcriber.position, 2), kind, text))
+    return events
+
+
+def test_provider_per_project(monkeypatch):
+    """settings.sttProvider selects the provider, unknown or keyless ones fall back to whisper"""
+    monkeypatch.setenv("DEEPGRAM_API_KEY", "test")
+    assert select_stt_provider({"settings": {"sttProvider": "Deepgram"}}) == DEEPGRAM
+    assert select_stt_provider({"settings": {"sttProvider": "inconnu"}}) == WHISPER
+    assert select_stt_provider({"settings": {}}) == WHISPER
+    assert select_stt_provider(None) == WHISPER
+    monkeypatch.delenv("DEEPGRAM_API_KEY")
+    assert select_stt_provider({"settings": {"sttProvider": "deepgram"}}) == WHISPER
+    assert select_stt_provider({"settings": {"sttProvider": "fake"}}) == FAKE
+    assert is_streaming(DEEPGRAM) and is_streaming(FAKE) and not is_streaming(WHISPER)
+
+
+def test_scripted_transcriber_follows_the_audio():
+    """Interims grow while the tone plays, the final comes after the endpointing silence"""
+    transcriber = ScriptedTranscriber(UtteranceScript([TEXT]).next, endpointing=0.3, words_per_second=WORDS_PER_SECOND)
+    clip = with_silence(tone_clip(TEXT, WORDS_PER_SECOND), 1.0)
+    start, end = speech_bounds(clip)
+    events = _transcribe(transcriber, clip)
+
+    kinds = [kind for _, kind, _ in events]
+    assert kinds[0] == START_OF_SPEECH and kinds[-2:] == [FINAL, END_OF_SPEECH]
+    interims = [text for _, kind, text in events if kind == INTERIM]
+    assert interims and all(TEXT.startswith(text) and text != TEXT for text in interims)
+    assert all(len(a) <= len(b) for a, b in zip(interims, interims[1:]))
+
+    assert events[0][0] == pytest.approx(start + FRAME_SECONDS)
+    final_at, _, final_text = events[-2]
+    assert final_text == TEXT
+    assert final_at == pytest.approx(end + 0.3, abs=FRAME_SECONDS)
+
+
+def test_scripted_transcriber_next_utterance_and_flush():
+    """Each stretch of speech is the next scripted utterance; flush ends the one in progress"""
+    transcriber = ScriptedTranscriber(UtteranceScript(["un deux", "trois quatre"]).next, endpointing=0.3)
+    first = _transcribe(transcriber, with_silence(tone_clip("un deux", WORDS_PER_SECOND), 0.5))
+    second = _transcribe(transcriber, tone_clip("trois quatre", WORDS_PER_SECOND))
+    assert [text for _, kind, text in first if kind == FINAL] == ["un deux"]
+    assert not [kind for _, kind, _ in second if kind == FINAL]
+    assert transcriber.flush() == [(FINAL, "trois quatre"), (END_OF_SPEECH, "")]
+    assert transcriber.flush() == []
+
+
+def test_speech_bounds_of_a_tone_clip():
+    clip = with_silence(tone_clip(TEXT, WORDS_PER_SECOND, lead=0.5), 2.0)
+    start, end = speech_bounds(clip)
+    assert start == pytest.approx(0.5, abs=FRAME_SECONDS)
+    assert end == pytest.approx(0.5 + len(TEXT.split()) / WORDS_PER_SECOND, abs=FRAME_SECONDS)
+    assert speech_bounds(with_silence(tone_clip("", WORDS_PER_SECOND), 1.0)) is None
+
+
+def test_fake_stt_stream_emits_livekit_events():
+    """The fake provider is a LiveKit STT: its stream turns room audio into speech events"""
+    pytest.importorskip("livekit.agents")
+    from livekit.agents import stt
+    from utils.stt_providers import build_stt
+    from utils.tts_cache import livekit_frame
+
+    async def run():
+        fake = build_stt(FAKE)
+        fake.script = UtteranceScript([TEXT])
+        stream = fake.stream()
+        clip = with_silence(tone_clip(TEXT, WORDS_PER_SECOND), 0.5)
+        for chunk in clip.chunks(FRAME_SECONDS):
+            stream.push_frame(livekit_frame(chunk, clip.sample_rate, clip.num_channels))
+        stream.end_input()
+        events = [event async for event in stream]
+        await stream.aclose()
+        return events
+
+    events = asyncio.run(run())
+    types = [event.type for event in events]
+    assert types[0] == stt.SpeechEventType.START_OF_SPEECH
+    assert stt.SpeechEventType.INTERIM_TRANSCRIPT in types
+    final = [event for event in events if event.type == stt.SpeechEventType.FINAL_TRANSCRIPT]
+    assert [event.alternatives[0].text for event in final] == [TEXT]
@@ -0,0 +1,68 @@
+"""
+Test suite for per-turn latency tracing
+"""
+import sys
+import os
+import json
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils import tracing
+from utils.tracing import LatencyHistogram, TurnTracer
+
+
+def _voice_turn(tracer, start, stt=0.3, ttft=0.4, llm=0.9, ttfb=0.2):
+    tracer.start_turn(at=start)
+    tracer.mark(tracing.STT_FINAL, at=start + stt, first_only=False)
+    tracer.mark(tracing.LLM_REQUEST, at=start + stt + 0.05)
+    tracer.mark(tracing.LLM_FIRST_TOKEN, at=start + stt + 0.05 + ttft)
+    tracer.mark(tracing.TTS_REQUEST, at=start + stt + 0.05 + ttft)
+    tracer.mark(tracing.LLM_FIRST_TOKEN, at=start + 99)  # Later chunks are ignored
+    tracer.mark(tracing.TTS_FIRST_AUDIO, at=start + stt + 0.05 + ttft + ttfb)
+    tracer.mark(tracing.PLAYOUT_START, at=start + stt + 0.05 + ttft + ttfb + 0.01)
+    assert not tracer.current.closed  # Still streaming
+    tracer.mark(tracing.LLM_LAST_TOKEN, at=start + stt + 0.05 + llm)
+
+
+def test_histogram_percentiles():
+    """Nearest-rank percentiles"""
+    histogram = LatencyHistogram()
+    for ms in range(1, 101):
+        histogram.observe(ms / 1000)
+    percentiles = histogram.percentiles()
+    assert percentiles == {"p50": 0.05, "p95": 0.095, "p99": 0.099}
+    assert LatencyHistogram().percentiles()["p99"] is None
+
+
+def test_turn_stages_and_chrome_trace(tmp_path):
+    """Stages are derived per turn, aggregated per worker and exported as a Chrome trace"""
+    tracing._worker_histograms.clear()
+    tracer = TurnTracer("room-test")
+
+    _voice_turn(tracer, start=10.0)
+    # The rep keeps talking before the agent answers: same turn, later end of speech
+    tracer.start_turn(at=20.0)
+    tracer.start_turn(at=21.0)
+    _voice_turn(tracer, start=21.0, ttft=0.8)
+
+    assert [turn.turn_id for turn in tracer.turns] == [1, 2]
+    assert all(turn.closed for turn in tracer.turns)
+    first = tracer.turns[0].stage_durations()
+    assert round(first["stt"], 3) == 0.3
+    assert round(first["llm_ttft"], 3) == 0.4
+    assert round(first["tts_ttfb"], 3) == 0.2
+    assert round(first["end_to_end"], 3) == 0.96
+
+    worker = tracing.worker_latency_summary()
+    assert worker["llm_ttft"]["count"] == 2
+    assert worker["llm_ttft"]["p99_ms"] == 800.0
+    assert tracer.session_summary()["end_to_end"]["count"] == 2
+
+    path = tracer.dump_chrome_trace(str(tmp_path))
+    with open(path) as f:
+        trace = json.load(f)
+    spans = [event for event in trace["traceEvents"] if event["ph"] == "X"]
+    assert {event["args"]["turn_id"] for event in spans} == {1, 2}
+    assert len([event for event in spans if event["cat"] == "end_to_end"]) == 2
+    assert all(event["dur"] >= 0 for event in spans)
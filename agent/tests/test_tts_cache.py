@@ -0,0 +1,130 @@
+"""
+Test suite for the TTS audio cache (clip storage, LRU tiers, fixed phrases in the TTS node)
+"""
+import sys
+import os
+import asyncio
+import time
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tests.helpers import fake_frame, text_stream
+from utils.instructions import CLOSING_PHRASE
+from utils.tts_cache import AudioClip, TTSCache, cached_tts, clip_key, read_clip, session_phrases, write_clip
+
+SAMPLE_RATE = 16000
+
+
+def _clip(byte: int, seconds: float = 0.2) -> AudioClip:
+    return AudioClip(bytes([byte, 0]) * int(SAMPLE_RATE * seconds), SAMPLE_RATE, 1)
+
+
+class FakeTTSNode:
+    """Default TTS node stand-in: one frame per text chunk, records what it was sent"""
+
+    def __init__(self):
+        self.texts = []
+
+    async def synthesize(self, chunks):
+        text = ""
+        async for chunk in chunks:
+            text += chunk
+            yield fake_frame(chunk.encode('utf-8'), SAMPLE_RATE, 1)
+        self.texts.append(text)
+
+
+async def _play(cache, tts, *chunks):
+    return [frame async for frame in cached_tts(text_stream(*chunks), cache, tts.synthesize, make_frame=fake_frame)]
+
+
+def test_clip_round_trip(tmp_path):
+    clip = AudioClip(b"\x01\x00" * SAMPLE_RATE, SAMPLE_RATE, 1)
+    path = str(tmp_path / "clips" / "a.wav")
+    write_clip(path, clip)
+    assert read_clip(path) == clip
+    assert clip.duration == 1.0 and len(clip.chunks(0.1)) == 10
+    assert read_clip(str(tmp_path / "missing.wav")) is None
+    assert clip_key("voice", "model", "Salut") != clip_key("voice", "model", "Salut !")
+    assert clip_key("voice", "model", "Salut") != clip_key("other", "model", "Salut")
+
+
+def test_memory_then_disk_tiers(tmp_path):
+    """Memory LRU evicts the oldest clip, which is still served from disk"""
+    async def scenario():
+        cache = TTSCache("voice", "model", cache_dir=str(tmp_path), memory_bytes=len(_clip(1).pcm) * 2)
+        for i, text in enumerate(("un", "deux", "trois"), 1):
+            await cache.put(text, _clip(i))
+        assert (await cache.get("trois")).pcm == _clip(3).pcm
+        assert (await cache.get("un")).pcm == _clip(1).pcm
+        assert await cache.get("quatre") is None
+        return cache
+
+    cache = asyncio.run(scenario())
+    assert cache.stats["memory"] == 1 and cache.stats["disk"] == 1 and cache.stats["miss"] == 1
+    assert cache.hit_rate == round(2 / 3, 3)
+    assert cache.stats["characters_saved"] == len("trois") + len("un")
+
+
+def test_disk_lru_eviction(tmp_path):
+    """Over the disk budget, least recently used clips are removed"""
+    async def scenario():
+        size = len(_clip(1).pcm) + 100
+        cache = TTSCache("voice", "model", cache_dir=str(tmp_path), memory_bytes=1, disk_bytes=size * 2)
+        await cache.put("un", _clip(1))
+        await cache.put("deux", _clip(2))
+        old = time.time() - 60
+        os.utime(cache.path("un"), (old, old))
+        os.utime(cache.path("deux"), (old + 1, old + 1))
+        await cache.get("un")  # Used again: now the most recent
+        await cache.put("trois", _clip(3))
+        return cache
+
+    cache = asyncio.run(scenario())
+    assert os.path.exists(cache.path("un")) and os.path.exists(cache.path("trois"))
+    assert not os.path.exists(cache.path("deux"))
+
+
+def test_fixed_phrase_served_from_cache(tmp_path):
+    """A registered phrase is synthesized once, then played from the cache"""
+    async def scenario():
+        cache = TTSCache("voice", "model", cache_dir=str(tmp_path))
+        cache.register([CLOSING_PHRASE])
+        tts = FakeTTSNode()
+        first = await _play(cache, tts, "Parfait, merci ! ", "Je vais préparer ", "ton rapport.")
+        second = await _play(cache, tts, "Parfait, merci !", " Je vais préparer ton rapport.")
+        return tts, cache, first, second
+
+    tts, cache, first, second = asyncio.run(scenario())
+    assert tts.texts == ["Parfait, merci ! Je vais préparer ton rapport."]
+    assert b"".join(f.data for f in second) == b"".join(f.data for f in first)
+    assert cache.stats["memory"] == 1 and cache.stats["miss"] == 1
+
+
+def test_other_replies_stream_to_tts(tmp_path):
+    """A reply that leaves the phrase prefixes is sent to the TTS, whole and uncached"""
+    async def scenario():
+        cache = TTSCache("voice", "model", cache_dir=str(tmp_path))
+        cache.register([CLOSING_PHRASE])
+        tts = FakeTTSNode()
+        await _play(cache, tts, "Parfait, merci ! ", "Et côté stock ?")
+        await _play(cache, tts, "Le cuiseur ", "est à 299€.")
+        await _play(cache, tts, "Parfait, merci !")  # Prefix only
+        return tts, cache
+
+    tts, cache = asyncio.run(scenario())
+    assert tts.texts == ["Parfait, merci ! Et côté stock ?", "Le cuiseur est à 299€.", "Parfait, merci !"]
+    assert cache.stats == {"memory": 0, "disk": 0, "miss": 0, "characters_saved": 0}
+    assert not os.listdir(tmp_path)
+
+
+def test_session_phrases():
+    """Closing line, natural prompts and generated attention point questions"""
+    points = [
+        {"description": "Produits vendus", "naturalPrompts": ["Qu'as-tu vendu ?"]},
+        {"description": "Retours clients"},
+    ]
+    phrases = session_phrases(points, "aujourd'hui")
+    assert phrases[0] == CLOSING_PHRASE
+    assert "Qu'as-tu vendu ?" in phrases
+    assert len(phrases) == 4
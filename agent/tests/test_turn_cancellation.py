@@ -0,0 +1,115 @@
+"""
+Test suite for stale turn cancellation (superseded text messages, waste accounting)
+"""
+import sys
+import os
+import asyncio
+from types import SimpleNamespace
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.inbox import SessionInbox
+from utils.turn_cancellation import TurnCanceller, TurnWork, chunk_text
+
+
+class FakeChat:
+    """Text turn handler: the LLM answers after delay seconds, replies are published in order"""
+
+    def __init__(self):
+        self.published = []
+
+    def handler(self, text: str, delay: float):
+        async def handle(work: TurnWork):
+            work.prompt_tokens = 100
+            await asyncio.sleep(delay)
+            work.delivered = True
+            self.published.append(f"reply to {text}")
+        return handle
+
+
+def test_newer_message_cancels_stale_reply():
+    """The slow reply to the first message never arrives after the reply to the second"""
+    async def scenario():
+        canceller, chat = TurnCanceller(), FakeChat()
+        first = canceller.start_text_turn(chat.handler("bonjour", 0.2), "p1")
+        await asyncio.sleep(0.01)
+        second = canceller.start_text_turn(chat.handler("en fait non", 0.02), "p1")
+        await asyncio.gather(first, second, return_exceptions=True)
+        return canceller, chat, first
+
+    canceller, chat, first = asyncio.run(scenario())
+    assert first.cancelled()
+    assert chat.published == ["reply to en fait non"]
+    assert canceller.stats["superseded"] == 1 and canceller.stats["wasted_tokens"] == 100
+
+
+def test_delivered_reply_is_not_cancelled():
+    async def scenario():
+        canceller, chat = TurnCanceller(), FakeChat()
+        first = canceller.start_text_turn(chat.handler("bonjour", 0.0), "p1")
+        await first
+        assert not canceller.cancel_text_turn("p1", "mode_switch")
+        canceller.start_text_turn(chat.handler("merci", 0.0), "p1")
+        await asyncio.sleep(0.01)
+        return canceller, chat
+
+    canceller, chat = asyncio.run(scenario())
+    assert chat.published == ["reply to bonjour", "reply to merci"]
+    assert canceller.stats["superseded"] == 0 and canceller.stats["wasted_tokens"] == 0
+
+
+def test_mode_switch_and_interruption_waste():
+    async def scenario():
+        canceller, chat = TurnCanceller(), FakeChat()
+        turn = canceller.start_text_turn(chat.handler("bonjour", 0.2), "p1")
+        await asyncio.sleep(0.01)
+        assert canceller.cancel_text_turn("p1", "mode_switch")
+        await asyncio.gather(turn, return_exceptions=True)
+        return canceller, chat
+
+    canceller, chat = asyncio.run(scenario())
+    assert chat.published == [] and canceller.stats["mode_switch"] == 1
+
+    canceller.record(TurnWork(prompt_tokens=50, generated_chars=40), "p1", "voice", "interrupted")
+    assert canceller.stats["interrupted"] == 1 and canceller.stats["wasted_tokens"] == 160
+
+
+def test_chunk_text():
+    assert chunk_text("Salut") == "Salut"
+    assert chunk_text(SimpleNamespace(delta=SimpleNamespace(content="ça va"))) == "ça va"
+    assert chunk_text(SimpleNamespace(delta=None)) == ""
+
+
+def test_message_during_streamed_reply_waits_for_it():
+    """A message typed mid-stream is answered after the streamed reply, on a history that has it"""
+    async def scenario():
+        canceller = TurnCanceller()
+        history, prompts = [], []
+
+        async def reply(text, work):
+            prompts.append([m for m in history])
+            work.prompt_tokens = 100
+            await asyncio.sleep(0.02)  # Waiting on the LLM
+            work.delivered = True      # First token published
+            await asyncio.sleep(0.1)   # Streaming
+            history.append(("assistant", f"reply to {text}"))
+
+        async def process(entry):
+            # Same steps as the text mode of the entrypoint
+            await canceller.wait_delivered()
+            history.append(("user", entry.text))
+            canceller.start_text_turn(lambda work: reply(entry.text, work), "p1")
+
+        inbox = SessionInbox(process, coalesce_window=0).start()
+        inbox.offer({"type": "user_text_message", "text": "un", "mode": "text"})
+        await asyncio.sleep(0.06)  # Mid-stream
+        inbox.offer({"type": "user_text_message", "text": "deux", "mode": "text"})
+        await asyncio.sleep(0.35)
+        await inbox.close()
+        return canceller, history, prompts
+
+    canceller, history, prompts = asyncio.run(scenario())
+    assert history == [("user", "un"), ("assistant", "reply to un"), ("user", "deux"), ("assistant", "reply to deux")]
+    assert prompts[1] == history[:3]
+    assert canceller.stats["superseded"] == 0
@@ -0,0 +1,488 @@
+"""
+Compact product catalog for Voyaltis Agent
+Column-oriented, immutable representation shared by ConfigLoader and SalesAnalyzer
+"""
+import json
+import re
+import sys
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+
+# Field aliases used to normalize Excel exports (French headers) and the legacy
+# Samsung format to the same columns. "nom"/"objectifs" cover the SalesAnalyzer format.
+FIELD_ALIASES = {
+    "name": ("name", "Nom", "nom"),
+    "display_name": ("display_name", "Nom d'affichage", "display name"),
+    "category": ("category", "Catégorie", "catégorie"),
+    "keywords": ("keywords", "Mots-clés", "mots-clés"),
+    "target_quantity": ("target_quantity", "Objectif", "objectif", "target", "objectifs"),
+}
+
+# Price fields that look like a price but are not the unit selling price
+PRICE_EXCLUDE_PATTERNS = [
+    re.compile(r"au\s+(kilo|litre|kg|l\b)"),  # "au kilo", "au litre"
+    re.compile(r"de\s+(gros|détail)"),         # "de gros", "de détail"
+    re.compile(r"achat"),                       # "prix achat"
+    re.compile(r"revient"),                     # "prix de revient"
+]
+
+class _Missing:
+    """Sentinel type for fields a product does not define (pickles as the singleton)"""
+
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        return "MISSING"
+
+    def __reduce__(self):
+        return "MISSING"
+
+
+MISSING = _Missing()
+
+# Strings longer than this are not interned (descriptions, characteristics...)
+_INTERN_MAX_LENGTH = 64
+
+
+def find_price_field(product: Mapping) -> float:
+    """
+    Intelligently find the price field in a product.
+    Matches variations like "Prix", "Prix (€)", "Prix (€/unité)", "price"
+    but excludes false positives like "Prix au kilo", "Prix de gros"
+
+    Returns the price value or 0 if not found
+    """
+    for field_name, field_value in product.items():
+        field_lower = field_name.lower()
+
+        # Check if it starts with "prix" or "price"
+        if not (field_lower.startswith("prix") or field_lower.startswith("price")):
+            continue
+
+        # Check if this field should be excluded
+        if any(pattern.search(field_lower) for pattern in PRICE_EXCLUDE_PATTERNS):
+            continue
+
+        # Try to extract numeric value
+        if isinstance(field_value, (int, float)):
+            return float(field_value)
+        elif isinstance(field_value, str):
+            try:
+                return float(field_value)
+            except ValueError:
+                continue
+
+    # No price field found
+    return 0.0
+
+
+def normalize_product_field(product: Mapping, field: str) -> Any:
+    """
+    Normalize product field names to handle different formats
+    Maps Excel format (Nom, Catégorie, etc.) to standard format
+    """
+    if field == "price":
+        return find_price_field(product)
+
+    for name in FIELD_ALIASES.get(field, (field,)):
+        if name in product:
+            return product[name]
+
+    # Return default values based on field type
+    if field == "keywords":
+        return []
+    elif field == "target_quantity":
+        return 0
+    return ""
+
+
+def _intern(value: Any) -> Any:
+    """Intern short strings so repeated values share one object across catalogs"""
+    if isinstance(value, str) and len(value) <= _INTERN_MAX_LENGTH:
+        return sys.intern(value)
+    return value
+
+
+def _as_int(value: Any) -> int:
+    """Coerce a target quantity to int (Excel exports sometimes give floats or strings)"""
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        try:
+            return int(float(value))
+        except ValueError:
+            return 0
+    return 0
+
+
+class ProductRecord(Mapping):
+    """
+    Read-only mapping view over one catalog row.
+    Behaves like the raw product dict it was built from, without storing a dict.
+    """
+
+    __slots__ = ("_catalog", "_index")
+
+    def __init__(self, catalog: "ProductCatalog", index: int):
+        self._catalog = catalog
+        self._index = index
+
+    def __getitem__(self, key: str) -> Any:
+        value = self._catalog._field_value(self._index, key)
+        if value is MISSING:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        row = self._catalog.rows[self._index]
+        for field_name, value in zip(self._catalog.field_names, row):
+            if value is not MISSING:
+                yield field_name
+
+    def __len__(self) -> int:
+        return sum(1 for value in self._catalog.rows[self._index] if value is not MISSING)
+
+    def __repr__(self) -> str:
+        return f"ProductRecord({dict(self)!r})"
+
+
+class ProductCatalog(Sequence):
+    """
+    Immutable, column-oriented product catalog.
+
+    Normalized fields live in parallel columns (interned strings, array-backed
+    prices/targets/category ids) and the original Excel fields are kept as
+    value rows aligned on a single shared tuple of field names. Iterating the
+    catalog yields ProductRecord views, so code written against the old list
+    of dicts keeps working without a second copy of the data.
+    """
+
+    __slots__ = (
+        "field_names", "rows", "names", "display_names", "labels",
+        "categories", "category_ids", "keywords", "prices", "targets",
+        "_label_index", "_field_positions", "_match_index", "_prompt_text", "__weakref__",
+    )
+
+    def __init__(
+        self,
+        field_names: Tuple[str, ...],
+        rows: Sequence[Tuple[Any, ...]],
+        names: Sequence[str],
+        display_names: Sequence[str],
+        categories: Sequence[str],
+        category_ids: Sequence[int],
+        keywords: Sequence[Tuple[str, ...]],
+        prices: Sequence[float],
+        targets: Sequence[int],
+        labels: Optional[Sequence[str]] = None,
+    ):
+        self.field_names = field_names
+        self.rows = rows
+        self.names = names
+        self.display_names = display_names
+        self.categories = categories
+        self.category_ids = category_ids
+        self.keywords = keywords
+        self.prices = prices
+        self.targets = targets
+        # Label = display name, falling back to name (what the reports use)
+        if labels is None:
+            labels = tuple(display or name for display, name in zip(display_names, names))
+        self.labels = labels
+        self._label_index = None
+        self._field_positions = {name: i for i, name in enumerate(field_names)}
+        self._prompt_text = None
+        self._match_index = None
+
+    @classmethod
+    def from_records(cls, records: Iterable[Mapping]) -> "ProductCatalog":
+        """Build a catalog from an iterable of raw product dicts"""
+        builder = CatalogBuilder()
+        for record in records:
+            builder.add(record)
+        return builder.build()
+
+    @classmethod
+    def from_file(cls, path: str, chunk_size: int = 64 * 1024) -> "ProductCatalog":
+        """Build a catalog by streaming a products.json file, one product at a time"""
+        return cls.from_records(iter_json_products(path, chunk_size))
+
+    @property
+    def prompt_text(self) -> Optional[str]:
+        """Rendered products list, filled once by ConfigLoader.get_products_list_for_prompt"""
+        return self._prompt_text
+
+    @prompt_text.setter
+    def prompt_text(self, text: str):
+        self._prompt_text = text
+
+    # Sequence protocol -----------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [ProductRecord(self, i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("catalog index out of range")
+        return ProductRecord(self, index)
+
+    def __iter__(self) -> Iterator[ProductRecord]:
+        for i in range(len(self)):
+            yield ProductRecord(self, i)
+
+    def __repr__(self) -> str:
+        return f"<ProductCatalog {len(self)} products, {len(self.field_names)} fields>"
+
+    # Lookups -----------------------------------------------------------------
+
+    def _field_value(self, index: int, field_name: str) -> Any:
+        position = self._field_positions.get(field_name)
+        if position is None:
+            return MISSING
+        return self.rows[index][position]
+
+    def index_of(self, label: str) -> Optional[int]:
+        """Return the row index of a product label (display name or name)"""
+        if self._label_index is None:
+            label_index = {}
+            for i, product_label in enumerate(self.labels):
+                label_index.setdefault(product_label, i)
+            self._label_index = label_index
+        return self._label_index.get(label)
+
+    def has_label(self, label: str) -> bool:
+        return self.index_of(label) is not None
+
+    def price_of(self, label: str) -> float:
+        """Return the unit price of a product label, 0.0 if unknown"""
+        index = self.index_of(label)
+        return self.prices[index] if index is not None else 0.0
+
+    def category_of(self, index: int) -> str:
+        return self.categories[self.category_ids[index]]
+
+    def record(self, index: int) -> ProductRecord:
+        return ProductRecord(self, index)
+
+    def total_target(self) -> int:
+        return sum(self.targets)
+
+    def match_index(self) -> Tuple[Tuple[Tuple[str, ...], Tuple[str, ...]], ...]:
+        """
+        Lowercased keywords and significant name words per product, for fuzzy matching.
+        Computed once and shared by every SalesAnalyzer on this catalog.
+        """
+        if self._match_index is None:
+            self._match_index = tuple(
+                (
+                    tuple(sys.intern(keyword.lower()) for keyword in keywords),
+                    tuple(sys.intern(word) for word in label.lower().split() if len(word) > 3),
+                )
+                for keywords, label in zip(self.keywords, self.labels)
+            )
+        return self._match_index
+
+
+class CatalogBuilder:
+    """
+    Accumulates products one by one into catalog columns.
+    Used both for in-memory lists and for streamed JSON files.
+    """
+
+    def __init__(self):
+        self._field_names: List[str] = []
+        self._field_positions: Dict[str, int] = {}
+        self._rows: List[Tuple[Any, ...]] = []
+        self._names: List[str] = []
+        self._display_names: List[str] = []
+        self._categories: List[str] = []
+        self._category_positions: Dict[str, int] = {}
+        self._category_ids = array("I")
+        self._keywords: List[Tuple[str, ...]] = []
+        self._prices = array("d")
+        self._targets = array("q")
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def add(self, product: Mapping):
+        """Add one raw product dict to the catalog"""
+        row: List[Any] = [MISSING] * len(self._field_names)
+        for field_name, value in product.items():
+            position = self._field_positions.get(field_name)
+            if position is None:
+                position = len(self._field_names)
+                self._field_names.append(sys.intern(field_name))
+                self._field_positions[field_name] = position
+                row.append(MISSING)
+            if isinstance(value, list):
+                value = tuple(_intern(v) for v in value)
+            row[position] = _intern(value)
+        row = tuple(row)
+        self._rows.append(row)
+
+        self._names.append(_intern(str(normalize_product_field(product, "name") or "")))
+        self._display_names.append(_intern(str(normalize_product_field(product, "display_name") or "")))
+
+        category = _intern(str(normalize_product_field(product, "category") or ""))
+        category_id = self._category_positions.get(category)
+        if category_id is None:
+            category_id = len(self._categories)
+            self._categories.append(category)
+            self._category_positions[category] = category_id
+        self._category_ids.append(category_id)
+
+        keywords = normalize_product_field(product, "keywords") or []
+        if isinstance(keywords, str):
+            keywords = [k.strip() for k in keywords.split(",") if k.strip()]
+        keywords = tuple(sys.intern(str(k)) for k in keywords)
+        for alias in FIELD_ALIASES["keywords"]:
+            position = self._field_positions.get(alias)
+            if position is not None and row[position] == keywords:
+                # Share the tuple already stored in the row
+                keywords = row[position]
+                break
+        self._keywords.append(keywords)
+
+        self._prices.append(find_price_field(product))
+        self._targets.append(_as_int(normalize_product_field(product, "target_quantity")))
+
+    def build(self) -> ProductCatalog:
+        """Freeze accumulated columns into an immutable ProductCatalog"""
+        # Rows added before a new field appeared are padded; the others are reused as is
+        width = len(self._field_names)
+        rows = tuple(
+            row if len(row) == width else row + (MISSING,) * (width - len(row))
+            for row in self._rows
+        )
+        return ProductCatalog(
+            field_names=tuple(self._field_names),
+            rows=rows,
+            names=tuple(self._names),
+            display_names=tuple(self._display_names),
+            categories=tuple(self._categories),
+            category_ids=self._category_ids,
+            keywords=tuple(self._keywords),
+            prices=self._prices,
+            targets=self._targets,
+        )
+
+
+class _JsonStream:
+    """
+    Minimal incremental reader over a JSON text file.
+    Keeps only the unconsumed part of the current chunk in memory.
+    """
+
+    _WHITESPACE = " \t\n\r"
+
+    def __init__(self, f, chunk_size: int):
+        self._file = f
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self, size: int) -> bool:
+        """Read more text, dropping the consumed prefix. Returns False at end of file."""
+        if self._eof:
+            return False
+        chunk = self._file.read(size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character without consuming it ('' at end)"""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in self._WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill(self._chunk_size):
+                return ""
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f"Invalid products JSON: expected '{char}' at offset {self._pos}")
+        self._pos += 1
+
+    def value(self) -> Any:
+        """Decode the next complete JSON value, reading more chunks as needed"""
+        self.peek()
+        read_size = self._chunk_size
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+                # A number cut by the chunk boundary would decode "successfully"
+                if end < len(self._buffer) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            if not self._fill(read_size):
+                continue
+            # Values larger than a chunk: grow reads instead of re-parsing many times
+            read_size *= 2
+
+
+def _iter_array(stream: _JsonStream) -> Iterator[Any]:
+    stream.expect("[")
+    if stream.peek() == "]":
+        stream.expect("]")
+        return
+    while True:
+        yield stream.value()
+        if stream.peek() == ",":
+            stream.expect(",")
+            continue
+        stream.expect("]")
+        return
+
+
+def iter_json_products(path: str, chunk_size: int = 64 * 1024) -> Iterator[Dict]:
+    """
+    Stream products from a products.json file without loading the document.
+    Supports both formats:
+    1. {"products": [...]} (old Samsung format)
+    2. [{...}, {...}] (new project format from Excel)
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        stream = _JsonStream(f, chunk_size)
+        first = stream.peek()
+
+        if first == "[":
+            yield from _iter_array(stream)
+            return
+
+        if first != "{":
+            return
+
+        # Object format: stream the "products" array, skip other (small) values
+        stream.expect("{")
+        if stream.peek() == "}":
+            return
+        while True:
+            key = stream.value()
+            stream.expect(":")
+            if key == "products" and stream.peek() == "[":
+                yield from _iter_array(stream)
+            else:
+                stream.value()
+            if stream.peek() == ",":
+                stream.expect(",")
+                continue
+            stream.expect("}")
+            return
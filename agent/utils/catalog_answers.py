@@ -0,0 +1,263 @@
+"""
+Catalog fast path for Voyaltis Agent
+Answers rep questions about price, characteristics, margin or category from a
+precomputed per-project index, so the LLM gets a short verified snippet instead
+of having to search the whole catalog
+"""
+import math
+import re
+import time
+import unicodedata
+import weakref
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from utils.catalog import MISSING, ProductCatalog
+
+# Question intents, checked in this order on the accent-free lowercase text
+INTENT_PATTERNS = [
+    ("margin", re.compile(r"\bmarges?\b")),
+    ("price", re.compile(r"\b(prix|coute|coutent|tarifs?|combien (ca|il|elle|ils|elles) (coute|vaut|valent)|vaut|valent)\b")),
+    ("category", re.compile(r"\b(categorie|gamme|famille|quel type|quelle sorte)\b")),
+    ("characteristics", re.compile(r"\b(caracteristiques?|specificites?|specs?|details?|description|contenance|rendement|finition|c'est quoi|ca fait quoi)\b")),
+]
+
+# Interrogative markers, for questions transcribed without "?"
+QUESTION_PATTERN = re.compile(r"\?|\b(c'est quoi|combien|quel|quelle|quels|quelles|est-ce que)\b")
+
+STOPWORDS = frozenset("""
+a au aux avec ce ces c cest d de des du elle en est et il j je l la le les leur lui ma mais me
+mes moi mon ne nous on ou par pas pour qu que qui sa se ses son sur ta te tes toi ton tu un une
+vos votre vous y deja quoi quel quelle quels quelles combien prix cout coute tarif marge gamme
+categorie caracteristiques produit produits bien alors donc oui non ca cela dit vendu vendus
+""".split())
+
+# Excel fields holding characteristics / margin
+CHARACTERISTICS_FIELD_PATTERN = re.compile(r"^(caract|descript|spec|détail|detail)", re.IGNORECASE)
+MARGIN_FIELD_PATTERN = re.compile(r"^(marge|margin)", re.IGNORECASE)
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase and strip accents ("Catégorie" -> "categorie")"""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).replace("’", "'")
+
+
+def tokenize(text: str) -> List[str]:
+    """Accent-free word tokens without stopwords, with naive plural folding"""
+    tokens = []
+    for token in re.findall(r"[a-z0-9]+", normalize_text(text)):
+        if token in STOPWORDS or len(token) < 2:
+            continue
+        if len(token) > 3 and token[-1] in "sx" and not token[-2].isdigit():
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def _format_price(price: float) -> str:
+    if price == int(price):
+        return f"{int(price)}€"
+    return f"{price:.2f}".replace(".", ",") + "€"
+
+
+def _format_margin(value) -> str:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        # Excel exports margins either as ratios (0.42) or percentages (42)
+        percent = value * 100 if value <= 1 else value
+        return f"{percent:g}%"
+    return str(value)
+
+
+@dataclass
+class CatalogAnswer:
+    """A verified catalog answer for one rep question"""
+    intent: str
+    product: str
+    text: str
+
+    def context_snippet(self) -> str:
+        """Short context block injected in place of the full catalog"""
+        return f"RÉPONSE CATALOGUE VÉRIFIÉE pour la question de l'utilisateur :\n- {self.text}"
+
+
+@dataclass
+class FastPathStats:
+    """How often the fast path fires and what it saves, for one session"""
+    lookups: int = 0
+    hits: int = 0
+    hits_by_intent: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    lookup_seconds: float = 0.0
+    prompt_chars_saved: int = 0
+    llm_seconds_fast: List[float] = field(default_factory=list)
+    llm_seconds_full: List[float] = field(default_factory=list)
+
+    def record_lookup(self, answer: Optional[CatalogAnswer], seconds: float):
+        self.lookups += 1
+        self.lookup_seconds += seconds
+        if answer:
+            self.hits += 1
+            self.hits_by_intent[answer.intent] += 1
+
+    def record_llm_call(self, seconds: float, fast_path: bool, prompt_chars_saved: int = 0):
+        """
+        Record the time to first token of an LLM call, with or without the full catalog
+        in the prompt (the prompt size weighs on the first token, not on the generation)
+        """
+        if fast_path:
+            self.llm_seconds_fast.append(seconds)
+            self.prompt_chars_saved += prompt_chars_saved
+        else:
+            self.llm_seconds_full.append(seconds)
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    def latency_saved_seconds(self) -> Optional[float]:
+        """
+        Estimated LLM latency saved: (mean full-catalog TTFT - mean fast-path TTFT) x fast calls.
+        None until both kinds of calls have been observed.
+        """
+        if not self.llm_seconds_fast or not self.llm_seconds_full:
+            return None
+        mean_fast = sum(self.llm_seconds_fast) / len(self.llm_seconds_fast)
+        mean_full = sum(self.llm_seconds_full) / len(self.llm_seconds_full)
+        return (mean_full - mean_fast) * len(self.llm_seconds_fast)
+
+    def summary(self) -> Dict:
+        saved = self.latency_saved_seconds()
+        return {
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": round(self.hit_rate, 3),
+            "hits_by_intent": dict(self.hits_by_intent),
+            "lookup_ms_total": round(self.lookup_seconds * 1000, 2),
+            "prompt_chars_saved": self.prompt_chars_saved,
+            "latency_saved_s": round(saved, 3) if saved is not None else None,
+        }
+
+
+def fast_path_instructions(instructions: str, products_info: Optional[str], products_summary: Optional[str]) -> Optional[str]:
+    """
+    Instructions of a voice fast path turn: the one-line-per-product summary in place of
+    the full catalog (the verified answer comes as a turn snippet). None when it would
+    not be shorter.
+    """
+    if not products_info or not products_summary or len(products_summary) >= len(products_info):
+        return None
+    if products_info not in instructions:
+        return None
+    return instructions.replace(products_info, products_summary, 1)
+
+
+class CatalogAnswerIndex:
+    """
+    Precomputed per-catalog index answering price / characteristics / margin / category questions.
+    Use CatalogAnswerIndex.for_config(config_loader) to share one index per catalog.
+    The index only holds a weak reference to its catalog (the key of the shared
+    instances), so the catalog and its index are released together.
+    """
+
+    _instances: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+    def __init__(self, config_loader):
+        catalog: ProductCatalog = config_loader.catalog
+        self._catalog_ref = weakref.ref(catalog)
+
+        # Inverted index: token -> product indexes (label, name and keywords)
+        postings: Dict[str, set] = defaultdict(set)
+        for i in range(len(catalog)):
+            text = " ".join((catalog.labels[i], catalog.names[i].replace("-", " "), " ".join(catalog.keywords[i])))
+            for token in tokenize(text):
+                postings[token].add(i)
+        self._postings = {token: tuple(indexes) for token, indexes in postings.items()}
+        count = max(len(catalog), 1)
+        self._idf = {token: math.log(1 + count / len(indexes)) for token, indexes in self._postings.items()}
+
+        # Which raw Excel columns hold characteristics and margin
+        self._characteristics_fields = [f for f in catalog.field_names if CHARACTERISTICS_FIELD_PATTERN.match(f)]
+        self._margin_fields = [f for f in catalog.field_names if MARGIN_FIELD_PATTERN.match(f)]
+
+    @property
+    def catalog(self) -> ProductCatalog:
+        return self._catalog_ref()
+
+    @classmethod
+    def for_config(cls, config_loader) -> "CatalogAnswerIndex":
+        """Return the shared index of a loader's catalog, building it on first use"""
+        index = cls._instances.get(config_loader.catalog)
+        if index is None:
+            index = cls(config_loader)
+            cls._instances[config_loader.catalog] = index
+        return index
+
+    def find_product(self, text: str) -> Optional[int]:
+        """Return the single product best matching the text, or None if absent or ambiguous"""
+        scores: Dict[int, float] = defaultdict(float)
+        for token in set(tokenize(text)):
+            for i in self._postings.get(token, ()):
+                scores[i] += self._idf[token]
+        if not scores:
+            return None
+
+        ranked: List[Tuple[float, int]] = sorted(((score, i) for i, score in scores.items()), reverse=True)
+        if len(ranked) > 1 and ranked[0][0] - ranked[1][0] < 1e-9:
+            return None  # Ambiguous: let the LLM ask which product
+        return ranked[0][1]
+
+    def detect_intent(self, text: str) -> Optional[str]:
+        normalized = normalize_text(text)
+        if not QUESTION_PATTERN.search(normalized):
+            return None
+        for intent, pattern in INTENT_PATTERNS:
+            if pattern.search(normalized):
+                return intent
+        return None
+
+    def answer(self, text: str) -> Optional[CatalogAnswer]:
+        """Answer a rep question from the catalog, or None to let the LLM handle it"""
+        intent = self.detect_intent(text)
+        if intent is None:
+            return None
+        index = self.find_product(text)
+        if index is None:
+            return None
+
+        catalog = self.catalog
+        label = catalog.labels[index]
+        record = catalog.record(index)
+
+        if intent == "price":
+            price = catalog.prices[index]
+            if not price:
+                return None
+            answer = f"{label} : prix {_format_price(price)}"
+        elif intent == "margin":
+            values = [record[f] for f in self._margin_fields if f in record]
+            if not values:
+                return None
+            answer = f"{label} : marge {_format_margin(values[0])}"
+        elif intent == "category":
+            category = catalog.category_of(index)
+            if not category:
+                return None
+            answer = f"{label} : catégorie {category}"
+        else:
+            values = [str(record[f]) for f in self._characteristics_fields if record.get(f, MISSING) not in (MISSING, None, "")]
+            if not values:
+                return None
+            answer = f"{label} : {'; '.join(values)}"
+            price = catalog.prices[index]
+            if price:
+                answer += f" (prix {_format_price(price)})"
+
+        return CatalogAnswer(intent=intent, product=label, text=answer)
+
+    def timed_answer(self, text: str, stats: FastPathStats) -> Optional[CatalogAnswer]:
+        """answer() with the lookup recorded in the session stats"""
+        started = time.perf_counter()
+        result = self.answer(text)
+        stats.record_lookup(result, time.perf_counter() - started)
+        return result
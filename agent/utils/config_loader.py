@@ -4,44 +4,65 @@ Loads products and client configuration dynamically
 """
 import json
 import os
-import re
+import weakref
 from typing import Dict, List, Any, Optional
 
+from utils.catalog import MISSING, ProductCatalog, find_price_field, normalize_product_field
+from utils.shared_catalog import attach_catalog
+
+# Compiled catalogs shared by every loader of the same unchanged file,
+# kept alive only as long as one session still uses them
+_catalog_cache: "weakref.WeakValueDictionary" = weakref.WeakValueDictionary()
+
 
 class ConfigLoader:
     def __init__(self, products_file: str = "config/products.json", client_config_file: str = "config/client_config.json"):
         self.products_file = products_file
         self.client_config_file = client_config_file
-        self.products = []
+        self.catalog = ProductCatalog.from_records([])
         self.client_config = {}
         self.load_products()
         self.load_client_config()
 
+    @property
+    def products(self) -> ProductCatalog:
+        """
+        Products as a read-only sequence of mapping views over the shared catalog.
+        Kept for callers written against the former list of raw dicts.
+        """
+        return self.catalog
+
     def load_products(self):
         """Load products from JSON file"""
         if not os.path.exists(self.products_file):
             raise FileNotFoundError(f"Products file not found: {self.products_file}")
 
-        with open(self.products_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        stat = os.stat(self.products_file)
+        cache_key = (os.path.abspath(self.products_file), stat.st_mtime_ns, stat.st_size)
+        catalog = _catalog_cache.get(cache_key)
+        if catalog is None:
+            # Prefer the read-only copy published in shared memory by the worker
+            catalog = attach_catalog(self.products_file) or self._compile_catalog()
+            _catalog_cache[cache_key] = catalog
+        self.catalog = catalog
 
+        print(f"✅ Loaded {len(self.catalog)} products from {self.products_file}")
+
+    def _compile_catalog(self) -> ProductCatalog:
+        """
+        Stream the products file into a ProductCatalog.
+        Products are compiled one by one, the raw JSON document is never materialized.
+        """
         # Load products from JSON structure
         # Support both formats:
         # 1. {"products": [...]} (old Samsung format)
         # 2. [{...}, {...}] (new project format from Excel)
-        if isinstance(data, list):
-            # Direct array format (from project Excel upload)
-            self.products = data
-        elif isinstance(data, dict):
-            # Object with "products" key (old format)
-            self.products = data.get("products", [])
-        else:
-            self.products = []
-
-        if not self.products:
+        catalog = ProductCatalog.from_file(self.products_file)
+
+        if not len(catalog):
             raise ValueError("No products found in JSON file")
 
-        print(f"✅ Loaded {len(self.products)} products from {self.products_file}")
+        return catalog
 
     def load_client_config(self):
         """Load client-specific configuration"""
@@ -88,76 +109,14 @@ class ConfigLoader:
 
         Returns the price value or 0 if not found
         """
-        # Pattern: starts with "prix" or "price" (case insensitive)
-        # May contain parentheses with currency/unit info
-        # Must NOT be followed by certain keywords that indicate wrong field
-
-        for field_name, field_value in product.items():
-            field_lower = field_name.lower()
-
-            # Check if it starts with "prix" or "price"
-            if not (field_lower.startswith("prix") or field_lower.startswith("price")):
-                continue
-
-            # Exclude false positives
-            exclude_patterns = [
-                r"au\s+(kilo|litre|kg|l\b)",  # "au kilo", "au litre"
-                r"de\s+(gros|détail)",         # "de gros", "de détail"
-                r"achat",                       # "prix achat"
-                r"revient",                     # "prix de revient"
-            ]
-
-            # Check if this field should be excluded
-            is_excluded = any(re.search(pattern, field_lower) for pattern in exclude_patterns)
-            if is_excluded:
-                continue
-
-            # This looks like the right price field!
-            # Try to extract numeric value
-            if isinstance(field_value, (int, float)):
-                return float(field_value)
-            elif isinstance(field_value, str):
-                # Try to parse string as number
-                try:
-                    return float(field_value)
-                except ValueError:
-                    continue
-
-        # No price field found
-        return 0.0
+        return find_price_field(product)
 
     def _normalize_product_field(self, product: Dict, field: str) -> Any:
         """
         Normalize product field names to handle different formats
         Maps Excel format (Nom, Catégorie, etc.) to standard format
         """
-        # Special handling for price field - use intelligent detection
-        if field == "price":
-            return self._find_price_field(product)
-
-        field_mappings = {
-            "name": ["name", "Nom", "nom"],
-            "display_name": ["display_name", "Nom d'affichage", "display name"],
-            "category": ["category", "Catégorie", "catégorie"],
-            "keywords": ["keywords", "Mots-clés", "mots-clés"],
-            "target_quantity": ["target_quantity", "Objectif", "objectif", "target"],
-        }
-
-        # Get possible field names for this field
-        possible_names = field_mappings.get(field, [field])
-
-        # Try each possible field name
-        for name in possible_names:
-            if name in product:
-                return product[name]
-
-        # Return default values based on field type
-        if field in ["keywords"]:
-            return []
-        elif field in ["target_quantity"]:
-            return 0
-        else:
-            return ""
+        return normalize_product_field(product, field)
 
     def get_products_list_for_prompt(self) -> str:
         """
@@ -173,6 +132,10 @@ class ConfigLoader:
         2. Samsung QLED Vision 8K (Téléviseur)
            ...
         """
+        catalog = self.catalog
+        if catalog.prompt_text is not None:
+            return catalog.prompt_text
+
         lines = []
 
         # Define standard fields that always get formatted specially
@@ -184,36 +147,37 @@ class ConfigLoader:
             "keywords", "Mots-clés", "mots-clés"
         }
 
-        for i, product in enumerate(self.products, 1):
-            name = self._normalize_product_field(product, "display_name") or self._normalize_product_field(product, "name")
-            category = self._normalize_product_field(product, "category")
-            keywords = self._normalize_product_field(product, "keywords")
+        # Resolve once which columns are displayed and how their label reads
+        extra_columns = [
+            (position, field_name.replace('_', ' ').title())
+            for position, field_name in enumerate(catalog.field_names)
+            if field_name not in standard_fields
+        ]
+
+        for i in range(len(catalog)):
+            name = catalog.labels[i]
+            category = catalog.category_of(i)
+            keywords = catalog.keywords[i]
 
             # Header line with name and category
-            lines.append(f"{i}. {name}" + (f" ({category})" if category else ""))
+            lines.append(f"{i + 1}. {name}" + (f" ({category})" if category else ""))
 
             # Keywords line
             if keywords:
                 lines.append(f"   - Mots-clés : {', '.join(keywords[:8])}...")
 
             # Add ALL other fields from the product (excluding standard fields)
-            for field_name, field_value in product.items():
-                # Skip standard fields already displayed
-                if field_name in standard_fields:
-                    continue
+            row = catalog.rows[i]
+            for position, display_name in extra_columns:
+                field_value = row[position]
 
-                # Skip empty values
-                if field_value is None or field_value == "" or field_value == []:
+                # Skip missing and empty values
+                if field_value is MISSING or field_value is None or field_value == "" or field_value == ():
                     continue
 
-                # Format the field nicely
-                display_name = field_name.replace('_', ' ').title()
-
                 # Format value based on type
-                if isinstance(field_value, list):
+                if isinstance(field_value, tuple):
                     formatted_value = ', '.join(str(v) for v in field_value)
-                elif isinstance(field_value, (int, float)):
-                    formatted_value = str(field_value)
                 else:
                     formatted_value = str(field_value)
 
@@ -221,22 +185,21 @@ class ConfigLoader:
 
             lines.append("")  # Empty line between products
 
-        return "\n".join(lines)
+        # The catalog is immutable, so the rendered text is cached on it and
+        # shared by every session using this project
+        catalog.prompt_text = "\n".join(lines)
+        return catalog.prompt_text
 
     def get_products_count(self) -> int:
         """Return number of products"""
-        return len(self.products)
+        return len(self.catalog)
 
     def get_empty_sales_dict(self) -> Dict[str, int]:
         """
         Generate empty sales dict for JSON structure
         Returns: {"Samsung Galaxy Z Nova": 0, "Samsung QLED Vision 8K": 0, ...}
         """
-        sales = {}
-        for product in self.products:
-            name = self._normalize_product_field(product, "display_name") or self._normalize_product_field(product, "name")
-            sales[name] = 0
-        return sales
+        return dict.fromkeys(self.catalog.labels, 0)
 
     def get_mapping_examples(self) -> str:
         """
@@ -246,13 +209,12 @@ class ConfigLoader:
         examples = ["EXEMPLES DE MAPPING CORRECTS :"]
 
         # Generate examples dynamically from first few products
-        for i, product in enumerate(self.products[:5]):  # First 5 products
-            name = self._normalize_product_field(product, "display_name") or self._normalize_product_field(product, "name")
-            keywords = self._normalize_product_field(product, "keywords")
-            category = self._normalize_product_field(product, "category")
+        for i in range(min(5, len(self.catalog))):  # First 5 products
+            name = self.catalog.labels[i]
+            keywords = self.catalog.keywords[i]
 
             # Pick first 2 keywords as examples
-            if keywords and len(keywords) >= 2:
+            if len(keywords) >= 2:
                 keyword1 = keywords[0]
                 keyword2 = keywords[1]
                 examples.append(f'- "J\'ai vendu 3 {keyword1}s" → {{"{name}": 3}}')
@@ -260,24 +222,40 @@ class ConfigLoader:
 
         return "\n".join(examples)
 
+    def get_products_summary_for_prompt(self) -> str:
+        """
+        One line per product ("1. Glycéro Satin Blanc (Peinture boiseries) - 35€"), for
+        catalogs too large for the full list; details come from the document index per turn
+        """
+        catalog = self.catalog
+        lines = []
+        for i, label in enumerate(catalog.labels):
+            category = catalog.category_of(i)
+            line = f"{i + 1}. {label} ({category})" if category else f"{i + 1}. {label}"
+            if catalog.prices[i]:
+                line += f" - {catalog.prices[i]:g}€"
+            lines.append(line)
+        return "\n".join(lines)
+
     def get_product_names_list(self) -> List[str]:
         """Return list of all product display names"""
-        return [
-            self._normalize_product_field(product, "display_name") or self._normalize_product_field(product, "name")
-            for product in self.products
-        ]
+        return list(self.catalog.labels)
 
     def get_products_for_analyzer(self) -> List[Dict]:
-        """Return products list formatted for SalesAnalyzer"""
-        formatted = []
-        for product in self.products:
-            formatted.append({
-                "nom": self._normalize_product_field(product, "display_name") or self._normalize_product_field(product, "name"),
-                "catégorie": self._normalize_product_field(product, "category"),
-                "objectifs": self._normalize_product_field(product, "target_quantity"),
-                "keywords": self._normalize_product_field(product, "keywords")
-            })
-        return formatted
+        """
+        Return products list formatted for SalesAnalyzer
+        SalesAnalyzer reads self.catalog directly; this copy is kept for external callers.
+        """
+        catalog = self.catalog
+        return [
+            {
+                "nom": catalog.labels[i],
+                "catégorie": catalog.category_of(i),
+                "objectifs": catalog.targets[i],
+                "keywords": list(catalog.keywords[i])
+            }
+            for i in range(len(catalog))
+        ]
 
     def get_brand_name(self) -> str:
         """Get brand name from client config"""
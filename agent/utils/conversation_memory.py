@@ -0,0 +1,216 @@
+"""
+Rolling conversation memory for Voyaltis Agent
+The LLM no longer receives the whole history every turn: the most recent messages stay
+verbatim, older ones are folded into a structured summary of the facts already
+collected (one line per answer: products, quantities, prices, client feedback...).
+Summary + recent messages stay under a token budget, so the prompt of a long weekly or
+monthly debrief does not grow with every follow-up.
+
+Compaction runs in the background once the history exceeds the budget (an LLM summary,
+or the extractive summary below). Until it completes, the overflow is folded
+extractively when the prompt is built, so the budget always holds. The report is still
+generated from the full conversation.
+
+Configuration (environment, the budget overridden per project by
+settings.historyTokenBudget in config.json):
+    VOYALTIS_HISTORY_TOKEN_BUDGET     summary + verbatim messages, in tokens (default 1500)
+    VOYALTIS_HISTORY_KEEP_MESSAGES    messages kept verbatim after a compaction (default 6)
+    VOYALTIS_HISTORY_SUMMARIZER       "llm" (gpt-4o-mini) or "extractive" (default llm)
+"""
+import asyncio
+import logging
+import os
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from utils import metrics
+from utils.turn_cancellation import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+HISTORY_TOKEN_BUDGET = int(os.getenv("VOYALTIS_HISTORY_TOKEN_BUDGET", "1500"))
+KEEP_RECENT_MESSAGES = int(os.getenv("VOYALTIS_HISTORY_KEEP_MESSAGES", "6"))
+HISTORY_SUMMARIZER = os.getenv("VOYALTIS_HISTORY_SUMMARIZER", "llm").strip().lower()
+
+# Share of the budget for the summary, the rest for the verbatim messages
+SUMMARY_SHARE = 0.4
+# Per-message overhead (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_HEADER = "Résumé des échanges précédents (faits déjà recueillis, ne pas les redemander) :"
+SUMMARIZER_PROMPT = (
+    "Tu mets à jour le résumé d'un débrief commercial. Réponds uniquement par une liste à puces "
+    "des faits déjà recueillis auprès du commercial (produits, quantités, prix, clients, retours, "
+    "problèmes, actions), une ligne courte par fait. Conserve tous les chiffres exacts et les faits "
+    "du résumé actuel. N'inclus pas les questions de l'agent."
+)
+
+HISTORY_COMPACTIONS = metrics.REGISTRY.counter(
+    "voyaltis_history_compactions_total", "Conversation history compactions by summarizer (llm/extractive/fallback)", ("project", "summarizer")
+)
+HISTORY_PROMPT_TOKENS = metrics.REGISTRY.histogram(
+    "voyaltis_history_prompt_tokens", "Estimated tokens of the conversation history sent to the LLM",
+    buckets=(250, 500, 1000, 1500, 2000, 3000, 5000, 10000, 20000),
+)
+
+Message = Dict[str, str]
+Summarizer = Callable[[str, List[Message], int], Awaitable[str]]
+
+
+def history_budget(project_config: Optional[dict]) -> int:
+    settings = (project_config or {}).get("settings", {}) or {}
+    return int(settings.get("historyTokenBudget", HISTORY_TOKEN_BUDGET))
+
+
+def message_tokens(messages: List[Message]) -> int:
+    return sum(estimate_tokens(len(m.get("content") or "")) + MESSAGE_OVERHEAD_TOKENS for m in messages)
+
+
+def _shorten(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    if len(text) <= limit:
+        return text
+    return text[:limit - 1].rsplit(" ", 1)[0] + "…"
+
+
+def extractive_summary(previous: str, messages: List[Message], max_tokens: int) -> str:
+    """
+    Previous summary lines + one line per user answer (with the question it answers),
+    shortened, then oldest lines dropped, to fit max_tokens
+    """
+    lines = [line for line in previous.splitlines() if line.strip()]
+    question = None
+    for message in messages:
+        content = " ".join((message.get("content") or "").split())
+        if not content:
+            continue
+        if message.get("role") == "assistant":
+            question = content
+        else:
+            lines.append(f"- {content} (question : {_shorten(question, 80)})" if question else f"- {content}")
+            question = None
+
+    limit = max_tokens * 4
+    for width in (240, 160, 100, 60):
+        shortened = [_shorten(line, width) for line in lines]
+        if len("\n".join(shortened)) <= limit:
+            return "\n".join(shortened)
+    while shortened and len("\n".join(shortened)) > limit:
+        shortened.pop(0)
+    return "\n".join(shortened)
+
+
+def openai_summarizer(model: str = "gpt-4o-mini", base_url: Optional[str] = None, project_id: str = "default") -> Summarizer:
+    """LLM summarizer: updates the summary with the compacted messages"""
+    from openai import AsyncOpenAI
+    client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), base_url=base_url)
+
+    async def summarize(previous: str, messages: List[Message], max_tokens: int) -> str:
+        transcript = "\n".join(
+            f"{'Commercial' if m['role'] == 'user' else 'Agent'} : {m['content']}" for m in messages if m.get("content")
+        )
+        response = await client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": SUMMARIZER_PROMPT},
+                {"role": "user", "content": f"Résumé actuel :\n{previous or '(vide)'}\n\nNouveaux échanges :\n{transcript}"},
+            ],
+            temperature=0,
+            max_tokens=max_tokens,
+        )
+        if response.usage:
+            metrics.record_llm_usage(project_id, model, response.usage.prompt_tokens, response.usage.completion_tokens)
+        return (response.choices[0].message.content or "").strip()
+
+    return summarize
+
+
+def summary_messages(summary: str) -> List[Message]:
+    """The summary as a system message (none while empty)"""
+    return [{"role": "system", "content": f"{SUMMARY_HEADER}\n{summary}"}] if summary else []
+
+
+class ConversationMemory:
+    """
+    Summary of the first `compacted` messages of a conversation, the rest verbatim.
+    Fed with the same growing message list every turn (one instance per history).
+    """
+
+    def __init__(self, budget_tokens: int = HISTORY_TOKEN_BUDGET, keep_recent: int = KEEP_RECENT_MESSAGES,
+                 summarizer: Optional[Summarizer] = None, project_id: str = "default"):
+        self.budget_tokens = budget_tokens
+        self.summary_tokens = int(budget_tokens * SUMMARY_SHARE)
+        self.keep_recent = keep_recent
+        self.summarizer = summarizer
+        self.project_id = project_id
+        self.summary = ""
+        self.compacted = 0
+        self.stats: Dict[str, int] = {"compactions": 0, "failures": 0}
+        self._task: Optional[asyncio.Task] = None
+
+    def _over_budget(self, summary: str, recent: List[Message]) -> bool:
+        return message_tokens(summary_messages(summary) + recent) > self.budget_tokens
+
+    def window(self, messages: List[Message]) -> Tuple[str, int]:
+        """(summary, index of the first verbatim message) for a prompt within the budget"""
+        if len(messages) < self.compacted:
+            # Another conversation: start over
+            self.summary, self.compacted = "", 0
+        summary, start = self.summary, self.compacted
+        if self._over_budget(summary, messages[start:]):
+            # Background compaction not done yet: fold the overflow extractively for this prompt
+            available = self.budget_tokens - self.summary_tokens
+            cut = len(messages) - 1  # The last message always stays verbatim
+            while cut > start and message_tokens(messages[cut - 1:]) <= available:
+                cut -= 1
+            summary = extractive_summary(summary, messages[start:cut], self.summary_tokens)
+            start = cut
+        return summary, start
+
+    def prompt_messages(self, messages: List[Message]) -> List[Message]:
+        """Summary (as a system message) and the recent messages, verbatim"""
+        summary, start = self.window(messages)
+        prompt = summary_messages(summary) + list(messages[start:])
+        HISTORY_PROMPT_TOKENS.observe(message_tokens(prompt))
+        return prompt
+
+    def update(self, messages: List[Message]):
+        """After a turn: compact in the background once the history exceeds the budget"""
+        if self._task and not self._task.done():
+            return
+        if len(messages) < self.compacted:
+            self.summary, self.compacted = "", 0
+        if not self._over_budget(self.summary, messages[self.compacted:]):
+            return
+        cut = len(messages) - self.keep_recent
+        if cut <= self.compacted:
+            return
+        self._task = asyncio.ensure_future(self._compact(self.summary, list(messages[self.compacted:cut]), cut))
+
+    async def _compact(self, previous: str, messages: List[Message], cut: int):
+        kind = "llm" if self.summarizer else "extractive"
+        try:
+            if self.summarizer:
+                summary = await self.summarizer(previous, messages, self.summary_tokens)
+            else:
+                summary = extractive_summary(previous, messages, self.summary_tokens)
+        except Exception as e:
+            logger.warning(f"⚠️ History summary failed, using the extractive summary: {e}")
+            self.stats["failures"] += 1
+            kind = "fallback"
+            summary = extractive_summary(previous, messages, self.summary_tokens)
+        # An LLM summary longer than its share is cut like the extractive one
+        self.summary = extractive_summary(summary, [], self.summary_tokens)
+        self.compacted = cut
+        self.stats["compactions"] += 1
+        HISTORY_COMPACTIONS.inc(project=self.project_id, summarizer=kind)
+        logger.info(f"🗜️ History compacted ({kind}): {cut} messages in ~{estimate_tokens(len(self.summary))} tokens")
+
+    async def wait(self):
+        """Wait for the compaction in progress, if any"""
+        if self._task:
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def close(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+        await self.wait()
@@ -0,0 +1,269 @@
+"""
+Conversation state machine for Voyaltis Agent
+Question counting and hybrid end-of-conversation detection, shared by the voice and
+text modes of the entrypoint and by the offline replay benchmark. No LiveKit here:
+the caller feeds messages and acts on the returned TurnOutcome (metrics, instruction
+updates, ending signal, report).
+
+End paths:
+    immediate    the agent said a final phrase ("je vais préparer ton rapport"), at any point
+    pattern      max questions reached, recap done, user replied, agent concludes
+    safety_net   max questions reached, recap done, user replied, agent replied anything
+    ultimate     too many exchanges after max questions
+"""
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+VOICE = "voice"
+TEXT = "text"
+
+# Phrases magiques qui déclenchent la fin IMMÉDIATE, quel que soit le nombre de questions
+IMMEDIATE_END_PATTERNS = [
+    "je vais préparer ton rapport",
+    "je vais préparer le rapport",
+    "je vais rédiger ton rapport",
+    "je vais rédiger le rapport",
+    "je prépare ton rapport",
+    "je prépare le rapport",
+    "je rédige ton rapport",
+    "je rédige le rapport"
+]
+
+# Phase de récap (dernière question de l'agent)
+RECAP_PATTERNS = [
+    "dernière information",
+    "dernière chose",
+    "dernière remarque",
+    "as-tu autre chose",
+    "autre chose",
+    "quelque chose à ajouter",
+    "un dernier mot",
+    "une dernière précision"
+]
+
+# Conclusion de l'agent après le récap
+END_PATTERNS = [
+    "préparer ton rapport",
+    "préparer le rapport",
+    "je vais générer",
+    "génération du rapport",
+    "rédiger ton rapport",
+    "rédiger le rapport",
+    "je m'y mets",
+    "je rédige"
+]
+
+# 3 full exchanges (agent+user pairs) after max questions
+MAX_EXCHANGES_AFTER_MAX = 6
+
+DEFAULT_ATTENTION_POINTS = [
+    {
+        "id": "default_sales",
+        "description": "Produits vendus",
+        "naturalPrompts": ["Comment s'est passée ta journée ? Qu'as-tu vendu ?"]
+    },
+    {
+        "id": "default_feedback",
+        "description": "Retours clients",
+        "naturalPrompts": ["Et au niveau des retours clients ?"]
+    }
+]
+
+
+def question_budget(attention_points: List[Dict]) -> Tuple[int, int, int]:
+    """
+    (base_questions, follow_up_buffer, max_questions) for the attention points
+    Formula: len(attention_points) + max(2, int(len(attention_points) * 0.5))
+    Example: 3 attention points → 3 + 2 = 5 questions
+             5 attention points → 5 + 2 = 7 questions
+    """
+    base_questions = len(attention_points)
+    follow_up_buffer = max(2, int(base_questions * 0.5))  # At least 2 follow-ups
+    return base_questions, follow_up_buffer, base_questions + follow_up_buffer
+
+
+def report_period(project_config: Optional[Dict]) -> Tuple[str, str]:
+    """(time_period, report_frequency) from the project report schedule"""
+    time_period = "aujourd'hui"  # Default: daily
+    report_frequency = "daily"
+    if not project_config:
+        return time_period, report_frequency
+
+    settings = project_config.get("settings", {})
+    report_frequency = settings.get("reportFrequency", "daily")
+    if settings.get("reportScheduleType", "fixed") == "fixed":
+        if report_frequency == "weekly":
+            time_period = "cette semaine"
+        elif report_frequency == "biweekly":
+            time_period = "ces deux dernières semaines"
+        elif report_frequency == "monthly":
+            time_period = "ce mois-ci"
+        # daily stays as "aujourd'hui"
+    else:  # per-appointment
+        time_period = "lors de cette visite"
+        report_frequency = "per-appointment"
+    return time_period, report_frequency
+
+
+def _first_match(text_lower: str, patterns: List[str]) -> Optional[str]:
+    for pattern in patterns:
+        if pattern in text_lower:
+            return pattern
+    return None
+
+
+@dataclass
+class TurnOutcome:
+    """What one message changed: question counted, and end path if the conversation ends"""
+    counted: bool = False
+    answered_user_question: bool = False
+    end_path: Optional[str] = None
+    matched_pattern: Optional[str] = None
+
+    @property
+    def should_end(self) -> bool:
+        return self.end_path is not None
+
+
+class ConversationState:
+    """Message history, question count and end detection of one session"""
+
+    def __init__(self, max_questions: int):
+        self.max_questions = max_questions
+        self.messages: List[Dict[str, str]] = []
+        self.questions_asked = 0
+        self.report_sent = False
+
+        # End-of-conversation tracking (hybrid system with safety nets)
+        self.recap_done = False  # Track if recap has been done
+        self.user_responded_after_recap = False  # User gave final input after recap
+        self.exchanges_after_max = 0  # Safety counter to prevent infinite loops
+
+    @property
+    def questions_remaining(self) -> int:
+        return self.max_questions - self.questions_asked
+
+    def add_message(self, role: str, content: str):
+        self.messages.append({"role": role, "content": content})
+
+    def conversation_text(self) -> str:
+        return "\n".join(f"{msg['role'].upper()}: {msg['content']}" for msg in self.messages)
+
+    def _previous_user_message(self) -> Optional[str]:
+        for i in range(len(self.messages) - 2, -1, -1):
+            if self.messages[i]["role"] == "user":
+                return self.messages[i]["content"]
+        return None
+
+    def _count_question(self, outcome: TurnOutcome, user_text: Optional[str]):
+        # Don't count if the agent is answering a user question (ends with "?")
+        if user_text and user_text.strip().endswith("?"):
+            outcome.answered_user_question = True
+            logger.info("💡 Agent answered user question - not counting (still at %d/%d)", self.questions_asked, self.max_questions, extra={"category": "questions"})
+            return
+        self.questions_asked += 1
+        outcome.counted = True
+        logger.info("📊 Questions: %d/%d", self.questions_asked, self.max_questions, extra={"category": "questions"})
+
+    def _check_immediate_end(self, outcome: TurnOutcome, text_lower: str) -> bool:
+        # CHEMIN 0 (PRIORITAIRE ABSOLU): phrase magique, vérifiée AVANT tout autre check
+        matched = _first_match(text_lower, IMMEDIATE_END_PATTERNS)
+        if not matched:
+            return False
+        self.report_sent = True  # Set immediately to prevent double processing
+        outcome.end_path = "immediate"
+        outcome.matched_pattern = matched
+        logger.info(f"🏁 IMMEDIATE END - agent said final phrase: '{matched}' (at question {self.questions_asked}/{self.max_questions})")
+        return True
+
+    def _check_recap_and_end(self, text_lower: str) -> Optional[str]:
+        # CHEMIN 1 (Idéal): Detect RECAP phase
+        is_recap = any(pattern in text_lower for pattern in RECAP_PATTERNS)
+        if is_recap and not self.recap_done:
+            self.recap_done = True
+            logger.info("📝 Recap detected - waiting for user's final input")
+            return None
+
+        if self.user_responded_after_recap:
+            # CHEMIN 2 (Patterns): After recap + user responded + conclusion patterns
+            if any(pattern in text_lower for pattern in END_PATTERNS):
+                logger.info("🏁 End detected (Pattern match) - recap + user replied + conclusion")
+                return "pattern"
+            # CHEMIN 3 (Safety net): User responded after recap, agent replied again
+            logger.info("🏁 End detected (Safety net) - user responded after recap + agent replied")
+            return "safety_net"
+        return None
+
+    def _check_ultimate(self, end_path: Optional[str]) -> Optional[str]:
+        # CHEMIN 4 (Ultimate safety): Too many exchanges after max
+        if self.exchanges_after_max >= MAX_EXCHANGES_AFTER_MAX:
+            logger.info("🏁 SAFETY END - too many exchanges after max questions")
+            return end_path or "ultimate"
+        return end_path
+
+    def _finish(self, outcome: TurnOutcome, end_path: Optional[str]) -> TurnOutcome:
+        if end_path and not self.report_sent:
+            self.report_sent = True
+            outcome.end_path = end_path
+        return outcome
+
+    def on_voice_item(self, role: str, content: str) -> TurnOutcome:
+        """
+        Voice mode: one conversation item (user transcription or agent speech).
+        The opening message is not counted, nor answers to a user question.
+        """
+        self.add_message(role, content)
+        outcome = TurnOutcome()
+
+        if role == "assistant" and len(self.messages) > 2:
+            self._count_question(outcome, self._previous_user_message())
+
+        if role == "assistant" and self._check_immediate_end(outcome, content.lower()):
+            return outcome
+
+        end_path = None
+        if self.questions_asked >= self.max_questions:
+            # Track exchanges for safety net
+            if role == "user":
+                self.exchanges_after_max += 1
+                if self.recap_done:
+                    self.user_responded_after_recap = True
+                    logger.info("📝 User responded after recap")
+
+            if role == "assistant":
+                logger.debug("🔍 questions_asked=%d, max_questions=%d", self.questions_asked, self.max_questions, extra={"category": "end_detection"})
+                end_path = self._check_recap_and_end(content.lower())
+
+            end_path = self._check_ultimate(end_path)
+
+        return self._finish(outcome, end_path)
+
+    def on_text_reply(self, user_text: str, assistant_text: str) -> TurnOutcome:
+        """
+        Text mode: the agent replied to user_text (already added with add_message).
+        One exchange per reply: the user side of the exchange is tracked here too.
+        """
+        self.add_message("assistant", assistant_text)
+        outcome = TurnOutcome()
+
+        if len(self.messages) > 2:
+            self._count_question(outcome, user_text)
+
+        text_lower = assistant_text.lower()
+        if self._check_immediate_end(outcome, text_lower):
+            return outcome
+
+        end_path = None
+        if self.questions_asked >= self.max_questions:
+            # Track that user sent a message after max
+            self.exchanges_after_max += 1
+            if self.recap_done:
+                self.user_responded_after_recap = True
+                logger.info("📝 User responded after recap (text mode)")
+
+            end_path = self._check_ultimate(self._check_recap_and_end(text_lower))
+
+        return self._finish(outcome, end_path)
@@ -0,0 +1,470 @@
+"""
+Project document index for Voyaltis Agent
+Offline BM25 index over a project's documents/ folder and catalog text, persisted
+under data/projects/{project_id}/index/ and queried per turn so the LLM only
+receives the few passages relevant to what the rep just said. Sessions only load it;
+build it at deploy time (a missing or stale index is otherwise rebuilt in the
+background by the first session, which uses the full catalog meanwhile).
+
+Build from agent/:
+    python -m utils.document_index build perrot
+    python -m utils.document_index build --all
+    python -m utils.document_index query perrot "rendement glycéro"
+"""
+import argparse
+import csv
+import json
+import logging
+import math
+import os
+import posixpath
+import re
+import time
+import weakref
+import zipfile
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+from xml.etree import ElementTree
+
+from utils.catalog import iter_json_products, normalize_product_field
+from utils.catalog_answers import tokenize
+
+logger = logging.getLogger(__name__)
+
+INDEX_FORMAT_VERSION = 1
+INDEX_DIRNAME = "index"
+INDEX_FILENAME = "documents.json"
+DOCUMENT_EXTENSIONS = (".xlsx", ".docx", ".csv", ".txt", ".md")
+
+# BM25 parameters (standard Okapi defaults)
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Free-text documents are cut into passages of about this many characters
+PASSAGE_MAX_CHARS = 600
+
+_XLSX_NS = {
+    "main": "http://schemas.openxmlformats.org/spreadsheetml/2006/main",
+    "rel": "http://schemas.openxmlformats.org/package/2006/relationships",
+}
+_XLSX_DOC_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+_DOCX_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_CELL_REF_PATTERN = re.compile(r"([A-Z]+)")
+
+# Loaded indexes shared by every session of the same unchanged index file
+_index_cache: "weakref.WeakValueDictionary" = weakref.WeakValueDictionary()
+
+
+@dataclass
+class Passage:
+    """One retrievable chunk of a project document"""
+    source: str
+    text: str
+    score: float = 0.0
+
+
+# ==================================================================================
+# Document extraction
+# ==================================================================================
+
+def _column_index(cell_ref: str) -> int:
+    letters = _CELL_REF_PATTERN.match(cell_ref).group(1)
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - ord("A") + 1
+    return index - 1
+
+
+def _format_cell(value: str) -> str:
+    try:
+        number = float(value)
+    except ValueError:
+        return value
+    return f"{number:g}"
+
+
+def _xlsx_shared_strings(archive: zipfile.ZipFile) -> List[str]:
+    if "xl/sharedStrings.xml" not in archive.namelist():
+        return []
+    root = ElementTree.fromstring(archive.read("xl/sharedStrings.xml"))
+    return [
+        "".join(t.text or "" for t in si.iter(f"{{{_XLSX_NS['main']}}}t"))
+        for si in root.findall("main:si", _XLSX_NS)
+    ]
+
+
+def _xlsx_sheets(archive: zipfile.ZipFile) -> List[Tuple[str, str]]:
+    """(sheet name, archive path) for every worksheet, in workbook order"""
+    workbook = ElementTree.fromstring(archive.read("xl/workbook.xml"))
+    rels = ElementTree.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+    targets = {rel.get("Id"): rel.get("Target") for rel in rels.findall("rel:Relationship", _XLSX_NS)}
+
+    sheets = []
+    for sheet in workbook.iterfind("main:sheets/main:sheet", _XLSX_NS):
+        target = targets.get(sheet.get(_XLSX_DOC_REL), "")
+        path = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join("xl", target))
+        if path in archive.namelist():
+            sheets.append((sheet.get("name"), path))
+    return sheets
+
+
+def _xlsx_rows(archive: zipfile.ZipFile, sheet_path: str, shared_strings: List[str]) -> Iterator[List[str]]:
+    main = f"{{{_XLSX_NS['main']}}}"
+    root = ElementTree.fromstring(archive.read(sheet_path))
+    for row in root.iter(f"{main}row"):
+        values: Dict[int, str] = {}
+        for cell in row.iter(f"{main}c"):
+            cell_type = cell.get("t")
+            if cell_type == "inlineStr":
+                value = "".join(t.text or "" for t in cell.iter(f"{main}t"))
+            else:
+                raw = cell.findtext(f"{main}v")
+                if raw is None:
+                    continue
+                if cell_type == "s":
+                    value = shared_strings[int(raw)]
+                elif cell_type == "b":
+                    value = "oui" if raw == "1" else "non"
+                elif cell_type in ("str", "e"):
+                    value = raw
+                else:
+                    value = _format_cell(raw)
+            value = value.strip()
+            if value:
+                values[_column_index(cell.get("r", "A"))] = value
+        if values:
+            yield [values.get(i, "") for i in range(max(values) + 1)]
+
+
+def _table_passages(rows: Iterator[List[str]], source: str) -> Iterator[Passage]:
+    """First row is the header, every other row becomes a "Header: value; ..." passage"""
+    headers = None
+    for row in rows:
+        if headers is None:
+            headers = row
+            continue
+        parts = []
+        for i, value in enumerate(row):
+            if not value:
+                continue
+            header = headers[i] if i < len(headers) and headers[i] else ""
+            parts.append(f"{header}: {value}" if header else value)
+        if parts:
+            yield Passage(source=source, text="; ".join(parts))
+
+
+def _text_passages(paragraphs: Iterator[str], source: str) -> Iterator[Passage]:
+    """Group consecutive paragraphs into passages of at most PASSAGE_MAX_CHARS"""
+    chunk: List[str] = []
+    size = 0
+    for paragraph in paragraphs:
+        paragraph = " ".join(paragraph.split())
+        if not paragraph:
+            continue
+        if chunk and size + len(paragraph) > PASSAGE_MAX_CHARS:
+            yield Passage(source=source, text=" ".join(chunk))
+            chunk, size = [], 0
+        chunk.append(paragraph)
+        size += len(paragraph) + 1
+    if chunk:
+        yield Passage(source=source, text=" ".join(chunk))
+
+
+def _display_name(filename: str) -> str:
+    # Uploaded files are prefixed by a millisecond timestamp ("1761668435251-Peintur_Produit.xlsx")
+    return re.sub(r"^\d{10,}-", "", filename)
+
+
+def extract_passages(path: str) -> List[Passage]:
+    """Extract passages from one document, by file extension"""
+    filename = os.path.basename(path)
+    source = _display_name(filename)
+    extension = os.path.splitext(filename)[1].lower()
+
+    if extension == ".xlsx":
+        with zipfile.ZipFile(path) as archive:
+            shared_strings = _xlsx_shared_strings(archive)
+            passages = []
+            for sheet_name, sheet_path in _xlsx_sheets(archive):
+                rows = _xlsx_rows(archive, sheet_path, shared_strings)
+                passages.extend(_table_passages(rows, f"{source} › {sheet_name}"))
+            return passages
+
+    if extension == ".docx":
+        with zipfile.ZipFile(path) as archive:
+            root = ElementTree.fromstring(archive.read("word/document.xml"))
+        paragraphs = (
+            "".join(t.text or "" for t in paragraph.iter(f"{_DOCX_NS}t"))
+            for paragraph in root.iter(f"{_DOCX_NS}p")
+        )
+        return list(_text_passages(paragraphs, source))
+
+    if extension == ".csv":
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            sample = f.read(4096)
+            f.seek(0)
+            try:
+                dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+            except csv.Error:
+                dialect = csv.excel
+            rows = ([value.strip() for value in row] for row in csv.reader(f, dialect))
+            return list(_table_passages((row for row in rows if any(row)), source))
+
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        return list(_text_passages(re.split(r"\n\s*\n", f.read()), source))
+
+
+def catalog_passages(products_file: str) -> Iterator[Passage]:
+    """One passage per catalog product, with every non-empty field"""
+    for product in iter_json_products(products_file):
+        label = normalize_product_field(product, "display_name") or normalize_product_field(product, "name")
+        parts = []
+        for field_name, value in product.items():
+            if value in (None, "", [], {}):
+                continue
+            if isinstance(value, list):
+                value = ", ".join(str(v) for v in value)
+            parts.append(f"{field_name}: {value}")
+        yield Passage(source=f"Catalogue › {label}", text="; ".join(parts))
+
+
+def document_files(project_dir: str) -> List[str]:
+    """Supported files of a project's documents/ folder, sorted for stable indexes"""
+    documents_dir = os.path.join(project_dir, "documents")
+    if not os.path.isdir(documents_dir):
+        return []
+    return sorted(
+        os.path.join(documents_dir, name)
+        for name in os.listdir(documents_dir)
+        if name.lower().endswith(DOCUMENT_EXTENSIONS) and not name.startswith("~$")
+    )
+
+
+def source_fingerprint(project_dir: str) -> List[List]:
+    """(name, mtime_ns, size) of every indexed input, used to detect a stale index"""
+    paths = document_files(project_dir)
+    products_file = os.path.join(project_dir, "products.json")
+    if os.path.exists(products_file):
+        paths.append(products_file)
+    fingerprint = []
+    for path in paths:
+        stat = os.stat(path)
+        fingerprint.append([os.path.relpath(path, project_dir), stat.st_mtime_ns, stat.st_size])
+    return fingerprint
+
+
+# ==================================================================================
+# BM25 index
+# ==================================================================================
+
+class DocumentIndex:
+    """
+    BM25 index over a project's passages.
+    Use DocumentIndex.for_project(project_dir) to load (or build) the shared index.
+    """
+
+    def __init__(self, passages: List[Passage], fingerprint: Optional[List[List]] = None):
+        self.passages = passages
+        self.fingerprint = fingerprint or []
+
+        # Inverted index: token -> ((passage index, term frequency), ...)
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        lengths = []
+        for i, passage in enumerate(passages):
+            counts = Counter(tokenize(f"{passage.source} {passage.text}"))
+            lengths.append(sum(counts.values()))
+            for token, tf in counts.items():
+                postings.setdefault(token, []).append((i, tf))
+
+        self._postings = {token: tuple(entries) for token, entries in postings.items()}
+        self._lengths = lengths
+        self._average_length = (sum(lengths) / len(lengths)) if lengths else 0.0
+        count = len(passages)
+        self._idf = {
+            token: math.log(1 + (count - len(entries) + 0.5) / (len(entries) + 0.5))
+            for token, entries in self._postings.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.passages)
+
+    # ------------------------------------------------------------------ build / persist
+
+    @classmethod
+    def build(cls, project_dir: str) -> "DocumentIndex":
+        """Extract and index every document and the catalog of a project"""
+        passages: List[Passage] = []
+        products_file = os.path.join(project_dir, "products.json")
+        if os.path.exists(products_file):
+            passages.extend(catalog_passages(products_file))
+
+        # products.json is usually generated from one of the documents: skip rows
+        # whose words are all already in a catalog passage
+        catalog_tokens = [frozenset(tokenize(p.text)) for p in passages]
+        catalog_postings: Dict[str, List[int]] = {}
+        for i, tokens in enumerate(catalog_tokens):
+            for token in tokens:
+                catalog_postings.setdefault(token, []).append(i)
+
+        for path in document_files(project_dir):
+            try:
+                extracted = extract_passages(path)
+            except (OSError, KeyError, zipfile.BadZipFile, ElementTree.ParseError) as e:
+                logger.warning(f"⚠️ Skipping unreadable document {path}: {e}")
+                continue
+            for passage in extracted:
+                tokens = frozenset(tokenize(passage.text))
+                candidates = min((catalog_postings.get(t, ()) for t in tokens), key=len, default=())
+                if not any(tokens <= catalog_tokens[i] for i in candidates):
+                    passages.append(passage)
+
+        return cls(passages, source_fingerprint(project_dir))
+
+    @staticmethod
+    def index_path(project_dir: str) -> str:
+        return os.path.join(project_dir, INDEX_DIRNAME, INDEX_FILENAME)
+
+    def save(self, path: str):
+        """Write passages and fingerprint; postings are rebuilt on load (cheap, keeps the file small)"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "version": INDEX_FORMAT_VERSION,
+                "fingerprint": self.fingerprint,
+                "passages": [[p.source, p.text] for p in self.passages],
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["DocumentIndex"]:
+        """Load a persisted index, or None if missing or written by another format version"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != INDEX_FORMAT_VERSION:
+            return None
+        passages = [Passage(source=source, text=text) for source, text in data["passages"]]
+        return cls(passages, data.get("fingerprint"))
+
+    @classmethod
+    def for_project(cls, project_dir: str, build: bool = True) -> Optional["DocumentIndex"]:
+        """
+        Return the project's index, shared per process.
+        A missing or stale persisted index is rebuilt and saved; with build=False it is
+        left to build_project_index and None is returned (sessions never parse documents).
+        """
+        path = cls.index_path(project_dir)
+        try:
+            stat = os.stat(path)
+            cache_key = (os.path.abspath(path), stat.st_mtime_ns)
+        except OSError:
+            cache_key = None
+
+        index = _index_cache.get(cache_key) if cache_key else None
+        if index is not None and index.fingerprint == source_fingerprint(project_dir):
+            return index
+
+        index = cls.load(path)
+        if index is None or index.fingerprint != source_fingerprint(project_dir):
+            if not build:
+                return None
+            index = build_project_index(project_dir)
+
+        stat = os.stat(path) if os.path.exists(path) else None
+        if stat:
+            _index_cache[(os.path.abspath(path), stat.st_mtime_ns)] = index
+        return index
+
+    # ------------------------------------------------------------------ query
+
+    def search(self, query: str, k: int = 3) -> List[Passage]:
+        """Top-k passages by BM25 score, best first; empty when nothing matches"""
+        scores: Dict[int, float] = {}
+        average_length = self._average_length or 1.0
+        for token in set(tokenize(query)):
+            entries = self._postings.get(token)
+            if not entries:
+                continue
+            idf = self._idf[token]
+            for i, tf in entries:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[i] / average_length)
+                scores[i] = scores.get(i, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [
+            Passage(source=self.passages[i].source, text=self.passages[i].text, score=score)
+            for i, score in ranked
+        ]
+
+    def context_snippet(self, query: str, k: int = 3, max_chars: int = 1500) -> Optional[str]:
+        """Top passages formatted for the LLM, or None when nothing is relevant"""
+        lines = []
+        size = 0
+        for passage in self.search(query, k):
+            line = f"- [{passage.source}] {passage.text}"
+            if lines and size + len(line) > max_chars:
+                break
+            lines.append(line[:max_chars])
+            size += len(line)
+        if not lines:
+            return None
+        return "EXTRAITS DES DOCUMENTS DU PROJET (pertinents pour ce tour) :\n" + "\n".join(lines)
+
+
+def build_project_index(project_dir: str) -> DocumentIndex:
+    """Build and persist a project's index (at deploy time, or off the session event loop)"""
+    started = time.perf_counter()
+    index = DocumentIndex.build(project_dir)
+    path = DocumentIndex.index_path(project_dir)
+    try:
+        index.save(path)
+    except OSError as e:
+        logger.warning(f"⚠️ Could not persist document index {path}: {e}")
+    logger.info(f"📚 Built document index for {project_dir}: {len(index)} passages in {(time.perf_counter() - started) * 1000:.0f}ms")
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query project document indexes")
+    parser.add_argument("--projects-dir", default=os.path.join("..", "data", "projects"))
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = commands.add_parser("build", help="Build and persist project indexes")
+    build_parser.add_argument("project_ids", nargs="*")
+    build_parser.add_argument("--all", action="store_true", help="Index every project")
+
+    query_parser = commands.add_parser("query", help="Query a project index")
+    query_parser.add_argument("project_id")
+    query_parser.add_argument("text")
+    query_parser.add_argument("-k", type=int, default=3)
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        project_ids = args.project_ids
+        if args.all:
+            project_ids = sorted(
+                name for name in os.listdir(args.projects_dir)
+                if os.path.isdir(os.path.join(args.projects_dir, name))
+            )
+        for project_id in project_ids:
+            project_dir = os.path.join(args.projects_dir, project_id)
+            started = time.perf_counter()
+            index = build_project_index(project_dir)
+            print(f"✅ {project_id}: {len(index)} passages indexed in {(time.perf_counter() - started) * 1000:.0f}ms")
+    else:
+        index = DocumentIndex.for_project(os.path.join(args.projects_dir, args.project_id))
+        started = time.perf_counter()
+        results = index.search(args.text, args.k)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        for passage in results:
+            print(f"{passage.score:6.2f}  [{passage.source}] {passage.text}")
+        print(f"⏱️ {elapsed_ms:.2f}ms over {len(index)} passages")
+
+
+if __name__ == "__main__":
+    main()
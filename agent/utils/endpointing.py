@@ -0,0 +1,217 @@
+"""
+Adaptive end-of-turn detection for Voyaltis Agent
+The fixed mode waits 2 s of VAD silence before every turn. The adaptive mode lets the
+VAD close speech segments after a short silence, then decides how long to keep
+waiting from:
+- the completeness of the transcript so far (finished sentence, or trailing "et",
+  preposition, comma, number of a list still being dictated),
+- the pauses this rep made inside their own turns, learned during the session,
+- early commits: the rep speaking again right after a turn was closed raises the
+  delay for the rest of the session.
+The turn is then committed with session.commit_user_turn() (turn_detection="manual").
+
+Configuration (environment):
+    VOYALTIS_ENDPOINTING      "fixed" (default, 2 s VAD silence) or "adaptive"
+"""
+import asyncio
+import inspect
+import logging
+import os
+import re
+import time
+from collections import deque
+from typing import Callable, Deque, Optional
+
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+FIXED = "fixed"
+ADAPTIVE = "adaptive"
+
+ENDPOINTING_MODE = os.getenv("VOYALTIS_ENDPOINTING", FIXED).strip().lower()
+
+# VAD silence closing a speech segment in adaptive mode (fixed mode: 2.0 s)
+ADAPTIVE_VAD_SILENCE = 0.4
+
+ENDPOINTING_DELAY = metrics.REGISTRY.histogram(
+    "voyaltis_endpointing_delay_seconds", "Adaptive endpointing wait after end of speech, by transcript completeness",
+    ("completeness",), buckets=(0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0)
+)
+EARLY_COMMITS = metrics.REGISTRY.counter(
+    "voyaltis_endpointing_early_commits_total", "Turns closed while the rep had not finished (speech resumed right after)"
+)
+
+# Words after which a French sentence is not finished
+CONTINUATION_WORDS = {
+    # Conjunctions and connectors
+    "et", "ou", "mais", "donc", "car", "puis", "alors", "ensuite", "aussi", "sinon", "parce", "que", "qui",
+    "quand", "comme", "si", "plus", "moins",
+    # Articles, determiners, prepositions
+    "le", "la", "les", "l", "un", "une", "des", "du", "de", "d", "au", "aux", "ce", "cet", "cette", "ces",
+    "mon", "ma", "mes", "son", "sa", "ses", "leur", "leurs", "à", "en", "avec", "pour", "sur", "sans",
+    "dans", "chez", "par", "vers", "entre",
+    # Hesitations
+    "euh", "heu", "hum", "bah", "ben", "genre", "enfin",
+    # Subject pronouns without a verb yet
+    "je", "j", "tu", "il", "elle", "on", "nous", "vous", "ils", "elles", "c",
+}
+
+# Number words: a list of quantities being dictated ("trois pots de blanc, deux")
+NUMBER_WORDS = {
+    "zéro", "un", "une", "deux", "trois", "quatre", "cinq", "six", "sept", "huit", "neuf", "dix", "onze",
+    "douze", "treize", "quatorze", "quinze", "seize", "vingt", "trente", "quarante", "cinquante",
+    "soixante", "cent", "cents", "mille",
+}
+
+# Complete short answers
+CLOSED_ANSWERS = {
+    "oui", "non", "ouais", "voilà", "merci", "d'accord", "ok", "okay", "exactement", "rien", "aucun",
+    "aucune", "c'est tout", "c'est bon", "non merci", "pas du tout", "ça marche",
+}
+
+_WORD = re.compile(r"[\w'’]+", re.UNICODE)
+
+
+def completeness(text: str) -> float:
+    """
+    0 (clearly unfinished) to 1 (clearly finished) estimate for a partial transcript.
+    Whisper punctuates, so the final punctuation carries most of the signal; the last
+    word catches sentences cut at a connector, an article or a quantity.
+    """
+    text = text.strip()
+    if not text:
+        return 0.0
+    words = [w.lower().replace("’", "'") for w in _WORD.findall(text)]
+    if not words:
+        return 0.5
+    last = words[-1].split("'")[-1] or words[-1]
+
+    if text.endswith(("...", "…")):
+        return 0.1
+    if text.endswith((",", ";", ":", "-")):
+        return 0.15
+    if text.rstrip(".!? ").lower() in CLOSED_ANSWERS or text.endswith(("?", "!")):
+        return 0.95
+    trailing = last in CONTINUATION_WORDS or words[-1].endswith("'")
+    if text.endswith("."):
+        # A period after a connector, or after one or two words, is often the STT closing on a pause
+        if trailing:
+            return 0.4
+        return 0.85 if len(words) > 2 else 0.6
+    if trailing:
+        return 0.1
+    # Quantity at the end: the product name (or the next quantity) is still coming
+    if last.isdigit() or last in NUMBER_WORDS:
+        return 0.2
+    return 0.5
+
+
+class PauseStats:
+    """Pauses a rep made inside their own turns (silence, then speech again)"""
+
+    def __init__(self, window: int = 50):
+        self.pauses: Deque[float] = deque(maxlen=window)
+
+    def observe(self, seconds: float):
+        self.pauses.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.pauses:
+            return None
+        ordered = sorted(self.pauses)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class AdaptiveEndpointer:
+    """
+    Decides when the rep's turn is over, from VAD segment boundaries and transcripts.
+    commit is called (on the event loop) when the turn should be closed.
+    """
+
+    def __init__(
+        self,
+        commit: Callable[[], object],
+        min_delay: float = 0.2,
+        max_delay: float = 3.0,
+        unfinished_delay: float = 1.5,
+        early_commit_window: float = 1.5,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.commit = commit
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.unfinished_delay = unfinished_delay
+        self.early_commit_window = early_commit_window
+        self.clock = clock
+        self.pauses = PauseStats()
+        self.bias = 0.0                   # Extra wait learned from early commits
+        self.early_commits = 0
+        self.turn_text = ""
+        self.speaking = False
+        self._speech_ended_at: Optional[float] = None
+        self._committed_at: Optional[float] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def delay_for(self, text: str) -> float:
+        """Seconds of silence after which a turn with this transcript is closed"""
+        score = completeness(text)
+        # Unfinished sentences wait for this rep's usual long pause (p90), at least unfinished_delay
+        learned = self.pauses.quantile(0.9)
+        unfinished = max(self.unfinished_delay, learned + 0.3 if learned is not None else 0.0)
+        delay = self.min_delay + (1.0 - score) * (unfinished - self.min_delay) + self.bias
+        return min(self.max_delay, delay)
+
+    def on_speech_start(self):
+        now = self.clock()
+        if self._timer:
+            # Speech again before the commit: a pause inside the turn
+            self._timer.cancel()
+            self._timer = None
+            if self._speech_ended_at is not None:
+                self.pauses.observe(now - self._speech_ended_at)
+        elif self._committed_at is not None and now - self._committed_at < self.early_commit_window:
+            # The turn was closed too early: wait longer from now on
+            self.early_commits += 1
+            self.bias = min(self.max_delay / 2, self.bias + 0.25)
+            EARLY_COMMITS.inc()
+            logger.debug("Early commit (%.2fs after), bias now %.2fs", now - self._committed_at, self.bias,
+                         extra={"category": "vad"})
+        self._committed_at = None
+        self.speaking = True
+
+    def on_speech_end(self):
+        self.speaking = False
+        self._speech_ended_at = self.clock()
+        self._schedule()
+
+    def on_transcript(self, text: str, is_final: bool = True):
+        """Final transcript of a speech segment (interim ones only rescore)"""
+        if is_final and text.strip():
+            self.turn_text = f"{self.turn_text} {text.strip()}".strip()
+        if not self.speaking and self._speech_ended_at is not None:
+            self._schedule(extra=text if not is_final else "")
+
+    def cancel(self):
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+    def _schedule(self, extra: str = ""):
+        self.cancel()
+        text = f"{self.turn_text} {extra}".strip()
+        delay = self.delay_for(text)
+        remaining = max(0.0, self._speech_ended_at + delay - self.clock())
+        self._timer = asyncio.get_running_loop().call_later(remaining, self._fire, delay, completeness(text))
+
+    def _fire(self, delay: float, score: float):
+        self._timer = None
+        self._committed_at = self.clock()
+        ENDPOINTING_DELAY.observe(delay, completeness="finished" if score >= 0.8 else "unfinished" if score < 0.4 else "unsure")
+        logger.debug("End of turn after %.2fs (completeness %.2f): %s", delay, score, self.turn_text,
+                     extra={"category": "vad"})
+        self.turn_text = ""
+        self._speech_ended_at = None
+        result = self.commit()
+        if inspect.isawaitable(result):
+            asyncio.ensure_future(result)
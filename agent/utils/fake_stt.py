@@ -0,0 +1,98 @@
+"""
+Fake streaming STT for Voyaltis Agent (settings.sttProvider "fake")
+A LiveKit STT that needs no API: its streams run the scripted transcriber on the room
+audio and emit START_OF_SPEECH, INTERIM_TRANSCRIPT, FINAL_TRANSCRIPT and END_OF_SPEECH
+events like Deepgram, so the session, the adaptive endpointer and the speculator see
+interim transcripts in tests and local runs. recognize() returns the next utterance.
+
+Configuration (environment):
+    VOYALTIS_FAKE_STT_SCRIPT          text file, one utterance per line (default: built-in lines)
+    VOYALTIS_FAKE_STT_ENDPOINTING     silence before the final transcript, in seconds (default 0.3)
+    VOYALTIS_FAKE_STT_LATENCY         delay of the final transcript, in seconds (default 0)
+"""
+import asyncio
+import logging
+import os
+from typing import List, Optional
+
+from livekit.agents import DEFAULT_API_CONNECT_OPTIONS, APIConnectOptions, stt
+from livekit.agents.types import NOT_GIVEN, NotGivenOr
+from livekit.agents.utils import AudioBuffer
+
+from utils.scripted_transcriber import (
+    END_OF_SPEECH, FINAL, INTERIM, START_OF_SPEECH, ScriptedTranscriber, UtteranceScript,
+)
+
+logger = logging.getLogger(__name__)
+
+FAKE_STT_SCRIPT = os.getenv("VOYALTIS_FAKE_STT_SCRIPT", "")
+FAKE_STT_ENDPOINTING = float(os.getenv("VOYALTIS_FAKE_STT_ENDPOINTING", "0.3"))
+FAKE_STT_LATENCY = float(os.getenv("VOYALTIS_FAKE_STT_LATENCY", "0"))
+
+_EVENT_TYPES = {
+    START_OF_SPEECH: stt.SpeechEventType.START_OF_SPEECH,
+    INTERIM: stt.SpeechEventType.INTERIM_TRANSCRIPT,
+    FINAL: stt.SpeechEventType.FINAL_TRANSCRIPT,
+    END_OF_SPEECH: stt.SpeechEventType.END_OF_SPEECH,
+}
+
+
+def read_script(path: str) -> List[str]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return [line.strip() for line in f if line.strip()]
+    except OSError as e:
+        logger.warning(f"⚠️ Could not read fake STT script {path}: {e}")
+        return []
+
+
+def _speech_event(kind: str, text: str, language: str) -> stt.SpeechEvent:
+    alternatives = [stt.SpeechData(language=language, text=text)] if text else []
+    return stt.SpeechEvent(type=_EVENT_TYPES[kind], alternatives=alternatives)
+
+
+class FakeSTT(stt.STT):
+    """Streaming STT reading its transcripts from a script (shared by its streams)"""
+
+    def __init__(self, utterances: Optional[List[str]] = None, language: str = "fr",
+                 endpointing: float = FAKE_STT_ENDPOINTING, latency: float = FAKE_STT_LATENCY):
+        super().__init__(capabilities=stt.STTCapabilities(streaming=True, interim_results=True))
+        if utterances is None and FAKE_STT_SCRIPT:
+            utterances = read_script(FAKE_STT_SCRIPT)
+        self.script = UtteranceScript(utterances) if utterances else UtteranceScript()
+        self.language = language
+        self.endpointing = endpointing
+        self.latency = latency
+
+    async def _recognize_impl(self, buffer: AudioBuffer, *, language: NotGivenOr[str] = NOT_GIVEN,
+                              conn_options: APIConnectOptions) -> stt.SpeechEvent:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return _speech_event(FINAL, self.script.next(), language or self.language)
+
+    def stream(self, *, language: NotGivenOr[str] = NOT_GIVEN,
+               conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS) -> "FakeRecognizeStream":
+        return FakeRecognizeStream(stt=self, conn_options=conn_options, language=language or self.language)
+
+
+class FakeRecognizeStream(stt.RecognizeStream):
+    def __init__(self, *, stt: FakeSTT, conn_options: APIConnectOptions, language: str):
+        super().__init__(stt=stt, conn_options=conn_options)
+        self._fake = stt
+        self._language = language
+        self._transcriber = ScriptedTranscriber(stt.script.next, endpointing=stt.endpointing)
+
+    async def _run(self) -> None:
+        async for data in self._input_ch:
+            if isinstance(data, self._FlushSentinel):
+                events = self._transcriber.flush()
+            else:
+                events = self._transcriber.feed(data.data.tobytes(), data.sample_rate, data.num_channels)
+            await self._emit(events)
+        await self._emit(self._transcriber.flush())
+
+    async def _emit(self, events):
+        for kind, text in events:
+            if kind == FINAL and self._fake.latency:
+                await asyncio.sleep(self._fake.latency)
+            self._event_ch.send_nowait(_speech_event(kind, text, self._language))
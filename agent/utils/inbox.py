@@ -0,0 +1,149 @@
+"""
+Ordered data channel inbox for Voyaltis Agent
+Client messages (user_text_message, switch_to_voice) are queued per session and
+processed one at a time, in arrival order, by a single consumer task. Typed messages
+sent in a burst (each one within the coalescing window of the previous one) become a
+single user turn, hence a single LLM call. The inbox is bounded: when it is full, a
+text message is merged into the last queued one, anything else is dropped.
+
+Configuration (environment):
+    VOYALTIS_INBOX_MAX_SIZE            queued messages per session (default 32)
+    VOYALTIS_INBOX_COALESCE_SECONDS    burst window for typed messages (default 0.4, 0 to disable)
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+MAX_SIZE = int(os.getenv("VOYALTIS_INBOX_MAX_SIZE", "32"))
+COALESCE_SECONDS = float(os.getenv("VOYALTIS_INBOX_COALESCE_SECONDS", "0.4"))
+
+TEXT_MESSAGE = "user_text_message"
+
+INBOX_DEPTH = metrics.REGISTRY.gauge("voyaltis_inbox_depth", "Data channel messages waiting in session inboxes")
+INBOX_WAIT = metrics.REGISTRY.histogram("voyaltis_inbox_wait_seconds", "Data channel messages: arrival to processing")
+INBOX_MESSAGES = metrics.REGISTRY.counter(
+    "voyaltis_inbox_messages_total", "Data channel messages by outcome (processed/coalesced/dropped)", ("result",)
+)
+
+
+@dataclass
+class InboxEntry:
+    """One message to process; a text entry may hold several coalesced messages"""
+    message: Dict
+    received: float
+    parts: List[str] = field(default_factory=list)
+    last_received: float = 0.0
+
+    @property
+    def is_text(self) -> bool:
+        return self.message.get("type") == TEXT_MESSAGE
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.parts)
+
+
+def _coalescible(entry: InboxEntry, message: Dict) -> bool:
+    return entry.is_text and message.get("type") == TEXT_MESSAGE and message.get("mode") == entry.message.get("mode")
+
+
+class SessionInbox:
+    """Bounded FIFO of client messages with a single consumer calling handler(entry)"""
+
+    def __init__(self, handler: Callable[[InboxEntry], Awaitable], max_size: int = MAX_SIZE, coalesce_window: float = COALESCE_SECONDS):
+        self.handler = handler
+        self.max_size = max_size
+        self.coalesce_window = coalesce_window
+        self.stats: Dict[str, int] = {"processed": 0, "coalesced": 0, "dropped": 0, "max_depth": 0}
+        self._entries: Deque[InboxEntry] = deque()
+        self._available = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def start(self) -> "SessionInbox":
+        self._task = asyncio.ensure_future(self._consume())
+        return self
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        INBOX_DEPTH.dec(len(self._entries))
+        self._entries.clear()
+
+    def offer(self, message: Dict) -> bool:
+        """Queue a message (from the synchronous data_received callback), False if dropped"""
+        now = time.perf_counter()
+        if len(self._entries) >= self.max_size:
+            # Full: a typed message still fits in the last queued one, other messages are dropped
+            if self._entries and _coalescible(self._entries[-1], message):
+                self._merge(self._entries[-1], message, now)
+                return True
+            self.stats["dropped"] += 1
+            INBOX_MESSAGES.inc(result="dropped")
+            logger.warning(f"⚠️ Inbox full ({self.max_size}), dropped {message.get('type')} message")
+            return False
+        entry = InboxEntry(message, now, last_received=now)
+        if entry.is_text:
+            entry.parts.append(message.get("text", ""))
+        self._entries.append(entry)
+        INBOX_DEPTH.inc()
+        self.stats["max_depth"] = max(self.stats["max_depth"], len(self._entries))
+        self._available.set()
+        return True
+
+    def _merge(self, entry: InboxEntry, message: Dict, received: float):
+        entry.parts.append(message.get("text", ""))
+        entry.last_received = max(entry.last_received, received)
+        self.stats["coalesced"] += 1
+        INBOX_MESSAGES.inc(result="coalesced")
+
+    def _pop(self) -> InboxEntry:
+        INBOX_DEPTH.dec()
+        return self._entries.popleft()
+
+    async def _wait(self, timeout: Optional[float] = None) -> bool:
+        self._available.clear()
+        try:
+            await asyncio.wait_for(self._available.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def _coalesce(self, entry: InboxEntry):
+        """Merge the text messages that follow entry within the burst window"""
+        while True:
+            while self._entries and _coalescible(entry, self._entries[0].message):
+                following = self._pop()
+                for part in following.parts:
+                    self._merge(entry, {"text": part}, following.last_received)
+            if self._entries:
+                return  # Another kind of message comes next: keep the order
+            remaining = entry.last_received + self.coalesce_window - time.perf_counter()
+            if remaining <= 0 or not await self._wait(remaining):
+                return
+
+    async def _consume(self):
+        while True:
+            while not self._entries:
+                await self._wait()
+            entry = self._pop()
+            if entry.is_text and self.coalesce_window > 0:
+                await self._coalesce(entry)
+            INBOX_WAIT.observe(time.perf_counter() - entry.received)
+            try:
+                await self.handler(entry)
+            except Exception as e:
+                logger.error(f"Error handling data message: {e}", exc_info=True)
+            self.stats["processed"] += 1
+            INBOX_MESSAGES.inc(result="processed")
@@ -0,0 +1,237 @@
+"""
+Agent instructions for Voyaltis Agent V2
+Pure string building (no LiveKit import), so it can run in an offload worker process
+"""
+from utils.question_generator import generate_natural_question
+
+# Said word for word at the end of every conversation (its audio is cached, see utils/tts_cache.py)
+CLOSING_PHRASE = "Parfait, merci ! Je vais préparer ton rapport."
+
+
+def build_simple_instructions(user_name: str, attention_points: list, questions_asked: int, max_questions: int, first_question_in_opening: bool = False, report_config: dict = None, table_structure: dict = None, base_questions: int = None, follow_up_buffer: int = None, products_info: str = None, time_period: str = "aujourd'hui") -> str:
+    """
+    Build ultra-simple instructions for the agent
+    Adapts based on report configuration and dynamic table structure
+    Includes product catalog if available
+    """
+
+    # Calculate base and buffer if not provided
+    if base_questions is None:
+        base_questions = len(attention_points)
+    if follow_up_buffer is None:
+        follow_up_buffer = max(2, int(base_questions * 0.5))
+
+    # Build attention points questions (only if tracking enabled)
+    questions_list = []
+
+    # Check report configuration (default to attention points tracking)
+    if report_config is None:
+        report_config = {
+            "attentionPointsTracking": True,
+            "productTableTracking": False,
+            "productSalesTracking": False,
+            "stockAlertsTracking": False,
+            "additionalRemarksTracking": False
+        }
+
+    attention_tracking = report_config.get("attentionPointsTracking", True)
+    product_sales_tracking = report_config.get("productSalesTracking", False)
+    stock_alerts_tracking = report_config.get("stockAlertsTracking", False)
+    remarks_tracking = report_config.get("additionalRemarksTracking", False)
+
+    # Build role description based on active options
+    role_parts = []
+    if attention_tracking:
+        role_parts.append(f"Poser exactement {len(attention_points)} questions sur les points d'attention")
+    if product_sales_tracking:
+        # Dynamic description based on table structure
+        if table_structure:
+            role_parts.append(f"Tracker les données de ventes: {table_structure.get('description', 'ventes de produits')}")
+        else:
+            role_parts.append("Capturer les quantités de produits vendus")
+    if stock_alerts_tracking:
+        role_parts.append("Identifier les produits en rupture ou risque de rupture de stock")
+    if remarks_tracking:
+        role_parts.append("Noter toute information pertinente supplémentaire")
+
+    role_description = "\n- ".join(role_parts)
+
+    # Build questions section only if attention tracking enabled
+    questions_section = ""
+    if attention_tracking and attention_points:
+        for i, point in enumerate(attention_points, 1):
+            desc = point.get("description", "")
+            natural_prompts = point.get("naturalPrompts", [])
+
+            if natural_prompts:
+                questions_list.append(f"Question {i}: {natural_prompts[0]}")
+            else:
+                # Use intelligent question generator instead of simple "Parle-moi de..."
+                natural_question = generate_natural_question(desc, index=i)
+                questions_list.append(f"Question {i}: {natural_question}")
+
+        # Calculate which mandatory questions have been covered
+        mandatory_questions_covered = min(questions_asked, base_questions)
+        mandatory_remaining = base_questions - mandatory_questions_covered
+
+        priority_warning = ""
+        if mandatory_remaining > 0:
+            priority_warning = f"\n🎯 PRIORITÉ : Il reste {mandatory_remaining} question(s) OBLIGATOIRE(S) sur les points d'attention à poser avant d'utiliser les questions bonus."
+
+        # Build warning messages outside f-string to avoid backslash issues
+        warning_one_left = "ATTENTION : Plus qu'UNE question restante. Assure-toi d'avoir couvert l'essentiel avant de clôturer." if max_questions - questions_asked == 1 else ""
+
+        limit_warning = ""
+        if questions_asked >= max_questions:
+            limit_warning = f"🛑 LIMITE ATTEINTE ! TU AS POSÉ {questions_asked} QUESTIONS SUR {max_questions} AUTORISÉES.\n   ➡️ NE POSE PLUS AUCUNE QUESTION !\n   ➡️ COMMENCE IMMÉDIATEMENT L'ÉTAPE 1 (RÉCAPITULATIF) !\n   ➡️ Dis: \"Merci {user_name} ! Pour résumer...\" puis termine par \"As-tu une dernière information à me partager ?\""
+
+        questions_section = f"""
+QUESTIONS À POSER (dans l'ordre) :
+{chr(10).join(questions_list)}
+
+PROGRESSION : Question {questions_asked}/{max_questions} ({base_questions} obligatoires + {follow_up_buffer} bonus)
+Questions obligatoires couvertes : {mandatory_questions_covered}/{base_questions}
+{priority_warning}
+
+⚠️ {warning_one_left}
+🚨 {limit_warning}
+"""
+
+    # Build tracking instructions
+    tracking_notes = []
+    if product_sales_tracking:
+        if table_structure and table_structure.get("columns"):
+            # Dynamic tracking based on table structure
+            sales_columns = [col for col in table_structure.get("columns", []) if col.get("source") == "sales"]
+            if sales_columns:
+                tracking_notes.append("DONNÉES DE VENTES À CAPTURER PAR PRODUIT:")
+                for col in sales_columns:
+                    tracking_notes.append(f"  - {col.get('label')}: {col.get('type')} (ex: {col.get('id')})")
+            else:
+                tracking_notes.append("- Capte les quantités de produits mentionnées")
+        else:
+            tracking_notes.append("- Capte les quantités de produits mentionnées")
+    if stock_alerts_tracking:
+        tracking_notes.append("\nALERTES RUPTURE DE STOCK:")
+        tracking_notes.append("  - Pour chaque produit, demande: \"Y a-t-il un risque de rupture de stock ?\"")
+        tracking_notes.append("  - Réponse attendue: Oui/Non")
+        tracking_notes.append("  - Note uniquement les produits avec réponse 'Oui'")
+    if remarks_tracking:
+        tracking_notes.append("\n- Note toute information importante même si elle ne correspond pas aux questions")
+
+    tracking_section = "\n".join(tracking_notes) if tracking_notes else ""
+
+    # Add products catalog if available
+    products_section = ""
+    if products_info:
+        products_section = f"""
+═══════════════════════════════════════════════════════════════
+📦 CATALOGUE PRODUITS DISPONIBLES
+═══════════════════════════════════════════════════════════════
+
+{products_info}
+
+⚠️ Tu as accès à TOUTES ces informations (prix, caractéristiques, catégories, etc.)
+Tu peux t'en servir pour répondre aux questions de {user_name} ou pour calculer des totaux.
+"""
+
+    # CRITICAL: Override instructions if limit reached
+    if questions_asked >= max_questions:
+        status_message = f"""
+🚨🚨🚨 ALERTE CRITIQUE 🚨🚨🚨
+TU AS ATTEINT LA LIMITE DE {max_questions} QUESTIONS !
+NE POSE PLUS AUCUNE QUESTION !
+
+➡️ ACTION IMMÉDIATE REQUISE :
+Fais un RÉCAPITULATIF de ce que {user_name} t'a dit, puis demande :
+"As-tu une dernière information à me partager ?"
+"""
+        next_action = f"FAIRE LE RÉCAPITULATIF MAINTENANT (ne pose plus de questions !)"
+    elif first_question_in_opening:
+        status_message = f"La question 1 a déjà été posée dans le message d'ouverture. Tu dois maintenant attendre la réponse de {user_name}."
+        next_action = f"Après avoir reçu la réponse à la question 1, pose la question 2."
+    else:
+        status_message = ""
+        next_action = "Commence par poser la question 1." if attention_tracking else "Engage la conversation naturellement."
+
+    # Adapt report context based on time period
+    report_context = f"à créer un rapport pour {time_period}"
+
+    instructions = f"""Tu es un assistant vocal sympathique qui aide {user_name} {report_context}.
+
+📋 CONTEXTE : L'HISTORIQUE COMPLET de ta conversation avec {user_name} est fourni ci-dessus.
+⚠️ LIS-LE ATTENTIVEMENT avant chaque réponse pour savoir ce qui a DÉJÀ été dit et demandé.
+
+TON RÔLE :
+- {role_description}
+- Une question à la fois
+- Courtes et naturelles (max 15 mots)
+- Écouter attentivement les réponses
+{questions_section}
+{status_message}
+
+RÈGLES SIMPLES :
+1. {next_action}
+2. ⚠️ AVANT de poser une question : VÉRIFIE l'historique de conversation ci-dessus pour voir si elle a DÉJÀ été posée et répondue
+3. 🚫 NE REPOSE JAMAIS une question qui a déjà été posée - passe à la suivante
+4. Attends la réponse complète
+5. {"Passe à la suivante qui n'a PAS encore été posée" if attention_tracking else "Continue la conversation naturellement"}
+6. 🎯 PRIORITÉ ABSOLUE : Couvre TOUS les {base_questions} points d'attention AVANT de poser des questions bonus
+7. Une fois les {base_questions} points couverts, tu peux poser jusqu'à {follow_up_buffer} questions de clarification si nécessaire
+8. Après {"avoir couvert tous les points" if attention_tracking else "avoir collecté les informations"}, PROCESSUS DE FIN EN 3 ÉTAPES :
+
+   ÉTAPE 1 - RÉCAPITULATIF :
+   Fais un résumé naturel et chaleureux de ce que tu as compris
+   Exemple : "Merci {user_name} ! Pour résumer, tu as vendu [produits], tu as eu des difficultés sur [points],
+   et les clients t'ont fait des retours sur [feedback]. As-tu une dernière information à me partager ?"
+
+   ÉTAPE 2 - DERNIÈRE PAROLE :
+   Attends la réponse de {user_name} (peut être un ajout, une modification, ou "non c'est bon")
+
+   ÉTAPE 3 - CONCLUSION :
+   Dis : "{CLOSING_PHRASE}"
+   🚫 NE RÉCITE JAMAIS le rapport oralement - dis seulement que tu le prépares, puis ARRÊTE de parler
+
+LIMITE : Maximum {max_questions} questions au total ({base_questions} obligatoires + {follow_up_buffer} bonus)
+
+{tracking_section}
+
+{products_section}
+
+GESTION DES QUESTIONS DE {user_name.upper()} :
+Si {user_name} pose une question (phrase finissant par "?") :
+1. 🔍 Fouille dans le catalogue produits ci-dessus pour trouver la réponse
+2. 💬 Réponds de manière concise et précise
+3. 📝 Extrais quand même les infos pertinentes de sa phrase pour le rapport
+4. ⏭️ Reprends directement avec ta prochaine question (transition naturelle)
+5. ⚠️ Cette réponse ne compte PAS dans tes {max_questions} questions
+
+Exemple :
+- {user_name} : "Aujourd'hui j'ai vendu 2 cuiseurs Linux. C'est quoi le prix déjà ?"
+- Toi : "Le cuiseur Linux est à 299€. D'accord ! Et c'est pour quand la livraison ?"
+  → Tu as capté "2 cuiseurs Linux vendus" pour le rapport
+  → Tu as répondu à sa question
+  → Tu reprends avec ta question suivante
+  → Tu es toujours à la même position dans tes questions (pas +1)
+
+Si tu ne sais pas :
+- Toi : "Je n'ai pas cette info dans mon catalogue. Mais bon, et du coup c'est pour quand la livraison ?"
+
+🚫 INTERDICTIONS STRICTES :
+- NE FAIS JAMAIS de récapitulatif pendant la conversation
+- NE RÉPÈTE JAMAIS les produits vendus que {user_name} vient de mentionner
+- Le SEUL récapitulatif autorisé est celui de l'ÉTAPE 1 (processus de fin)
+- Exemple de ce qu'il NE FAUT PAS faire :
+  ❌ {user_name} : "J'ai vendu 2 cuiseurs Linux"
+  ❌ Toi : "D'accord, donc 2 cuiseurs Linux. Et pour la livraison ?"
+  ✅ Toi : "Super ! Et c'est pour quand la livraison ?"
+
+IMPORTANT :
+- Réponds en texte naturel conversationnel
+- PAS de JSON
+- Questions courtes et directes
+- Reste sympathique et détendu
+- Capte TOUTES les informations pertinentes mentionnées (même quand {user_name} pose une question)
+"""
+
+    return instructions
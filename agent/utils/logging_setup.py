@@ -0,0 +1,202 @@
+"""
+Logging pipeline for Voyaltis Agent
+Application loggers write to an in-memory queue; a listener thread formats (JSON or
+text) and writes the records, so the event loop only pays for creating a LogRecord.
+Messages use %-style arguments and are formatted on the listener thread, only for
+records that pass the level and sampling filters.
+
+Configuration (environment):
+    VOYALTIS_LOG_LEVEL=INFO                 operational events
+    VOYALTIS_TRANSCRIPT_LOG_LEVEL=INFO      transcript content (user/agent text, reports)
+    VOYALTIS_LOG_FORMAT=json                json or text
+    VOYALTIS_LOG_FILE=../logs/agent.json    default: stderr
+    VOYALTIS_LOG_SAMPLING=vad=0.1,turn_latency=0.2   keep this fraction of a category (below WARNING)
+"""
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import os
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+from typing import Dict, Mapping, Optional
+
+TRANSCRIPT_LOGGER = "voyaltis.transcript"
+
+# Loggers routed through the queue (module loggers of the agent included)
+APP_LOGGERS = ("voyaltis", "voyaltis-agent", "voyaltis-agent-v2", "utils", "sales_analyzer", "conversational_engine")
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s %(message)s"
+
+# Argument types copied when a record is queued (see DeferredQueueHandler)
+_MUTABLE_ARGS = (dict, list, set, bytearray)
+
+# LogRecord attributes that are not user extras
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+# Per-session fields added to every record (session, project). The dict is mutated
+# in place so tasks created before the project is known still see it.
+_log_context: contextvars.ContextVar[Optional[Dict[str, str]]] = contextvars.ContextVar("voyaltis_log_context", default=None)
+
+_listener: Optional[QueueListener] = None
+_configure_lock = threading.Lock()
+
+
+class LazyJson:
+    """json.dumps(obj) computed only if the record is actually written"""
+    __slots__ = ("obj", "kwargs")
+
+    def __init__(self, obj, **kwargs):
+        self.obj = obj
+        self.kwargs = kwargs
+
+    def __str__(self) -> str:
+        return json.dumps(self.obj, ensure_ascii=False, default=str, **self.kwargs)
+
+
+def set_log_context(**fields):
+    """Tag the records of the current session (task and its children) with fields"""
+    context = _log_context.get()
+    if context is None:
+        context = {}
+        _log_context.set(context)
+    context.update({key: str(value) for key, value in fields.items() if value is not None})
+
+
+class ContextFilter(logging.Filter):
+    """Copy the session context onto the record (runs on the calling thread, before the record is queued)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = _log_context.get()
+        if context:
+            for key, value in context.items():
+                if not hasattr(record, key):
+                    setattr(record, key, value)
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep one record out of round(1 / rate) per category (extra={"category": ...}).
+    Warnings and errors are never sampled out.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.periods = {category: max(1, round(1 / rate)) if rate > 0 else 0 for category, rate in rates.items()}
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        category = getattr(record, "category", None)
+        if category is None or record.levelno >= logging.WARNING:
+            return True
+        period = self.periods.get(category)
+        if period is None:
+            return True
+        if period == 0:
+            return False
+        with self._lock:
+            count = self._counts.get(category, 0)
+            self._counts[category] = count + 1
+        return count % period == 0
+
+
+def _snapshot(arg):
+    """Deep copy of a mutable argument, so the message shows its value at logging time"""
+    if isinstance(arg, _MUTABLE_ARGS):
+        return copy.deepcopy(arg)
+    if isinstance(arg, LazyJson):
+        return LazyJson(copy.deepcopy(arg.obj), **arg.kwargs)
+    return arg
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler that enqueues the record unformatted: the standard prepare() formats the
+    message on the calling thread, which is exactly the cost we move off the loop.
+    Mutable arguments (session state dicts and lists, LazyJson data) are snapshotted
+    instead, since they could change before the listener thread formats the message.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        args = record.args
+        if not args:
+            return record
+        try:
+            if isinstance(args, Mapping):
+                record.args = {key: _snapshot(value) for key, value in args.items()}
+            else:
+                record.args = tuple(_snapshot(arg) for arg in args)
+        except Exception:
+            # Not copyable: format now
+            record.msg, record.args = record.getMessage(), None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, message, session fields and extras"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+def _parse_rates(setting: str) -> Dict[str, float]:
+    rates = {}
+    for item in setting.split(","):
+        name, _, value = item.partition("=")
+        if name.strip() and value.strip():
+            rates[name.strip()] = float(value)
+    return rates
+
+
+def configure_logging(stream=None) -> QueueListener:
+    """Route the agent loggers through the queue; idempotent per process"""
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            return _listener
+
+        log_file = os.getenv("VOYALTIS_LOG_FILE")
+        if log_file:
+            os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
+            sink: logging.Handler = logging.FileHandler(log_file, encoding="utf-8")
+        else:
+            sink = logging.StreamHandler(stream or sys.stderr)
+        if os.getenv("VOYALTIS_LOG_FORMAT", "json").lower() == "json":
+            sink.setFormatter(JsonFormatter())
+        else:
+            sink.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+        queue: SimpleQueue = SimpleQueue()
+        handler = DeferredQueueHandler(queue)
+        handler.addFilter(SamplingFilter(_parse_rates(os.getenv("VOYALTIS_LOG_SAMPLING", ""))))
+        handler.addFilter(ContextFilter())
+
+        level = os.getenv("VOYALTIS_LOG_LEVEL", "INFO").upper()
+        for name in APP_LOGGERS:
+            app_logger = logging.getLogger(name)
+            app_logger.handlers = [handler]
+            app_logger.propagate = False
+            app_logger.setLevel(level)
+        logging.getLogger(TRANSCRIPT_LOGGER).setLevel(os.getenv("VOYALTIS_TRANSCRIPT_LOG_LEVEL", "INFO").upper())
+
+        _listener = QueueListener(queue, sink, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+        return _listener
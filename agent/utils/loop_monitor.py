@@ -0,0 +1,180 @@
+"""
+Event loop lag monitor for Voyaltis Agent
+A heartbeat task measures how late the loop wakes it up; a watchdog thread notices
+when the heartbeat is overdue and captures the stack of the loop thread, so the
+blocking callback is reported by function name (fuzzy matching, prompt building,
+json.dumps of a report...).
+
+C calls that hold the GIL (json.dumps, re) can only be sampled once they return:
+the captured frame is then the Python caller, which still names the offender.
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+import weakref
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+AGENT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+UNKNOWN_OFFENDER = "<not captured>"
+
+# One monitor per event loop
+_monitors: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+@dataclass
+class BlockingStats:
+    """Blocking episodes attributed to one function"""
+    count: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    stack: List[str] = field(default_factory=list)
+
+    def add(self, seconds: float, stack: List[str]):
+        self.count += 1
+        self.total_seconds += seconds
+        if seconds >= self.max_seconds:
+            self.max_seconds = seconds
+            self.stack = stack
+
+
+def _describe(frame, root: str = AGENT_DIR) -> Tuple[str, List[str]]:
+    """
+    (offender, formatted stack) for a frame. The offender is the innermost frame of
+    agent code outside this module, or the innermost frame if none.
+    """
+    summary = traceback.extract_stack(frame)
+    stack = [f"{os.path.relpath(s.filename, root) if s.filename.startswith(root) else s.filename}:{s.lineno} {s.name}" for s in summary]
+
+    chosen = summary[-1] if summary else None
+    for entry in reversed(summary):
+        if entry.filename.startswith(root) and entry.filename != __file__ and "site-packages" not in entry.filename:
+            chosen = entry
+            break
+    if chosen is None:
+        return UNKNOWN_OFFENDER, stack
+
+    location = os.path.relpath(chosen.filename, root) if chosen.filename.startswith(root) else os.path.basename(chosen.filename)
+    return f"{chosen.name} ({location}:{chosen.lineno})", stack
+
+
+class LoopMonitor:
+    """Continuous loop lag measurement with stack capture of blocking callbacks"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, interval: float = 0.1, threshold: float = 0.1):
+        self.loop = loop
+        self.interval = interval
+        self.threshold = threshold
+        self.offenders: Dict[str, BlockingStats] = {}
+        self.max_lag = 0.0
+
+        self._lock = threading.Lock()
+        self._beat = time.monotonic()
+        self._beat_seq = 0
+        self._captures: Dict[int, Tuple[str, List[str]]] = {}
+        self._loop_thread_id: Optional[int] = None
+        self._stopped = threading.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+
+    def start(self):
+        self._task = self.loop.create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name="voyaltis-loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+
+    async def _heartbeat(self):
+        self._loop_thread_id = threading.get_ident()
+        with self._lock:
+            self._beat = time.monotonic()
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+
+            with self._lock:
+                capture = self._captures.pop(self._beat_seq, None)
+                self._beat_seq += 1
+                self._beat = now
+
+            metrics.LOOP_LAG.observe(lag)
+            self.max_lag = max(self.max_lag, lag)
+            if lag >= self.threshold:
+                self._record(lag, capture)
+
+    def _watch(self):
+        poll = self.threshold / 2
+        while not self._stopped.wait(poll):
+            with self._lock:
+                overdue = time.monotonic() - self._beat > self.interval + self.threshold
+                seq = self._beat_seq
+                if not overdue or seq in self._captures or self._loop_thread_id is None:
+                    continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            capture = _describe(frame)
+            with self._lock:
+                # Only keep it if the loop is still stuck on the same beat
+                if self._beat_seq == seq:
+                    self._captures[seq] = capture
+
+    def _record(self, lag: float, capture: Optional[Tuple[str, List[str]]]):
+        offender, stack = capture if capture else (UNKNOWN_OFFENDER, [])
+        with self._lock:
+            self.offenders.setdefault(offender, BlockingStats()).add(lag, stack)
+        metrics.BLOCKING_CALLS.inc(function=offender)
+        metrics.BLOCKED_SECONDS.inc(lag, function=offender)
+        logger.warning(f"🐢 Event loop blocked {lag * 1000:.0f}ms by {offender}")
+
+    def report(self, top: int = 10) -> List[Dict]:
+        """Worst offenders by total blocked time"""
+        with self._lock:
+            items = sorted(self.offenders.items(), key=lambda item: item[1].total_seconds, reverse=True)[:top]
+        return [
+            {
+                "function": offender,
+                "count": stats.count,
+                "total_ms": round(stats.total_seconds * 1000, 1),
+                "max_ms": round(stats.max_seconds * 1000, 1),
+                "stack": stats.stack[-8:],
+            }
+            for offender, stats in items
+        ]
+
+    def log_report(self, top: int = 5):
+        offenders = self.report(top)
+        if not offenders:
+            logger.info(f"🐢 No event loop blocking over {self.threshold * 1000:.0f}ms (max lag {self.max_lag * 1000:.0f}ms)")
+            return
+        for entry in offenders:
+            logger.warning(f"🐢 Loop blocker: {entry['function']} - {entry['count']}x, total {entry['total_ms']}ms, max {entry['max_ms']}ms")
+            logger.debug("🐢 Stack:\n  " + "\n  ".join(entry["stack"]))
+
+
+def start_loop_monitor(loop: Optional[asyncio.AbstractEventLoop] = None) -> LoopMonitor:
+    """
+    Start (once per loop) the monitor of the running loop.
+    VOYALTIS_LOOP_LAG_THRESHOLD_MS sets the blocking threshold (default 100ms).
+    """
+    loop = loop or asyncio.get_running_loop()
+    monitor = _monitors.get(loop)
+    if monitor is None:
+        threshold = float(os.getenv("VOYALTIS_LOOP_LAG_THRESHOLD_MS", "100")) / 1000
+        monitor = LoopMonitor(loop, threshold=threshold)
+        monitor.start()
+        _monitors[loop] = monitor
+    return monitor
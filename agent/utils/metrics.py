@@ -0,0 +1,417 @@
+"""
+Prometheus metrics for Voyaltis Agent
+Counters, gauges and fixed-bucket histograms kept in memory (a dict update per
+observation). Job processes write a snapshot file every few seconds; the worker
+process serves /metrics by merging them with its own registry. Snapshots of exited
+job processes are folded into one aggregate file on scrape, so the directory stays
+one file per live process however many sessions have run.
+"""
+import asyncio
+import bisect
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+METRICS_DIR = os.getenv("VOYALTIS_METRICS_DIR", os.path.join(tempfile.gettempdir(), "voyaltis-metrics"))
+SNAPSHOT_INTERVAL_SECONDS = 5.0
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+LOOP_LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[Tuple[Tuple[str, ...], object]]:
+        with self._lock:
+            return [(key, value[:] if isinstance(value, list) else value) for key, value in self._values.items()]
+
+
+class Counter(_Metric):
+    """Monotonic counter"""
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """Value that goes up and down (summed across processes)"""
+    type = "gauge"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Fixed-bucket histogram; each label set holds [bucket counts..., sum, count]"""
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def time(self, **labels) -> "_Timer":
+        """Context manager observing the elapsed time of its block"""
+        return _Timer(self, labels)
+
+
+class _Timer:
+    __slots__ = ("_histogram", "_labels", "_started")
+
+    def __init__(self, histogram: Histogram, labels: Dict[str, str]):
+        self._histogram = histogram
+        self._labels = labels
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._histogram.observe(time.perf_counter() - self._started, **self._labels)
+        return False
+
+
+class MetricsRegistry:
+    """Metrics of one process, rendered alone or merged with other processes' snapshots"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def snapshot(self) -> Dict:
+        """JSON-serializable state of every metric"""
+        return {
+            name: {
+                "type": metric.type,
+                "help": metric.documentation,
+                "labelnames": list(metric.labelnames),
+                "buckets": list(getattr(metric, "buckets", ())),
+                "samples": [[list(key), value] for key, value in metric.samples()],
+            }
+            for name, metric in self._metrics.items()
+        }
+
+    def render(self, other_snapshots: Iterable[Dict] = ()) -> str:
+        """Prometheus text exposition of this registry plus other process snapshots"""
+        return render_snapshots([self.snapshot(), *other_snapshots])
+
+
+def merge_snapshots(snapshots: Iterable[Dict]) -> Dict:
+    """Sum counters, gauges and histogram buckets of the same metric across processes"""
+    merged: Dict[str, Dict] = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot.items():
+            target = merged.get(name)
+            if target is None:
+                target = merged[name] = {**metric, "samples": {}}
+            elif target["buckets"] != metric["buckets"]:
+                logger.warning(f"⚠️ Bucket mismatch for {name}, skipping one process snapshot")
+                continue
+            samples = target["samples"]
+            for key, value in metric["samples"]:
+                key = tuple(key)
+                if key not in samples:
+                    samples[key] = list(value) if isinstance(value, list) else value
+                elif isinstance(value, list):
+                    samples[key] = [a + b for a, b in zip(samples[key], value)]
+                else:
+                    samples[key] += value
+    return merged
+
+
+def render_snapshots(snapshots: Iterable[Dict]) -> str:
+    lines: List[str] = []
+    for name, metric in sorted(merge_snapshots(snapshots).items()):
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        labelnames = metric["labelnames"]
+        for key, value in sorted(metric["samples"].items()):
+            if metric["type"] != "histogram":
+                lines.append(f"{name}{_format_labels(labelnames, key)} {_format_value(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip([*metric["buckets"], float("inf")], value[:-2]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{name}_bucket{_format_labels(labelnames, key, le)} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labelnames, key)} {_format_value(value[-2])}")
+            lines.append(f"{name}_count{_format_labels(labelnames, key)} {value[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+# ==================================================================================
+# Agent metrics
+# ==================================================================================
+
+REGISTRY = MetricsRegistry()
+
+ACTIVE_SESSIONS = REGISTRY.gauge("voyaltis_active_sessions", "Sessions currently running")
+SESSIONS = REGISTRY.counter("voyaltis_sessions_total", "Sessions started", ("project",))
+QUESTIONS_ASKED = REGISTRY.counter("voyaltis_questions_asked_total", "Questions asked by the agent", ("project", "mode"))
+END_DETECTIONS = REGISTRY.counter("voyaltis_end_detection_total", "Conversation ends by detection path", ("path", "mode"))
+REPORT_LATENCY = REGISTRY.histogram("voyaltis_report_generation_seconds", "Report generation latency", ("project",))
+REPORT_FAILURES = REGISTRY.counter("voyaltis_report_failures_total", "Failed report generations", ("project",))
+LLM_TOKENS = REGISTRY.counter("voyaltis_llm_tokens_total", "LLM tokens by project, direction (in/out) and model", ("project", "direction", "model"))
+FUZZY_MATCHES = REGISTRY.counter("voyaltis_fuzzy_match_total", "Sales product name mapping results (direct/fuzzy/miss)", ("result",))
+LOOP_LAG = REGISTRY.histogram("voyaltis_event_loop_lag_seconds", "Event loop scheduling lag", buckets=LOOP_LAG_BUCKETS)
+BLOCKING_CALLS = REGISTRY.counter("voyaltis_event_loop_blocking_total", "Event loop blocking episodes over threshold, by offending function", ("function",))
+BLOCKED_SECONDS = REGISTRY.counter("voyaltis_event_loop_blocked_seconds_total", "Event loop time lost to blocking, by offending function", ("function",))
+
+
+def record_llm_usage(project: str, model: str, tokens_in: Optional[int], tokens_out: Optional[int]):
+    """Count LLM tokens, ignoring providers that did not report usage"""
+    if tokens_in:
+        LLM_TOKENS.inc(tokens_in, project=project, direction="in", model=model)
+    if tokens_out:
+        LLM_TOKENS.inc(tokens_out, project=project, direction="out", model=model)
+
+
+# ==================================================================================
+# Process snapshots and HTTP endpoint
+# ==================================================================================
+
+_snapshot_thread: Optional[threading.Thread] = None
+_snapshot_lock = threading.Lock()
+_server_pid: Optional[int] = None
+_fold_lock = threading.Lock()
+
+# Counters and histograms of every exited job process, summed by the serving process
+EXITED_SNAPSHOT = "metrics-exited.json"
+
+
+def _snapshot_path(pid: int) -> str:
+    return os.path.join(METRICS_DIR, f"metrics-{pid}.json")
+
+
+def write_snapshot():
+    """Write this process' registry to the shared metrics directory (atomic replace)"""
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    path = _snapshot_path(os.getpid())
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"pid": os.getpid(), "metrics": REGISTRY.snapshot()}, f)
+    os.replace(tmp_path, path)
+
+
+def start_snapshot_writer(interval: float = SNAPSHOT_INTERVAL_SECONDS):
+    """Write snapshots every interval from a daemon thread; idempotent per process"""
+    global _snapshot_thread
+    if os.getpid() == _server_pid:
+        return  # The serving process reads its registry directly
+    with _snapshot_lock:
+        if _snapshot_thread is not None and _snapshot_thread.is_alive():
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    write_snapshot()
+                except OSError as e:
+                    logger.warning(f"⚠️ Could not write metrics snapshot: {e}")
+
+        _snapshot_thread = threading.Thread(target=run, name="voyaltis-metrics-snapshot", daemon=True)
+        _snapshot_thread.start()
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _as_snapshot(merged: Dict) -> Dict:
+    """A merge_snapshots result back in snapshot form"""
+    return {
+        name: {**metric, "samples": [[list(key), value] for key, value in metric["samples"].items()]}
+        for name, metric in merged.items()
+    }
+
+
+def _fold_exited(exited: Dict, snapshots: List[Dict]) -> Dict:
+    """
+    Add the counters and histograms of exited processes to the exited aggregate file
+    and remove their own files, so the directory holds one file per live process
+    """
+    exited = _as_snapshot(merge_snapshots([exited, *snapshots]))
+    path = os.path.join(METRICS_DIR, EXITED_SNAPSHOT)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"pid": None, "metrics": exited}, f)
+    os.replace(tmp_path, path)
+    return exited
+
+
+def read_snapshots() -> List[Dict]:
+    """
+    Snapshots of the other processes. Counters and histograms of exited processes
+    are kept (totals stay monotonic) in a single aggregate; their gauges are dropped.
+    """
+    snapshots = []
+    try:
+        names = os.listdir(METRICS_DIR)
+    except FileNotFoundError:
+        return snapshots
+    with _fold_lock:
+        exited: Dict = {}
+        dead: List[Tuple[str, Dict]] = []
+        for name in names:
+            path = os.path.join(METRICS_DIR, name)
+            if name.startswith("metrics-") and name.endswith(".json.tmp"):
+                # Left by a process killed mid-write
+                pid = name[len("metrics-"):-len(".json.tmp")]
+                if pid.isdigit() and not _pid_alive(int(pid)):
+                    _remove(path)
+                continue
+            if not (name.startswith("metrics-") and name.endswith(".json")):
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            metrics = data.get("metrics", {})
+            if name == EXITED_SNAPSHOT:
+                exited = metrics
+            elif data.get("pid") == os.getpid():
+                continue
+            elif not _pid_alive(data.get("pid", -1)):
+                dead.append((path, {n: m for n, m in metrics.items() if m["type"] != "gauge"}))
+            else:
+                snapshots.append(metrics)
+        if dead:
+            try:
+                exited = _fold_exited(exited, [metrics for _, metrics in dead])
+            except OSError as e:
+                logger.warning(f"⚠️ Could not fold exited metrics snapshots: {e}")
+                snapshots.extend(metrics for _, metrics in dead)
+            else:
+                for path, _ in dead:
+                    _remove(path)
+        if exited:
+            snapshots.append(exited)
+    return snapshots
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def render_all() -> str:
+    return REGISTRY.render(read_snapshots())
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1") -> threading.Thread:
+    """
+    Serve /metrics from a daemon thread with its own event loop, so scrapes never
+    run on a session's loop. Clears snapshots left by a previous worker run.
+    """
+    from aiohttp import web
+
+    global _server_pid
+    _server_pid = os.getpid()
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    for name in os.listdir(METRICS_DIR):
+        if name.startswith("metrics-"):
+            _remove(os.path.join(METRICS_DIR, name))
+
+    async def handle_metrics(request):
+        text = await asyncio.get_running_loop().run_in_executor(None, render_all)
+        return web.Response(text=text, content_type="text/plain", charset="utf-8", headers={"X-Prometheus-Version": "0.0.4"})
+
+    def run():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        app = web.Application()
+        app.router.add_get("/metrics", handle_metrics)
+        runner = web.AppRunner(app, access_log=None)
+        loop.run_until_complete(runner.setup())
+        loop.run_until_complete(web.TCPSite(runner, host, port).start())
+        loop.run_forever()
+
+    thread = threading.Thread(target=run, name="voyaltis-metrics-server", daemon=True)
+    thread.start()
+    logger.info(f"📈 Metrics endpoint on http://{host}:{port}/metrics")
+    return thread
@@ -0,0 +1,128 @@
+"""
+Executor offloading for Voyaltis Agent
+CPU-heavy session work (prompt building, catalog rendering, sales mapping, report
+serialization) runs inline while small, and moves to a thread or process pool once
+its input passes a per-operation threshold, so one large project does not stall the
+audio of the other rooms sharing the event loop. Every call is timed per operation.
+
+Configuration (environment):
+    VOYALTIS_OFFLOAD_THREADS      thread pool size (default 4)
+    VOYALTIS_OFFLOAD_PROCESSES    process pool size (default 0: CPU work uses threads)
+    VOYALTIS_OFFLOAD_THRESHOLDS   per-operation overrides, "instructions=50000,map_sales=20"
+"""
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+INLINE = "inline"
+THREAD = "thread"
+PROCESS = "process"
+
+# Input size (operation specific unit) from which an operation leaves the event loop
+DEFAULT_THRESHOLDS: Dict[str, int] = {
+    "instructions": 100_000,        # characters of catalog text in the prompt
+    "extraction_prompt": 100_000,   # characters of conversation + catalog text
+    "map_sales": 50 * 1_000,        # sales lines x catalog products
+    "report_json": 200,             # report entries (sales + amounts + insights)
+}
+
+OFFLOAD_SECONDS = metrics.REGISTRY.histogram(
+    "voyaltis_offload_seconds", "Offloadable operation duration, by operation and executor", ("operation", "executor")
+)
+
+
+def _parse_thresholds(setting: str) -> Dict[str, int]:
+    thresholds = {}
+    for item in setting.split(","):
+        name, _, value = item.partition("=")
+        if name.strip() and value.strip():
+            thresholds[name.strip()] = int(value)
+    return thresholds
+
+
+class Offloader:
+    """Dispatches operations inline, to a thread pool or to a process pool"""
+
+    def __init__(self, threads: int = 4, processes: int = 0, thresholds: Optional[Dict[str, int]] = None):
+        self.threads = threads
+        self.processes = processes
+        self.thresholds = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+
+    @classmethod
+    def from_env(cls) -> "Offloader":
+        return cls(
+            threads=int(os.getenv("VOYALTIS_OFFLOAD_THREADS", "4")),
+            processes=int(os.getenv("VOYALTIS_OFFLOAD_PROCESSES", "0")),
+            thresholds=_parse_thresholds(os.getenv("VOYALTIS_OFFLOAD_THRESHOLDS", "")),
+        )
+
+    def _executor(self, kind: str) -> Executor:
+        if kind == PROCESS:
+            if self._process_pool is None:
+                # spawn: workers must not inherit the LiveKit job process state
+                self._process_pool = ProcessPoolExecutor(self.processes, mp_context=multiprocessing.get_context("spawn"))
+            return self._process_pool
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(self.threads, thread_name_prefix="voyaltis-offload")
+        return self._thread_pool
+
+    def executor_for(self, operation: str, size: int, cpu_bound: bool) -> str:
+        """Where an operation of this input size runs"""
+        if size < self.thresholds.get(operation, 0):
+            return INLINE
+        if cpu_bound and self.processes > 0:
+            return PROCESS
+        return THREAD if self.threads > 0 else INLINE
+
+    async def run(self, operation: str, func: Callable, *args, size: int = 0, cpu_bound: bool = False, **kwargs):
+        """
+        Run func(*args, **kwargs) for an operation, off the loop once size passes its threshold.
+        cpu_bound operations go to the process pool when one is configured: func and its
+        arguments must then be picklable (module-level functions, plain data).
+        """
+        kind = self.executor_for(operation, size, cpu_bound)
+        started = time.perf_counter()
+        if kind == INLINE:
+            result = func(*args, **kwargs)
+        else:
+            call = functools.partial(func, *args, **kwargs)
+            result = await asyncio.get_running_loop().run_in_executor(self._executor(kind), call)
+        elapsed = time.perf_counter() - started
+
+        OFFLOAD_SECONDS.observe(elapsed, operation=operation, executor=kind)
+        if kind != INLINE:
+            logger.info(f"🧵 {operation} ({size}) ran in {kind} pool in {elapsed * 1000:.1f}ms")
+        return result
+
+    def shutdown(self):
+        for pool in (self._thread_pool, self._process_pool):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._thread_pool = self._process_pool = None
+
+
+_offloader: Optional[Offloader] = None
+
+
+def get_offloader() -> Offloader:
+    """Process-wide offloader, configured from the environment on first use"""
+    global _offloader
+    if _offloader is None:
+        _offloader = Offloader.from_env()
+    return _offloader
+
+
+async def offload(operation: str, func: Callable, *args, size: int = 0, cpu_bound: bool = False, **kwargs):
+    """Shortcut for get_offloader().run(...)"""
+    return await get_offloader().run(operation, func, *args, size=size, cpu_bound=cpu_bound, **kwargs)
@@ -0,0 +1,120 @@
+"""
+Opening message audio for Voyaltis Agent
+The opening line only depends on the user name, the first attention point, the report
+frequency and the time period. It is synthesized as soon as the project config is
+known, in parallel with session.start, and kept in the TTS cache (utils/tts_cache.py,
+memory and disk), so the next session of the same rep on the same project plays it
+without a TTS call. session.say() plays the frames as they arrive.
+
+Configuration (environment):
+    VOYALTIS_OPENING_AUDIO     0 to synthesize the opening live in session.say()
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import AsyncIterator, Callable, List, Optional
+
+from utils import metrics
+from utils.tts_cache import AudioClip, TTSCache, livekit_frame
+
+logger = logging.getLogger(__name__)
+
+OPENING_AUDIO_ENABLED = os.getenv("VOYALTIS_OPENING_AUDIO", "1").strip().lower() not in ("0", "false", "no")
+
+OPENING_AUDIO = metrics.REGISTRY.counter(
+    "voyaltis_opening_audio_total", "Opening message audio by source (cache/synthesized/failed/live)", ("source",)
+)
+OPENING_FIRST_FRAME = metrics.REGISTRY.histogram(
+    "voyaltis_opening_first_frame_seconds", "Opening audio: start of rendering to first frame, by source", ("source",)
+)
+
+
+class OpeningAudio:
+    """
+    Opening clip rendered in the background: from the TTS cache, else from tts.synthesize()
+    (then cached). frames() can be iterated while rendering is in progress.
+    """
+
+    def __init__(self, tts, cache: TTSCache, text: str, make_frame: Callable = livekit_frame):
+        self.tts = tts
+        self.cache = cache
+        self.text = text
+        self.make_frame = make_frame
+        self.source: Optional[str] = None
+        self.error: Optional[Exception] = None
+        self._chunks: List[bytes] = []
+        self._format: Optional[tuple] = None
+        self._done = False
+        self._updated = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> "OpeningAudio":
+        self._task = asyncio.ensure_future(self._render())
+        return self
+
+    @property
+    def failed(self) -> bool:
+        return self.error is not None
+
+    def _push(self, pcm: bytes, sample_rate: int, num_channels: int):
+        if not self._chunks:
+            OPENING_FIRST_FRAME.observe(time.perf_counter() - self._started, source=self.source)
+        self._format = (sample_rate, num_channels)
+        self._chunks.append(pcm)
+        self._updated.set()
+
+    async def _render(self):
+        self._started = time.perf_counter()
+        try:
+            clip = await self.cache.get(self.text)
+            if clip:
+                self.source = "cache"
+                for chunk in clip.chunks():
+                    self._push(chunk, clip.sample_rate, clip.num_channels)
+            else:
+                self.source = "synthesized"
+                async with self.tts.synthesize(self.text) as stream:
+                    async for audio in stream:
+                        frame = audio.frame
+                        self._push(bytes(frame.data), frame.sample_rate, frame.num_channels)
+                if self._chunks:
+                    await self.cache.put(self.text, AudioClip(b"".join(self._chunks), *self._format))
+            OPENING_AUDIO.inc(source=self.source)
+            logger.info(f"🔊 Opening audio ready ({self.source}, {len(self._chunks)} frames)")
+        except Exception as e:
+            self.error = e
+            OPENING_AUDIO.inc(source="failed")
+            logger.warning(f"⚠️ Opening audio pre-synthesis failed: {e}")
+        finally:
+            self._done = True
+            self._updated.set()
+
+    async def frames(self) -> AsyncIterator:
+        """
+        Audio frames of the opening, as soon as each one is rendered. If rendering fails
+        before the first frame (even after session.say started), the opening is
+        synthesized live instead; a failure part-way leaves the opening cut.
+        """
+        played = 0
+        while True:
+            while played < len(self._chunks):
+                yield self.make_frame(self._chunks[played], *self._format)
+                played += 1
+            if self._done:
+                break
+            self._updated.clear()
+            await self._updated.wait()
+
+        if self.failed and not played:
+            OPENING_AUDIO.inc(source="live")
+            logger.info("🔊 Opening audio: live synthesis after the pre-synthesis failure")
+            try:
+                async with self.tts.synthesize(self.text) as stream:
+                    async for audio in stream:
+                        frame = audio.frame
+                        yield self.make_frame(bytes(frame.data), frame.sample_rate, frame.num_channels)
+            except Exception as e:
+                logger.error(f"❌ Opening audio live synthesis failed: {e}")
+        elif self.failed:
+            logger.warning(f"⚠️ Opening audio cut after {played} frames")
@@ -0,0 +1,164 @@
+"""
+Sampled per-session profiling for Voyaltis Agent
+Opt-in statistical profiler for the lifetime of one session: a thread samples every
+thread's stack (sys._current_frames) and writes folded stacks (flamegraph.pl,
+speedscope, inferno), plus a tracemalloc top-allocations snapshot, when the session closes.
+
+Configuration (environment):
+    VOYALTIS_PROFILE=1                 profile every session
+    VOYALTIS_PROFILE_SAMPLE_RATE=0.05  or profile this fraction of sessions
+    VOYALTIS_PROFILE_PROJECTS=perrot   restrict to these project ids (comma-separated)
+    VOYALTIS_PROFILE_DIR=../logs       output directory
+    VOYALTIS_PROFILE_INTERVAL_MS=10    sampling interval
+"""
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+AGENT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PROFILE_DIR = os.path.join("..", "logs")
+TRACEMALLOC_FRAMES = 25
+TRACEMALLOC_TOP = 50
+
+
+def _frame_label(code) -> str:
+    filename = code.co_filename
+    if filename.startswith(AGENT_DIR):
+        location = os.path.relpath(filename, AGENT_DIR)
+    else:
+        # Library frames: keep the path from the package directory
+        parts = filename.replace("\\", "/").split("/")
+        location = "/".join(parts[-2:])
+    return f"{code.co_name} ({location}:{code.co_firstlineno})"
+
+
+def _safe_tag(value: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", value or "unknown")[:80]
+
+
+class SessionProfiler:
+    """Stack sampler plus tracemalloc for one session"""
+
+    def __init__(self, interval: float = 0.01, output_dir: str = DEFAULT_PROFILE_DIR):
+        self.interval = interval
+        self.output_dir = output_dir
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self._labels: Dict[object, str] = {}
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._owns_tracemalloc = False
+        self._started = 0.0
+
+    def start(self):
+        self._started = time.perf_counter()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            self._owns_tracemalloc = True
+        self._thread = threading.Thread(target=self._sample_loop, name="voyaltis-profiler", daemon=True)
+        self._thread.start()
+
+    def _sample_loop(self):
+        own_id = threading.get_ident()
+        thread_names = {}
+        while not self._stopped.wait(self.interval):
+            if len(thread_names) != threading.active_count():
+                thread_names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack: List[str] = []
+                while frame is not None:
+                    code = frame.f_code
+                    label = self._labels.get(code)
+                    if label is None:
+                        label = self._labels[code] = _frame_label(code)
+                    stack.append(label)
+                    frame = frame.f_back
+                stack.append(thread_names.get(thread_id, f"thread-{thread_id}"))
+                self.samples[";".join(reversed(stack))] += 1
+            self.sample_count += 1
+
+    def _halt(self):
+        self._stopped.set()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+
+    def discard(self):
+        """Stop without writing anything (session not selected after all)"""
+        self._halt()
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+
+    def stop(self, project_id: str, room_name: str) -> Dict[str, str]:
+        """Stop sampling and write the profile files; returns {kind: path}"""
+        self._halt()
+
+        snapshot = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        stem = os.path.join(
+            self.output_dir,
+            f"profile-{_safe_tag(project_id)}-{_safe_tag(room_name)}-{time.strftime('%Y%m%d-%H%M%S')}",
+        )
+        paths = {"folded": f"{stem}.folded"}
+        with open(paths["folded"], "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+        if snapshot is not None:
+            paths["tracemalloc"] = f"{stem}.tracemalloc.txt"
+            statistics = snapshot.filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            )).statistics("lineno")
+            total = sum(stat.size for stat in statistics)
+            with open(paths["tracemalloc"], "w", encoding="utf-8") as f:
+                f.write(f"# project={project_id} room={room_name} total={total / 1024:.1f} KiB\n")
+                for stat in statistics[:TRACEMALLOC_TOP]:
+                    frame = stat.traceback[0]
+                    f.write(f"{stat.size / 1024:10.1f} KiB {stat.count:8d} blocks  {frame.filename}:{frame.lineno}\n")
+
+        elapsed = time.perf_counter() - self._started
+        logger.info(f"🔬 Session profile ({self.sample_count} samples over {elapsed:.0f}s): {paths}")
+        return paths
+
+
+def should_profile() -> bool:
+    """Whether this session is sampled, from VOYALTIS_PROFILE / VOYALTIS_PROFILE_SAMPLE_RATE"""
+    if os.getenv("VOYALTIS_PROFILE", "").lower() in ("1", "true", "yes"):
+        return True
+    rate = float(os.getenv("VOYALTIS_PROFILE_SAMPLE_RATE", "0") or 0)
+    return rate > 0 and random.random() < rate
+
+
+def profiling_project_selected(project_id: Optional[str]) -> bool:
+    """Whether VOYALTIS_PROFILE_PROJECTS (if set) includes this project"""
+    projects = {p.strip() for p in os.getenv("VOYALTIS_PROFILE_PROJECTS", "").split(",") if p.strip()}
+    return not projects or project_id in projects
+
+
+def start_session_profiler() -> Optional[SessionProfiler]:
+    """
+    Start a profiler if this session is sampled, else None.
+    Started before the project is known: check profiling_project_selected() once it is.
+    """
+    if not should_profile():
+        return None
+    profiler = SessionProfiler(
+        interval=float(os.getenv("VOYALTIS_PROFILE_INTERVAL_MS", "10")) / 1000,
+        output_dir=os.getenv("VOYALTIS_PROFILE_DIR", DEFAULT_PROFILE_DIR),
+    )
+    profiler.start()
+    return profiler
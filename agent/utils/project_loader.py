@@ -0,0 +1,132 @@
+"""
+Project data loading for Voyaltis Agent
+Configuration, products and document index of data/projects/{project_id}/, with the
+defaults used when a project has none. Paths are relative to agent/.
+"""
+import asyncio
+import json
+import logging
+import os
+from typing import Dict, Optional
+
+from utils.config_loader import ConfigLoader
+from utils.document_index import DocumentIndex, build_project_index
+from utils.offload import offload
+
+logger = logging.getLogger(__name__)
+
+PROJECTS_DIR = os.path.join("..", "data", "projects")
+
+# Above this size the full catalog is replaced in the prompt by one line per product,
+# product details then come from the document index passages of each turn
+FULL_CATALOG_PROMPT_MAX_CHARS = 8000
+
+# Background document index builds of this process, by project
+_index_builds: Dict[str, asyncio.Task] = {}
+
+
+def load_project_config(project_id: str) -> dict:
+    """
+    Load project configuration from data/projects/{project_id}/config.json
+    """
+    try:
+        config_path = os.path.join(PROJECTS_DIR, project_id, "config.json")
+        with open(config_path, 'r') as f:
+            return json.load(f)
+    except Exception as e:
+        logger.error(f"Error loading project config for {project_id}: {e}")
+        return {}
+
+
+def load_project_products(project_id: str) -> ConfigLoader:
+    """
+    Load project-specific products from data/projects/{project_id}/products.json
+    Returns a new ConfigLoader with the project's products, or the default one if not found
+    """
+    try:
+        products_path = os.path.join(PROJECTS_DIR, project_id, "products.json")
+        client_config_path = os.path.join(PROJECTS_DIR, project_id, "client_config.json")
+
+        # Check if project-specific products file exists
+        if os.path.exists(products_path):
+            logger.info(f"📦 Loading products from project: {project_id}")
+
+            # Load with project-specific client config if it exists, otherwise use non-existent path
+            # This will force ConfigLoader to use generic defaults instead of Samsung config
+            if os.path.exists(client_config_path):
+                config_loader = ConfigLoader(products_path, client_config_path)
+            else:
+                # Pass a non-existent path to force default config (not Samsung)
+                config_loader = ConfigLoader(products_path, "non_existent_config.json")
+
+            logger.info(f"✅ Loaded {len(config_loader.products)} products from project {project_id}")
+            return config_loader
+        else:
+            logger.warning(f"⚠️ No products.json found for project {project_id}, using defaults")
+            return ConfigLoader("config/products.json")
+    except Exception as e:
+        logger.error(f"Error loading project products for {project_id}: {e}")
+        return ConfigLoader("config/products.json")
+
+
+def load_project_documents(project_id: str, build: bool = False) -> Optional[DocumentIndex]:
+    """
+    Load the persisted document index of data/projects/{project_id}/
+    Returns None if the project has nothing to index, or while its index is missing or
+    stale: it is then rebuilt in the background for the next sessions (deploys build it
+    ahead with python -m utils.document_index build --all). Offline tools pass build=True
+    to build it inline instead.
+    """
+    try:
+        document_index = DocumentIndex.for_project(os.path.join(PROJECTS_DIR, project_id), build=build)
+        if document_index is None:
+            schedule_index_build(project_id)
+        elif len(document_index):
+            logger.info(f"📚 Document index ready for {project_id}: {len(document_index)} passages")
+            return document_index
+    except Exception as e:
+        logger.error(f"Error loading document index for {project_id}: {e}")
+    return None
+
+
+def schedule_index_build(project_id: str) -> Optional[asyncio.Task]:
+    """Rebuild a project's document index off the event loop, once at a time per project"""
+    task = _index_builds.get(project_id)
+    if task is not None:
+        return task
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+    logger.warning(f"⚠️ Document index of {project_id} missing or stale: full catalog for this session, rebuilding in the background")
+    task = loop.create_task(offload("document_index", build_project_index, os.path.join(PROJECTS_DIR, project_id), cpu_bound=True))
+    _index_builds[project_id] = task
+
+    def done(task: asyncio.Task):
+        _index_builds.pop(project_id, None)
+        if not task.cancelled() and task.exception():
+            logger.error(f"Error building document index for {project_id}: {task.exception()}")
+
+    task.add_done_callback(done)
+    return task
+
+
+def products_info_for_prompt(config_loader: ConfigLoader, document_index: Optional[DocumentIndex]) -> Optional[str]:
+    """Products list for the agent instructions, None without products"""
+    if not config_loader.products:
+        return None
+    products_info = config_loader.get_products_list_for_prompt()
+    # Large catalogs: one line per product, details retrieved per turn
+    if document_index and len(products_info) > FULL_CATALOG_PROMPT_MAX_CHARS:
+        products_info = config_loader.get_products_summary_for_prompt()
+    return products_info
+
+
+def list_projects() -> list:
+    """Project ids of data/projects/ that have a config.json"""
+    if not os.path.isdir(PROJECTS_DIR):
+        return []
+    return sorted(
+        name for name in os.listdir(PROJECTS_DIR)
+        if os.path.exists(os.path.join(PROJECTS_DIR, name, "config.json"))
+    )
@@ -0,0 +1,152 @@
+"""
+Report generation for Voyaltis Agent
+End of conversation: extraction prompt → LLM (Claude) → JSON → fuzzy sales mapping →
+sales amounts → "conversation-complete" packet to the client. The completion
+function and the room are injected, so the replay benchmark runs the same code with
+fake ones.
+"""
+import json
+import logging
+import os
+import time
+import traceback
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from utils import metrics
+from utils.offload import offload
+
+logger = logging.getLogger(__name__)
+
+REPORT_MODEL = "claude-sonnet-4-20250514"
+
+# Anthropic API base URL override (local mock server for load tests), default API otherwise
+REPORT_BASE_URL = os.getenv("VOYALTIS_REPORT_BASE_URL") or None
+
+# prompt -> response text
+Completion = Callable[[str], Awaitable[str]]
+
+
+async def claude_completion(prompt: str, project_id: Optional[str] = None) -> str:
+    """Report completion with Claude (Anthropic API), token usage recorded per project"""
+    from anthropic import AsyncAnthropic
+    anthropic = AsyncAnthropic(api_key=os.getenv("ANTHROPIC_API_KEY"), base_url=REPORT_BASE_URL)
+
+    response = await anthropic.messages.create(
+        model=REPORT_MODEL,
+        max_tokens=2048,
+        messages=[{"role": "user", "content": prompt}]
+    )
+    metrics.record_llm_usage(project_id or "default", "claude-sonnet-4", response.usage.input_tokens, response.usage.output_tokens)
+    return response.content[0].text
+
+
+def parse_report_json(response_text: str) -> Dict:
+    """JSON of the LLM response, markdown code fences removed"""
+    response_text = response_text.strip()
+    if "```json" in response_text:
+        response_text = response_text.split("```json")[1].split("```")[0].strip()
+    elif "```" in response_text:
+        response_text = response_text.split("```")[1].split("```")[0].strip()
+    return json.loads(response_text)
+
+
+def calculate_sales_amounts(sales: Dict[str, float], catalog) -> Tuple[Dict[str, float], float]:
+    """({product_name: amount}, total) from quantities and the catalog price column (no discount)"""
+    total_amount = 0.0
+    sales_amounts = {}
+    for product_name, quantity in sales.items():
+        if quantity > 0:
+            price = catalog.price_of(product_name)
+            amount = quantity * price
+            sales_amounts[product_name] = round(amount, 2)
+            total_amount += amount
+
+            if price > 0:
+                logger.debug("  ✓ %s: %s × %s€ = %.2f€", product_name, quantity, price, amount)
+            else:
+                logger.warning("  ⚠️  %s: No price found (quantity: %s)", product_name, quantity)
+    return sales_amounts, total_amount
+
+
+async def send_ending_signal(room):
+    """Tell the client the conversation is ending (cuts the microphone)"""
+    await room.local_participant.publish_data(
+        payload=json.dumps({"type": "conversation_ending"}).encode('utf-8'),
+        topic="conversation-ending"
+    )
+
+
+async def generate_report(
+    room,
+    messages: List[Dict[str, str]],
+    attention_points: List[Dict],
+    config_loader,
+    prompt_builder,
+    sales_analyzer,
+    complete: Optional[Completion] = None,
+    project_id: Optional[str] = None,
+) -> Optional[Dict]:
+    """
+    Generate the report of a conversation and publish it to the room.
+    Returns the published report data, or None if generation failed (already logged).
+    """
+    logger.info("📊 Generating report...")
+    if complete is None:
+        async def complete(prompt: str) -> str:
+            return await claude_completion(prompt, project_id)
+
+    conversation_text = "\n".join(f"{msg['role'].upper()}: {msg['content']}" for msg in messages)
+    attention_structure = "\n".join(
+        f"{i}. {point.get('description', '').upper()}"
+        for i, point in enumerate(attention_points, 1)
+    )
+
+    prompt = await offload(
+        "extraction_prompt", prompt_builder.build_claude_extraction_prompt,
+        size=len(conversation_text) + len(config_loader.get_products_list_for_prompt()),
+        conversation_text=conversation_text,
+        attention_structure=attention_structure
+    )
+
+    report_started = time.perf_counter()
+    try:
+        extracted_data = parse_report_json(await complete(prompt))
+
+        # Apply fuzzy matching
+        if "sales" in extracted_data:
+            extracted_data["sales"] = await offload(
+                "map_sales", sales_analyzer.map_sales_data, extracted_data["sales"],
+                size=len(extracted_data["sales"]) * len(config_loader.catalog)
+            )
+
+        sales_amounts: Dict[str, float] = {}
+        total_amount = 0.0
+        if extracted_data.get("sales"):
+            logger.info(f"💰 Calculating sales amounts for {len(extracted_data['sales'])} products...")
+            sales_amounts, total_amount = calculate_sales_amounts(extracted_data["sales"], config_loader.catalog)
+
+        extracted_data["sales_amounts"] = sales_amounts  # Individual amounts per product
+        extracted_data["total_amount"] = round(total_amount, 2)
+        logger.info(f"💰 Total sales amount: {extracted_data['total_amount']}€")
+
+        data_message = {
+            "type": "conversation_complete",
+            "data": extracted_data
+        }
+        report_entries = len(extracted_data.get("sales") or {}) + len(sales_amounts) + len(extracted_data.get("key_insights") or [])
+        report_json = await offload("report_json", json.dumps, data_message, size=report_entries)
+
+        await room.local_participant.publish_data(
+            payload=report_json.encode('utf-8'),
+            topic="conversation-complete"
+        )
+
+        logger.info("✅ Report sent to client")
+        metrics.REPORT_LATENCY.observe(time.perf_counter() - report_started, project=project_id or "default")
+        return extracted_data
+
+    except Exception as e:
+        metrics.REPORT_FAILURES.inc(project=project_id or "default")
+        logger.error(f"❌ Report generation failed: {e}")
+        logger.error(traceback.format_exc())
+        return None
@@ -0,0 +1,63 @@
+"""
+Streamed text-mode replies for Voyaltis Agent
+In text mode the reply is published on the conversation-message topic while the LLM
+generates it: agent_response_delta packets carry the new text (the client appends them
+to the message with the same id), then the usual agent_response carries the whole
+reply. Tokens are coalesced so the data channel gets a packet per few words, not per
+token: a packet is sent once min_chars are pending or interval has elapsed since the
+previous one (the first token is sent right away).
+
+Configuration (environment):
+    VOYALTIS_TEXT_DELTA_INTERVAL_MS    minimum time between two delta packets (default 80)
+    VOYALTIS_TEXT_DELTA_MIN_CHARS      pending characters that trigger a packet (default 24)
+"""
+import os
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, Optional
+
+from utils import metrics
+
+DELTA_INTERVAL = float(os.getenv("VOYALTIS_TEXT_DELTA_INTERVAL_MS", "80")) / 1000
+DELTA_MIN_CHARS = int(os.getenv("VOYALTIS_TEXT_DELTA_MIN_CHARS", "24"))
+
+TEXT_DELTA_PACKETS = metrics.REGISTRY.counter(
+    "voyaltis_text_delta_packets_total", "agent_response_delta packets published in text mode"
+)
+
+
+class DeltaPublisher:
+    """Coalesces the tokens of one streamed reply into agent_response_delta packets"""
+
+    def __init__(self, publish: Callable[[Dict], Awaitable], interval: float = DELTA_INTERVAL,
+                 min_chars: int = DELTA_MIN_CHARS, clock: Callable[[], float] = time.perf_counter):
+        self.publish = publish
+        self.interval = interval
+        self.min_chars = min_chars
+        self.clock = clock
+        self.response_id = uuid.uuid4().hex[:12]
+        self.text = ""
+        self.packets = 0
+        self._pending = ""
+        self._last_sent: Optional[float] = None
+
+    async def push(self, token: str):
+        self.text += token
+        self._pending += token
+        if (self._last_sent is None or len(self._pending) >= self.min_chars
+                or self.clock() - self._last_sent >= self.interval):
+            await self.flush()
+
+    async def flush(self):
+        if not self._pending:
+            return
+        packet = {"type": "agent_response_delta", "id": self.response_id, "seq": self.packets, "text": self._pending, "role": "assistant"}
+        self._pending = ""
+        self._last_sent = self.clock()
+        self.packets += 1
+        TEXT_DELTA_PACKETS.inc()
+        await self.publish(packet)
+
+    def final_packet(self, text: str) -> Dict:
+        """The whole reply, replacing the deltas on the client"""
+        return {"type": "agent_response", "id": self.response_id, "text": text, "role": "assistant"}
@@ -0,0 +1,102 @@
+"""
+Scripted transcription for the fake STT provider
+Follows the audio it is fed, like a streaming provider would: a frame whose energy
+is over the threshold is speech. Speech starts the next scripted utterance, interim
+transcripts reveal its words at the speaking rate, and the final transcript comes
+once `endpointing` seconds of silence have followed. Time is the audio position
+(samples fed), so the events of a recording are the same however fast it is fed.
+"""
+import math
+from array import array
+from typing import Callable, List, Sequence, Tuple
+
+START_OF_SPEECH = "start_of_speech"
+INTERIM = "interim"
+FINAL = "final"
+END_OF_SPEECH = "end_of_speech"
+
+DEFAULT_ENERGY_THRESHOLD = 500.0   # RMS of 16-bit samples
+DEFAULT_UTTERANCES = (
+    "J'ai vu trois clients aujourd'hui",
+    "On a vendu douze pots de peinture blanche et quatre rouleaux",
+    "Le client trouve le prix un peu élevé",
+    "Non c'est tout pour aujourd'hui",
+)
+
+Event = Tuple[str, str]
+
+
+def pcm_energy(pcm: bytes) -> float:
+    """RMS of 16-bit PCM samples (all channels)"""
+    samples = array("h", pcm[:len(pcm) - len(pcm) % 2])
+    if not samples:
+        return 0.0
+    return math.sqrt(sum(s * s for s in samples) / len(samples))
+
+
+class UtteranceScript:
+    """Scripted utterances, in order, starting over once all were spoken"""
+
+    def __init__(self, utterances: Sequence[str] = DEFAULT_UTTERANCES):
+        self.utterances = [u for u in utterances if u.strip()] or list(DEFAULT_UTTERANCES)
+        self._next = 0
+
+    def next(self) -> str:
+        utterance = self.utterances[self._next % len(self.utterances)]
+        self._next += 1
+        return utterance
+
+
+class ScriptedTranscriber:
+    """Speech events of one audio stream: feed() each frame, flush() at the end"""
+
+    def __init__(self, next_utterance: Callable[[], str], endpointing: float = 0.3, interim_interval: float = 0.25,
+                 words_per_second: float = 2.5, energy_threshold: float = DEFAULT_ENERGY_THRESHOLD):
+        self.next_utterance = next_utterance
+        self.endpointing = endpointing
+        self.interim_interval = interim_interval
+        self.words_per_second = words_per_second
+        self.energy_threshold = energy_threshold
+        self.position = 0.0
+        self._speech_start = None
+        self._last_voice = 0.0
+        self._words: List[str] = []
+        self._interims = 0
+
+    @property
+    def speaking(self) -> bool:
+        return self._speech_start is not None
+
+    def feed(self, pcm: bytes, sample_rate: int, num_channels: int = 1) -> List[Event]:
+        duration = len(pcm) / (2 * num_channels * sample_rate)
+        start, self.position = self.position, self.position + duration
+        if pcm_energy(pcm) < self.energy_threshold:
+            if self.speaking and self.position - self._last_voice >= self.endpointing:
+                return self._end()
+            return []
+
+        events: List[Event] = []
+        if not self.speaking:
+            self._speech_start = start
+            self._words = self.next_utterance().split()
+            self._interims = 0
+            events.append((START_OF_SPEECH, ""))
+        self._last_voice = self.position
+        spoken = self.position - self._speech_start
+        if spoken >= (self._interims + 1) * self.interim_interval:
+            self._interims += 1
+            # Interims never hold the whole utterance: the final one does
+            count = min(len(self._words) - 1, max(1, int(spoken * self.words_per_second)))
+            if count > 0:
+                events.append((INTERIM, " ".join(self._words[:count])))
+        return events
+
+    def flush(self) -> List[Event]:
+        """End of input: the utterance in progress becomes final"""
+        return self._end() if self.speaking else []
+
+    def _end(self) -> List[Event]:
+        text = " ".join(self._words)
+        self._speech_start = None
+        self._words = []
+        return [(FINAL, text), (END_OF_SPEECH, "")]
@@ -0,0 +1,380 @@
+"""
+Shared-memory product catalogs for Voyaltis Agent
+The worker process publishes compiled catalogs once; job processes attach them read-only
+"""
+import atexit
+import bisect
+import hashlib
+import json
+import logging
+import os
+import struct
+import threading
+from array import array
+from functools import lru_cache
+from multiprocessing import shared_memory
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from utils.catalog import MISSING, ProductCatalog
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"VCAT"
+FORMAT_VERSION = 1
+# magic, format version, header length
+_PREAMBLE = struct.Struct("<4sII")
+_ALIGNMENT = 8
+# Separator for keyword lists inside a string column
+_KEYWORD_SEPARATOR = "\x1f"
+
+# Segments published by this process, unlinked at exit
+_published: Dict[str, shared_memory.SharedMemory] = {}
+# Segments attached by this process, mapped for its whole lifetime since
+# catalog columns keep zero-copy views on them
+_attached: Dict[str, shared_memory.SharedMemory] = {}
+_tracker_lock = threading.Lock()
+
+
+def shared_catalog_name(products_file: str) -> str:
+    """
+    Shared memory name of a products file.
+    Includes mtime and size so an edited file never attaches a stale catalog.
+    """
+    stat = os.stat(products_file)
+    key = f"{os.path.abspath(products_file)}:{stat.st_mtime_ns}:{stat.st_size}"
+    return "voyaltis-cat-" + hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+# Packing ---------------------------------------------------------------------
+
+def _pack_strings(values: Iterable[str]) -> bytes:
+    """Pack strings as (count + 1) uint64 offsets followed by the UTF-8 blob"""
+    blobs = [value.encode("utf-8") for value in values]
+    offsets = array("Q", [0])
+    total = 0
+    for blob in blobs:
+        total += len(blob)
+        offsets.append(total)
+    return offsets.tobytes() + b"".join(blobs)
+
+
+def _encode_row(row: Tuple[Any, ...]) -> str:
+    """Encode a value row as JSON, keyed by field position (missing fields omitted)"""
+    return json.dumps(
+        {str(i): (list(v) if isinstance(v, tuple) else v) for i, v in enumerate(row) if v is not MISSING},
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+
+
+def pack_catalog(catalog: ProductCatalog, prompt_text: str = "") -> bytes:
+    """Serialize a catalog, its keyword index and its rendered prompt text"""
+    count = len(catalog)
+    match_index = catalog.match_index()
+    order = sorted(range(count), key=catalog.labels.__getitem__)
+
+    sections = [
+        ("prices", "d", array("d", catalog.prices).tobytes()),
+        ("targets", "q", array("q", catalog.targets).tobytes()),
+        ("category_ids", "I", array("I", catalog.category_ids).tobytes()),
+        ("label_order", "I", array("I", order).tobytes()),
+        ("names", "str", _pack_strings(catalog.names)),
+        ("display_names", "str", _pack_strings(catalog.display_names)),
+        ("labels", "str", _pack_strings(catalog.labels)),
+        ("keywords", "str", _pack_strings(_KEYWORD_SEPARATOR.join(k) for k in catalog.keywords)),
+        ("match_keywords", "str", _pack_strings(_KEYWORD_SEPARATOR.join(k) for k, _ in match_index)),
+        ("match_name_words", "str", _pack_strings(_KEYWORD_SEPARATOR.join(w) for _, w in match_index)),
+        ("rows", "str", _pack_strings(_encode_row(row) for row in catalog.rows)),
+        ("prompt_text", "text", prompt_text.encode("utf-8")),
+    ]
+
+    layout = {}
+    body = bytearray()
+    for name, kind, data in sections:
+        body.extend(b"\0" * (-len(body) % _ALIGNMENT))
+        layout[name] = [kind, len(body), len(data)]
+        body.extend(data)
+
+    header = json.dumps({
+        "count": count,
+        "field_names": list(catalog.field_names),
+        "categories": list(catalog.categories),
+        "sections": layout,
+    }, ensure_ascii=False).encode("utf-8")
+    header += b" " * (-(_PREAMBLE.size + len(header)) % _ALIGNMENT)
+
+    return _PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header)) + header + bytes(body)
+
+
+# Read-only columns -----------------------------------------------------------
+
+class _StringColumn(Sequence):
+    """Sequence of strings decoded on access from a packed string section"""
+
+    __slots__ = ("_offsets", "_blob")
+
+    def __init__(self, buffer: memoryview, count: int):
+        offsets_size = (count + 1) * 8
+        self._offsets = buffer[:offsets_size].cast("Q")
+        self._blob = buffer[offsets_size:]
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        return str(self._blob[self._offsets[index]:self._offsets[index + 1]], "utf-8")
+
+
+class _SplitColumn(Sequence):
+    """Sequence of string tuples stored as separator-joined strings"""
+
+    __slots__ = ("_strings",)
+
+    def __init__(self, strings: _StringColumn):
+        self._strings = strings
+
+    def __len__(self) -> int:
+        return len(self._strings)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        value = self._strings[index]
+        return tuple(value.split(_KEYWORD_SEPARATOR)) if value else ()
+
+
+class _RowColumn(Sequence):
+    """Sequence of value rows decoded from JSON on access (small per-process LRU)"""
+
+    __slots__ = ("_strings", "_width", "_decode")
+
+    def __init__(self, strings: _StringColumn, width: int):
+        self._strings = strings
+        self._width = width
+        self._decode = lru_cache(maxsize=256)(self._decode_row)
+
+    def _decode_row(self, index: int) -> Tuple[Any, ...]:
+        row = [MISSING] * self._width
+        for position, value in json.loads(self._strings[index]).items():
+            row[int(position)] = tuple(value) if isinstance(value, list) else value
+        return tuple(row)
+
+    def __len__(self) -> int:
+        return len(self._strings)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        return self._decode(index)
+
+
+class _MatchIndexColumn(Sequence):
+    """(lowercased keywords, name words) pairs read from shared memory"""
+
+    __slots__ = ("_keywords", "_name_words")
+
+    def __init__(self, keywords: _SplitColumn, name_words: _SplitColumn):
+        self._keywords = keywords
+        self._name_words = name_words
+
+    def __len__(self) -> int:
+        return len(self._keywords)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return self._keywords[index], self._name_words[index]
+
+
+class SharedProductCatalog(ProductCatalog):
+    """
+    ProductCatalog backed by a shared memory segment.
+    Numeric columns are zero-copy views; strings are decoded on access, so a job
+    process only pays private memory for what it actually reads.
+    """
+
+    __slots__ = ("_shm", "_label_order", "_prompt_section")
+
+    def __init__(self, shm: shared_memory.SharedMemory):
+        buffer = shm.buf
+        magic, version, header_length = _PREAMBLE.unpack_from(buffer, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported shared catalog format in {shm.name}")
+        header = json.loads(bytes(buffer[_PREAMBLE.size:_PREAMBLE.size + header_length]))
+        base = _PREAMBLE.size + header_length
+        count = header["count"]
+
+        def section(name: str) -> memoryview:
+            _kind, offset, length = header["sections"][name]
+            return buffer[base + offset:base + offset + length]
+
+        def numbers(name: str) -> memoryview:
+            kind, _offset, _length = header["sections"][name]
+            return section(name).cast(kind)
+
+        def strings(name: str) -> _StringColumn:
+            return _StringColumn(section(name), count)
+
+        field_names = tuple(header["field_names"])
+        super().__init__(
+            field_names=field_names,
+            rows=_RowColumn(strings("rows"), len(field_names)),
+            names=strings("names"),
+            display_names=strings("display_names"),
+            categories=tuple(header["categories"]),
+            category_ids=numbers("category_ids"),
+            keywords=_SplitColumn(strings("keywords")),
+            prices=numbers("prices"),
+            targets=numbers("targets"),
+            labels=strings("labels"),
+        )
+        self._shm = shm
+        self._label_order = numbers("label_order")
+        self._prompt_section = section("prompt_text")
+        self._match_index = _MatchIndexColumn(
+            _SplitColumn(strings("match_keywords")),
+            _SplitColumn(strings("match_name_words")),
+        )
+
+    @property
+    def prompt_text(self) -> Optional[str]:
+        """Rendered products list, decoded from the shared segment"""
+        return str(self._prompt_section, "utf-8") if len(self._prompt_section) else None
+
+    @property
+    def shared_name(self) -> str:
+        return self._shm.name
+
+    @property
+    def shared_size(self) -> int:
+        return self._shm.size
+
+    def index_of(self, label: str) -> Optional[int]:
+        """Binary search over the label order stored in the segment (no per-process dict)"""
+        labels = self.labels
+        position = bisect.bisect_left(self._label_order, label, key=labels.__getitem__)
+        if position < len(self._label_order) and labels[self._label_order[position]] == label:
+            return self._label_order[position]
+        return None
+
+    def __repr__(self) -> str:
+        return f"<SharedProductCatalog {self._shm.name} {len(self)} products>"
+
+
+# Publish / attach ------------------------------------------------------------
+
+class _Segment(shared_memory.SharedMemory):
+    """
+    Shared memory segment that is never closed implicitly.
+    Catalog columns hold zero-copy views on it, which SharedMemory.__del__
+    cannot close; the mapping is released when the process exits.
+    """
+
+    def __del__(self):
+        pass
+
+
+def _open_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """Attach an existing segment without letting this process unlink it at exit"""
+    if name in _published:
+        return _published[name]
+    try:
+        return _Segment(name=name, track=False)
+    except TypeError:
+        pass
+
+    # Python < 3.13 always registers attached segments with the resource tracker,
+    # which may destroy them when a job process exits: skip that registration
+    from multiprocessing import resource_tracker
+    with _tracker_lock:
+        register = resource_tracker.register
+        resource_tracker.register = lambda rname, rtype: None if rtype == "shared_memory" else register(rname, rtype)
+        try:
+            return _Segment(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+def publish_catalog(products_file: str) -> shared_memory.SharedMemory:
+    """
+    Compile a products file and publish it in shared memory.
+    The segment stays owned by this process and is unlinked at exit.
+    """
+    # Imported here: config_loader itself attaches published catalogs
+    from utils.config_loader import ConfigLoader
+
+    name = shared_catalog_name(products_file)
+    if name in _published:
+        return _published[name]
+
+    config_loader = ConfigLoader(products_file, "non_existent_config.json")
+    payload = pack_catalog(config_loader.catalog, config_loader.get_products_list_for_prompt())
+
+    try:
+        shm = _Segment(name=name, create=True, size=len(payload))
+    except FileExistsError:
+        # Left over by a crashed worker: replace it
+        stale = shared_memory.SharedMemory(name=name)
+        stale.close()
+        stale.unlink()
+        shm = _Segment(name=name, create=True, size=len(payload))
+
+    shm.buf[:len(payload)] = payload
+    _published[name] = shm
+    logger.info(f"📦 Published catalog {products_file} as {name} ({len(payload) / 1024:.0f} KiB)")
+    return shm
+
+
+def attach_catalog(products_file: str) -> Optional[SharedProductCatalog]:
+    """Attach the published catalog of a products file, or None if not published"""
+    try:
+        name = shared_catalog_name(products_file)
+        shm = _attached.get(name) or _open_shared_memory(name)
+    except (FileNotFoundError, OSError):
+        return None
+
+    try:
+        catalog = SharedProductCatalog(shm)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not attach shared catalog {name}: {e}")
+        return None
+
+    _attached[name] = shm
+    return catalog
+
+
+def publish_projects(project_ids: Iterable[str], projects_dir: str = os.path.join("..", "data", "projects")) -> List[str]:
+    """Publish the catalogs of several projects, returning the names that were published"""
+    names = []
+    for project_id in project_ids:
+        products_file = os.path.join(projects_dir, project_id, "products.json")
+        if not os.path.exists(products_file):
+            logger.warning(f"⚠️ No products.json for project {project_id}, not published")
+            continue
+        try:
+            names.append(publish_catalog(products_file).name)
+        except Exception as e:
+            logger.error(f"Error publishing catalog for {project_id}: {e}")
+    return names
+
+
+def unpublish_all():
+    """Unlink every segment published by this process"""
+    while _published:
+        name, shm = _published.popitem()
+        _attached.pop(name, None)
+        try:
+            shm.unlink()
+            shm.close()
+        except (FileNotFoundError, BufferError):
+            # Views attached in this process keep the mapping until exit
+            pass
+
+
+atexit.register(unpublish_all)
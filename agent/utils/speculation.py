@@ -0,0 +1,274 @@
+"""
+Speculative LLM generation for Voyaltis Agent
+While the end of turn is still being decided (VAD silence, adaptive endpointing), the
+reply is generated from the transcript so far. When the turn is committed:
+- hit:   the final transcript says the same thing (case, punctuation, fillers and
+         small wording changes aside, same quantities): the buffered reply is used
+- miss:  it changed materially: the speculative call is cancelled, the reply is
+         generated again from the final transcript
+A transcript that changes while the rep is silent cancels and restarts the
+speculation. Wasted tokens (prompt + generated) of cancelled runs are counted per
+project over a sliding hour; past the project budget, speculation pauses.
+
+Configuration (environment, overridden per project by settings.speculativeResponses
+and settings.speculationMaxWastedTokensPerHour in config.json):
+    VOYALTIS_SPECULATION                       1 to enable (default off)
+    VOYALTIS_SPECULATION_MAX_WASTED_TOKENS     wasted tokens per project and hour (default 20000)
+"""
+import asyncio
+import difflib
+import logging
+import os
+import re
+import time
+from collections import defaultdict, deque
+from dataclasses import asdict, dataclass
+from typing import AsyncIterator, Callable, Deque, Dict, List, Optional, Tuple
+
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+SPECULATION_ENABLED = os.getenv("VOYALTIS_SPECULATION", "0").strip().lower() in ("1", "true", "yes")
+MAX_WASTED_TOKENS_PER_HOUR = int(os.getenv("VOYALTIS_SPECULATION_MAX_WASTED_TOKENS", "20000"))
+
+SPECULATIONS = metrics.REGISTRY.counter(
+    "voyaltis_speculation_total", "Speculative replies by outcome (hit/miss/restarted/cancelled/skipped)", ("project", "result")
+)
+SPECULATION_WASTED_TOKENS = metrics.REGISTRY.counter(
+    "voyaltis_speculation_wasted_tokens_total", "Prompt and generated tokens of discarded speculative replies", ("project",)
+)
+
+FILLER_WORDS = {"euh", "heu", "hum", "hmm", "bah", "ben", "bon", "alors", "genre", "voilà", "quoi"}
+NUMBER_WORDS = {
+    "zéro", "un", "une", "deux", "trois", "quatre", "cinq", "six", "sept", "huit", "neuf", "dix", "onze",
+    "douze", "treize", "quatorze", "quinze", "seize", "vingt", "trente", "quarante", "cinquante",
+    "soixante", "cent", "cents", "mille",
+}
+
+# SpeculationStats field -> voyaltis_speculation_total result label
+RESULT_LABELS = {"hits": "hit", "misses": "miss", "restarted": "restarted", "cancelled": "cancelled", "skipped": "skipped"}
+
+_WORD = re.compile(r"[\w']+", re.UNICODE)
+_END = object()
+
+
+def speculation_settings(project_config: Optional[dict]) -> Tuple[bool, int]:
+    """(enabled, max wasted tokens per hour) of a project"""
+    settings = (project_config or {}).get("settings", {}) or {}
+    enabled = settings.get("speculativeResponses", SPECULATION_ENABLED)
+    budget = settings.get("speculationMaxWastedTokensPerHour", MAX_WASTED_TOKENS_PER_HOUR)
+    return bool(enabled), int(budget)
+
+
+def _words(text: str) -> List[str]:
+    return [w for w in _WORD.findall(text.lower().replace("’", "'")) if w not in FILLER_WORDS]
+
+
+def materially_same(speculated: str, final: str, similarity: float = 0.9) -> bool:
+    """Same request for the LLM: same quantities, and nearly the same words"""
+    a, b = _words(speculated), _words(final)
+    if a == b:
+        return True
+    numbers_a = [w for w in a if w.isdigit() or w in NUMBER_WORDS]
+    numbers_b = [w for w in b if w.isdigit() or w in NUMBER_WORDS]
+    if numbers_a != numbers_b:
+        return False
+    return difflib.SequenceMatcher(None, " ".join(a), " ".join(b), autojunk=False).ratio() >= similarity
+
+
+class CostGuard:
+    """Wasted speculative tokens per project over a sliding window, shared by the sessions of a process"""
+
+    def __init__(self, window: float = 3600.0, clock: Callable[[], float] = time.monotonic):
+        self.window = window
+        self.clock = clock
+        self._wasted: Dict[str, Deque[Tuple[float, int]]] = defaultdict(deque)
+
+    def record(self, project: str, tokens: int):
+        self._wasted[project].append((self.clock(), tokens))
+
+    def wasted(self, project: str) -> int:
+        entries = self._wasted[project]
+        horizon = self.clock() - self.window
+        while entries and entries[0][0] < horizon:
+            entries.popleft()
+        return sum(tokens for _, tokens in entries)
+
+    def allow(self, project: str, limit: int) -> bool:
+        return self.wasted(project) < limit
+
+
+COST_GUARD = CostGuard()
+
+
+@dataclass
+class SpeculationStats:
+    """Speculation outcomes of one session"""
+    started: int = 0
+    hits: int = 0
+    misses: int = 0
+    restarted: int = 0
+    cancelled: int = 0
+    skipped: int = 0
+    wasted_tokens: int = 0
+
+    @property
+    def hit_rate(self) -> Optional[float]:
+        decided = self.hits + self.misses
+        return round(self.hits / decided, 3) if decided else None
+
+    def as_dict(self) -> Dict:
+        return {**asdict(self), "hit_rate": self.hit_rate}
+
+
+class SpeculativeRun:
+    """One speculative generation, buffered until the turn is committed"""
+
+    def __init__(self, text: str, chunks: AsyncIterator, prompt_tokens: int):
+        self.text = text
+        self.prompt_tokens = prompt_tokens
+        self.generated = 0
+        self.error: Optional[Exception] = None
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task = asyncio.ensure_future(self._produce(chunks))
+
+    async def _produce(self, chunks: AsyncIterator):
+        try:
+            async for chunk in chunks:
+                self.generated += 1
+                self._queue.put_nowait(chunk)
+            self._queue.put_nowait(_END)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.error = e
+            self._queue.put_nowait(e)
+        finally:
+            aclose = getattr(chunks, "aclose", None)
+            if aclose:
+                await aclose()
+
+    @property
+    def tokens(self) -> int:
+        return self.prompt_tokens + self.generated
+
+    def cancel(self):
+        self._task.cancel()
+
+    async def stream(self) -> AsyncIterator:
+        """Buffered chunks, then the rest as it is generated (closing it stops the generation)"""
+        try:
+            while True:
+                item = await self._queue.get()
+                if item is _END:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # Barge-in: the LLM node closes this stream, the background call must stop too
+            self._task.cancel()
+
+
+class Speculator:
+    """
+    Speculative replies of one session. generate(text) starts the LLM stream of a reply
+    to text as the user message; each stream chunk counts as one generated token, and
+    prompt_tokens(text) estimates the input tokens of the call.
+    """
+
+    def __init__(
+        self,
+        generate: Callable[[str], AsyncIterator],
+        project_id: str = "default",
+        enabled: bool = True,
+        max_wasted_tokens: int = MAX_WASTED_TOKENS_PER_HOUR,
+        prompt_tokens: Callable[[str], int] = lambda text: 0,
+        min_words: int = 3,
+        similarity: float = 0.9,
+        guard: CostGuard = COST_GUARD,
+    ):
+        self.generate = generate
+        self.project_id = project_id
+        self.enabled = enabled
+        self.max_wasted_tokens = max_wasted_tokens
+        self.prompt_tokens = prompt_tokens
+        self.min_words = min_words
+        self.similarity = similarity
+        self.guard = guard
+        self.stats = SpeculationStats()
+        self.speaking = False
+        self._finals: List[str] = []
+        self._interim = ""
+        self._run: Optional[SpeculativeRun] = None
+
+    @property
+    def candidate(self) -> str:
+        """Transcript of the turn so far: final segments, then the current interim"""
+        return " ".join([*self._finals, self._interim]).strip()
+
+    def on_transcript(self, text: str, is_final: bool = True):
+        if is_final:
+            if text.strip():
+                self._finals.append(text.strip())
+            self._interim = ""
+        else:
+            self._interim = text.strip()
+        if not self.speaking:
+            self._speculate()
+
+    def on_speech_start(self):
+        self.speaking = True
+
+    def on_speech_end(self):
+        self.speaking = False
+        self._speculate()
+
+    def _speculate(self):
+        text = self.candidate
+        if not self.enabled or len(_words(text)) < self.min_words:
+            return
+        if self._run:
+            if materially_same(self._run.text, text, self.similarity):
+                return
+            self._discard("restarted")
+        if not self.guard.allow(self.project_id, self.max_wasted_tokens):
+            self._count("skipped")
+            return
+        self._count("started")
+        self._run = SpeculativeRun(text, self.generate(text), self.prompt_tokens(text))
+        logger.debug("Speculating on: %s", text, extra={"category": "speculation"})
+
+    def take(self, final_text: str) -> Optional[AsyncIterator]:
+        """Buffered reply stream if the speculation matches the committed turn, else None"""
+        run, self._run = self._run, None
+        self._finals, self._interim = [], ""
+        if not run:
+            return None
+        if not run.error and materially_same(run.text, final_text, self.similarity):
+            self._count("hits")
+            logger.debug("Speculation hit (%d chunks ready)", run.generated, extra={"category": "speculation"})
+            return run.stream()
+        self._run = run
+        self._discard("misses")
+        return None
+
+    def cancel(self):
+        """Drop the speculation (the conversation context changed)"""
+        if self._run:
+            self._discard("cancelled")
+        self._finals, self._interim = [], ""
+
+    def _discard(self, outcome: str):
+        run, self._run = self._run, None
+        run.cancel()
+        self.stats.wasted_tokens += run.tokens
+        self.guard.record(self.project_id, run.tokens)
+        SPECULATION_WASTED_TOKENS.inc(run.tokens, project=self.project_id)
+        self._count(outcome)
+
+    def _count(self, outcome: str):
+        setattr(self.stats, outcome, getattr(self.stats, outcome) + 1)
+        if outcome in RESULT_LABELS:
+            SPECULATIONS.inc(project=self.project_id, result=RESULT_LABELS[outcome])
@@ -0,0 +1,204 @@
+"""
+Speakable text for Voyaltis Agent TTS
+Two stages between the LLM and the TTS:
+- segmentation: the streamed reply is cut at sentence ends (and at clause ends once a
+  clause is long enough), so the TTS starts on the first clause and never receives
+  half of a number ("29" then "9€");
+- normalization: prices, percentages, units (10L, 80m²), times, ordinals, decimals
+  and product codes (RX-500) written out in French words, with precompiled rules and
+  memoized results (the same phrases come back every session).
+"""
+import functools
+import re
+from typing import AsyncIterable, AsyncIterator, Optional
+
+UNITS = ["zéro", "un", "deux", "trois", "quatre", "cinq", "six", "sept", "huit", "neuf", "dix", "onze", "douze",
+         "treize", "quatorze", "quinze", "seize"]
+TENS = {2: "vingt", 3: "trente", 4: "quarante", 5: "cinquante", 6: "soixante"}
+
+# Units after a number: (singular, plural)
+UNIT_WORDS = {
+    "l": ("litre", "litres"), "ml": ("millilitre", "millilitres"), "cl": ("centilitre", "centilitres"),
+    "kg": ("kilo", "kilos"), "g": ("gramme", "grammes"), "mg": ("milligramme", "milligrammes"),
+    "m²": ("mètre carré", "mètres carrés"), "m2": ("mètre carré", "mètres carrés"),
+    "m³": ("mètre cube", "mètres cubes"), "m3": ("mètre cube", "mètres cubes"),
+    "km": ("kilomètre", "kilomètres"), "m": ("mètre", "mètres"), "cm": ("centimètre", "centimètres"),
+    "mm": ("millimètre", "millimètres"), "kw": ("kilowatt", "kilowatts"), "w": ("watt", "watts"),
+    "v": ("volt", "volts"), "min": ("minute", "minutes"), "h": ("heure", "heures"),
+}
+TAX_WORDS = {"ht": "hors taxes", "ttc": "toutes taxes comprises"}
+ABBREVIATIONS = ("M.", "Mme.", "Mlle.", "etc.", "env.", "réf.", "cf.", "ex.", "p.")
+
+# Thousands separated by a space, a (narrow) no-break space or a dot: "1 299", "12.000"
+_NUMBER = r"\d{1,3}(?:[ \u00a0\u202f.]\d{3})+(?!\d)|\d+"
+# Decimal separator: a comma, or a dot not followed by exactly three digits ("2.5", not "12.000")
+_DECIMAL_SEP = r"(?:,|\.(?!\d{3}(?!\d)))"
+_PRICE_AFTER = re.compile(rf"(?<![\w,.])({_NUMBER})(?:[,.](\d{{1,2}}))?\s?(?:€|euros?\b|EUR\b)(?:\s?(HT|TTC)\b)?", re.IGNORECASE)
+_PRICE_BEFORE = re.compile(rf"€\s?({_NUMBER})(?:[,.](\d{{1,2}}))?")
+_PERCENT = re.compile(rf"({_NUMBER})(?:{_DECIMAL_SEP}(\d+))?\s?%")
+_TIME = re.compile(r"\b(\d{1,2})\s?h\s?(\d{2})\b")
+_UNIT = re.compile(rf"(?<![\w,.])({_NUMBER})(?:{_DECIMAL_SEP}(\d+))?\s?({'|'.join(sorted(map(re.escape, UNIT_WORDS), key=len, reverse=True))})(?![\w²³])", re.IGNORECASE)
+_ORDINAL = re.compile(r"\b(\d+)(er|re|ère|e|ème)\b")
+_CODE = re.compile(r"\b(?=[A-Z0-9-]*[A-Z])(?=[A-Z0-9-]*\d)[A-Z0-9]+(?:-[A-Z0-9]+)*\b")
+_DECIMAL = re.compile(rf"(?<![\w,.])({_NUMBER}){_DECIMAL_SEP}(\d+)(?![\d])")
+_INTEGER = re.compile(rf"(?<![\w,.])({_NUMBER})(?![\d])")
+_SPACES = re.compile(r"\s+")
+
+# Segment ends: sentence punctuation, or clause punctuation, followed by a space
+_SENTENCE_END = re.compile(r"[.!?…]+[\"»)]?\s")
+_CLAUSE_END = re.compile(r"[,;:]\s")
+
+
+def _below_hundred(n: int) -> str:
+    if n <= 16:
+        return UNITS[n]
+    if n < 20:
+        return f"dix-{UNITS[n - 10]}"
+    tens, unit = divmod(n, 10)
+    if tens in (7, 9):
+        # soixante-dix..., quatre-vingt-dix...
+        base = "soixante" if tens == 7 else "quatre-vingt"
+        if tens == 7 and unit == 1:
+            return "soixante et onze"
+        return f"{base}-{_below_hundred(10 + unit)}"
+    if tens == 8:
+        return "quatre-vingts" if unit == 0 else f"quatre-vingt-{UNITS[unit]}"
+    if unit == 0:
+        return TENS[tens]
+    if unit == 1:
+        return f"{TENS[tens]} et un"
+    return f"{TENS[tens]}-{UNITS[unit]}"
+
+
+def _below_thousand(n: int, final: bool = True) -> str:
+    hundreds, rest = divmod(n, 100)
+    if hundreds == 0:
+        return _below_hundred(rest)
+    prefix = "cent" if hundreds == 1 else f"{UNITS[hundreds]} cent"
+    if rest == 0:
+        # "deux cents", but "deux cent mille"
+        return f"{prefix}s" if hundreds > 1 and final else prefix
+    return f"{prefix} {_below_hundred(rest)}"
+
+
+@functools.lru_cache(maxsize=4096)
+def number_to_words(n: int) -> str:
+    """French words of a non-negative integer ("quatre-vingt-dix-neuf", "deux mille trois cents")"""
+    if n < 1000:
+        return _below_thousand(n)
+    parts = []
+    for value, singular, plural in ((10 ** 9, "milliard", "milliards"), (10 ** 6, "million", "millions")):
+        count, n = divmod(n, value)
+        if count:
+            parts.append(f"{number_to_words(count)} {singular if count == 1 else plural}")
+    thousands, n = divmod(n, 1000)
+    if thousands:
+        parts.append("mille" if thousands == 1 else f"{_below_thousand(thousands, final=False)} mille")
+    if n:
+        parts.append(_below_thousand(n))
+    return " ".join(parts)
+
+
+def ordinal_to_words(n: int) -> str:
+    if n == 1:
+        return "premier"
+    words = number_to_words(n)
+    if words.endswith("cinq"):
+        return f"{words}uième"
+    if words.endswith("neuf"):
+        return f"{words[:-1]}vième"
+    if words.endswith(("e", "s")) and not words.endswith("trois"):
+        words = words[:-1]
+    return f"{words}ième"
+
+
+def _integer(digits: str) -> int:
+    return int(re.sub(r"[ \u00a0\u202f.]", "", digits))
+
+
+def _decimal_words(integer: str, decimals: Optional[str]) -> str:
+    words = number_to_words(_integer(integer))
+    if decimals:
+        # "2,05" → "deux virgule zéro cinq"
+        zeros = len(decimals) - len(decimals.lstrip("0"))
+        tail = " ".join(["zéro"] * zeros + ([number_to_words(int(decimals))] if decimals.strip("0") else []))
+        words = f"{words} virgule {tail}".strip()
+    return words
+
+
+def _price(match) -> str:
+    amount = _integer(match.group(1))
+    cents = int((match.group(2) or "0").ljust(2, "0"))
+    words = f"{number_to_words(amount)} {'euro' if amount <= 1 else 'euros'}"
+    if cents:
+        words += f" {number_to_words(cents)}"
+    tax = match.group(3) if match.re is _PRICE_AFTER else None
+    return f"{words} {TAX_WORDS[tax.lower()]}" if tax else words
+
+
+def _unit(match) -> str:
+    singular, plural = UNIT_WORDS[match.group(3).lower()]
+    amount = _decimal_words(match.group(1), match.group(2))
+    unit = singular if not match.group(2) and _integer(match.group(1)) <= 1 else plural
+    return f"{amount} {unit}"
+
+
+def _code(match) -> str:
+    spoken = []
+    for part in re.findall(r"[A-Z]+|\d+", match.group(0)):
+        if part.isdigit():
+            # Long digit runs are read digit by digit
+            spoken.append(number_to_words(int(part)) if len(part) <= 4 and not part.startswith("0") else " ".join(UNITS[int(d)] for d in part))
+        else:
+            spoken.append(" ".join(part) if len(part) <= 3 else part)
+    return " ".join(spoken)
+
+
+@functools.lru_cache(maxsize=4096)
+def speakable(text: str) -> str:
+    """Text with numbers, prices, units and product codes written out for French TTS"""
+    if not any(c.isdigit() or c in "€%" for c in text):
+        return text
+    text = _PRICE_AFTER.sub(_price, text)
+    text = _PRICE_BEFORE.sub(_price, text)
+    text = _PERCENT.sub(lambda m: f"{_decimal_words(m.group(1), m.group(2))} pour cent", text)
+    text = _TIME.sub(lambda m: f"{number_to_words(int(m.group(1)))} heures {number_to_words(int(m.group(2)))}"
+                     if m.group(2) != "00" else f"{number_to_words(int(m.group(1)))} heures", text)
+    text = _UNIT.sub(_unit, text)
+    text = _ORDINAL.sub(lambda m: ordinal_to_words(int(m.group(1))) if m.group(2) not in ("re", "ère") or m.group(1) != "1" else "première", text)
+    text = _CODE.sub(_code, text)
+    text = _DECIMAL.sub(lambda m: _decimal_words(m.group(1), m.group(2)), text)
+    text = _INTEGER.sub(lambda m: number_to_words(_integer(m.group(1))), text)
+    return _SPACES.sub(" ", text)
+
+
+def _segment_end(buffer: str, first: bool, min_clause_chars: int) -> int:
+    """Index after the last usable boundary of buffer, 0 if none"""
+    end = 0
+    for match in _SENTENCE_END.finditer(buffer):
+        words = buffer[:match.start() + 1].split()
+        if words and words[-1] not in ABBREVIATIONS:
+            end = match.end()
+    if end:
+        return end
+    # No finished sentence: a long enough clause (the first one as soon as possible)
+    threshold = min_clause_chars // 2 if first else min_clause_chars
+    for match in _CLAUSE_END.finditer(buffer):
+        if match.end() >= threshold:
+            end = match.end()
+    return end
+
+
+async def speech_segments(text: AsyncIterable[str], min_clause_chars: int = 40) -> AsyncIterator[str]:
+    """Streamed LLM text as speakable sentence / clause segments"""
+    buffer = ""
+    first = True
+    async for chunk in text:
+        buffer += chunk
+        end = _segment_end(buffer, first, min_clause_chars)
+        if end:
+            segment, buffer = buffer[:end], buffer[end:]
+            first = False
+            yield speakable(segment.strip()) + " "
+    if buffer.strip():
+        yield speakable(buffer.strip())
@@ -0,0 +1,76 @@
+"""
+Speech-to-text provider selection for Voyaltis Agent
+- whisper    OpenAI whisper-1: batch, transcribes each VAD segment once it has ended,
+             so its latency adds to the end-of-turn silence
+- deepgram   Deepgram streaming (livekit-plugins-deepgram): interim transcripts while
+             the rep speaks, final transcript a few hundred ms after the end of speech
+- fake       scripted streaming STT (utils/fake_stt.py): interim and final transcripts
+             driven by the room audio, no API, for tests and local runs
+
+Selected per project with settings.sttProvider in config.json, default from the
+environment. A deepgram project without DEEPGRAM_API_KEY falls back to whisper.
+
+Configuration (environment):
+    VOYALTIS_STT_PROVIDER     default provider, "whisper" (default), "deepgram" or "fake"
+    VOYALTIS_DEEPGRAM_MODEL   Deepgram model (default nova-2)
+"""
+import logging
+import os
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+WHISPER = "whisper"
+DEEPGRAM = "deepgram"
+FAKE = "fake"
+STT_PROVIDERS = (WHISPER, DEEPGRAM, FAKE)
+STREAMING_PROVIDERS = (DEEPGRAM, FAKE)
+
+DEFAULT_STT_PROVIDER = os.getenv("VOYALTIS_STT_PROVIDER", WHISPER).strip().lower()
+DEEPGRAM_MODEL = os.getenv("VOYALTIS_DEEPGRAM_MODEL", "nova-2")
+
+
+def select_stt_provider(project_config: Optional[dict]) -> str:
+    """Provider of a project: settings.sttProvider, else VOYALTIS_STT_PROVIDER"""
+    settings = (project_config or {}).get("settings", {}) or {}
+    provider = str(settings.get("sttProvider") or DEFAULT_STT_PROVIDER).strip().lower()
+    if provider not in STT_PROVIDERS:
+        logger.warning(f"⚠️ Unknown STT provider '{provider}', using {WHISPER}")
+        return WHISPER
+    if provider == DEEPGRAM and not os.getenv("DEEPGRAM_API_KEY"):
+        logger.warning(f"⚠️ STT provider {DEEPGRAM} selected but DEEPGRAM_API_KEY is not set, using {WHISPER}")
+        return WHISPER
+    return provider
+
+
+def is_streaming(provider: str) -> bool:
+    return provider in STREAMING_PROVIDERS
+
+
+def build_stt(provider: str, language: str = "fr", http_session=None):
+    """
+    LiveKit STT instance of a provider (plugins imported on use). http_session is
+    only needed outside a job (benchmarks), where LiveKit has no shared session.
+    """
+    if provider == FAKE:
+        from utils.fake_stt import FakeSTT
+        return FakeSTT(language=language)
+
+    if provider == DEEPGRAM:
+        from livekit.plugins import deepgram
+        options = {"http_session": http_session} if http_session else {}
+        return deepgram.STT(
+            model=DEEPGRAM_MODEL,
+            language=language,
+            interim_results=True,
+            punctuate=True,
+            smart_format=True,
+            filler_words=True,  # "euh" in the transcript: the rep is still talking
+            **options,
+        )
+
+    from livekit.plugins import openai
+    return openai.STT(
+        model="whisper-1",
+        language=language,
+    )
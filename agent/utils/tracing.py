@@ -0,0 +1,264 @@
+"""
+Per-turn latency tracing for Voyaltis Agent
+Marks each stage of a voice turn (end of speech, STT, LLM first/last token, TTS first
+audio, playout start), aggregates stage durations into per-worker p50/p95/p99
+histograms and dumps single sessions as Chrome trace JSON (chrome://tracing, Perfetto)
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Turn events, in pipeline order
+END_OF_SPEECH = "end_of_speech"
+STT_FINAL = "stt_final"
+LLM_REQUEST = "llm_request"
+LLM_FIRST_TOKEN = "llm_first_token"
+LLM_LAST_TOKEN = "llm_last_token"
+TTS_REQUEST = "tts_request"
+TTS_FIRST_AUDIO = "tts_first_audio"
+PLAYOUT_START = "playout_start"
+
+TURN_EVENTS = (
+    END_OF_SPEECH, STT_FINAL, LLM_REQUEST, LLM_FIRST_TOKEN,
+    LLM_LAST_TOKEN, TTS_REQUEST, TTS_FIRST_AUDIO, PLAYOUT_START,
+)
+
+# Stage name -> (start event, end event)
+TURN_STAGES: Dict[str, Tuple[str, str]] = {
+    "stt": (END_OF_SPEECH, STT_FINAL),
+    "endpointing": (END_OF_SPEECH, LLM_REQUEST),
+    "llm_ttft": (LLM_REQUEST, LLM_FIRST_TOKEN),
+    "llm_total": (LLM_REQUEST, LLM_LAST_TOKEN),
+    "tts_ttfb": (TTS_REQUEST, TTS_FIRST_AUDIO),
+    "end_to_end": (END_OF_SPEECH, PLAYOUT_START),
+}
+
+# Samples kept per histogram (most recent), enough for stable p99 on a worker
+HISTOGRAM_MAX_SAMPLES = 10_000
+
+
+class LatencyHistogram:
+    """Bounded window of latency samples (seconds) with exact percentiles"""
+
+    def __init__(self, max_samples: int = HISTOGRAM_MAX_SAMPLES):
+        self._samples: Deque[float] = deque(maxlen=max_samples)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+            self.total += seconds
+
+    def percentiles(self, quantiles=(0.5, 0.95, 0.99)) -> Dict[str, Optional[float]]:
+        """Nearest-rank percentiles over the sample window, None when empty"""
+        with self._lock:
+            samples = sorted(self._samples)
+        result = {}
+        for q in quantiles:
+            key = f"p{round(q * 100):d}"
+            if not samples:
+                result[key] = None
+            else:
+                rank = min(len(samples) - 1, max(0, int(q * len(samples) + 0.5) - 1))
+                result[key] = samples[rank]
+        return result
+
+    def summary(self) -> Dict:
+        summary = {"count": self.count}
+        for key, value in self.percentiles().items():
+            summary[f"{key}_ms"] = round(value * 1000, 1) if value is not None else None
+        return summary
+
+
+# Stage histograms of this worker process, shared by all its sessions
+_worker_histograms: Dict[str, LatencyHistogram] = {}
+_worker_lock = threading.Lock()
+
+
+def worker_histogram(stage: str) -> LatencyHistogram:
+    with _worker_lock:
+        histogram = _worker_histograms.get(stage)
+        if histogram is None:
+            histogram = _worker_histograms[stage] = LatencyHistogram()
+        return histogram
+
+
+def worker_latency_summary() -> Dict[str, Dict]:
+    """p50/p95/p99 per stage over every turn traced by this worker"""
+    with _worker_lock:
+        stages = dict(_worker_histograms)
+    return {stage: histogram.summary() for stage, histogram in sorted(stages.items())}
+
+
+class _StageDurations:
+    """Stage durations of a turn, rendered only if the log record is written"""
+    __slots__ = ("turn",)
+
+    def __init__(self, turn: "TurnTrace"):
+        self.turn = turn
+
+    def __str__(self) -> str:
+        durations = self.turn.stage_durations()
+        return " ".join(f"{stage}={seconds * 1000:.0f}ms" for stage, seconds in durations.items()) or "no complete stage"
+
+
+@dataclass
+class TurnTrace:
+    """Event timestamps (perf_counter seconds) of one turn"""
+    turn_id: int
+    source: str = "voice"
+    events: Dict[str, float] = field(default_factory=dict)
+    closed: bool = False
+
+    def stage_durations(self) -> Dict[str, float]:
+        durations = {}
+        for stage, (start, end) in TURN_STAGES.items():
+            if start in self.events and end in self.events and self.events[end] >= self.events[start]:
+                durations[stage] = self.events[end] - self.events[start]
+        return durations
+
+
+class TurnTracer:
+    """
+    Records turn events for one session.
+    A turn opens on end of speech (or a text message) and closes once playout started
+    and the LLM finished (or when the next turn opens); its stage durations then go
+    to the worker histograms.
+    """
+
+    def __init__(self, session_id: str, max_turns: int = 500):
+        self.session_id = session_id
+        self.turns: Deque[TurnTrace] = deque(maxlen=max_turns)
+        self._next_turn_id = 1
+        self._origin = time.perf_counter()
+        self._origin_wall = time.time()
+
+    @property
+    def current(self) -> Optional[TurnTrace]:
+        return self.turns[-1] if self.turns else None
+
+    def start_turn(self, source: str = "voice", at: Optional[float] = None) -> TurnTrace:
+        """
+        Open a turn at end of speech. While the agent has not started answering,
+        a new end of speech (the rep kept talking) moves the existing turn's start instead.
+        """
+        at = time.perf_counter() if at is None else at
+        turn = self.current
+        if turn is not None and not turn.closed and LLM_REQUEST not in turn.events:
+            turn.events[END_OF_SPEECH] = at
+            return turn
+
+        if turn is not None and not turn.closed:
+            self.finish_turn()
+        turn = TurnTrace(turn_id=self._next_turn_id, source=source)
+        self._next_turn_id += 1
+        turn.events[END_OF_SPEECH] = at
+        self.turns.append(turn)
+        return turn
+
+    def mark(self, event: str, at: Optional[float] = None, first_only: bool = True):
+        """Record an event on the open turn; by default only its first occurrence counts"""
+        turn = self.current
+        if turn is None or turn.closed:
+            return
+        if first_only and event in turn.events:
+            return
+        turn.events[event] = time.perf_counter() if at is None else at
+        # Streamed replies start playing before the LLM is done: close once both happened
+        if PLAYOUT_START in turn.events and LLM_LAST_TOKEN in turn.events:
+            self.finish_turn()
+
+    def finish_turn(self):
+        """Close the open turn and feed its stage durations to the worker histograms"""
+        turn = self.current
+        if turn is None or turn.closed:
+            return
+        turn.closed = True
+        for stage, seconds in turn.stage_durations().items():
+            worker_histogram(stage).observe(seconds)
+        logger.info(
+            "⏱️ Turn %d (%s): %s", turn.turn_id, turn.source, _StageDurations(turn),
+            extra={"category": "turn_latency", "turn_id": turn.turn_id},
+        )
+
+    def record_reported(self, name: str, seconds: float):
+        """Provider-reported latency (LiveKit metrics), kept beside the measured stages"""
+        if seconds is None or seconds < 0:
+            return
+        worker_histogram(f"reported_{name}").observe(seconds)
+
+    def on_metrics(self, metrics):
+        """Handle a LiveKit metrics_collected payload (EOU, STT, LLM and TTS metrics)"""
+        metrics_type = getattr(metrics, "type", "")
+        if metrics_type == "eou_metrics":
+            self.record_reported("end_of_utterance_delay", getattr(metrics, "end_of_utterance_delay", None))
+            self.record_reported("transcription_delay", getattr(metrics, "transcription_delay", None))
+        elif metrics_type == "llm_metrics":
+            self.record_reported("llm_ttft", getattr(metrics, "ttft", None))
+        elif metrics_type == "tts_metrics":
+            self.record_reported("tts_ttfb", getattr(metrics, "ttfb", None))
+        elif metrics_type == "stt_metrics":
+            self.record_reported("stt_duration", getattr(metrics, "duration", None))
+
+    # ------------------------------------------------------------------ export
+
+    def session_summary(self) -> Dict[str, Dict]:
+        """p50/p95/p99 per stage over this session's turns only"""
+        histograms: Dict[str, LatencyHistogram] = {}
+        for turn in self.turns:
+            for stage, seconds in turn.stage_durations().items():
+                histograms.setdefault(stage, LatencyHistogram()).observe(seconds)
+        return {stage: histogram.summary() for stage, histogram in histograms.items()}
+
+    def to_chrome_trace(self) -> Dict:
+        """Chrome trace event format: one row per stage, one instant event per turn event"""
+        pid = os.getpid()
+        stage_rows = {stage: i + 1 for i, stage in enumerate(TURN_STAGES)}
+        events: List[Dict] = [
+            {"ph": "M", "name": "process_name", "pid": pid, "args": {"name": f"session {self.session_id}"}},
+            {"ph": "M", "name": "thread_name", "pid": pid, "tid": 0, "args": {"name": "events"}},
+        ]
+        events.extend(
+            {"ph": "M", "name": "thread_name", "pid": pid, "tid": tid, "args": {"name": stage}}
+            for stage, tid in stage_rows.items()
+        )
+
+        def micros(at: float) -> int:
+            return int((at - self._origin) * 1_000_000)
+
+        for turn in self.turns:
+            args = {"session_id": self.session_id, "turn_id": turn.turn_id, "source": turn.source}
+            for event, at in sorted(turn.events.items(), key=lambda item: item[1]):
+                events.append({"ph": "i", "s": "t", "name": event, "pid": pid, "tid": 0, "ts": micros(at), "args": args})
+            for stage, seconds in turn.stage_durations().items():
+                start = turn.events[TURN_STAGES[stage][0]]
+                events.append({
+                    "ph": "X", "name": f"turn {turn.turn_id} {stage}", "cat": stage,
+                    "pid": pid, "tid": stage_rows[stage],
+                    "ts": micros(start), "dur": int(seconds * 1_000_000), "args": args,
+                })
+
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {"session_id": self.session_id, "started_at": self._origin_wall},
+        }
+
+    def dump_chrome_trace(self, directory: str) -> str:
+        """Write the session trace as {directory}/trace-{session_id}.json and return the path"""
+        os.makedirs(directory, exist_ok=True)
+        safe_id = "".join(c if c.isalnum() or c in "-_" else "_" for c in self.session_id)
+        path = os.path.join(directory, f"trace-{safe_id}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_chrome_trace(), f)
+        return path
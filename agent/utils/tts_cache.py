@@ -0,0 +1,270 @@
+"""
+TTS audio cache for Voyaltis Agent
+The agent keeps saying the same phrases: the closing line, the attention point
+questions (naturalPrompts, generate_natural_question), the opening of a rep. Their
+audio is content-addressed by (voice_id, model, text) and kept in two LRU tiers: in
+memory (per worker process) and on disk (shared by the processes of a machine).
+
+In the TTS node, the reply text is held back only while it is still the prefix of a
+registered phrase: a reply that is exactly one of them is played from the cache (or
+synthesized once, then cached), any other reply goes to the TTS without delay.
+
+Configuration (environment):
+    VOYALTIS_TTS_CACHE              0 to disable the phrase cache (default on)
+    VOYALTIS_AUDIO_CACHE_DIR        cached clips (default ../data/audio_cache)
+    VOYALTIS_TTS_CACHE_MEMORY_MB    memory tier size (default 32)
+    VOYALTIS_TTS_CACHE_DISK_MB      disk tier size (default 256)
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import wave
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import AsyncIterable, AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple
+
+from utils import metrics
+from utils.instructions import CLOSING_PHRASE
+from utils.question_generator import generate_natural_question
+
+logger = logging.getLogger(__name__)
+
+AUDIO_CACHE_DIR = os.getenv("VOYALTIS_AUDIO_CACHE_DIR", os.path.join("..", "data", "audio_cache"))
+TTS_CACHE_ENABLED = os.getenv("VOYALTIS_TTS_CACHE", "1").strip().lower() not in ("0", "false", "no")
+MEMORY_BYTES = int(float(os.getenv("VOYALTIS_TTS_CACHE_MEMORY_MB", "32")) * 1024 * 1024)
+DISK_BYTES = int(float(os.getenv("VOYALTIS_TTS_CACHE_DISK_MB", "256")) * 1024 * 1024)
+
+# Frames played from a cached clip (100 ms)
+REPLAY_FRAME_SECONDS = 0.1
+
+TTS_CACHE_LOOKUPS = metrics.REGISTRY.counter(
+    "voyaltis_tts_cache_total", "TTS cache lookups by result (memory/disk hit, miss)", ("result",)
+)
+TTS_CACHE_CHARS_SAVED = metrics.REGISTRY.counter(
+    "voyaltis_tts_cache_characters_saved_total", "Characters served from the TTS cache instead of synthesized"
+)
+
+
+def clip_key(voice_id: str, model: str, text: str) -> str:
+    """Content address of a synthesized text"""
+    return hashlib.sha256(json.dumps([voice_id, model, text], ensure_ascii=False).encode('utf-8')).hexdigest()[:32]
+
+
+def normalize_phrase(text: str) -> str:
+    return " ".join(text.split())
+
+
+@dataclass
+class AudioClip:
+    """16-bit PCM audio"""
+    pcm: bytes
+    sample_rate: int
+    num_channels: int
+
+    @property
+    def duration(self) -> float:
+        return len(self.pcm) / (2 * self.num_channels * self.sample_rate)
+
+    def chunks(self, seconds: float = REPLAY_FRAME_SECONDS) -> List[bytes]:
+        size = max(1, int(self.sample_rate * seconds)) * 2 * self.num_channels
+        return [self.pcm[i:i + size] for i in range(0, len(self.pcm), size)]
+
+
+def read_clip(path: str) -> Optional[AudioClip]:
+    try:
+        with wave.open(path, 'rb') as f:
+            return AudioClip(f.readframes(f.getnframes()), f.getframerate(), f.getnchannels())
+    except (OSError, EOFError, wave.Error):
+        return None
+
+
+def write_clip(path: str, clip: AudioClip):
+    """Atomic write: a concurrent reader sees the whole clip or none"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with wave.open(tmp, 'wb') as f:
+        f.setnchannels(clip.num_channels)
+        f.setsampwidth(2)
+        f.setframerate(clip.sample_rate)
+        f.writeframes(clip.pcm)
+    os.replace(tmp, path)
+
+
+def livekit_frame(pcm: bytes, sample_rate: int, num_channels: int):
+    from livekit import rtc
+    return rtc.AudioFrame(pcm, sample_rate, num_channels, len(pcm) // (2 * num_channels))
+
+
+class TTSCache:
+    """Audio clips of one voice and model: memory LRU, then disk LRU (file mtime = last use)"""
+
+    def __init__(self, voice_id: str, model: str, cache_dir: str = AUDIO_CACHE_DIR,
+                 memory_bytes: int = MEMORY_BYTES, disk_bytes: int = DISK_BYTES):
+        self.voice_id = voice_id
+        self.model = model
+        self.cache_dir = cache_dir
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.phrases: set = set()
+        self.stats: Dict[str, int] = {"memory": 0, "disk": 0, "miss": 0, "characters_saved": 0}
+        self._memory: "OrderedDict[str, AudioClip]" = OrderedDict()
+        self._memory_size = 0
+
+    def path(self, text: str) -> str:
+        return os.path.join(self.cache_dir, f"{clip_key(self.voice_id, self.model, normalize_phrase(text))}.wav")
+
+    # -- Registered phrases (served from the cache in the TTS node) -------------------
+
+    def register(self, phrases: Iterable[str]):
+        self.phrases.update(normalize_phrase(p) for p in phrases if p and p.strip())
+
+    def could_match(self, prefix: str) -> bool:
+        prefix = normalize_phrase(prefix)
+        return any(phrase.startswith(prefix) for phrase in self.phrases)
+
+    def is_phrase(self, text: str) -> bool:
+        return normalize_phrase(text) in self.phrases
+
+    @property
+    def hit_rate(self) -> Optional[float]:
+        lookups = self.stats["memory"] + self.stats["disk"] + self.stats["miss"]
+        return round((self.stats["memory"] + self.stats["disk"]) / lookups, 3) if lookups else None
+
+    # -- Lookups ----------------------------------------------------------------------
+
+    async def get(self, text: str) -> Optional[AudioClip]:
+        path = self.path(text)
+        clip = self._memory.get(path)
+        result = "memory"
+        if clip:
+            self._memory.move_to_end(path)
+        else:
+            clip = await asyncio.get_running_loop().run_in_executor(None, self._read_disk, path)
+            result = "disk" if clip else "miss"
+            if clip:
+                self._remember(path, clip)
+        self.stats[result] += 1
+        TTS_CACHE_LOOKUPS.inc(result=result)
+        if clip:
+            self.stats["characters_saved"] += len(text)
+            TTS_CACHE_CHARS_SAVED.inc(len(text))
+        return clip
+
+    async def put(self, text: str, clip: AudioClip):
+        path = self.path(text)
+        self._remember(path, clip)
+        await asyncio.get_running_loop().run_in_executor(None, self._write_disk, path, clip)
+
+    def _remember(self, path: str, clip: AudioClip):
+        if path in self._memory:
+            self._memory_size -= len(self._memory.pop(path).pcm)
+        self._memory[path] = clip
+        self._memory_size += len(clip.pcm)
+        while self._memory_size > self.memory_bytes and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted.pcm)
+
+    def _read_disk(self, path: str) -> Optional[AudioClip]:
+        clip = read_clip(path)
+        if clip:
+            try:
+                os.utime(path)  # Most recently used
+            except OSError:
+                pass
+        return clip
+
+    def _write_disk(self, path: str, clip: AudioClip):
+        try:
+            write_clip(path, clip)
+            self._evict_disk()
+        except OSError as e:
+            logger.warning(f"⚠️ TTS cache write failed: {e}")
+
+    def _evict_disk(self):
+        entries: List[Tuple[float, int, str]] = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".wav"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.disk_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+
+_caches: Dict[Tuple[str, str], TTSCache] = {}
+
+
+def get_tts_cache(voice_id: str, model: str) -> TTSCache:
+    """Cache of a voice and model, shared by the sessions of the process"""
+    key = (voice_id, model)
+    if key not in _caches:
+        _caches[key] = TTSCache(voice_id, model)
+    return _caches[key]
+
+
+def session_phrases(attention_points: List[Dict], time_period: str) -> List[str]:
+    """Fixed phrases of a session: the closing line and the attention point questions"""
+    phrases = [CLOSING_PHRASE]
+    for i, point in enumerate(attention_points, 1):
+        phrases.extend(point.get("naturalPrompts", []) or [])
+        if point.get("description"):
+            phrases.append(generate_natural_question(point["description"], index=i, time_period=time_period))
+    return phrases
+
+
+async def _prepend(first: str, rest: AsyncIterator[str]) -> AsyncIterator[str]:
+    if first:
+        yield first
+    async for chunk in rest:
+        yield chunk
+
+
+async def cached_tts(
+    text: AsyncIterable[str],
+    cache: TTSCache,
+    synthesize: Callable[[AsyncIterable[str]], AsyncIterator],
+    make_frame: Callable = livekit_frame,
+) -> AsyncIterator:
+    """
+    Audio frames of a streamed reply: from the cache when the whole reply is a registered
+    phrase, else from synthesize(text stream) (frames with .data, .sample_rate, .num_channels).
+    """
+    chunks = text.__aiter__()
+    held = ""
+    async for chunk in chunks:
+        held += chunk
+        if not cache.could_match(held):
+            # Not a fixed phrase: stream to the TTS right away
+            async for frame in synthesize(_prepend(held, chunks)):
+                yield frame
+            return
+
+    if not cache.is_phrase(held):
+        if held.strip():
+            async for frame in synthesize(_prepend(held, chunks)):
+                yield frame
+        return
+
+    clip = await cache.get(held)
+    if clip:
+        for pcm in clip.chunks():
+            yield make_frame(pcm, clip.sample_rate, clip.num_channels)
+        return
+
+    # Fixed phrase not cached yet: synthesize once, keep the audio
+    pcm_chunks: List[bytes] = []
+    audio_format = None
+    async for frame in synthesize(_prepend(held, chunks)):
+        pcm_chunks.append(bytes(frame.data))
+        audio_format = (frame.sample_rate, frame.num_channels)
+        yield frame
+    if pcm_chunks:
+        await cache.put(held, AudioClip(b"".join(pcm_chunks), *audio_format))
@@ -0,0 +1,93 @@
+"""
+Stale turn cancellation for Voyaltis Agent
+A turn becomes stale before its reply is delivered when:
+- superseded:   in text mode, a newer user message arrives while the previous reply
+                is still waiting on the LLM (the reply would arrive after the fresh one)
+- mode_switch:  the rep switches back to voice during a text reply
+- interrupted:  in voice mode, the rep barges in during LLM generation or playout
+                (the speech handle cancels the LLM and TTS nodes)
+Text turns run as one task per session, cancelled by the next one while their reply is
+not delivered yet; once it streams, the next message waits for it. The tokens spent
+on a stale turn (estimated prompt tokens once the request is sent, generated text)
+are recorded as waste.
+"""
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Optional
+
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+STALE_TURNS = metrics.REGISTRY.counter(
+    "voyaltis_stale_turns_total", "Turns cancelled before their reply was delivered, by mode and reason", ("project", "mode", "reason")
+)
+STALE_TURN_WASTED_TOKENS = metrics.REGISTRY.counter(
+    "voyaltis_stale_turn_wasted_tokens_total", "Estimated prompt and generated tokens of cancelled turns", ("project", "mode")
+)
+
+
+def estimate_tokens(chars: int) -> int:
+    return chars // 4
+
+
+def chunk_text(chunk) -> str:
+    """Text of an LLM node chunk (str, or ChatChunk with a delta)"""
+    if isinstance(chunk, str):
+        return chunk
+    delta = getattr(chunk, "delta", None)
+    return getattr(delta, "content", None) or ""
+
+
+@dataclass
+class TurnWork:
+    """Work spent on one turn"""
+    prompt_tokens: int = 0
+    generated_chars: int = 0
+    delivered: bool = False
+
+    @property
+    def tokens(self) -> int:
+        return self.prompt_tokens + estimate_tokens(self.generated_chars)
+
+
+class TurnCanceller:
+    """At most one text turn in flight per session, and the waste of every cancelled turn"""
+
+    def __init__(self):
+        self.stats: Dict[str, int] = {"superseded": 0, "mode_switch": 0, "interrupted": 0, "wasted_tokens": 0}
+        self._task: Optional[asyncio.Task] = None
+        self._work: Optional[TurnWork] = None
+
+    def record(self, work: TurnWork, project: str, mode: str, reason: str):
+        tokens = work.tokens
+        self.stats[reason] += 1
+        self.stats["wasted_tokens"] += tokens
+        STALE_TURNS.inc(project=project, mode=mode, reason=reason)
+        if tokens:
+            STALE_TURN_WASTED_TOKENS.inc(tokens, project=project, mode=mode)
+        logger.info(f"✂️ Stale {mode} turn cancelled ({reason}, ~{tokens} tokens wasted)")
+
+    def start_text_turn(self, handler: Callable[[TurnWork], Awaitable], project: str) -> asyncio.Task:
+        """Run handler(work) as the current text turn, cancelling the previous one"""
+        self.cancel_text_turn(project, "superseded")
+        work = TurnWork()
+        task = asyncio.ensure_future(handler(work))
+        self._task, self._work = task, work
+        return task
+
+    async def wait_delivered(self):
+        """Wait for the text turn whose reply is being delivered (it cannot be cancelled)"""
+        task, work = self._task, self._work
+        if task and not task.done() and work.delivered:
+            await asyncio.wait({task})
+
+    def cancel_text_turn(self, project: str, reason: str) -> bool:
+        """Cancel the text turn in flight, unless its reply is already being delivered"""
+        task, work = self._task, self._work
+        if not task or task.done() or work.delivered:
+            return False
+        task.cancel()
+        self.record(work, project, "text", reason)
+        return True
@@ -123,17 +123,41 @@ export default function ProjectScreen() {
     }
   };
 
-  const handleAgentResponse = (text: string) => {
+  const handleAgentResponse = (text: string, responseId?: string) => {
     // Ajouter la réponse de l'agent à l'historique
     if (text.trim()) {
+      const messageId = responseId ? `agent-${responseId}` : `agent-${Date.now()}`;
+      setConversationMessages(prev => {
+        // Réponse texte diffusée : le message complet remplace les morceaux reçus
+        if (prev.some(message => message.id === messageId)) {
+          return prev.map(message => message.id === messageId ? { ...message, text: text.trim() } : message);
+        }
+        const agentMessage: Message = {
+          id: messageId,
+          text: text.trim(),
+          sender: 'agent',
+          timestamp: new Date(),
+        };
+        return [...prev, agentMessage];
+      });
+    }
+  };
+
+  const handleAgentResponseDelta = (responseId: string, text: string) => {
+    // Réponse texte en cours de génération : afficher les morceaux au fil de l'eau
+    const messageId = `agent-${responseId}`;
+    setConversationMessages(prev => {
+      if (prev.some(message => message.id === messageId)) {
+        return prev.map(message => message.id === messageId ? { ...message, text: message.text + text } : message);
+      }
       const agentMessage: Message = {
-        id: `agent-${Date.now()}`,
-        text: text.trim(),
+        id: messageId,
+        text: text.trimStart(),
         sender: 'agent',
         timestamp: new Date(),
       };
-      setConversationMessages(prev => [...prev, agentMessage]);
-    }
+      return [...prev, agentMessage];
+    });
   };
 
   const handleConnectionStateChange = (isConnected: boolean, isAgentSpeaking: boolean) => {
@@ -935,6 +959,7 @@ export default function ProjectScreen() {
                   existingReport={dailyReport}
                   onTranscription={handleTranscription}
                   onAgentResponse={handleAgentResponse}
+                  onAgentResponseDelta={handleAgentResponseDelta}
                   onConversationComplete={handleConversationComplete}
                   onGeneratingReport={() => {
                     // Ouvrir le modal immédiatement en mode chargement
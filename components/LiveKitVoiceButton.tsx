@@ -18,7 +18,8 @@ interface LiveKitVoiceButtonProps {
   eventName?: string;
   existingReport?: any;
   onTranscription?: (text: string, isFinal: boolean) => void;
-  onAgentResponse?: (text: string) => void;
+  onAgentResponse?: (text: string, responseId?: string) => void;
+  onAgentResponseDelta?: (responseId: string, text: string) => void;
   onConversationComplete?: (data: any) => void;
   onGeneratingReport?: () => void; // Called when report generation starts
   onConnectionStateChange?: (isConnected: boolean, isAgentSpeaking: boolean) => void;
@@ -35,6 +36,7 @@ export default function LiveKitVoiceButton({
   existingReport,
   onTranscription,
   onAgentResponse,
+  onAgentResponseDelta,
   onConversationComplete,
   onGeneratingReport,
   onConnectionStateChange,
@@ -67,6 +69,7 @@ export default function LiveKitVoiceButton({
     existingReport,
     onTranscription,
     onAgentResponse,
+    onAgentResponseDelta,
     onGeneratingReport, // Pass through to hook
     onConversationComplete: (data) => {
       // Report received, now we can fully disconnect
@@ -13,7 +13,8 @@ export interface UseLiveKitRoomOptions {
   eventName?: string;
   existingReport?: any; // Pass existing report for edit mode
   onTranscription?: (text: string, isFinal: boolean) => void;
-  onAgentResponse?: (text: string) => void;
+  onAgentResponse?: (text: string, responseId?: string) => void;
+  onAgentResponseDelta?: (responseId: string, text: string) => void; // Text mode: reply streamed as it is generated
   onConversationComplete?: (data: any) => void;
   onGeneratingReport?: () => void; // Called when conversation ending signal received
 }
@@ -35,7 +36,7 @@ export interface UseLiveKitRoomReturn {
 }
 
 export function useLiveKitRoom(options: UseLiveKitRoomOptions): UseLiveKitRoomReturn {
-  const { userName, projectId, eventName, onTranscription, onAgentResponse, onConversationComplete, onGeneratingReport } = options;
+  const { userName, projectId, eventName, onTranscription, onAgentResponse, onAgentResponseDelta, onConversationComplete, onGeneratingReport } = options;
 
   const [isConnecting, setIsConnecting] = useState(false);
   const [isConnected, setIsConnected] = useState(false);
@@ -181,9 +182,13 @@ export function useLiveKitRoom(options: UseLiveKitRoomOptions): UseLiveKitRoomRe
           setIsGeneratingReport(false); // Stop animation when report is ready
           onConversationComplete(message.data);
         }
-        // Handle agent response (for conversation history)
+        // Handle streamed agent response chunk (text mode, appended to the message with the same id)
+        else if (message.type === 'agent_response_delta' && onAgentResponseDelta) {
+          onAgentResponseDelta(message.id, message.text);
+        }
+        // Handle agent response (for conversation history, replaces the streamed chunks)
         else if (message.type === 'agent_response' && onAgentResponse) {
-          onAgentResponse(message.text);
+          onAgentResponse(message.text, message.id);
         }
         // Handle user transcription (for conversation history)
         else if (message.type === 'user_transcription' && onTranscription) {
@@ -198,7 +203,7 @@ export function useLiveKitRoom(options: UseLiveKitRoomOptions): UseLiveKitRoomRe
     room.on(RoomEvent.ConnectionQualityChanged, (quality, participant) => {
       console.log('Connection quality changed:', quality, participant?.identity);
     });
-  }, [onTranscription, onAgentResponse, onConversationComplete]);
+  }, [onTranscription, onAgentResponse, onAgentResponseDelta, onConversationComplete]);
 
   // Connect to room
   const connect = useCallback(async () => {